@@ -2,14 +2,18 @@
 Flask web application for monitoring dashboard.
 """
 
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session
+from flask import Flask, render_template, jsonify, request, redirect, url_for, session, Response
 from src.analytics import (
     get_complete_report,
     get_uptime_summary,
     get_performance_stats,
+    get_anomalies,
+    get_slos,
     detect_outages
 )
-from src.database import get_recent_checks, get_check_count
+from src.storage import get_storage
+from src.web.caching import conditional_json, API_CACHE_SECONDS
+import json
 import os
 
 # Create Flask app
@@ -25,14 +29,8 @@ def dashboard():
         # Get comprehensive report
         report = get_complete_report(hours=24)
         
-        # Ensure all values are valid numbers (not None)
-        if report and 'uptime' in report:
-            uptime = report['uptime']
-            uptime['overall'] = uptime.get('overall', 0.0) or 0.0
-            uptime['last_24h'] = uptime.get('last_24h', 0.0) or 0.0
-            uptime['last_7d'] = uptime.get('last_7d', 0.0) or 0.0
-            uptime['last_30d'] = uptime.get('last_30d', 0.0) or 0.0
-        
+        # Ensure all values are valid numbers (not None). Uptime stays None
+        # for periods without checks: the template shows "No data"
         if report and 'performance' in report:
             perf = report['performance']
             perf['total_checks'] = perf.get('total_checks', 0) or 0
@@ -44,7 +42,10 @@ def dashboard():
             perf['median_response_time'] = perf.get('median_response_time', 0.0) or 0.0
         
         # Get recent checks for table
-        recent_checks = get_recent_checks(limit=10)
+        recent_checks = get_storage().get_recent_checks(limit=10)
+        
+        # Error budgets per target (kept up to date incrementally)
+        slos = get_slos()
         
         # Ensure response_time is never None in recent checks
         for check in recent_checks:
@@ -56,12 +57,27 @@ def dashboard():
         success_message = session.pop('success_message', None)
         error = session.pop('error', None)
         
+        # Instant check queued by /check: show the result if it is already
+        # in, otherwise the page polls /api/check/<id> for it
+        check_job = None
+        job_id = session.pop('check_job', None)
+        if job_id:
+            from src.pipeline import get_pipeline
+            job = get_pipeline().get_job(job_id)
+            if job is not None:
+                check_job = job.to_dict()
+                if job.status == 'done':
+                    check_result = check_job['result']
+                    check_job = None
+        
         # Render dashboard template
         return render_template(
             'index.html',
             report=report,
             recent_checks=recent_checks,
+            slos=slos,
             check_result=check_result,
+            check_job=check_job,
             success_message=success_message,
             error=error
         )
@@ -74,10 +90,10 @@ def dashboard():
             'index.html',
             report={
                 'uptime': {
-                    'overall': 0.0,
-                    'last_24h': 0.0,
-                    'last_7d': 0.0,
-                    'last_30d': 0.0
+                    'overall': None,
+                    'last_24h': None,
+                    'last_7d': None,
+                    'last_30d': None
                 },
                 'performance': {
                     'total_checks': 0,
@@ -96,13 +112,16 @@ def dashboard():
                 'report_period_hours': 24
             },
             recent_checks=[],
+            slos=[],
             check_result=None,
+            check_job=None,
             success_message=None,
             error=None
         )
 
 
 @app.route('/api/status')
+@conditional_json(time_bucket=API_CACHE_SECONDS)
 def api_status():
     """
     API endpoint for current status (JSON).
@@ -116,6 +135,7 @@ def api_status():
 
 
 @app.route('/api/uptime')
+@conditional_json(time_bucket=API_CACHE_SECONDS)
 def api_uptime():
     """
     API endpoint for uptime data only.
@@ -128,24 +148,276 @@ def api_uptime():
 
 
 @app.route('/api/recent')
+@conditional_json()
 def api_recent():
     """
     API endpoint for recent checks.
     """
     try:
-        recent = get_recent_checks(limit=20)
+        recent = get_storage().get_recent_checks(limit=20)
         return jsonify(recent)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/anomalies')
+def api_anomalies():
+    """
+    API endpoint for latency baselines, flap rates and anomaly flags per target.
+    Optional query parameter: url.
+    """
+    try:
+        return jsonify(get_anomalies(url=request.args.get('url')))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/timeseries/<metric>')
+@conditional_json(time_bucket=API_CACHE_SECONDS)
+def api_timeseries(metric):
+    """
+    API endpoint for response time and uptime series, downsampled for charts.
+    Query parameters: hours or days (default 24 hours), or start/end;
+    points (default 300); method (lttb or minmax); url (default all).
+    """
+    from src.timeseries import get_timeseries, period_bounds, METRICS, METHODS, DEFAULT_POINTS
+
+    method = request.args.get('method', 'lttb')
+    if metric not in METRICS:
+        return jsonify({'error': f"Unknown metric, use one of: {', '.join(METRICS)}"}), 404
+    if method not in METHODS:
+        return jsonify({'error': f"Unknown method, use one of: {', '.join(METHODS)}"}), 400
+    try:
+        start, end = period_bounds(
+            hours=request.args.get('hours', type=float),
+            days=request.args.get('days', type=float),
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+        points = request.args.get('points', DEFAULT_POINTS, type=int)
+    except (ValueError, OverflowError) as e:
+        return jsonify({'error': f'Invalid period: {e}'}), 400
+
+    series = get_timeseries(metric, start, end, points=points, url=request.args.get('url'), method=method)
+    if series is None:
+        return jsonify({'error': 'Could not read series'}), 500
+    return jsonify(series)
+
+
+@app.route('/api/slo')
+def api_slo():
+    """
+    API endpoint for SLIs, error budgets and burn rates per target.
+    Optional query parameter: url.
+    """
+    try:
+        return jsonify(get_slos(url=request.args.get('url')))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def read_agent_batch():
+    """
+    Authorize an agent request and read its (decompressed) body.
+    Without AGENT_TOKEN only local clients may send results, unless
+    AGENT_ALLOW_UNAUTHENTICATED is set.
+
+    Returns:
+        tuple: (body, None), or (None, error response) to return as is
+    """
+    from src.aggregator import AGENT_TOKEN, MAX_BATCH_BYTES, is_authorized, decompress
+    
+    if not is_authorized(request.headers.get('X-Agent-Token'), request.remote_addr):
+        message = 'Invalid agent token' if AGENT_TOKEN else 'Set AGENT_TOKEN to accept results from other hosts'
+        return None, (jsonify({'error': message}), 401)
+    if (request.content_length or 0) > MAX_BATCH_BYTES:
+        return None, (jsonify({'error': f'Batch is larger than {MAX_BATCH_BYTES} bytes'}), 413)
+    try:
+        body = request.get_data()
+        if request.headers.get('Content-Encoding') == 'gzip':
+            body = decompress(body)
+    except ValueError as e:
+        return None, (jsonify({'error': f'Invalid batch: {e}'}), 400)
+    return body, None
+
+
+@app.route('/api/agents/results', methods=['POST'])
+def api_agent_results():
+    """
+    Aggregator endpoint: save a batch of results from a probe agent.
+    Body: {"agent": name, "results": [...]}, optionally gzip-compressed.
+    """
+    from src.aggregator import decode_results, get_aggregator
+    
+    body, error = read_agent_batch()
+    if error:
+        return error
+    try:
+        agent, results = decode_results(json.loads(body))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid batch: {e}'}), 400
+    
+    row_ids = get_aggregator().ingest(agent, results)
+    if results and not row_ids:
+        return jsonify({'error': 'Could not save results'}), 503
+    return jsonify({'saved': len(row_ids), 'ids': row_ids})
+
+
+@app.route('/api/ingest', methods=['POST'])
+def api_ingest():
+    """
+    Bulk ingest endpoint: save a binary batch of results (see src/wire.py),
+    optionally gzip-compressed. Batches naming an agent also update the
+    aggregator's quorum decisions.
+    """
+    from src.aggregator import MAX_BATCH_RESULTS, get_aggregator
+    from src.wire import decode_results
+    
+    body, error = read_agent_batch()
+    if error:
+        return error
+    try:
+        agent, results = decode_results(body, max_results=MAX_BATCH_RESULTS)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid batch: {e}'}), 400
+    
+    if agent:
+        row_ids = get_aggregator().ingest(agent, results)
+    else:
+        row_ids = get_storage().save_checks(results) if results else []
+    if results and not row_ids:
+        return jsonify({'error': 'Could not save results'}), 503
+    return jsonify({'saved': len(row_ids), 'ids': row_ids})
+
+
+@app.route('/api/agents')
+def api_agents():
+    """
+    API endpoint for probe agents and the quorum decision per URL.
+    """
+    from src.aggregator import get_aggregator
+    return jsonify(get_aggregator().get_status())
+
+
+@app.route('/api/pipeline')
+def api_pipeline():
+    """
+    API endpoint for probe pipeline queue depths and counters
+    (including the log pipeline's).
+    """
+    from src.pipeline import get_pipeline_stats
+    from src.logger import get_logging_stats
+    stats = get_pipeline_stats()
+    stats['logging'] = get_logging_stats()
+    return jsonify(stats)
+
+
+@app.route('/api/alerts')
+def api_alerts():
+    """
+    API endpoint for firing/flapping alerts and notification delivery counters.
+    """
+    from src.alerts import get_alert_status
+    return jsonify(get_alert_status())
+
+
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus/OpenMetrics scrape endpoint.
+    Served from in-memory counters, never touches the database.
+    """
+    from src.metrics import render_metrics
+    body, content_type = render_metrics(request.headers.get('Accept', ''))
+    return Response(body, content_type=content_type)
+
+
+def local_only():
+    """
+    Refuse debug requests from other machines: spans and stack samples
+    show the monitor's internals, and serve.py listens on all interfaces.
+
+    Returns:
+        tuple: (response, 403) for remote clients, None for local ones
+    """
+    from src.aggregator import LOCAL_ADDRESSES
+    if request.remote_addr not in LOCAL_ADDRESSES:
+        return jsonify({'error': 'Only allowed from localhost'}), 403
+    return None
+
+
+@app.route('/debug/spans')
+def debug_spans():
+    """
+    Timing spans of the monitor's own hot paths (see src/instrumentation.py).
+    Only served to localhost.
+    """
+    from src.instrumentation import is_enabled, get_span_stats, get_profiler
+    
+    forbidden = local_only()
+    if forbidden:
+        return forbidden
+    
+    profiler = get_profiler()
+    return jsonify({
+        'enabled': is_enabled(),
+        'spans': get_span_stats(),
+        'profiler': profiler.get_stats() if profiler else {'running': False}
+    })
+
+
+@app.route('/debug/instrumentation', methods=['POST'])
+def debug_instrumentation():
+    """
+    Switch spans and the sampling profiler on or off at runtime.
+    JSON body: {"spans": true|false, "profiler": true|false, "interval": 0.01}
+    Only accepted from localhost.
+    """
+    from src import instrumentation
+    
+    forbidden = local_only()
+    if forbidden:
+        return forbidden
+    
+    options = request.get_json(silent=True) or {}
+    if 'spans' in options:
+        instrumentation.enable() if options['spans'] else instrumentation.disable()
+    if 'profiler' in options:
+        if options['profiler']:
+            instrumentation.start_profiler(float(options.get('interval', 0.01)))
+        else:
+            instrumentation.stop_profiler()
+    
+    return debug_spans()
+
+
+@app.route('/debug/profile')
+def debug_profile():
+    """
+    Sampling profiler output as folded stacks (flame graph input).
+    Only served to localhost.
+    """
+    from src.instrumentation import get_profiler
+    
+    forbidden = local_only()
+    if forbidden:
+        return forbidden
+    
+    profiler = get_profiler()
+    if profiler is None:
+        return jsonify({'error': 'Profiler was never started'}), 404
+    limit = request.args.get('limit', type=int)
+    return Response(profiler.folded(limit), mimetype='text/plain')
+
+
 @app.route('/health')
 def health():
     """
     Health check endpoint.
     """
     try:
-        total_checks = get_check_count()
+        from src.metrics import get_total_checks
+        total_checks = get_total_checks()
         return jsonify({
             'status': 'healthy',
             'total_checks': total_checks
@@ -160,18 +432,26 @@ def health():
 @app.route('/check', methods=['POST'])
 def instant_check():
     """
-    Instant URL check - user submits URL and gets immediate result.
-    Uses POST-Redirect-GET pattern to prevent form resubmission.
+    Instant URL check - user submits URL and the check is queued.
+    Returns right away instead of holding the request while the probe
+    (and its retries) run. Form posts use POST-Redirect-GET and the
+    dashboard polls for the result; JSON clients get 202 with a job id.
     """
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    
     try:
-        from src.monitor import check_website
-        from src.database import save_check
+        from src.pipeline import get_pipeline
         
-        # Get URL from form
-        url = request.form.get('url', '').strip()
+        # Get URL from form (or JSON body)
+        url = request.form.get('url', '')
+        if not url and request.is_json:
+            url = (request.get_json(silent=True) or {}).get('url', '')
+        url = url.strip()
         
         # Validate URL
         if not url:
+            if wants_json:
+                return jsonify({'error': 'Please enter a URL'}), 400
             session['error'] = "Please enter a URL"
             return redirect(url_for('dashboard'))
         
@@ -179,24 +459,68 @@ def instant_check():
         if not url.startswith('http://') and not url.startswith('https://'):
             url = 'https://' + url
         
-        # Check the website
-        result = check_website(url, timeout=5)
+        # Queue the check on the shared probe pipeline (result is saved there)
+        job = get_pipeline().submit_job(url, timeout=5)
         
-        # Save to database
-        save_check(result)
+        if wants_json:
+            return jsonify({
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': url_for('api_check_status', job_id=job.id),
+                'events_url': url_for('api_check_events', job_id=job.id)
+            }), 202
         
-        # Store result in session for display after redirect
-        session['check_result'] = result
-        session['success_message'] = f"Checked {url} successfully!"
+        # Remember the job for display after redirect
+        session['check_job'] = job.id
+        session['success_message'] = f"Checking {url}..."
         
         # Redirect to dashboard (PRG pattern)
         return redirect(url_for('dashboard'))
             
     except Exception as e:
+        if wants_json:
+            return jsonify({'error': f"Error checking URL: {str(e)}"}), 500
         session['error'] = f"Error checking URL: {str(e)}"
         return redirect(url_for('dashboard'))
 
 
+@app.route('/api/check/<job_id>')
+def api_check_status(job_id):
+    """
+    API endpoint for polling an instant check job.
+    """
+    from src.pipeline import get_pipeline
+    
+    job = get_pipeline().get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/check/<job_id>/events')
+def api_check_events(job_id):
+    """
+    Server-Sent Events stream for an instant check job.
+    Sends one 'result' event when the job finishes.
+    """
+    from src.pipeline import get_pipeline
+    
+    job = get_pipeline().get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    
+    def stream():
+        # Keep-alive comments until the job is finished (or we give up)
+        for _ in range(60):
+            if job.wait(timeout=1):
+                break
+            yield ': waiting\n\n'
+        yield f"event: result\ndata: {json.dumps(job.to_dict())}\n\n"
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
 if __name__ == '__main__':
     # Get port from environment or default to 5000
     port = int(os.getenv('FLASK_PORT', 5000))
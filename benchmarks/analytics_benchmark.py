@@ -0,0 +1,113 @@
+"""
+Analytics backend benchmark: SQL/Python versus NumPy columns.
+
+For each history size a temporary database is seeded (see
+uptime_benchmark.py) and these report stages are timed on both backends
+over the whole history:
+
+- uptime:       calculate_uptime_percentage (time-weighted)
+- outages:      detect_outages
+- performance:  get_performance_stats
+- percentiles:  p50/p90/p95/p99 of response times (SQL: sorted fetch)
+
+The NumPy backend keeps the columns in memory and only reads new checks
+on later calls: "cold load" is the first full read from SQLite, the stage
+timings are warm (best of --repeat runs, data unchanged).
+
+Usage:
+    python benchmarks/analytics_benchmark.py
+    python benchmarks/analytics_benchmark.py --sizes 100000,1000000,10000000 --json analytics.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import src.analytics as analytics
+import src.database as database
+from src import vectorized
+from benchmarks.uptime_benchmark import seed_database, measure
+
+QUANTILES = (50, 90, 95, 99)
+
+
+def sql_percentiles():
+    """
+    Percentiles the way the SQL backend computes the median: sorted fetch.
+    """
+    conn = database.get_connection()
+    times = [row[0] for row in conn.execute(
+        'SELECT response_time FROM checks WHERE success = 1 AND response_time IS NOT NULL '
+        'ORDER BY response_time')]
+    database.close_connection(conn)
+    return {f'p{q}': round(times[min(len(times) - 1, int(len(times) * q / 100))], 3)
+            for q in QUANTILES}
+
+
+def numpy_percentiles():
+    return vectorized.percentiles(vectorized.load_columns(), QUANTILES)
+
+
+STAGES = {
+    'uptime': lambda: analytics.calculate_uptime_percentage(method='time'),
+    'outages': lambda: len(analytics.detect_outages(hours=None)),
+    'performance': lambda: analytics.get_performance_stats()['median_response_time']
+}
+
+
+def run_size(rows, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        seed_database(os.path.join(tmp, 'monitoring.db'), rows)
+        print(f"Seeded {rows} checks in {time.perf_counter() - start:.1f}s")
+
+        # First call fills the process-wide column store
+        results['numpy:cold_load'] = measure(lambda: len(vectorized.load_columns()), 1)
+
+        for backend in ('sql', 'numpy'):
+            analytics.ANALYTICS_BACKEND = backend
+            for stage, fn in STAGES.items():
+                results[f'{backend}:{stage}'] = measure(fn, repeat)
+            percentiles = sql_percentiles if backend == 'sql' else numpy_percentiles
+            results[f'{backend}:percentiles'] = measure(percentiles, repeat)
+
+    print(f"{rows:>9} cold load    numpy {results['numpy:cold_load']['best_seconds']:8.3f}s")
+    for stage in list(STAGES) + ['percentiles']:
+        sql = results[f'sql:{stage}']['best_seconds']
+        fast = results[f'numpy:{stage}']['best_seconds']
+        print(f"{rows:>9} {stage:12} sql {sql:8.3f}s  numpy {fast:8.3f}s  "
+              f"x{sql / fast if fast else float('inf'):5.1f}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark analytics backends')
+    parser.add_argument('--sizes', default='100000,1000000', help='Comma-separated row counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    if not vectorized.HAS_NUMPY:
+        print("❌ NumPy is not installed (pip install numpy)")
+        return 1
+
+    results = {'generated': datetime.now().isoformat(timespec='seconds'), 'sizes': {}}
+    for rows in (int(size) for size in options.sizes.split(',')):
+        results['sizes'][rows] = run_size(rows, options.repeat)
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
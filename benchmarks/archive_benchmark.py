@@ -0,0 +1,98 @@
+"""
+Archive export / import benchmark.
+
+Fills a temporary database with synthetic checks (see uptime_benchmark.py),
+then times `run.py export` and `run.py import` into an empty database:
+
+- rows/s each way
+- archive size against the database file
+- peak resident memory after each step (should not grow with --rows)
+
+Usage:
+    python benchmarks/archive_benchmark.py
+    python benchmarks/archive_benchmark.py --rows 10000000 --json archive.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import src.database as database
+from src import archive
+from uptime_benchmark import seed_database
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def timed_step(fn):
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': count,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(count / elapsed) if count else 0,
+        'peak_memory_mb': peak_memory_mb()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark archive export/import')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--targets', type=int, default=3)
+    parser.add_argument('--level', type=int, default=archive.COMPRESSION_LEVEL)
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    results = {'rows': options.rows, 'level': options.level}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'monitoring.db')
+        path = os.path.join(tmp, 'history.chka')
+
+        start = time.perf_counter()
+        seed_database(source, options.rows, options.targets)
+        print(f"Seeded {options.rows} checks in {time.perf_counter() - start:.1f}s")
+        results['seed_memory_mb'] = peak_memory_mb()
+
+        results['export'] = timed_step(
+            lambda: archive.export_checks(path, level=options.level))
+
+        database.DB_PATH = os.path.join(tmp, 'restored.db')
+        database.init_database()
+        results['import'] = timed_step(lambda: archive.import_checks(path))
+
+        results['database_mb'] = round(os.path.getsize(source) / 2 ** 20, 1)
+        results['archive_mb'] = round(os.path.getsize(path) / 2 ** 20, 1)
+
+    for step in ('export', 'import'):
+        r = results[step]
+        print(f"{step:6} {r['seconds']:8.2f}s  {r['rows_per_second']:>10,} rows/s  "
+              f"peak {r['peak_memory_mb']} MB")
+    print(f"database {results['database_mb']} MB, archive {results['archive_mb']} MB")
+
+    results['generated'] = datetime.now().isoformat(timespec='seconds')
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
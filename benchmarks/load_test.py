@@ -0,0 +1,192 @@
+"""
+Local load test for the dashboard API.
+
+Seeds a temporary database with synthetic checks, starts the dashboard
+on localhost and hammers an endpoint with keep-alive clients. Compares
+the Flask development server ("dev", what `python app.py` runs) with the
+production entry point ("prod", `python serve.py`). No network access.
+
+Usage:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --modes prod --clients 16 --duration 20
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import src.database as database
+
+
+def seed_database(path, rows, targets=3, days=30):
+    """
+    Fill a database with synthetic checks spread over the last `days` days.
+    """
+    database.DB_PATH = path
+    database.init_database()
+
+    now = datetime.now()
+    step = timedelta(days=days) / rows
+    urls = [f'https://target-{i}.test/' for i in range(targets)]
+    batch = []
+    for i in range(rows):
+        success = random.random() > 0.02
+        batch.append({
+            'url': urls[i % targets],
+            'timestamp': now - step * (rows - i),
+            'status_code': 200 if success else None,
+            'response_time': random.uniform(0.05, 0.8) if success else None,
+            'success': success,
+            'error': None if success else 'Connection failed - Cannot reach website',
+            'retries': 0 if success else 3
+        })
+        if len(batch) == 5000:
+            database.save_checks(batch)
+            batch = []
+    if batch:
+        database.save_checks(batch)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, db_path, threads):
+    """
+    Start the dashboard in a subprocess and wait until it answers.
+    """
+    env = dict(os.environ, DB_PATH=db_path, FLASK_PORT=str(port))
+    if mode == 'dev':
+        command = [sys.executable, '-c',
+                   'from app import app; '
+                   f'app.run(host="127.0.0.1", port={port}, debug=True, use_reloader=False)']
+    else:
+        command = [sys.executable, 'serve.py', '--host', '127.0.0.1',
+                   '--port', str(port), '--threads', str(threads)]
+
+    process = subprocess.Popen(command, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/health')
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def run_load(port, path, clients, duration):
+    """
+    Hit `path` from `clients` keep-alive connections for `duration` seconds.
+
+    Returns:
+        dict: requests, errors, requests/sec and latency percentiles (ms)
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        local = []
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise http.client.HTTPException(response.status)
+                local.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the dashboard API')
+    parser.add_argument('--modes', default='dev,prod', help='Comma-separated: dev, prod')
+    parser.add_argument('--path', default='/api/status')
+    parser.add_argument('--rows', type=int, default=20000, help='Synthetic checks to seed')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=8, help='Server threads (prod)')
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'monitoring.db')
+        print(f"Seeding {options.rows} checks...")
+        seed_database(db_path, options.rows)
+
+        for mode in options.modes.split(','):
+            port = free_port()
+            process = start_server(mode, port, db_path, options.threads)
+            try:
+                run_load(port, options.path, options.clients, 1)  # warm-up
+                results[mode] = run_load(port, options.path, options.clients, options.duration)
+            finally:
+                process.terminate()
+                process.wait()
+
+            r = results[mode]
+            print(f"{mode:5} {options.path}: {r['requests_per_sec']:8.1f} req/s  "
+                  f"p50 {r['p50_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms  "
+                  f"({r['requests']} requests, {r['errors']} errors)")
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
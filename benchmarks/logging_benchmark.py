@@ -0,0 +1,107 @@
+"""
+Logging overhead benchmark.
+
+Logs what one check logs (a result line and a "saved" line) many times
+and reports the time the calling thread spends per check for:
+
+- sync:         a colored StreamHandler writing in the caller (the old setup)
+- async_text:   the queued pipeline with colored output (src/logger.py)
+- async_json:   the queued pipeline with JSON output
+- async_sample: the queued pipeline with LOG_CHECK_SAMPLE-style sampling
+
+Output goes to a temporary file, so the numbers are a lower bound of what
+a terminal or a log shipper costs the synchronous setup.
+
+Usage:
+    python benchmarks/logging_benchmark.py
+    python benchmarks/logging_benchmark.py --checks 200000 --sample 0.01 --json logging.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.logger import LogPipeline, SampleFilter, build_formatter
+
+
+def log_checks(logger, checks):
+    start = time.perf_counter()
+    for i in range(checks):
+        url = f'https://target-{i % 20}.test/'
+        logger.info("✅ %s is UP - Status: %s - Response time: %.3fs", url, 200, 0.123,
+                    extra={'url': url, 'status_code': 200})
+        logger.info("💾 Saved check result to database (ID: %s)", i, extra={'url': url, 'check_id': i})
+    return time.perf_counter() - start
+
+
+def new_logger(name, handler, sample=None):
+    logger = logging.getLogger(f'bench.{name}')
+    logger.handlers = [handler]
+    logger.filters = []
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    if sample is not None:
+        logger.addFilter(SampleFilter(sample))
+    return logger
+
+
+def run(name, checks, path, fmt='text', sample=None, synchronous=False):
+    with open(path, 'w', encoding='utf-8') as stream:
+        if synchronous:
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(build_formatter('text'))
+            elapsed = log_checks(new_logger(name, handler), checks)
+            stats = {'written': checks * 2, 'dropped': 0}
+            drain = 0.0
+        else:
+            # Large enough that nothing is dropped: the cost measured is queuing
+            pipeline = LogPipeline(stream, fmt=fmt, queue_size=checks * 2 + 1)
+            elapsed = log_checks(new_logger(name, pipeline.handler, sample), checks)
+            start = time.perf_counter()
+            pipeline.stop()
+            drain = time.perf_counter() - start
+            stats = pipeline.stats
+    return {
+        'caller_us_per_check': round(elapsed / checks * 1e6, 2),
+        'drain_seconds': round(drain, 3),
+        'lines_written': stats['written'],
+        'dropped': stats['dropped']
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark per-check logging overhead')
+    parser.add_argument('--checks', type=int, default=50000)
+    parser.add_argument('--sample', type=float, default=0.01, help='Share kept by async_sample')
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    report = {'checks': options.checks, 'modes': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.log')
+        modes = report['modes']
+        modes['sync'] = run('sync', options.checks, path, synchronous=True)
+        modes['async_text'] = run('async_text', options.checks, path)
+        modes['async_json'] = run('async_json', options.checks, path, fmt='json')
+        modes['async_sample'] = run('async_sample', options.checks, path, sample=options.sample)
+
+    for name, r in report['modes'].items():
+        print(f"{name:13} {r['caller_us_per_check']:8.2f} µs/check in the caller  "
+              f"drain {r['drain_seconds']:6.3f} s  {r['lines_written']:>8,} lines  {r['dropped']} dropped")
+
+    report['generated'] = datetime.now().isoformat(timespec='seconds')
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
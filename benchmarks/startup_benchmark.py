@@ -0,0 +1,133 @@
+"""
+Startup time benchmark.
+
+Imports each entry point in a fresh interpreter with `python -X importtime`
+and reports:
+
+- import_ms:  cumulative import time of the entry point module (median)
+- wall_ms:    whole process time minus an empty interpreter's (median)
+- heaviest:   modules with the most import time of their own
+- heavy:      modules of HEAVY_MODULES that were imported (should be none
+              except where listed in ALLOWED_HEAVY)
+
+Entry points with a budget in IMPORT_BUDGETS_MS fail --check when their
+import time is over it; tests/test_startup.py enforces the same budgets.
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 10 --check --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Entry points (module imported by `import <name>`)
+ENTRY_POINTS = ['run', 'src.agent', 'src.scheduler', 'src.database', 'src.wire', 'app']
+
+# Most milliseconds an entry point's imports may take. Generous against
+# typical runs (5-10x), so only a new eager heavy import trips them.
+IMPORT_BUDGETS_MS = {
+    'run': 150,
+    'src.agent': 300,
+    'src.scheduler': 300,
+    'src.database': 150,
+    'src.wire': 50,
+}
+
+# Dependencies that should only load when they are used
+HEAVY_MODULES = ['requests', 'apscheduler', 'flask', 'numpy', 'http.server', 'smtplib', 'dotenv']
+
+# Heavy modules an entry point needs anyway
+ALLOWED_HEAVY = {'app': {'flask', 'http.server'}}
+
+
+def import_times(module, env=None):
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Args:
+        module (str): Module name
+        env (dict): Environment (default: this one's)
+
+    Returns:
+        dict: module name -> (self microseconds, cumulative microseconds)
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        # The first import of a module is the one that counts
+        times.setdefault(name.strip(), (int(own), int(cumulative)))
+    return times
+
+
+def wall_time(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure(module, runs, baseline):
+    imports = [import_times(module) for _ in range(runs)]
+    walls = [wall_time(f'import {module}') for _ in range(runs)]
+    last = imports[-1]
+    heaviest = sorted(last.items(), key=lambda item: item[1][0], reverse=True)[:5]
+    return {
+        'import_ms': round(statistics.median(t[module][1] for t in imports) / 1000, 1),
+        'wall_ms': round(max(0.0, statistics.median(walls) - baseline) * 1000, 1),
+        'heaviest': [[name, round(own / 1000, 1)] for name, (own, _) in heaviest],
+        'heavy': sorted(name for name in HEAVY_MODULES
+                        if name in last and name not in ALLOWED_HEAVY.get(module, ()))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark entry point startup time')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--modules', default=','.join(ENTRY_POINTS))
+    parser.add_argument('--check', action='store_true', help='Exit 1 if a budget is exceeded')
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    baseline = statistics.median(wall_time('pass') for _ in range(options.runs))
+    results = {'runs': options.runs, 'interpreter_ms': round(baseline * 1000, 1), 'modules': {}}
+    failures = []
+    for module in options.modules.split(','):
+        r = results['modules'][module] = measure(module, options.runs, baseline)
+        budget = IMPORT_BUDGETS_MS.get(module)
+        over = budget is not None and r['import_ms'] > budget
+        if over or r['heavy']:
+            failures.append(module)
+        print(f"{module:14} import {r['import_ms']:7.1f} ms"
+              f"{f' (budget {budget})' if budget else '':14}  wall +{r['wall_ms']:6.1f} ms  "
+              f"{'heavy: ' + ', '.join(r['heavy']) if r['heavy'] else ''}"
+              f"{'  OVER BUDGET' if over else ''}")
+        print(f"{'':14} heaviest: " + ', '.join(f"{name} {ms}" for name, ms in r['heaviest']))
+    print(f"empty interpreter {results['interpreter_ms']} ms")
+
+    results['generated'] = datetime.now().isoformat(timespec='seconds')
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if options.check and failures:
+        print(f"❌ Over budget or loading heavy modules: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
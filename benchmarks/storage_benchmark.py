@@ -0,0 +1,106 @@
+"""
+Storage backend benchmark.
+
+Runs the same workload on each storage backend (see src/storage.py):
+
+- save:    save_checks() in batches of 50, like the pipeline writer
+- report:  get_complete_report(hours=24)
+- uptime:  calculate_uptime_percentage() over the whole history
+
+so analytics can be compared with and without SQLite and the disk.
+
+Usage:
+    python benchmarks/storage_benchmark.py
+    python benchmarks/storage_benchmark.py --rows 200000 --json storage.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import src.database as database
+from src import storage
+from src.analytics import get_complete_report, calculate_uptime_percentage
+
+
+def make_checks(rows, targets, days=7):
+    rng = random.Random(1)
+    end = datetime.now().replace(microsecond=0)
+    step = days * 86400 / rows
+    checks = []
+    for i in range(rows):
+        success = rng.random() > 0.02
+        checks.append({
+            'url': f'https://target-{i % targets}.test/',
+            'timestamp': end - timedelta(seconds=int((rows - i) * step)),
+            'status_code': 200 if success else None,
+            'response_time': round(rng.uniform(0.05, 0.8), 3) if success else None,
+            'success': success,
+            'error': None if success else 'Timeout',
+            'retries': 0
+        })
+    return checks
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings), 4)
+
+
+def run_backend(name, checks, path, repeat):
+    if name == 'sqlite':
+        database.DB_PATH = path
+    backend = storage.BACKENDS[name]()
+    backend.init()
+    storage.set_storage(backend)
+
+    start = time.perf_counter()
+    for i in range(0, len(checks), 50):
+        backend.save_checks(checks[i:i + 50])
+    save_seconds = time.perf_counter() - start
+
+    return {
+        'save_rows_per_second': round(len(checks) / save_seconds),
+        'report_seconds': measure(lambda: get_complete_report(hours=24), repeat),
+        'uptime_seconds': measure(calculate_uptime_percentage, repeat)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark storage backends')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--targets', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--backends', default=','.join(sorted(storage.BACKENDS)))
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    checks = make_checks(options.rows, options.targets)
+    results = {'rows': options.rows, 'backends': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in options.backends.split(','):
+            r = run_backend(name, checks, os.path.join(tmp, f'{name}.db'), options.repeat)
+            results['backends'][name] = r
+            print(f"{name:7} save {r['save_rows_per_second']:>9,} rows/s  "
+                  f"report {r['report_seconds']:8.4f}s  uptime {r['uptime_seconds']:8.4f}s")
+
+    results['generated'] = datetime.now().isoformat(timespec='seconds')
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Local stub HTTP servers with scripted latency and failures.
+
+A StubServer answers every GET after a latency drawn from its script, and
+fails a share of requests in the scripted ways:
+
+    error_rate    503 response (the probe sees the site as down, no retry)
+    timeout_rate  no answer for `hang` seconds (past the probe's timeout)
+    reset_rate    connection closed without an answer
+
+Decisions come from a seeded random generator, so the same script gives
+the same sequence of outcomes. Everything listens on 127.0.0.1.
+"""
+
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Stub target. Counts requests and outcomes in `counts`.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency=0.005, jitter=0.0, error_rate=0.0, timeout_rate=0.0,
+                 reset_rate=0.0, hang=2.0, seed=1):
+        """
+        Args:
+            latency (float): Seconds before answering
+            jitter (float): Extra random seconds, up to this much
+            error_rate (float): Share of 503 answers
+            timeout_rate (float): Share of requests left hanging for `hang` seconds
+            reset_rate (float): Share of connections closed without an answer
+            hang (float): Seconds a timed-out request hangs
+            seed (int): Random seed of the script
+        """
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.reset_rate = reset_rate
+        self.hang = hang
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'ok': 0, 'error': 0, 'timeout': 0, 'reset': 0}
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def next_outcome(self):
+        """
+        Draw the outcome and delay of the next request.
+
+        Returns:
+            tuple: (outcome, seconds to wait)
+        """
+        with self.lock:
+            draw = self.rng.random()
+            delay = self.latency + self.rng.random() * self.jitter
+            if draw < self.reset_rate:
+                outcome = 'reset'
+            elif draw < self.reset_rate + self.timeout_rate:
+                outcome, delay = 'timeout', self.hang
+            elif draw < self.reset_rate + self.timeout_rate + self.error_rate:
+                outcome = 'error'
+            else:
+                outcome = 'ok'
+            self.counts[outcome] += 1
+        return outcome, delay
+
+    def handle_error(self, request, client_address):
+        # Probes give up on hanging requests, so broken pipes are expected
+        pass
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        outcome, delay = self.server.next_outcome()
+        time.sleep(delay)
+        if outcome == 'reset':
+            # RST instead of FIN, like a dropped connection
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.close_connection = True
+            return
+        body = b'ok' if outcome == 'ok' else b'unavailable'
+        self.send_response(200 if outcome == 'ok' else 503)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stubs(count, **script):
+    """
+    Start `count` stub servers with the same script (different seeds).
+
+    Returns:
+        list: Running StubServer instances
+    """
+    seed = script.pop('seed', 1)
+    return [StubServer(seed=seed + i, **script).start() for i in range(count)]
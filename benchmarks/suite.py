@@ -0,0 +1,254 @@
+"""
+Reproducible benchmark suite.
+
+Runs on a synthetic workload (benchmarks/workload.py) and local stub
+servers (benchmarks/stubs.py), with no network access and nothing written
+outside a temporary directory:
+
+- probe_throughput:    probes/s through the probe pipeline against stubs
+                       with scripted latency, 503s, timeouts and resets
+- save_check:          rows/s of single save_check() calls
+- save_checks_batch:   rows/s of save_checks() in batches of 50
+- report_latency:      get_complete_report(hours=24) on the seeded history
+- dashboard_render:    GET / (template render included)
+
+Results are written as JSON with the git commit, Python version and
+parameters, so runs of different versions can be compared:
+
+    python benchmarks/suite.py --json results/current.json
+    python benchmarks/suite.py --compare results/baseline.json
+
+--compare exits with status 1 if a metric regressed by more than
+--tolerance (default 25%).
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import src.database as database
+from src import storage
+from src.analytics import get_complete_report
+from src.monitor import check_website
+from src.pipeline import ProbePipeline
+from stubs import start_stubs
+from workload import generate_history, seed_storage, PATTERNS
+
+SUITE_VERSION = 1
+
+
+def metric(value, unit, better):
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def median_seconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench_probes(options):
+    """
+    Probe a distinct stub URL per probe through the pipeline (so nothing is
+    coalesced), saving into the in-memory backend.
+    """
+    stubs = start_stubs(
+        options.stub_servers, latency=options.stub_latency, jitter=options.stub_latency,
+        error_rate=0.02, timeout_rate=0.01, reset_rate=0.01, hang=options.probe_timeout * 2
+    )
+    previous = storage.set_storage(storage.MemoryStorage())
+
+    def probe(url, timeout=5):
+        return check_website(url, timeout=options.probe_timeout, max_retries=1)
+
+    pipeline = ProbePipeline(probe_workers=options.workers, probe_queue_size=options.probes,
+                             overflow_policy='block', probe=probe)
+    try:
+        pipeline.start()
+        start = time.perf_counter()
+        for i in range(options.probes):
+            stub = stubs[i % len(stubs)]
+            pipeline.submit(f'{stub.url}probe/{i}')
+        while pipeline.stats['saved'] + pipeline.stats['write_errors'] < options.probes:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+    finally:
+        pipeline.stop()
+        storage.set_storage(previous)
+        for stub in stubs:
+            stub.stop()
+
+    outcomes = {}
+    for stub in stubs:
+        for outcome, count in stub.counts.items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + count
+    print(f"  stub outcomes: {outcomes}")
+    return metric(round(options.probes / elapsed, 1), 'probes/s', 'higher')
+
+
+def bench_saves(options, tmp):
+    database.DB_PATH = os.path.join(tmp, 'saves.db')
+    database.init_database()
+    checks = list(generate_history(targets=options.targets, days=1, seed=options.seed))
+
+    single = checks[:options.single_saves]
+    start = time.perf_counter()
+    for check in single:
+        database.save_check(check)
+    single_rate = len(single) / (time.perf_counter() - start)
+
+    batched = checks[options.single_saves:]
+    start = time.perf_counter()
+    for i in range(0, len(batched), 50):
+        database.save_checks(batched[i:i + 50])
+    batch_rate = len(batched) / (time.perf_counter() - start)
+
+    return (metric(round(single_rate), 'rows/s', 'higher'),
+            metric(round(batch_rate), 'rows/s', 'higher'))
+
+
+def bench_reads(options, tmp):
+    database.DB_PATH = os.path.join(tmp, 'history.db')
+    backend = storage.SQLiteStorage()
+    backend.init()
+    rows = seed_storage(backend, generate_history(
+        targets=options.targets, days=options.days, interval=options.interval,
+        pattern=options.pattern, seed=options.seed
+    ))
+    print(f"  seeded {rows} checks ({options.pattern})")
+
+    previous = storage.set_storage(backend)
+    try:
+        report = median_seconds(lambda: get_complete_report(hours=24), options.repeat)
+
+        from app import app
+        client = app.test_client()
+        client.get('/')  # template compiled once
+
+        def render():
+            response = client.get('/')
+            assert response.status_code == 200
+
+        dashboard = median_seconds(render, options.repeat)
+    finally:
+        storage.set_storage(previous)
+
+    return (metric(round(report * 1000, 2), 'ms', 'lower'),
+            metric(round(dashboard * 1000, 2), 'ms', 'lower'))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print each metric against a baseline run.
+
+    Returns:
+        list: Names of metrics worse than the baseline by more than `tolerance`
+    """
+    regressions = []
+    for name, current in results['metrics'].items():
+        old = baseline.get('metrics', {}).get(name)
+        if not old or not old['value']:
+            continue
+        change = current['value'] / old['value'] - 1
+        worse = -change if current['better'] == 'higher' else change
+        flag = ''
+        if worse > tolerance:
+            regressions.append(name)
+            flag = '  ❌ regression'
+        print(f"{name:20} {old['value']:>12} -> {current['value']:>12} {current['unit']:9} "
+              f"{change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--targets', type=int, default=3)
+    parser.add_argument('--days', type=float, default=7, help='Seeded history length')
+    parser.add_argument('--interval', type=int, default=30, help='Seconds between checks')
+    parser.add_argument('--pattern', choices=PATTERNS, default='outages')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--probes', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--stub-servers', type=int, default=4)
+    parser.add_argument('--stub-latency', type=float, default=0.005, help='Seconds')
+    parser.add_argument('--probe-timeout', type=float, default=0.5, help='Seconds')
+    parser.add_argument('--single-saves', type=int, default=1000)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--compare', help='Baseline results file')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    options = parser.parse_args(argv)
+
+    # Per-check console logging is not what is measured here
+    logging.getLogger('monitor').setLevel(logging.WARNING)
+
+    metrics = {}
+    saved_path = database.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            print("probe throughput...")
+            metrics['probe_throughput'] = bench_probes(options)
+            print("saves...")
+            metrics['save_check'], metrics['save_checks_batch'] = bench_saves(options, tmp)
+            print("reports...")
+            metrics['report_latency'], metrics['dashboard_render'] = bench_reads(options, tmp)
+        finally:
+            database.DB_PATH = saved_path
+
+    results = {
+        'suite_version': SUITE_VERSION,
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parameters': {key: value for key, value in vars(options).items()
+                       if key not in ('json', 'compare', 'tolerance')},
+        'metrics': metrics
+    }
+
+    for name, m in metrics.items():
+        print(f"{name:20} {m['value']:>12} {m['unit']}")
+
+    if options.json:
+        os.makedirs(os.path.dirname(os.path.abspath(options.json)), exist_ok=True)
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('parameters') != results['parameters']:
+            print("⚠️  Baseline was run with different parameters")
+        regressions = compare(results, baseline, options.tolerance)
+        if regressions:
+            print(f"❌ Regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
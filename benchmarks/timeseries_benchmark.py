@@ -0,0 +1,132 @@
+"""
+Chart series benchmark.
+
+Builds a synthetic history in a temporary database, rolls it up, and
+times get_timeseries() for every target at once over several periods:
+
+- rollups:  the normal path (rollup tiers plus the recent raw checks)
+- raw:      ROLLUPS=false, every check of the period grouped in SQL
+
+and reports the points returned against the checks they stand for.
+
+Usage:
+    python benchmarks/timeseries_benchmark.py
+    python benchmarks/timeseries_benchmark.py --targets 20 --days 30 --interval 60 --json series.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import src.database as database
+from src import rollups
+from src.timeseries import get_timeseries
+
+PERIODS = [('24h', timedelta(hours=24)), ('7d', timedelta(days=7)), ('30d', timedelta(days=30))]
+
+
+def build_history(targets, days, interval, batch=20000):
+    rng = random.Random(1)
+    end = datetime.now().replace(microsecond=0) - timedelta(minutes=10)
+    start = end - timedelta(days=days)
+    pending = []
+    saved = 0
+    moment = start
+    while moment < end:
+        for t in range(targets):
+            success = rng.random() > 0.01
+            pending.append({
+                'url': f'https://target-{t}.test/',
+                'timestamp': moment,
+                'status_code': 200 if success else None,
+                'response_time': round(rng.uniform(0.05, 0.8), 4) if success else None,
+                'success': success,
+                'error': None if success else 'Timeout',
+                'retries': 0
+            })
+        if len(pending) >= batch:
+            database.save_checks(pending)
+            saved += len(pending)
+            pending = []
+        moment += timedelta(seconds=interval)
+    if pending:
+        database.save_checks(pending)
+        saved += len(pending)
+    return saved
+
+
+def timed_series(metric, period, points, runs):
+    end = datetime.now()
+    durations = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        series = get_timeseries(metric, end - period, end, points=points)
+        durations.append(time.perf_counter() - began)
+    return round(statistics.median(durations) * 1000, 1), series
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark downsampled chart series')
+    parser.add_argument('--targets', type=int, default=10)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--interval', type=int, default=120, help='Seconds between checks of a target')
+    parser.add_argument('--points', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    report = {'targets': options.targets, 'days': options.days, 'interval': options.interval,
+              'points': options.points, 'periods': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'series.db')
+        database.init_database()
+        began = time.perf_counter()
+        report['checks'] = build_history(options.targets, options.days, options.interval)
+        report['build_seconds'] = round(time.perf_counter() - began, 1)
+        began = time.perf_counter()
+        while rollups.compact(max_batches=1000):
+            pass
+        report['compact_seconds'] = round(time.perf_counter() - began, 1)
+
+        for name, period in PERIODS:
+            if period > timedelta(days=options.days):
+                continue
+            result = report['periods'][name] = {}
+            for mode, enabled in (('rollups', True), ('raw', False)):
+                rollups.ROLLUPS_ENABLED = enabled
+                for metric in ('response_time', 'uptime'):
+                    ms, series = timed_series(metric, period, options.points, options.runs)
+                    result[f'{mode}_{metric}_ms'] = ms
+                    if mode == 'rollups' and metric == 'response_time':
+                        result['sources'] = series['sources']
+                        result['resolution'] = series['resolution']
+                        result['points_per_target'] = max(len(s['points']) for s in series['series'])
+                        result['bytes'] = len(json.dumps(series))
+            rollups.ROLLUPS_ENABLED = True
+            result['checks'] = int(period.total_seconds() // options.interval) * options.targets
+
+    print(f"{report['checks']:,} checks of {options.targets} targets "
+          f"(built in {report['build_seconds']} s, rolled up in {report['compact_seconds']} s)")
+    for name, r in report['periods'].items():
+        print(f"{name:4} {r['checks']:>9,} checks -> {r['points_per_target']:4} points/target "
+              f"({r['bytes']:,} bytes, {r['resolution']} s buckets from {'+'.join(r['sources'])})  "
+              f"response_time {r['rollups_response_time_ms']:7.1f} ms (raw {r['raw_response_time_ms']:7.1f})  "
+              f"uptime {r['rollups_uptime_ms']:7.1f} ms (raw {r['raw_uptime_ms']:7.1f})")
+
+    report['generated'] = datetime.now().isoformat(timespec='seconds')
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
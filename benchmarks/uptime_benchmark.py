@@ -0,0 +1,137 @@
+"""
+Uptime computation benchmark.
+
+Fills a temporary database with synthetic checks (generated inside SQLite,
+then linked to their previous check like save_check() does) and times:
+
+- fetch:  the previous implementation (SELECT success, ratio in Python)
+- count:  calculate_uptime_percentage(method='count')
+- time:   calculate_uptime_percentage(method='time'), time-weighted
+
+for the whole history and the last 24 hours.
+
+Usage:
+    python benchmarks/uptime_benchmark.py
+    python benchmarks/uptime_benchmark.py --rows 10000000 --json uptime.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import src.database as database
+from src.analytics import calculate_uptime_percentage
+
+
+def seed_database(path, rows, targets=3, days=30):
+    """
+    Generate `rows` checks for `targets` URLs spread over the last `days`
+    days, about 2% failures, with jittered intervals.
+    """
+    database.DB_PATH = path
+
+    # Generated into a single table laid out like older versions' `checks`;
+    # init_database() then moves it into daily partitions and links each
+    # check to the previous one, as save_check() does
+    end = int(time.time())
+    step = days * 86400 / rows
+    columns = ', '.join(f'{name} {definition}' for name, definition in database.CHECK_COLUMNS)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute(f'CREATE TABLE checks ({columns})')
+    conn.execute(f'''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {rows - 1})
+        INSERT INTO checks (url, timestamp, status_code, response_time, success, error, retries)
+        SELECT
+            'https://target-' || (i % {targets}) || '.test/',
+            datetime({end} - CAST(({rows} - i) * {step} AS INTEGER) + (abs(random()) % 3),
+                     'unixepoch', 'localtime'),
+            CASE WHEN abs(random()) % 50 = 0 THEN NULL ELSE 200 END,
+            0.05 + (abs(random()) % 750) / 1000.0,
+            1,
+            NULL,
+            0
+        FROM n
+    ''')
+    conn.execute('UPDATE checks SET success = 0, response_time = NULL WHERE status_code IS NULL')
+    conn.commit()
+    conn.close()
+
+    database.init_database()
+    database.backfill_check_states()
+
+    conn = sqlite3.connect(path)
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def fetch_uptime(hours=None):
+    """
+    The previous implementation: fetch every success flag, ratio in Python.
+    """
+    conn = database.get_connection()
+    query = "SELECT success FROM checks WHERE 1=1"
+    params = []
+    if hours:
+        query += " AND timestamp >= datetime('now', 'localtime', ?)"
+        params.append(f'-{hours} hours')
+    results = conn.execute(query, params).fetchall()
+    database.close_connection(conn)
+    if not results:
+        return None
+    return round(sum(1 for row in results if row[0] == 1) / len(results) * 100, 2)
+
+
+def measure(fn, repeat):
+    timings = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - start)
+    return {'value': value, 'best_seconds': round(min(timings), 4)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark uptime computation')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--targets', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    results = {'rows': options.rows, 'runs': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'monitoring.db')
+        start = time.perf_counter()
+        seed_database(path, options.rows, options.targets)
+        print(f"Seeded {options.rows} checks in {time.perf_counter() - start:.1f}s")
+
+        cases = {
+            'fetch': lambda hours: fetch_uptime(hours),
+            'count': lambda hours: calculate_uptime_percentage(hours=hours, method='count'),
+            'time': lambda hours: calculate_uptime_percentage(hours=hours, method='time')
+        }
+        for period, hours in (('overall', None), ('last_24h', 24)):
+            for name, fn in cases.items():
+                r = measure(lambda: fn(hours), options.repeat)
+                results['runs'][f'{name}:{period}'] = r
+                print(f"{name:6} {period:9} {r['best_seconds']:9.4f}s  uptime {r['value']}")
+
+    results['generated'] = datetime.now().isoformat(timespec='seconds')
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
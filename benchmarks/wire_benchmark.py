@@ -0,0 +1,147 @@
+"""
+Result wire format and bulk ingest benchmark.
+
+Measures, on synthetic check results:
+
+- encode/decode: results/s and bytes per result of the binary format
+  (src/wire.py, plain and gzipped) against gzip-compressed JSON
+- save:   save_checks() of whole batches into a temporary database
+  (the bulk insert path) against save_check() per result
+- ingest: POST /api/ingest through the Flask test client, end to end
+
+Usage:
+    python benchmarks/wire_benchmark.py
+    python benchmarks/wire_benchmark.py --results 200000 --batch 10000 --json wire.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import src.database as database
+from src import wire
+from src.aggregator import encode_result, decode_results as decode_json
+
+
+def make_results(count, targets):
+    rng = random.Random(1)
+    start = datetime.now().replace(microsecond=0) - timedelta(seconds=count)
+    results = []
+    for i in range(count):
+        success = rng.random() > 0.02
+        moment = start + timedelta(seconds=i)
+        results.append({
+            'url': f'https://target-{i % targets}.test/',
+            'timestamp': moment,
+            'status_code': 200 if success else None,
+            'response_time': round(rng.uniform(0.05, 0.8), 6) if success else None,
+            'success': success,
+            'error': None if success else 'Timeout',
+            'retries': 0 if success else 2,
+            'queue_wait': round(rng.uniform(0, 0.01), 6),
+            'scheduled_at': moment,
+            'schedule_lag': round(rng.uniform(0, 0.05), 3),
+            'missed_runs': 0
+        })
+    return results
+
+
+def batches(results, size):
+    return [results[i:i + size] for i in range(0, len(results), size)]
+
+
+def rate(count, fn):
+    start = time.perf_counter()
+    fn()
+    return round(count / (time.perf_counter() - start))
+
+
+def codec(results, size):
+    chunks = batches(results, size)
+    binary = [wire.encode_results(chunk, agent='bench') for chunk in chunks]
+    text = [gzip.compress(json.dumps({'agent': 'bench', 'results': [encode_result(r) for r in chunk]}).encode(), 5)
+            for chunk in chunks]
+    return {
+        'binary': {
+            'encode_per_second': rate(len(results), lambda: [wire.encode_results(c, agent='bench') for c in chunks]),
+            'decode_per_second': rate(len(results), lambda: [wire.decode_results(b) for b in binary]),
+            'bytes_per_result': round(sum(map(len, binary)) / len(results), 1),
+            'gzip_bytes_per_result': round(sum(len(gzip.compress(b, 5)) for b in binary) / len(results), 1)
+        },
+        'json_gzip': {
+            'encode_per_second': rate(len(results), lambda: [
+                gzip.compress(json.dumps({'agent': 'bench', 'results': [encode_result(r) for r in c]}).encode(), 5)
+                for c in chunks]),
+            'decode_per_second': rate(len(results), lambda: [
+                decode_json(json.loads(gzip.decompress(t))) for t in text]),
+            'bytes_per_result': round(sum(map(len, text)) / len(results), 1)
+        }
+    }
+
+
+def fresh_database(tmp, name):
+    database.DB_PATH = os.path.join(tmp, name)
+    database.init_database()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the result wire format and bulk ingest')
+    parser.add_argument('--results', type=int, default=100000)
+    parser.add_argument('--targets', type=int, default=20)
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--row-by-row', type=int, default=10000,
+                        help='Results saved one by one for comparison')
+    parser.add_argument('--json', help='Write results to this file')
+    options = parser.parse_args(argv)
+
+    results = make_results(options.results, options.targets)
+    report = {'results': options.results, 'batch': options.batch}
+    report.update(codec(results, options.batch))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh_database(tmp, 'rows.db')
+        few = results[:options.row_by_row]
+        report['save_one_by_one_per_second'] = rate(len(few), lambda: [database.save_check(r) for r in few])
+
+        fresh_database(tmp, 'bulk.db')
+        report['save_bulk_per_second'] = rate(len(results), lambda: [
+            database.save_checks(chunk) for chunk in batches(results, options.batch)])
+
+        fresh_database(tmp, 'ingest.db')
+        from app import app
+        client = app.test_client()
+        bodies = [wire.encode_results(chunk) for chunk in batches(results, options.batch)]
+        headers = {'Content-Type': wire.CONTENT_TYPE}
+
+        def ingest():
+            for body in bodies:
+                response = client.post('/api/ingest', data=body, headers=headers)
+                assert response.status_code == 200, response.get_data(as_text=True)
+        report['ingest_per_second'] = rate(len(results), ingest)
+
+    for name in ('binary', 'json_gzip'):
+        r = report[name]
+        print(f"{name:10} encode {r['encode_per_second']:>10,}/s  decode {r['decode_per_second']:>10,}/s  "
+              f"{r['bytes_per_result']:6} bytes/result"
+              + (f" ({r['gzip_bytes_per_result']} gzipped)" if 'gzip_bytes_per_result' in r else ''))
+    print(f"save one by one {report['save_one_by_one_per_second']:>10,} rows/s")
+    print(f"save bulk       {report['save_bulk_per_second']:>10,} rows/s")
+    print(f"/api/ingest     {report['ingest_per_second']:>10,} rows/s")
+
+    report['generated'] = datetime.now().isoformat(timespec='seconds')
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Synthetic check histories for benchmarks.
+
+generate_history() yields check results like check_website() returns,
+for a number of targets over a period, with a failure pattern:
+
+    steady     independent failures at `failure_rate`
+    outages    mostly up, with outages of `outage_minutes` starting at
+               random checks (so that about `failure_rate` of the time is down)
+    flapping   every check has a `failure_rate` chance of flipping the
+               state, so failures come in short runs
+
+The same seed gives the same history, so runs are comparable across versions.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+PATTERNS = ('steady', 'outages', 'flapping')
+
+ERRORS = [
+    'Timeout - Website took longer than 5 seconds',
+    'Connection failed - Cannot reach website',
+]
+
+
+def generate_history(targets=3, days=7, interval=30, pattern='steady', failure_rate=0.02,
+                     outage_minutes=10, jitter=2, end=None, seed=1):
+    """
+    Generate synthetic check results, oldest first (all targets interleaved).
+
+    Args:
+        targets (int): Number of URLs
+        days (float): Length of the history
+        interval (int): Seconds between checks of one URL
+        pattern (str): Failure pattern (see PATTERNS)
+        failure_rate (float): Share of failed checks (steady, outages) or
+            chance of a state flip (flapping)
+        outage_minutes (int): Outage length (outages)
+        jitter (int): Max seconds a check is late
+        end (datetime): Time of the last checks (default: now)
+        seed (int): Random seed
+
+    Yields:
+        dict: Check result
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown failure pattern: {pattern}")
+
+    rng = random.Random(seed)
+    end = (end or datetime.now()).replace(microsecond=0)
+    steps = int(days * 86400 / interval)
+    start = end - timedelta(seconds=steps * interval)
+    urls = [f'https://target-{i}.test/' for i in range(targets)]
+
+    # Outage length in checks, and the chance one starts so that about
+    # failure_rate of all checks fall into one
+    outage_checks = max(1, outage_minutes * 60 // interval)
+    outage_start_rate = failure_rate / outage_checks
+
+    down_until = {url: -1 for url in urls}
+    up = {url: True for url in urls}
+
+    for step in range(steps):
+        base = start + timedelta(seconds=step * interval)
+        for url in urls:
+            if pattern == 'steady':
+                success = rng.random() >= failure_rate
+            elif pattern == 'outages':
+                if step > down_until[url] and rng.random() < outage_start_rate:
+                    down_until[url] = step + outage_checks - 1
+                success = step > down_until[url]
+            else:
+                if rng.random() < failure_rate:
+                    up[url] = not up[url]
+                success = up[url]
+
+            yield {
+                'url': url,
+                'timestamp': base + timedelta(seconds=rng.randint(0, jitter)),
+                'status_code': 200 if success else None,
+                'response_time': round(rng.lognormvariate(-1.6, 0.5), 3) if success else None,
+                'success': success,
+                'error': None if success else rng.choice(ERRORS),
+                'retries': 0 if success else 3
+            }
+
+
+def seed_storage(backend, checks, batch_size=5000):
+    """
+    Save generated checks into a storage backend in large batches.
+
+    Args:
+        backend (StorageBackend): Target (see src/storage.py)
+        checks (iterable): Check results
+        batch_size (int): Checks per save_checks() call
+
+    Returns:
+        int: Number of checks saved
+    """
+    saved = 0
+    batch = []
+    for check in checks:
+        batch.append(check)
+        if len(batch) == batch_size:
+            saved += len(backend.save_checks(batch))
+            batch = []
+    if batch:
+        saved += len(backend.save_checks(batch))
+    return saved
@@ -1,16 +1,24 @@
 """
 Main entry point for the website monitoring tool.
 Run this script to start continuous monitoring.
+
+    python run.py                          # monitor
+    python run.py export history.chka      # write the check history to a file
+    python run.py import history.chka      # load checks from such a file
+    python run.py agent http://central:5000 --name eu-1
+                                           # probe from here, send results to an aggregator
 """
 
+import argparse
+import logging
+import os
 import time
 import signal
 import sys
-from src.scheduler import start_monitoring, stop_monitoring
 from src.logger import setup_logger
 
-# Initialize logger
-logger = setup_logger()
+# Application logger, configured by main() once .env is loaded
+logger = logging.getLogger('monitor')
 
 # Flag for graceful shutdown
 running = True
@@ -21,6 +29,8 @@ def signal_handler(sig, frame):
     Handle Ctrl+C gracefully.
     """
     global running
+    from src.scheduler import stop_monitoring
+    
     logger.info("\n🛑 Shutdown signal received...")
     running = False
     stop_monitoring()
@@ -28,10 +38,91 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 
+def run_archive(command, path, since=None):
+    """
+    Export or import the check history (see src/archive.py).
+    
+    Returns:
+        int: Exit code
+    """
+    from src.archive import export_checks, import_checks
+    from src.database import init_database
+    
+    init_database()
+    start = time.perf_counter()
+    if command == 'export':
+        count = export_checks(path, since=since)
+    else:
+        count = import_checks(path)
+    if count is None:
+        return 1
+    
+    elapsed = time.perf_counter() - start
+    logger.info(f"⏱️  {count} checks in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} checks/s)")
+    return 0
+
+
+def run_agent_command(options):
+    """
+    Run as a probe agent (see src/agent.py).
+    
+    Returns:
+        int: Exit code
+    """
+    from src.agent import run_agent
+    from src.scheduler import get_monitor_urls
+    
+    urls = [u.strip() for u in options.urls.split(',') if u.strip()] if options.urls else get_monitor_urls()
+    stats = run_agent(
+        options.aggregator, urls,
+        agent=options.name,
+        interval=options.interval or int(os.getenv('CHECK_INTERVAL', 30)),
+        timeout=int(os.getenv('TIMEOUT', 5)),
+        rounds=options.rounds,
+        token=os.getenv('AGENT_TOKEN') or None
+    )
+    return 0 if stats['results_sent'] or options.rounds == 0 else 1
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line (no command starts monitoring).
+    """
+    parser = argparse.ArgumentParser(description='Website Availability Monitor')
+    commands = parser.add_subparsers(dest='command')
+    export = commands.add_parser('export', help='Write the check history to an archive file')
+    export.add_argument('path', help='Archive file to write')
+    export.add_argument('--since', help="Only checks from this time on ('YYYY-MM-DD [HH:MM:SS]')")
+    load = commands.add_parser('import', help='Load checks from an archive file')
+    load.add_argument('path', help='Archive file to read')
+    agent = commands.add_parser('agent', help='Probe from here and send results to an aggregator')
+    agent.add_argument('aggregator', help='Base URL of the aggregator (the dashboard app)')
+    agent.add_argument('--name', help='Agent name (default: host name)')
+    agent.add_argument('--urls', help='Comma-separated URLs (default: MONITOR_URL)')
+    agent.add_argument('--interval', type=int, help='Seconds between rounds (default: CHECK_INTERVAL)')
+    agent.add_argument('--rounds', type=int, help='Stop after this many rounds')
+    return parser.parse_args(argv)
+
+
 def main():
     """
-    Main function to start monitoring.
+    Main function to start monitoring (or run an archive command).
+    Modules are imported by the command that needs them, after the
+    environment is loaded, so `--help` and agents start fast.
     """
+    from dotenv import load_dotenv
+    
+    # Load environment variables (modules read them on import, logging
+    # reads its settings in setup_logger())
+    load_dotenv()
+    setup_logger()
+    
+    options = parse_args()
+    if options.command == 'agent':
+        sys.exit(run_agent_command(options))
+    if options.command:
+        sys.exit(run_archive(options.command, options.path, getattr(options, 'since', None)))
+    
     # Register signal handler for Ctrl+C
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -42,8 +133,16 @@ def main():
     logger.info("")
     
     # Start monitoring
+    from src.scheduler import start_monitoring, stop_monitoring
     start_monitoring()
     
+    # Expose Prometheus metrics if a port is configured
+    metrics_port = os.getenv('METRICS_PORT')
+    if metrics_port:
+        from src.metrics import start_metrics_server
+        start_metrics_server(int(metrics_port))
+        logger.info(f"📈 Metrics at http://localhost:{metrics_port}/metrics")
+    
     logger.info("")
     logger.info("📊 Monitoring is now running...")
     logger.info("⌨️  Press Ctrl+C to stop")
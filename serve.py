@@ -0,0 +1,124 @@
+"""
+Production entry point for the web dashboard.
+Serves app.py with a multi-threaded WSGI server instead of the
+Flask development server.
+
+Usage:
+    python serve.py                         # waitress, 8 threads
+    python serve.py --threads 16
+    python serve.py --workers 4             # gunicorn (Linux/macOS)
+    python serve.py --with-monitor          # also run the scheduler in-process
+"""
+
+import argparse
+import os
+from dotenv import load_dotenv
+
+# Load environment variables before any module reads them
+load_dotenv()
+
+from src.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger()
+
+
+def parse_args(argv=None):
+    """
+    Parse command line options (defaults come from environment).
+
+    Returns:
+        argparse.Namespace: Serving options
+    """
+    parser = argparse.ArgumentParser(description='Serve the monitoring dashboard')
+    parser.add_argument('--host', default=os.getenv('WEB_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('FLASK_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', 1)),
+                        help='Worker processes (more than 1 requires gunicorn)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', 8)),
+                        help='Threads per worker')
+    parser.add_argument('--keep-alive', type=int, default=int(os.getenv('WEB_KEEPALIVE', 5)),
+                        help='Seconds to keep idle connections open')
+    parser.add_argument('--with-monitor', action='store_true',
+                        default=os.getenv('WEB_WITH_MONITOR', '').lower() in ('1', 'true', 'yes'),
+                        help='Run the monitoring scheduler in the web process')
+    return parser.parse_args(argv)
+
+
+def serve_waitress(app, options):
+    """
+    Serve with waitress (pure Python, works everywhere).
+    """
+    from waitress import serve
+
+    serve(
+        app,
+        host=options.host,
+        port=options.port,
+        threads=options.threads,
+        channel_timeout=max(options.keep_alive, 1),
+        ident='web-availability-monitor'
+    )
+
+
+def serve_gunicorn(app, options):
+    """
+    Serve with gunicorn using threaded workers.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{options.host}:{options.port}')
+            self.cfg.set('workers', options.workers)
+            self.cfg.set('threads', options.threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('keepalive', options.keep_alive)
+
+        def load(self):
+            return app
+
+    DashboardApplication().run()
+
+
+def main(argv=None):
+    """
+    Main function to start the production server.
+    """
+    options = parse_args(argv)
+
+    from app import app
+    from src.web.serving import configure_production
+    configure_production(app)
+
+    logger.info("=" * 50)
+    logger.info("🌐 Starting Web Dashboard (production)")
+    logger.info("=" * 50)
+    logger.info(f"📊 Dashboard URL: http://localhost:{options.port}")
+    logger.info(f"🧵 {options.workers} worker(s) x {options.threads} thread(s), keep-alive {options.keep_alive}s")
+
+    if options.with_monitor:
+        if options.workers > 1:
+            logger.error("❌ --with-monitor needs a single worker (each worker would run its own scheduler)")
+            return 1
+        from src.scheduler import start_monitoring
+        start_monitoring()
+
+    try:
+        if options.workers > 1:
+            try:
+                serve_gunicorn(app, options)
+                return 0
+            except ImportError:
+                logger.warning("⚠️  gunicorn is not installed - falling back to a single waitress process")
+
+        serve_waitress(app, options)
+        return 0
+    finally:
+        if options.with_monitor:
+            from src.scheduler import stop_monitoring
+            stop_monitoring()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+"""
+Probe agent: checks targets from this machine and streams the results to
+an aggregator (see src/aggregator.py) instead of a local database.
+
+The agent runs the usual probe pipeline (rate limits, coalescing, schedule
+lag), with the pipeline's batched writer sending each batch to the
+aggregator as one request: a binary batch (see src/wire.py) to
+/api/ingest, or with AGENT_WIRE_FORMAT=json gzip-compressed JSON to
+/api/agents/results. Batches that cannot be
+delivered stay in an outbox (at most AGENT_OUTBOX_SIZE results, oldest
+dropped first) and go out with the next batch.
+"""
+
+import gzip
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from itertools import islice
+from datetime import datetime
+
+from src.aggregator import encode_result, MAX_BATCH_RESULTS
+from src import wire
+from src.lazy import lazy_import
+from src.pipeline import ProbePipeline
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+requests = lazy_import('requests')
+
+# Most undelivered results kept for the next attempt
+AGENT_OUTBOX_SIZE = int(os.getenv('AGENT_OUTBOX_SIZE', 10000))
+
+# Batch encoding: 'binary' or 'json'
+AGENT_WIRE_FORMAT = os.getenv('AGENT_WIRE_FORMAT', 'binary')
+
+# Path of the aggregator's endpoint for each encoding
+RESULTS_PATHS = {'binary': '/api/ingest', 'json': '/api/agents/results'}
+
+
+class AgentClient:
+    """
+    Sends result batches to the aggregator; usable as a pipeline's save().
+    """
+
+    def __init__(self, aggregator_url, agent, token=None, timeout=10,
+                 outbox_size=AGENT_OUTBOX_SIZE, session=None, wire_format=AGENT_WIRE_FORMAT):
+        """
+        Args:
+            aggregator_url (str): Base URL of the aggregator (the dashboard app)
+            agent (str): Name of this agent
+            token (str): Shared secret (AGENT_TOKEN on the aggregator)
+            timeout (float): Request timeout in seconds
+            outbox_size (int): Most undelivered results kept
+            session (requests.Session): HTTP session (default: a new one)
+            wire_format (str): 'binary' or 'json'
+        """
+        if wire_format not in RESULTS_PATHS:
+            raise ValueError(f"Unknown wire format: {wire_format}")
+        self.url = aggregator_url.rstrip('/') + RESULTS_PATHS[wire_format]
+        self.agent = agent
+        self.wire_format = wire_format
+        self.timeout = timeout
+        self.outbox = deque(maxlen=outbox_size)
+        self.session = session or requests.Session()
+        if wire_format == 'binary':
+            self.session.headers['Content-Type'] = wire.CONTENT_TYPE
+        else:
+            self.session.headers.update({'Content-Type': 'application/json',
+                                         'Content-Encoding': 'gzip'})
+        if token:
+            self.session.headers['X-Agent-Token'] = token
+        self.lock = threading.Lock()
+        self.stats = {'batches_sent': 0, 'results_sent': 0, 'send_errors': 0, 'dropped': 0}
+
+    def send(self, results):
+        """
+        Send results (after any still in the outbox).
+
+        Args:
+            results (list): Check results
+
+        Returns:
+            list: Row IDs the aggregator assigned to `results`, or an
+                empty list if they were kept in the outbox
+        """
+        with self.lock:
+            for result in results:
+                if len(self.outbox) == self.outbox.maxlen:
+                    self.stats['dropped'] += 1
+                self.outbox.append(result)
+            row_ids = self._deliver()
+        return row_ids[len(row_ids) - len(results):] if row_ids else []
+
+    def flush(self):
+        """
+        Try once more to deliver the outbox.
+
+        Returns:
+            int: Results still undelivered
+        """
+        with self.lock:
+            self._deliver()
+            return len(self.outbox)
+
+    def _deliver(self):
+        # At most MAX_BATCH_RESULTS per request (the aggregator refuses more)
+        row_ids = []
+        while self.outbox:
+            batch = list(islice(self.outbox, MAX_BATCH_RESULTS))
+            try:
+                body = self._encode(batch)
+                response = self.session.post(self.url, data=body, timeout=self.timeout)
+                response.raise_for_status()
+                row_ids.extend(response.json()['ids'])
+            except Exception as e:
+                self.stats['send_errors'] += 1
+                logger.warning(f"⚠️  Could not send {len(batch)} results to the aggregator: {e}")
+                return []
+            for _ in batch:
+                self.outbox.popleft()
+            self.stats['batches_sent'] += 1
+            self.stats['results_sent'] += len(batch)
+        return row_ids
+
+    def _encode(self, batch):
+        if self.wire_format == 'binary':
+            return wire.encode_results(batch, agent=self.agent)
+        payload = {'agent': self.agent, 'results': [encode_result(result) for result in batch]}
+        return gzip.compress(json.dumps(payload).encode(), 5)
+
+
+def _idle(pipeline):
+    """
+    True once no probe is queued or running (a probe leaves `pending`
+    and becomes busy under the same lock).
+    """
+    with pipeline.lock:
+        return not pipeline.pending and pipeline.stats['busy_workers'] == 0
+
+
+def run_agent(aggregator_url, urls, agent=None, interval=30, timeout=5, rounds=None,
+              token=None, probe_workers=4):
+    """
+    Check `urls` every `interval` seconds and send the results to the aggregator.
+
+    Args:
+        aggregator_url (str): Base URL of the aggregator
+        urls (list): URLs to check
+        agent (str): Agent name (default: host name)
+        interval (int): Seconds between rounds
+        timeout (int): Probe timeout in seconds
+        rounds (int): Stop after this many rounds (default: run until interrupted)
+        token (str): Shared secret
+        probe_workers (int): Probe threads
+
+    Returns:
+        dict: Client statistics
+    """
+    agent = agent or socket.gethostname()
+    client = AgentClient(aggregator_url, agent, token=token)
+    pipeline = ProbePipeline(probe_workers=probe_workers, save=client.send)
+    pipeline.start()
+    logger.info(f"🛰️  Agent {agent} checking {', '.join(urls)} every {interval}s "
+                f"for {aggregator_url}")
+
+    done = 0
+    next_run = time.monotonic()
+    try:
+        while rounds is None or done < rounds:
+            planned = datetime.now()
+            for url in urls:
+                pipeline.submit(url, timeout=timeout,
+                                schedule={'scheduled_at': planned, 'interval': interval})
+            done += 1
+            next_run += interval
+            if rounds is not None and done >= rounds:
+                break
+            time.sleep(max(0.0, next_run - time.monotonic()))
+
+        # Let the last round finish before stopping (stop() drops queued probes)
+        deadline = time.monotonic() + timeout * 2 + 5
+        while not _idle(pipeline) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        left = client.flush()
+        if left:
+            logger.error(f"❌ {left} results could not be delivered")
+
+    logger.info(f"📤 Agent {agent} sent {client.stats['results_sent']} results")
+    return dict(client.stats)
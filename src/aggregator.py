@@ -0,0 +1,312 @@
+"""
+Aggregator for distributed probe agents.
+
+Probe agents (see src/agent.py) run the same probe engine at other vantage
+points and POST batches of results to /api/agents/results. The aggregator
+saves them through the storage backend, tagged with the agent's name, and
+keeps each agent's latest result per URL in memory to decide per URL:
+
+    up        no agent with a fresh result sees it down
+    partial   some agents see it down, fewer than the quorum (most likely
+              a problem on their side of the network)
+    down      at least AGENT_QUORUM agents see it down (default: a majority
+              of the agents with a fresh result)
+    unknown   fewer agents with a fresh result than the quorum
+
+A result is fresh for AGENT_STALE_SECONDS (default three check intervals).
+"""
+
+import hmac
+import os
+import threading
+import zlib
+from datetime import datetime
+
+from src.storage import get_storage
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Shared secret agents send in the X-Agent-Token header. Without one,
+# only clients on this machine may send results, unless
+# AGENT_ALLOW_UNAUTHENTICATED is set (e.g. on a trusted private network)
+AGENT_TOKEN = os.getenv('AGENT_TOKEN', '')
+AGENT_ALLOW_UNAUTHENTICATED = os.getenv('AGENT_ALLOW_UNAUTHENTICATED', '').lower() in ('1', 'true', 'yes')
+
+# Addresses of clients on this machine
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+# Agents that must see a URL down to call it down (0 = majority)
+AGENT_QUORUM = int(os.getenv('AGENT_QUORUM', 0))
+
+# Seconds an agent's latest result counts for the decision
+AGENT_STALE_SECONDS = int(os.getenv('AGENT_STALE_SECONDS', 0)) or 3 * int(os.getenv('CHECK_INTERVAL', 30))
+
+# Most results accepted per request
+MAX_BATCH_RESULTS = 10000
+
+# Most bytes of a request body, after decompression
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Fields of a result as sent by agents (timestamps as TIME_FORMAT text)
+RESULT_FIELDS = ('url', 'timestamp', 'status_code', 'response_time', 'success', 'error',
+                 'retries', 'queue_wait', 'scheduled_at', 'schedule_lag', 'missed_runs')
+
+
+def decode_results(payload):
+    """
+    Validate an agent's batch and convert it to check result dictionaries.
+
+    Args:
+        payload (dict): {"agent": name, "results": [result, ...]}
+
+    Returns:
+        tuple: (agent name, list of check results tagged with it)
+
+    Raises:
+        ValueError: If the batch is malformed
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('Batch must be a JSON object')
+    agent = payload.get('agent')
+    if not isinstance(agent, str) or not agent.strip() or len(agent) > 64:
+        raise ValueError('Missing or invalid agent name')
+    items = payload.get('results')
+    if not isinstance(items, list):
+        raise ValueError('Missing results list')
+    if len(items) > MAX_BATCH_RESULTS:
+        raise ValueError(f'At most {MAX_BATCH_RESULTS} results per batch')
+
+    results = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get('url') or 'success' not in item:
+            raise ValueError('Each result needs url, timestamp and success')
+        result = {field: item.get(field) for field in RESULT_FIELDS}
+        result['timestamp'] = datetime.strptime(item['timestamp'], TIME_FORMAT)
+        if result['scheduled_at']:
+            result['scheduled_at'] = datetime.strptime(result['scheduled_at'], TIME_FORMAT)
+        result['success'] = bool(result['success'])
+        result['retries'] = result['retries'] or 0
+        result['missed_runs'] = result['missed_runs'] or 0
+        result['agent'] = agent.strip()
+        results.append(result)
+    return agent.strip(), results
+
+
+def is_authorized(token, remote_addr):
+    """
+    Whether an agent request may send results.
+
+    Args:
+        token (str): X-Agent-Token header of the request
+        remote_addr (str): Client address
+
+    Returns:
+        bool: True if the token matches AGENT_TOKEN, or without one if the
+            client is local or AGENT_ALLOW_UNAUTHENTICATED is set
+    """
+    if AGENT_TOKEN:
+        return hmac.compare_digest(token or '', AGENT_TOKEN)
+    return AGENT_ALLOW_UNAUTHENTICATED or remote_addr in LOCAL_ADDRESSES
+
+
+def decompress(body, limit=None):
+    """
+    Decompress a gzip request body, without ever inflating more than
+    `limit` bytes (a small body can expand to gigabytes).
+
+    Args:
+        body (bytes): gzip-compressed data
+        limit (int): Most bytes of output (default MAX_BATCH_BYTES)
+
+    Returns:
+        bytes: Decompressed data
+
+    Raises:
+        ValueError: If the output would exceed the limit or the data is
+            truncated or not gzip
+    """
+    limit = MAX_BATCH_BYTES if limit is None else limit
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    try:
+        data = decompressor.decompress(body, limit)
+    except zlib.error as e:
+        raise ValueError(f'Invalid gzip data: {e}')
+    if decompressor.unconsumed_tail or (not decompressor.eof and len(data) >= limit):
+        raise ValueError(f'Batch is larger than {limit} bytes uncompressed')
+    if not decompressor.eof:
+        raise ValueError('Compressed batch is truncated')
+    return data
+
+
+def encode_result(result):
+    """
+    Convert a check result to the JSON form agents send.
+
+    Args:
+        result (dict): Check result from check_website() / the pipeline
+
+    Returns:
+        dict: RESULT_FIELDS with timestamps as text
+    """
+    encoded = {field: result.get(field) for field in RESULT_FIELDS}
+    for field in ('timestamp', 'scheduled_at'):
+        if isinstance(encoded[field], datetime):
+            encoded[field] = encoded[field].strftime(TIME_FORMAT)
+    return encoded
+
+
+class Aggregator:
+    """
+    Saves agent results and keeps quorum decisions per URL.
+    """
+
+    def __init__(self, quorum=AGENT_QUORUM, stale_seconds=AGENT_STALE_SECONDS, save=None):
+        """
+        Args:
+            quorum (int): Agents that must see a URL down (0 = majority)
+            stale_seconds (int): Seconds an agent's latest result counts
+            save (callable): save(results) -> list of row IDs
+                (default: the storage backend's save_checks)
+        """
+        self.quorum = quorum
+        self.stale_seconds = stale_seconds
+        self.save = save or (lambda results: get_storage().save_checks(results))
+        self.latest = {}     # url -> agent -> (timestamp, success, response_time)
+        self.agents = {}     # agent -> counters
+        self.decisions = {}  # url -> (state, since)
+        self.lock = threading.Lock()
+
+    def ingest(self, agent, results):
+        """
+        Save one batch from an agent and update the decisions.
+
+        Args:
+            agent (str): Agent name
+            results (list): Check results (from decode_results)
+
+        Returns:
+            list: IDs of saved rows (empty list if saving failed)
+        """
+        row_ids = self.save(results) if results else []
+        now = datetime.now()
+
+        with self.lock:
+            counters = self.agents.setdefault(agent, {'batches': 0, 'results': 0, 'failed_batches': 0})
+            counters['last_seen'] = now.strftime(TIME_FORMAT)
+            if results and not row_ids:
+                counters['failed_batches'] += 1
+                return []
+            counters['batches'] += 1
+            counters['results'] += len(results)
+
+            touched = set()
+            for result in results:
+                previous = self.latest.setdefault(result['url'], {}).get(agent)
+                if previous is None or previous[0] <= result['timestamp']:
+                    self.latest[result['url']][agent] = (
+                        result['timestamp'], result['success'], result.get('response_time')
+                    )
+                    touched.add(result['url'])
+
+            changes = []
+            for url in sorted(touched):
+                state = self._decide(url, now)['state']
+                previous = self.decisions.get(url)
+                if previous is None or previous[0] != state:
+                    self.decisions[url] = (state, now.strftime(TIME_FORMAT))
+                    changes.append((url, state, previous[0] if previous else None))
+
+        for url, state, previous in changes:
+            if previous is not None:
+                icon = {'up': '🟢', 'partial': '🟡', 'down': '🔴'}.get(state, '⚪')
+                logger.info(f"{icon} Quorum for {url}: {previous} -> {state}")
+        return row_ids
+
+    def _decide(self, url, now):
+        """
+        Quorum decision for one URL from the agents' fresh results (lock held).
+        """
+        fresh = {
+            agent: observation for agent, observation in self.latest.get(url, {}).items()
+            if (now - observation[0]).total_seconds() <= self.stale_seconds
+        }
+        quorum = self.quorum or len(fresh) // 2 + 1
+        agents_down = sorted(agent for agent, (_, success, _) in fresh.items() if not success)
+        agents_up = sorted(agent for agent, (_, success, _) in fresh.items() if success)
+
+        if len(fresh) < quorum:
+            state = 'unknown'
+        elif len(agents_down) >= quorum:
+            state = 'down'
+        elif agents_down:
+            state = 'partial'
+        else:
+            state = 'up'
+        return {
+            'url': url,
+            'state': state,
+            'quorum': quorum,
+            'agents_up': agents_up,
+            'agents_down': agents_down,
+            'stale_agents': sorted(set(self.latest.get(url, {})) - set(fresh))
+        }
+
+    def decide(self, url, now=None):
+        """
+        Get the quorum decision for a URL.
+
+        Args:
+            url (str): Target URL
+            now (datetime): Time the freshness is judged at (default: now)
+
+        Returns:
+            dict: state, quorum, agents_up, agents_down, stale_agents
+        """
+        with self.lock:
+            return self._decide(url, now or datetime.now())
+
+    def get_status(self, now=None):
+        """
+        Get agents and the quorum decision of every URL.
+
+        Returns:
+            dict: {'agents': {...}, 'targets': [...]}
+        """
+        now = now or datetime.now()
+        with self.lock:
+            targets = []
+            for url in sorted(self.latest):
+                decision = self._decide(url, now)
+                # The time the decision last changed (as of the last batch)
+                state, since = self.decisions.get(url, (None, None))
+                decision['since'] = since if state == decision['state'] else None
+                targets.append(decision)
+            return {
+                'agents': {agent: dict(counters) for agent, counters in sorted(self.agents.items())},
+                'quorum': self.quorum or 'majority',
+                'stale_seconds': self.stale_seconds,
+                'targets': targets
+            }
+
+
+# Shared aggregator instance
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator():
+    """
+    Get the process-wide aggregator.
+
+    Returns:
+        Aggregator: Aggregator
+    """
+    global _aggregator
+
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = Aggregator()
+        return _aggregator
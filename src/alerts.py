@@ -0,0 +1,664 @@
+"""
+Alerting: rules evaluated on each saved check, and batched notifications.
+
+Rules are evaluated incrementally from the pipeline's result listener,
+with per-URL windows held in memory, so alerting never queries the database:
+
+    consecutive_failures  the last ALERT_CONSECUTIVE_FAILURES checks failed
+    latency_p95           p95 response time over ALERT_WINDOW seconds is
+                          above ALERT_LATENCY_P95 seconds
+    uptime                share of successful checks over ALERT_WINDOW
+                          seconds is below ALERT_UPTIME_BELOW percent
+
+Each (URL, rule) pair is a small state machine. A rule only fires after
+its condition held for ALERT_DEBOUNCE evaluations in a row, and only
+resolves after it was clear for as many (consecutive_failures fires at
+once, its streak already debounces). An alert whose condition changed
+ALERT_FLAP_THRESHOLD times within ALERT_FLAP_WINDOW seconds is flapping:
+one 'flapping' notification is sent and further changes are suppressed
+until it settles (half as many changes in the window), when the settled
+state is sent.
+
+Notifications are queued to a dispatcher thread, which sends what arrived
+within ALERT_BATCH_SECONDS as one webhook POST and/or one email, and retries
+failed deliveries with exponential backoff. A slow or unreachable receiver
+never delays the pipeline writer.
+"""
+
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from src.lazy import lazy_import
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Only loaded once a notification is sent
+requests = lazy_import('requests')
+
+# Evaluate alert rules on saved checks
+ALERTS_ENABLED = os.getenv('ALERTS', 'true').lower() in ('1', 'true', 'yes')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class ConsecutiveFailuresRule:
+    """
+    Breached while the last `count` checks of a URL failed.
+    The streak already debounces, so the rule fires on the first breach
+    (resolving is still debounced).
+    """
+
+    name = 'consecutive_failures'
+    fire_after = 1
+
+    def __init__(self, count):
+        """
+        Args:
+            count (int): Failed checks in a row
+        """
+        self.threshold = count
+        self.streaks = {}
+
+    def update(self, url, result, moment):
+        """
+        Add one check result.
+
+        Returns:
+            tuple: (breached, value), or (None, None) if there is too little data
+        """
+        streak = 0 if result['success'] else self.streaks.get(url, 0) + 1
+        self.streaks[url] = streak
+        return streak >= self.threshold, streak
+
+    def describe(self, url, value):
+        return f"{url}: {value} consecutive failed checks"
+
+
+class LatencyP95Rule:
+    """
+    Breached while the p95 response time of successful checks within the
+    last `window` seconds is above `threshold` seconds.
+    """
+
+    name = 'latency_p95'
+    fire_after = None
+
+    def __init__(self, threshold, window=600, min_samples=5):
+        """
+        Args:
+            threshold (float): Seconds
+            window (int): Seconds of checks the percentile covers
+            min_samples (int): Checks needed in the window before evaluating
+        """
+        self.threshold = threshold
+        self.window = window
+        self.min_samples = min_samples
+        self.windows = {}
+
+    def update(self, url, result, moment):
+        samples = self.windows.setdefault(url, deque())
+        if result['success'] and result.get('response_time') is not None:
+            samples.append((moment, result['response_time']))
+        while samples and samples[0][0] <= moment - self.window:
+            samples.popleft()
+
+        if len(samples) < self.min_samples:
+            return None, None
+        # Nearest-rank percentile; windows hold tens of checks, so sorting is cheap
+        values = sorted(value for _, value in samples)
+        p95 = values[math.ceil(0.95 * len(values)) - 1]
+        return p95 > self.threshold, p95
+
+    def describe(self, url, value):
+        return f"{url}: p95 response time {value:.3f}s (limit {self.threshold}s)"
+
+
+class UptimeRule:
+    """
+    Breached while the share of successful checks within the last `window`
+    seconds is below `threshold` percent.
+    """
+
+    name = 'uptime'
+    fire_after = None
+
+    def __init__(self, threshold, window=600, min_samples=5):
+        """
+        Args:
+            threshold (float): Percent
+            window (int): Seconds of checks the uptime covers
+            min_samples (int): Checks needed in the window before evaluating
+        """
+        self.threshold = threshold
+        self.window = window
+        self.min_samples = min_samples
+        self.windows = {}
+        self.successes = {}
+
+    def update(self, url, result, moment):
+        checks = self.windows.setdefault(url, deque())
+        up = self.successes.get(url, 0)
+        success = bool(result['success'])
+        checks.append((moment, success))
+        up += success
+        while checks and checks[0][0] <= moment - self.window:
+            up -= checks.popleft()[1]
+        self.successes[url] = up
+
+        if len(checks) < self.min_samples:
+            return None, None
+        uptime = up / len(checks) * 100
+        return uptime < self.threshold, uptime
+
+    def describe(self, url, value):
+        return f"{url}: uptime {value:.2f}% (limit {self.threshold}%)"
+
+
+class AlertState:
+    """
+    Debounced, flap-suppressed state of one rule for one URL.
+    """
+
+    def __init__(self, fire_after, resolve_after, flap_window, flap_threshold):
+        self.fire_after = fire_after
+        self.resolve_after = resolve_after
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        self.breached = False
+        self.firing = False
+        self.flapping = False
+        self.breach_streak = 0
+        self.clear_streak = 0
+        self.changes = deque()
+        self.value = None
+        self.since = None
+
+    def evaluate(self, breached, moment):
+        """
+        Add one evaluation of the rule.
+
+        Args:
+            breached (bool): Whether the rule's condition holds now
+            moment (float): Epoch seconds of the check
+
+        Returns:
+            str: 'firing', 'resolved' or 'flapping' if a notification is due, else None
+        """
+        if breached != self.breached:
+            self.changes.append(moment)
+            self.breached = breached
+        while self.changes and self.changes[0] <= moment - self.flap_window:
+            self.changes.popleft()
+
+        if breached:
+            self.breach_streak += 1
+            self.clear_streak = 0
+        else:
+            self.clear_streak += 1
+            self.breach_streak = 0
+
+        # Hysteresis: start at the threshold, settle at half of it
+        changes = len(self.changes)
+        flapping = changes >= self.flap_threshold or (
+            self.flapping and changes > self.flap_threshold // 2
+        )
+        if flapping != self.flapping:
+            self.flapping = flapping
+            self.since = moment
+            if flapping:
+                return 'flapping'
+            self.firing = breached
+            return 'firing' if breached else 'resolved'
+        if self.flapping:
+            return None
+
+        if not self.firing and self.breach_streak >= self.fire_after:
+            self.firing = True
+            self.since = moment
+            return 'firing'
+        if self.firing and self.clear_streak >= self.resolve_after:
+            self.firing = False
+            self.since = moment
+            return 'resolved'
+        return None
+
+
+class AlertEngine:
+    """
+    Evaluates rules on each check result and hands notifications to a dispatcher.
+    Called from the pipeline writer only, so rule windows need no locking;
+    the lock guards reads of the alert states from other threads.
+    """
+
+    def __init__(self, rules, dispatcher=None, debounce=2, flap_window=600, flap_threshold=6):
+        """
+        Args:
+            rules (list): Rule instances
+            dispatcher (NotificationDispatcher): Receives notifications (None = log only)
+            debounce (int): Evaluations a condition must hold (or be clear) to change state
+            flap_window (int): Seconds over which condition changes are counted
+            flap_threshold (int): Changes within flap_window that mean flapping
+        """
+        self.rules = rules
+        self.dispatcher = dispatcher
+        self.debounce = debounce
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def process(self, result):
+        """
+        Evaluate all rules on one check result.
+
+        Args:
+            result (dict): Check result (as saved by the pipeline writer)
+
+        Returns:
+            list: Notifications sent for this result
+        """
+        url = result['url']
+        timestamp = result.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.strptime(timestamp[:19], TIME_FORMAT)
+        moment = timestamp.timestamp() if timestamp else time.time()
+
+        notifications = []
+        with self.lock:
+            for rule in self.rules:
+                breached, value = rule.update(url, result, moment)
+                if breached is None:
+                    continue
+                state = self.states.get((url, rule.name))
+                if state is None:
+                    state = AlertState(rule.fire_after or self.debounce, self.debounce,
+                                       self.flap_window, self.flap_threshold)
+                    self.states[(url, rule.name)] = state
+                state.value = value
+                change = state.evaluate(breached, moment)
+                if change:
+                    notifications.append(self._notification(url, rule, change, value, moment))
+
+        for notification in notifications:
+            icon = {'firing': '🚨', 'resolved': '✅', 'flapping': '🔀'}[notification['state']]
+            logger.warning(f"{icon} Alert {notification['state']}: {notification['message']}")
+            if self.dispatcher:
+                self.dispatcher.notify(notification)
+        return notifications
+
+    def _notification(self, url, rule, state, value, moment):
+        return {
+            'url': url,
+            'rule': rule.name,
+            'state': state,
+            'value': round(value, 4) if isinstance(value, float) else value,
+            'threshold': rule.threshold,
+            'message': rule.describe(url, value),
+            'timestamp': datetime.fromtimestamp(moment).strftime(TIME_FORMAT)
+        }
+
+    def get_active(self):
+        """
+        Get alerts that are firing or flapping.
+
+        Returns:
+            list: One dict per alert (url, rule, state, value, since)
+        """
+        with self.lock:
+            items = sorted(self.states.items())
+            return [
+                {
+                    'url': url,
+                    'rule': rule,
+                    'state': 'flapping' if state.flapping else 'firing',
+                    'value': state.value,
+                    'since': datetime.fromtimestamp(state.since).strftime(TIME_FORMAT)
+                }
+                for (url, rule), state in items
+                if state.firing or state.flapping
+            ]
+
+
+class WebhookChannel:
+    """
+    POSTs a batch as JSON: {"alerts": [notification, ...]}.
+    """
+
+    name = 'webhook'
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, notifications):
+        response = requests.post(self.url, json={'alerts': notifications}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class SmtpChannel:
+    """
+    Sends a batch as one plain-text email.
+    """
+
+    name = 'smtp'
+
+    def __init__(self, host, port=25, sender='monitor@localhost', recipients=(),
+                 username=None, password=None, starttls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def build_message(self, notifications):
+        """
+        Build the email for a batch of notifications.
+
+        Returns:
+            EmailMessage: Message with one line per notification
+        """
+        from email.message import EmailMessage
+
+        counts = {}
+        for notification in notifications:
+            counts[notification['state']] = counts.get(notification['state'], 0) + 1
+        summary = ', '.join(f"{count} {state}" for state, count in sorted(counts.items()))
+
+        message = EmailMessage()
+        message['Subject'] = f"[monitor] {summary}"
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content('\n'.join(
+            f"{n['timestamp']}  {n['state'].upper():9} {n['message']}" for n in notifications
+        ) + '\n')
+        return message
+
+    def send(self, notifications):
+        import smtplib
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or '')
+            smtp.send_message(self.build_message(notifications))
+
+
+class NotificationDispatcher:
+    """
+    Background thread delivering notifications in batches.
+
+    Notifications arriving within `batch_seconds` of the first one (up to
+    `batch_size`) go out together, once per channel. A failed delivery is
+    retried `max_retries` times, waiting retry_backoff * 2**attempt seconds,
+    without holding up later batches. The queue is bounded; notifications
+    beyond it are dropped and counted.
+    """
+
+    def __init__(self, channels, batch_seconds=5.0, batch_size=100, max_retries=3,
+                 retry_backoff=2.0, queue_size=1000):
+        self.channels = channels
+        self.batch_seconds = batch_seconds
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.retries = []  # (due, attempt, channel, batch)
+        self.lock = threading.Lock()
+        self.stats = {'queued': 0, 'dropped': 0, 'batches_sent': 0, 'retries': 0, 'failed': 0}
+        self.thread = None
+        self.closing = threading.Event()
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.closing.clear()
+            self.thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+            self.thread.start()
+        return self
+
+    def notify(self, notification):
+        """
+        Queue one notification without blocking.
+
+        Returns:
+            bool: False if the queue was full and it was dropped
+        """
+        try:
+            self.queue.put_nowait(notification)
+        except queue.Full:
+            with self.lock:
+                self.stats['dropped'] += 1
+            logger.error("❌ Alert queue full, notification dropped")
+            return False
+        with self.lock:
+            self.stats['queued'] += 1
+        return True
+
+    def stop(self, timeout=10):
+        """
+        Deliver what is queued (pending retries get one last attempt) and stop.
+        """
+        self.closing.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self.queue.qsize()
+        stats['pending_retries'] = len(self.retries)
+        return stats
+
+    def _collect(self):
+        """
+        Wait for a notification (or a due retry), then gather the rest of the batch.
+        """
+        wait = 0.2
+        if self.retries:
+            wait = max(0.0, min(wait, min(due for due, _, _, _ in self.retries) - time.monotonic()))
+        try:
+            batch = [self.queue.get(timeout=wait)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + (0 if self.closing.is_set() else self.batch_seconds)
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0
+                             else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, channel, batch, attempt):
+        try:
+            channel.send(batch)
+        except Exception as e:
+            if attempt < self.max_retries and not self.closing.is_set():
+                due = time.monotonic() + self.retry_backoff * 2 ** attempt
+                self.retries.append((due, attempt + 1, channel, batch))
+                with self.lock:
+                    self.stats['retries'] += 1
+                logger.warning(f"⚠️  Alert delivery via {channel.name} failed ({e}), retrying")
+            else:
+                with self.lock:
+                    self.stats['failed'] += 1
+                logger.error(f"❌ Alert delivery via {channel.name} failed: {e}")
+            return
+        with self.lock:
+            self.stats['batches_sent'] += 1
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                for channel in self.channels:
+                    self._deliver(channel, batch, 0)
+
+            closing = self.closing.is_set()
+            now = time.monotonic()
+            due = [r for r in self.retries if closing or r[0] <= now]
+            self.retries = [r for r in self.retries if not (closing or r[0] <= now)]
+            for _, attempt, channel, retry_batch in due:
+                self._deliver(channel, retry_batch, attempt)
+
+            if closing and self.queue.empty() and not self.retries:
+                return
+
+
+def build_rules():
+    """
+    Build the alert rules configured in the environment.
+
+    Environment:
+        ALERT_CONSECUTIVE_FAILURES: Failed checks in a row (0 = off)
+        ALERT_LATENCY_P95: p95 response time limit in seconds (0 = off)
+        ALERT_UPTIME_BELOW: Uptime limit in percent (0 = off)
+        ALERT_WINDOW: Seconds covered by the latency and uptime rules
+        ALERT_MIN_SAMPLES: Checks in the window needed to evaluate them
+
+    Returns:
+        list: Rule instances
+    """
+    window = int(os.getenv('ALERT_WINDOW', 600))
+    min_samples = int(os.getenv('ALERT_MIN_SAMPLES', 5))
+    consecutive = int(os.getenv('ALERT_CONSECUTIVE_FAILURES', 3))
+    latency = float(os.getenv('ALERT_LATENCY_P95', 0))
+    uptime = float(os.getenv('ALERT_UPTIME_BELOW', 0))
+
+    rules = []
+    if consecutive > 0:
+        rules.append(ConsecutiveFailuresRule(consecutive))
+    if latency > 0:
+        rules.append(LatencyP95Rule(latency, window, min_samples))
+    if uptime > 0:
+        rules.append(UptimeRule(uptime, window, min_samples))
+    return rules
+
+
+def build_channels():
+    """
+    Build the notification channels configured in the environment.
+
+    Environment:
+        ALERT_WEBHOOK_URL: POST notifications here as JSON
+        ALERT_SMTP_HOST, ALERT_SMTP_PORT: Mail server for email notifications
+        ALERT_SMTP_FROM, ALERT_SMTP_TO: Sender, comma-separated recipients
+        ALERT_SMTP_USER, ALERT_SMTP_PASSWORD: Optional login
+        ALERT_SMTP_STARTTLS: Upgrade the connection with STARTTLS
+
+    Returns:
+        list: Channel instances
+    """
+    channels = []
+    webhook = os.getenv('ALERT_WEBHOOK_URL')
+    if webhook:
+        channels.append(WebhookChannel(webhook))
+
+    smtp_host = os.getenv('ALERT_SMTP_HOST')
+    recipients = [r.strip() for r in os.getenv('ALERT_SMTP_TO', '').split(',') if r.strip()]
+    if smtp_host and recipients:
+        channels.append(SmtpChannel(
+            smtp_host,
+            port=int(os.getenv('ALERT_SMTP_PORT', 25)),
+            sender=os.getenv('ALERT_SMTP_FROM', 'monitor@localhost'),
+            recipients=recipients,
+            username=os.getenv('ALERT_SMTP_USER') or None,
+            password=os.getenv('ALERT_SMTP_PASSWORD') or None,
+            starttls=os.getenv('ALERT_SMTP_STARTTLS', 'false').lower() in ('1', 'true', 'yes')
+        ))
+    return channels
+
+
+# Shared engine instance
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine():
+    """
+    Get the process-wide alert engine, starting its dispatcher on first use.
+
+    Environment:
+        ALERT_DEBOUNCE: Evaluations a condition must hold to fire or resolve
+        ALERT_FLAP_WINDOW, ALERT_FLAP_THRESHOLD: Flapping detection
+        ALERT_BATCH_SECONDS: Seconds notifications are gathered into one batch
+        ALERT_MAX_RETRIES, ALERT_RETRY_BACKOFF: Delivery retries
+
+    Returns:
+        AlertEngine: Alert engine
+    """
+    global _engine
+
+    with _engine_lock:
+        if _engine is None:
+            channels = build_channels()
+            dispatcher = None
+            if channels:
+                dispatcher = NotificationDispatcher(
+                    channels,
+                    batch_seconds=float(os.getenv('ALERT_BATCH_SECONDS', 5)),
+                    max_retries=int(os.getenv('ALERT_MAX_RETRIES', 3)),
+                    retry_backoff=float(os.getenv('ALERT_RETRY_BACKOFF', 2))
+                ).start()
+            _engine = AlertEngine(
+                build_rules(),
+                dispatcher=dispatcher,
+                debounce=int(os.getenv('ALERT_DEBOUNCE', 2)),
+                flap_window=int(os.getenv('ALERT_FLAP_WINDOW', 600)),
+                flap_threshold=int(os.getenv('ALERT_FLAP_THRESHOLD', 6))
+            )
+            names = ', '.join(rule.name for rule in _engine.rules) or 'none'
+            targets = ', '.join(channel.name for channel in channels) or 'log only'
+            logger.info(f"🔔 Alert rules: {names} ({targets})")
+        return _engine
+
+
+def evaluate_result(result):
+    """
+    Pipeline listener: evaluate alert rules on one saved check.
+
+    Args:
+        result (dict): Saved check result
+    """
+    get_alert_engine().process(result)
+
+
+def get_alert_status():
+    """
+    Get active alerts and dispatcher counters without starting the engine.
+
+    Returns:
+        dict: {'enabled', 'active', 'dispatcher'}
+    """
+    if _engine is None:
+        return {'enabled': False, 'active': [], 'dispatcher': None}
+    return {
+        'enabled': True,
+        'active': _engine.get_active(),
+        'dispatcher': _engine.dispatcher.get_stats() if _engine.dispatcher else None
+    }
+
+
+def stop_alerts():
+    """
+    Deliver pending notifications and drop the process-wide engine.
+    """
+    global _engine
+
+    with _engine_lock:
+        if _engine is not None:
+            if _engine.dispatcher:
+                _engine.dispatcher.stop()
+            _engine = None
@@ -2,11 +2,58 @@
 Analytics module for calculating uptime and performance metrics.
 """
 
-from datetime import datetime, timedelta
-from src.database import get_connection, close_connection
+import os
+from datetime import datetime, timedelta, timezone
+from src.instrumentation import timed
+from src.storage import get_storage, uses_sqlite
+from src import anomaly, slo, vectorized, rollups
+from src.logger import setup_logger
 
+logger = setup_logger()
 
-def calculate_uptime_percentage(hours=None, days=None, url=None):
+# Where reports are computed: 'sql' (SQLite queries and Python loops) or
+# 'numpy' (columnar extracts, see src/vectorized.py; needs NumPy)
+ANALYTICS_BACKEND = os.getenv('ANALYTICS_BACKEND', 'sql')
+
+if ANALYTICS_BACKEND == 'numpy' and not vectorized.HAS_NUMPY:
+    logger.warning("⚠️  ANALYTICS_BACKEND=numpy but NumPy is not installed - using SQL")
+
+
+# How uptime is computed: 'time' weights each check by how long its state
+# lasted (until the next check), 'count' is the plain ratio of successful checks
+UPTIME_METHOD = os.getenv('UPTIME_METHOD', 'time')
+
+# A check's state is assumed to last at most this many seconds; longer gaps
+# between checks (monitor stopped, missed runs) count as unknown, not up/down
+UPTIME_MAX_GAP = int(os.getenv('UPTIME_MAX_GAP', 300))
+
+# Runs of fewer failed checks than this are blips, not outages (a flaky
+# target would otherwise report hundreds of one-check outages); a run that
+# is still ongoing is always an outage
+OUTAGE_MIN_CHECKS = int(os.getenv('OUTAGE_MIN_CHECKS', 2))
+
+def use_vectorized_backend():
+    """
+    Returns:
+        bool: True if reports are computed with the NumPy backend (which
+            reads SQLite storage only)
+    """
+    return ANALYTICS_BACKEND == 'numpy' and vectorized.HAS_NUMPY and uses_sqlite()
+
+
+def _uptime_cutoff(hours=None, days=None):
+    """
+    Start of the period covered by hours/days (None = since monitoring started).
+    """
+    if hours:
+        return datetime.now() - timedelta(hours=hours)
+    if days:
+        return datetime.now() - timedelta(days=days)
+    return None
+
+
+@timed('analytics.calculate_uptime_percentage')
+def calculate_uptime_percentage(hours=None, days=None, url=None, method=None, max_gap=None):
     """
     Calculate uptime percentage for a time period.
     
@@ -14,55 +61,133 @@ def calculate_uptime_percentage(hours=None, days=None, url=None):
         hours (int): Calculate for last N hours
         days (int): Calculate for last N days
         url (str): Filter by specific URL (optional)
+        method (str): 'time' (time-weighted) or 'count' (ratio of successful
+            checks); defaults to UPTIME_METHOD
+        max_gap (int): Time-weighted only: seconds a check's state may last
+            at most (defaults to UPTIME_MAX_GAP)
         
     Returns:
-        float: Uptime percentage (0-100)
+        float: Uptime percentage (0-100), or None when there are no
+            checks in the period (no data is not the same as down)
+    
+    Note:
+        The part of the period older than the stored raw checks is read
+        from rollups (see src/rollups.py), always with SQL.
+    """
+    method = method or UPTIME_METHOD
+    if use_vectorized_backend() and not rollups.reaches_rollups(_uptime_cutoff(hours, days)):
+        return _vectorized_uptime(hours=hours, days=days, url=url, method=method, max_gap=max_gap)
+    if method == 'count':
+        return calculate_count_uptime(hours=hours, days=days, url=url)
+    return calculate_time_weighted_uptime(hours=hours, days=days, url=url, max_gap=max_gap)
+
+
+def _vectorized_uptime(hours=None, days=None, url=None, method='time', max_gap=None):
+    """
+    calculate_uptime_percentage() on the NumPy backend.
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Build query based on parameters
-        query = "SELECT success FROM checks WHERE 1=1"
-        params = []
-        
-        # Add time filter
-        if hours:
-            cutoff = datetime.now() - timedelta(hours=hours)
-            cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M:%S')
-            query += " AND timestamp >= ?"
-            params.append(cutoff_str)
-        elif days:
-            cutoff = datetime.now() - timedelta(days=days)
-            cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M:%S')
-            query += " AND timestamp >= ?"
-            params.append(cutoff_str)
-        
-        # Add URL filter
-        if url:
-            query += " AND url = ?"
-            params.append(url)
-        
-        # Execute query
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        close_connection(conn)
-        
-        # Calculate uptime
-        if not results:
-            return 0.0
-        
-        total_checks = len(results)
-        successful_checks = sum(1 for row in results if row[0] == 1)
-        
-        uptime = (successful_checks / total_checks) * 100
+        if max_gap is None:
+            max_gap = UPTIME_MAX_GAP
+        cutoff = _uptime_cutoff(hours, days)
+        
+        # Time-weighted: also load the checks whose state reaches into the period
+        since = cutoff
+        if cutoff and method != 'count':
+            since = cutoff - timedelta(seconds=max_gap)
+        
+        columns = vectorized.load_columns(url=url, since=since)
+        start = int(cutoff.replace(tzinfo=timezone.utc).timestamp()) if cutoff else None
+        return vectorized.uptime(columns, start=start, method=method, max_gap=max_gap)
+        
+    except Exception as e:
+        logger.error(f"❌ Error calculating uptime: {e}")
+        return None
+
+
+@timed('analytics.calculate_count_uptime')
+def calculate_count_uptime(hours=None, days=None, url=None):
+    """
+    Uptime as the share of successful checks (every check weighs the same,
+    however long its state lasted).
+    
+    Args:
+        hours (int): Calculate for last N hours
+        days (int): Calculate for last N days
+        url (str): Filter by specific URL (optional)
+        
+    Returns:
+        float: Uptime percentage (0-100), or None when there are no checks
+    """
+    try:
+        totals = get_storage().count_totals(since=_uptime_cutoff(hours, days), url=url)
+        
+        if not totals['checks']:
+            return None
+        
+        uptime = (totals['successes'] / totals['checks']) * 100
         return round(uptime, 2)
         
     except Exception as e:
-        print(f"❌ Error calculating uptime: {e}")
-        if conn:
-            close_connection(conn)
-        return 0.0
+        logger.error(f"❌ Error calculating uptime: {e}")
+        return None
+
+
+@timed('analytics.calculate_time_weighted_uptime')
+def calculate_time_weighted_uptime(hours=None, days=None, url=None, max_gap=None):
+    """
+    Uptime weighted by time: each check's state (up or down) lasts until the
+    next check of the same URL, at most max_gap seconds. The latest check
+    before the period supplies the state at its start, so irregular
+    intervals, manual checks and scheduler gaps do not bias the result.
+    
+    Args:
+        hours (int): Calculate for last N hours
+        days (int): Calculate for last N days
+        url (str): Filter by specific URL (optional)
+        max_gap (int): Seconds a check's state may last at most
+            (defaults to UPTIME_MAX_GAP)
+        
+    Returns:
+        float: Uptime percentage (0-100), or None when there are no checks.
+            If no time has elapsed yet (checks only just stored), the plain
+            ratio of successful checks is returned.
+    """
+    try:
+        if max_gap is None:
+            max_gap = UPTIME_MAX_GAP
+        
+        # Stored timestamps are naive local times and strftime('%s') reads
+        # them as UTC, so all epoch values are computed in that same frame
+        def epoch(moment):
+            return int(moment.replace(tzinfo=timezone.utc).timestamp())
+        
+        now = epoch(datetime.now())
+        cutoff = _uptime_cutoff(hours, days)
+        start = epoch(cutoff) if cutoff else 0
+        
+        storage = get_storage()
+        totals = storage.state_totals(since=cutoff, url=url, max_gap=max_gap)
+        seconds = totals['seconds']
+        up_seconds = totals['up_seconds']
+        
+        # Current state of each URL (its latest check), up to now
+        for check in storage.get_latest_checks(url=url):
+            last = epoch(datetime.strptime(check['timestamp'], '%Y-%m-%d %H:%M:%S'))
+            current = max(0, min(now, last + max_gap) - max(last, start))
+            seconds += current
+            if check['success'] == 1:
+                up_seconds += current
+        
+        if seconds:
+            return round(up_seconds / seconds * 100, 2)
+        if totals['checks']:
+            return round(totals['successes'] / totals['checks'] * 100, 2)
+        return None
+        
+    except Exception as e:
+        logger.error(f"❌ Error calculating time-weighted uptime: {e}")
+        return None
 
 
 def get_overall_uptime(url=None):
@@ -117,6 +242,7 @@ def get_uptime_last_30d(url=None):
     return calculate_uptime_percentage(days=30, url=url)
 
 
+@timed('analytics.get_uptime_summary')
 def get_uptime_summary(url=None):
     """
     Get uptime summary for multiple time periods.
@@ -125,7 +251,7 @@ def get_uptime_summary(url=None):
         url (str): Filter by specific URL (optional)
         
     Returns:
-        dict: Uptime percentages for different periods
+        dict: Uptime percentages for different periods (None = no data)
     """
     return {
         'overall': get_overall_uptime(url),
@@ -134,45 +260,42 @@ def get_uptime_summary(url=None):
         'last_30d': get_uptime_last_30d(url)
     }
 
-def detect_outages(hours=24, url=None):
+@timed('analytics.detect_outages')
+def detect_outages(hours=24, url=None, min_checks=None):
     """
     Detect outages (consecutive failed checks).
     
     Args:
         hours (int): Look back N hours (default 24)
         url (str): Filter by URL (optional)
+        min_checks (int): Failed checks an outage needs (default OUTAGE_MIN_CHECKS)
         
     Returns:
         list: List of outage dictionaries
     """
+    if min_checks is None:
+        min_checks = OUTAGE_MIN_CHECKS
+    return [
+        outage for outage in _failed_runs(hours=hours, url=url)
+        if outage['checks_failed'] >= min_checks or outage.get('ongoing')
+    ]
+
+
+def _failed_runs(hours=24, url=None):
+    """
+    All runs of consecutive failed checks, oldest first.
+    """
+    if use_vectorized_backend():
+        try:
+            since = datetime.now() - timedelta(hours=hours) if hours else None
+            return vectorized.outages(vectorized.load_columns(url=url, since=since))
+        except Exception as e:
+            logger.error(f"❌ Error detecting outages: {e}")
+            return []
+    
     try:
-        conn = get_connection()
-        conn.row_factory = lambda cursor, row: {
-            'id': row[0],
-            'timestamp': row[1],
-            'success': row[2]
-        }
-        cursor = conn.cursor()
-        
-        # Get checks for time period
-        query = "SELECT id, timestamp, success FROM checks WHERE 1=1"
-        params = []
-        
-        if hours:
-            cutoff = datetime.now() - timedelta(hours=hours)
-            cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M:%S')
-            query += " AND timestamp >= ?"
-            params.append(cutoff_str)
-        
-        if url:
-            query += " AND url = ?"
-            params.append(url)
-        
-        query += " ORDER BY timestamp ASC"
-        
-        cursor.execute(query, params)
-        checks = cursor.fetchall()
-        close_connection(conn)
+        since = datetime.now() - timedelta(hours=hours) if hours else None
+        checks = get_storage().check_states(since=since, url=url)
         
         # Detect outages
         outages = []
@@ -213,9 +336,7 @@ def detect_outages(hours=24, url=None):
         return outages
         
     except Exception as e:
-        print(f"❌ Error detecting outages: {e}")
-        if conn:
-            close_connection(conn)
+        logger.error(f"❌ Error detecting outages: {e}")
         return []
 
 
@@ -239,9 +360,11 @@ def calculate_duration_minutes(start_str, end_str):
         return 0
 
 
+@timed('analytics.get_outage_summary')
 def get_outage_summary(hours=24, url=None):
     """
     Get summary of outages.
+    Runs shorter than OUTAGE_MIN_CHECKS are only counted, as blips.
     
     Args:
         hours (int): Look back N hours
@@ -250,13 +373,16 @@ def get_outage_summary(hours=24, url=None):
     Returns:
         dict: Outage statistics
     """
-    outages = detect_outages(hours=hours, url=url)
+    runs = detect_outages(hours=hours, url=url, min_checks=1)
+    outages = [o for o in runs if o['checks_failed'] >= OUTAGE_MIN_CHECKS or o.get('ongoing')]
+    blips = len(runs) - len(outages)
     
     if not outages:
         return {
             'total_outages': 0,
             'total_downtime_minutes': 0,
             'longest_outage_minutes': 0,
+            'blips': blips,
             'outages': []
         }
     
@@ -267,9 +393,49 @@ def get_outage_summary(hours=24, url=None):
         'total_outages': len(outages),
         'total_downtime_minutes': total_downtime,
         'longest_outage_minutes': longest_outage,
+        'blips': blips,
         'outages': outages
     }
 
+@timed('analytics.get_anomalies')
+def get_anomalies(url=None):
+    """
+    Get the online latency baselines, flap rates and anomaly flags per
+    target (see src/anomaly.py), caught up to the latest saved check.
+    
+    Args:
+        url (str): Filter by URL (optional)
+        
+    Returns:
+        list: One dict per URL
+    """
+    try:
+        return anomaly.get_detector().report(url=url)
+    except Exception as e:
+        logger.error(f"❌ Error getting anomalies: {e}")
+        return []
+
+
+@timed('analytics.get_slos')
+def get_slos(url=None):
+    """
+    Get the SLI, error budget and burn rates per target (see src/slo.py),
+    caught up to the latest saved check.
+    
+    Args:
+        url (str): Filter by URL (optional)
+        
+    Returns:
+        list: One dict per URL
+    """
+    try:
+        return slo.get_tracker().report(url=url)
+    except Exception as e:
+        logger.error(f"❌ Error getting SLOs: {e}")
+        return []
+
+
+@timed('analytics.get_performance_stats')
 def get_performance_stats(hours=None, days=None, url=None):
     """
     Get performance statistics for response times.
@@ -294,109 +460,39 @@ def get_performance_stats(hours=None, days=None, url=None):
         Response time statistics (avg, min, max, median) are calculated only from successful checks
         where response_time is not NULL. Failed checks are counted in failed_checks but do not
         contribute to response time calculations.
+        Periods older than the stored raw checks use rollups for counts, avg, min and max;
+        the median only covers raw checks.
     """
+    if use_vectorized_backend() and not rollups.reaches_rollups(_uptime_cutoff(hours, days)):
+        try:
+            since = _uptime_cutoff(hours, days)
+            return vectorized.performance_stats(vectorized.load_columns(url=url, since=since))
+        except Exception as e:
+            logger.error(f"❌ Error getting performance stats: {e}")
+            return {
+                'total_checks': 0,
+                'successful_checks': 0,
+                'failed_checks': 0,
+                'avg_response_time': 0.0,
+                'min_response_time': 0.0,
+                'max_response_time': 0.0,
+                'median_response_time': 0.0
+            }
+    
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Build time and URL filters
-        time_filter = ""
-        params = []
-        
-        if hours:
-            cutoff = datetime.now() - timedelta(hours=hours)
-            cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M:%S')
-            time_filter = " AND timestamp >= ?"
-            params.append(cutoff_str)
-        elif days:
-            cutoff = datetime.now() - timedelta(days=days)
-            cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M:%S')
-            time_filter = " AND timestamp >= ?"
-            params.append(cutoff_str)
-        
-        url_filter = ""
-        if url:
-            url_filter = " AND url = ?"
-            params.append(url)
-        
-        # Query 1: Get total, successful, and failed counts (ALL checks)
-        count_query = f"""
-            SELECT 
-                COUNT(*) as total_checks,
-                SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful_checks,
-                SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as failed_checks
-            FROM checks
-            WHERE 1=1{time_filter}{url_filter}
-        """
-        cursor.execute(count_query, params)
-        count_result = cursor.fetchone()
-        
-        # Handle None result from count query
-        if not count_result:
-            total_checks = 0
-            successful_checks = 0
-            failed_checks = 0
-        else:
-            total_checks = count_result[0] or 0
-            successful_checks = count_result[1] or 0
-            failed_checks = count_result[2] or 0
-        
-        # Query 2: Get response time stats (ONLY successful checks)
-        stats_query = f"""
-            SELECT 
-                AVG(response_time) as avg_response_time,
-                MIN(response_time) as min_response_time,
-                MAX(response_time) as max_response_time
-            FROM checks
-            WHERE success = 1 AND response_time IS NOT NULL{time_filter}{url_filter}
-        """
-        cursor.execute(stats_query, params)
-        stats_result = cursor.fetchone()
-        
-        # Handle None result from stats query
-        if not stats_result:
-            avg = 0.0
-            min_time = 0.0
-            max_time = 0.0
-        else:
-            avg = stats_result[0] if stats_result[0] is not None else 0.0
-            min_time = stats_result[1] if stats_result[1] is not None else 0.0
-            max_time = stats_result[2] if stats_result[2] is not None else 0.0
-        
-        # Query 3: Get median (ONLY successful checks)
-        median_query = f"""
-            SELECT response_time FROM checks 
-            WHERE success = 1 AND response_time IS NOT NULL{time_filter}{url_filter}
-            ORDER BY response_time
-        """
-        cursor.execute(median_query, params)
-        response_times = [row[0] for row in cursor.fetchall() if row and row[0] is not None]
-        
-        close_connection(conn)
-        
-        # Calculate median
-        median = 0.0
-        if response_times:
-            n = len(response_times)
-            if n % 2 == 0:
-                median = (response_times[n//2 - 1] + response_times[n//2]) / 2
-            else:
-                median = response_times[n//2]
-        
+        stats = get_storage().response_stats(since=_uptime_cutoff(hours, days), url=url)
         return {
-            'total_checks': total_checks,
-            'successful_checks': successful_checks,
-            'failed_checks': failed_checks,
-            'avg_response_time': round(avg, 3),
-            'min_response_time': round(min_time, 3),
-            'max_response_time': round(max_time, 3),
-            'median_response_time': round(median, 3)
+            'total_checks': stats['total_checks'],
+            'successful_checks': stats['successful_checks'],
+            'failed_checks': stats['failed_checks'],
+            'avg_response_time': round(stats['avg_response_time'], 3),
+            'min_response_time': round(stats['min_response_time'], 3),
+            'max_response_time': round(stats['max_response_time'], 3),
+            'median_response_time': round(stats['median_response_time'], 3)
         }
         
     except Exception as e:
-        print(f"❌ Error getting performance stats: {e}")
-        if conn:
-            close_connection(conn)
+        logger.error(f"❌ Error getting performance stats: {e}")
         return {
             'total_checks': 0,
             'successful_checks': 0,
@@ -407,21 +503,55 @@ def get_performance_stats(hours=None, days=None, url=None):
             'median_response_time': 0.0
         }
         
-    except Exception as e:
-        print(f"❌ Error getting performance stats: {e}")
-        if conn:
-            close_connection(conn)
+
+@timed('analytics.get_schedule_stats')
+def get_schedule_stats(hours=24, url=None):
+    """
+    Get scheduler health: how late scheduled checks started and how many
+    planned runs never ran (missed by the scheduler, coalesced with
+    another probe or dropped by the pipeline).
+    
+    Args:
+        hours (int): Look back N hours
+        url (str): Filter by URL (optional)
+        
+    Returns:
+        dict: Scheduling statistics including:
+            - scheduled_checks (int): Checks started by the scheduler
+            - avg_lag_seconds (float): Average delay between planned and actual start
+            - max_lag_seconds (float): Largest delay
+            - missed_runs (int): Planned runs that never ran
+            - coverage_percent (float): Share of planned runs that ran
+              (None when there were no scheduled checks)
+    """
+    try:
+        since = datetime.now() - timedelta(hours=hours) if hours else None
+        totals = get_storage().schedule_totals(since=since, url=url)
+        
+        scheduled = totals['scheduled_checks']
+        missed = totals['missed_runs']
+        planned = scheduled + missed
+        
         return {
-            'total_checks': 0,
-            'successful_checks': 0,
-            'failed_checks': 0,
-            'avg_response_time': 0.0,
-            'min_response_time': 0.0,
-            'max_response_time': 0.0,
-            'median_response_time': 0.0
+            'scheduled_checks': scheduled,
+            'avg_lag_seconds': round(totals['avg_lag_seconds'], 3),
+            'max_lag_seconds': round(totals['max_lag_seconds'], 3),
+            'missed_runs': missed,
+            'coverage_percent': round(scheduled / planned * 100, 2) if planned else None
         }
         
+    except Exception as e:
+        logger.error(f"❌ Error getting schedule stats: {e}")
+        return {
+            'scheduled_checks': 0,
+            'avg_lag_seconds': 0.0,
+            'max_lag_seconds': 0.0,
+            'missed_runs': 0,
+            'coverage_percent': None
+        }
+
 
+@timed('analytics.get_complete_report')
 def get_complete_report(hours=24, url=None):
     """
     Get comprehensive monitoring report.
@@ -438,6 +568,7 @@ def get_complete_report(hours=24, url=None):
         'uptime': get_uptime_summary(url=url),
         'outages': get_outage_summary(hours=hours, url=url),
         'performance': get_performance_stats(hours=hours, url=url),
+        'schedule': get_schedule_stats(hours=hours, url=url),
         'report_period_hours': hours,
         'report_generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
\ No newline at end of file
@@ -0,0 +1,412 @@
+"""
+Online flap detection and anomaly scoring per target.
+
+Each URL has a TargetDetector updated in O(1) per check, with no history
+kept:
+
+    latency    exponentially weighted mean and variance (EWMA/EWMV) of
+               response times; a response time ANOMALY_SPIKE_Z standard
+               deviations (and ANOMALY_MIN_DELTA seconds) above the mean
+               is a spike
+    flapping   exponentially weighted rate of up/down changes per check;
+               flapping above ANOMALY_FLAP_HIGH, settled below ANOMALY_FLAP_LOW
+
+anomaly_score is the larger of the spike z-score over ANOMALY_SPIKE_Z and
+the flap rate over ANOMALY_FLAP_HIGH, so 1.0 or more is anomalous.
+
+The scheduler feeds detectors from the pipeline's result listener. States
+are checkpointed to the detector_state table (SQLite storage only), with
+the id of the last check they include, so another process (the dashboard)
+or a restart loads them and replays only newer checks.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from src.database import get_connection, close_connection
+from src.storage import uses_sqlite
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Evaluate checks as they are saved
+ANOMALY_DETECTION = os.getenv('ANOMALY_DETECTION', 'true').lower() in ('1', 'true', 'yes')
+
+# Weight of the newest response time in the latency mean and variance
+ANOMALY_ALPHA = float(os.getenv('ANOMALY_ALPHA', 0.1))
+
+# Standard deviations above the mean that make a spike
+ANOMALY_SPIKE_Z = float(os.getenv('ANOMALY_SPIKE_Z', 3.0))
+
+# Seconds above the mean a spike needs as well (very steady targets have a
+# tiny deviation, where a few milliseconds would be many of them)
+ANOMALY_MIN_DELTA = float(os.getenv('ANOMALY_MIN_DELTA', 0.05))
+
+# Response times needed before spikes are flagged
+ANOMALY_WARMUP = int(os.getenv('ANOMALY_WARMUP', 20))
+
+# Weight of the newest check in the flap rate, and the flapping thresholds
+ANOMALY_FLAP_ALPHA = float(os.getenv('ANOMALY_FLAP_ALPHA', 0.1))
+ANOMALY_FLAP_HIGH = float(os.getenv('ANOMALY_FLAP_HIGH', 0.3))
+ANOMALY_FLAP_LOW = float(os.getenv('ANOMALY_FLAP_LOW', 0.15))
+
+# Seconds between checkpoints of changed detectors
+ANOMALY_CHECKPOINT_SECONDS = int(os.getenv('ANOMALY_CHECKPOINT_SECONDS', 60))
+
+# Hours of checks replayed for URLs without a checkpoint
+ANOMALY_REPLAY_HOURS = 24
+
+# Anomalies kept per target for the API
+RECENT_ANOMALIES = 20
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+UPSERT_STATE_SQL = '''
+    INSERT INTO detector_state (url, last_id, state, updated_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        last_id = excluded.last_id,
+        state = excluded.state,
+        updated_at = excluded.updated_at
+    WHERE excluded.last_id > detector_state.last_id
+'''
+
+
+def _format_timestamp(timestamp):
+    if hasattr(timestamp, 'strftime'):
+        return timestamp.strftime(TIME_FORMAT)
+    return str(timestamp)[:19] if timestamp else None
+
+
+class TargetDetector:
+    """
+    Latency baseline and flap rate of one URL.
+    """
+
+    # Fields saved in checkpoints
+    FIELDS = ('checks', 'samples', 'mean', 'variance', 'flap_rate', 'flapping',
+              'last_success', 'state_changes', 'flap_episodes', 'spikes', 'zscore',
+              'spike', 'last_response_time', 'last_check', 'last_id')
+
+    def __init__(self, url):
+        self.url = url
+        self.checks = 0
+        self.samples = 0
+        self.mean = None
+        self.variance = 0.0
+        self.flap_rate = 0.0
+        self.flapping = False
+        self.last_success = None
+        self.state_changes = 0
+        self.flap_episodes = 0
+        self.spikes = 0
+        self.zscore = None
+        self.spike = False
+        self.last_response_time = None
+        self.last_check = None
+        self.last_id = 0
+        self.recent = deque(maxlen=RECENT_ANOMALIES)
+
+    def update(self, check):
+        """
+        Add one check (oldest first).
+
+        Args:
+            check (dict): Check with url, timestamp, success, response_time
+                and, once saved, id
+        """
+        self.checks += 1
+        self.last_check = _format_timestamp(check.get('timestamp'))
+        self.last_id = max(self.last_id, check.get('id') or 0)
+        success = bool(check['success'])
+
+        # Flap rate: EWMA of "state changed since the previous check"
+        if self.last_success is not None:
+            changed = success != self.last_success
+            self.state_changes += changed
+            self.flap_rate += ANOMALY_FLAP_ALPHA * (changed - self.flap_rate)
+        self.last_success = success
+
+        if not self.flapping and self.flap_rate >= ANOMALY_FLAP_HIGH:
+            self.flapping = True
+            self.flap_episodes += 1
+            self.recent.append({'timestamp': self.last_check, 'type': 'flapping',
+                                'value': round(self.flap_rate, 3)})
+        elif self.flapping and self.flap_rate < ANOMALY_FLAP_LOW:
+            self.flapping = False
+
+        self.zscore = None
+        self.spike = False
+        response_time = check.get('response_time')
+        if not success or response_time is None:
+            return
+
+        self.last_response_time = response_time
+        if self.samples == 0:
+            self.mean = response_time
+        else:
+            deviation = math.sqrt(self.variance)
+            difference = response_time - self.mean
+            if self.samples >= ANOMALY_WARMUP and deviation > 0:
+                self.zscore = difference / deviation
+                self.spike = (self.zscore >= ANOMALY_SPIKE_Z
+                              and difference >= ANOMALY_MIN_DELTA)
+            # Incremental EWMA/EWMV (West 1979 / Finch 2009)
+            increment = ANOMALY_ALPHA * difference
+            self.mean += increment
+            self.variance = (1 - ANOMALY_ALPHA) * (self.variance + difference * increment)
+        self.samples += 1
+
+        if self.spike:
+            self.spikes += 1
+            self.recent.append({'timestamp': self.last_check, 'type': 'spike',
+                                'value': response_time, 'zscore': round(self.zscore, 2)})
+
+    @property
+    def anomaly_score(self):
+        latency = max(0.0, self.zscore or 0.0) / ANOMALY_SPIKE_Z
+        return max(latency, self.flap_rate / ANOMALY_FLAP_HIGH)
+
+    def to_dict(self):
+        """
+        Get the detector as reported by the API.
+
+        Returns:
+            dict: Baseline, scores and recent anomalies
+        """
+        deviation = math.sqrt(self.variance)
+        return {
+            'url': self.url,
+            'checks': self.checks,
+            'last_check': self.last_check,
+            'latency_baseline': round(self.mean, 4) if self.mean is not None else None,
+            'latency_stddev': round(deviation, 4) if self.mean is not None else None,
+            'last_response_time': self.last_response_time,
+            'zscore': round(self.zscore, 2) if self.zscore is not None else None,
+            'spike': self.spike,
+            'spikes': self.spikes,
+            'flap_rate': round(self.flap_rate, 3),
+            'flapping': self.flapping,
+            'state_changes': self.state_changes,
+            'flap_episodes': self.flap_episodes,
+            'anomaly_score': round(self.anomaly_score, 2),
+            'anomalous': self.spike or self.flapping,
+            'recent_anomalies': list(self.recent)
+        }
+
+    def dump(self):
+        state = {field: getattr(self, field) for field in self.FIELDS}
+        state['recent'] = list(self.recent)
+        return json.dumps(state)
+
+    @classmethod
+    def load(cls, url, data):
+        detector = cls(url)
+        state = json.loads(data)
+        for field in cls.FIELDS:
+            if field in state:
+                setattr(detector, field, state[field])
+        detector.recent.extend(state.get('recent', []))
+        return detector
+
+
+class AnomalyDetector:
+    """
+    Detectors of all URLs, with checkpoints in the database.
+
+    Fed either live by the pipeline listener (process) or, in a process
+    without the scheduler, by catching up on saved checks (sync).
+    """
+
+    def __init__(self, checkpoint_seconds=ANOMALY_CHECKPOINT_SECONDS, persist=None):
+        """
+        Args:
+            checkpoint_seconds (int): Seconds between checkpoints
+            persist (bool): Load and save checkpoints (default: with SQLite storage)
+        """
+        self.checkpoint_seconds = checkpoint_seconds
+        self.persist = uses_sqlite() if persist is None else persist
+        self.targets = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.live = False
+        self.loaded = False
+        self.synced_id = 0
+        self.last_checkpoint = time.monotonic()
+
+    def _target(self, url):
+        detector = self.targets.get(url)
+        if detector is None:
+            detector = self.targets[url] = TargetDetector(url)
+        return detector
+
+    def _load(self):
+        """
+        Load checkpoints once; sync() continues from the oldest of them.
+        """
+        self.loaded = True
+        if not self.persist:
+            return
+        conn = get_connection()
+        try:
+            rows = conn.execute('SELECT url, state FROM detector_state').fetchall()
+        finally:
+            close_connection(conn)
+        for url, data in rows:
+            self.targets[url] = TargetDetector.load(url, data)
+        if self.targets:
+            self.synced_id = min(d.last_id for d in self.targets.values())
+
+    def process(self, check):
+        """
+        Add one saved check (pipeline listener).
+
+        Args:
+            check (dict): Saved check result
+        """
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            self.live = True
+            detector = self._target(check['url'])
+            if check.get('id') and check['id'] <= detector.last_id:
+                return
+            detector.update(check)
+            self.dirty.add(check['url'])
+        self.checkpoint()
+
+    def sync(self):
+        """
+        Catch up on checks saved since the detectors last saw one (only
+        needed where no listener feeds them).
+
+        Returns:
+            int: Number of checks added
+        """
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            if self.live or not self.persist:
+                return 0
+
+            conn = get_connection()
+            try:
+                query = ('SELECT id, url, timestamp, success, response_time '
+                         'FROM checks WHERE id > ?')
+                params = [self.synced_id]
+                if not self.targets:
+                    since = datetime.now() - timedelta(hours=ANOMALY_REPLAY_HOURS)
+                    query += ' AND timestamp >= ?'
+                    params.append(since.strftime(TIME_FORMAT))
+                rows = conn.execute(query + ' ORDER BY id', params).fetchall()
+            finally:
+                close_connection(conn)
+
+            added = 0
+            for row_id, url, timestamp, success, response_time in rows:
+                detector = self._target(url)
+                if row_id <= detector.last_id:
+                    continue
+                detector.update({'id': row_id, 'url': url, 'timestamp': timestamp,
+                                 'success': success, 'response_time': response_time})
+                self.dirty.add(url)
+                added += 1
+            if rows:
+                self.synced_id = max(self.synced_id, rows[-1][0])
+        if added:
+            self.checkpoint()
+        return added
+
+    def checkpoint(self, force=False):
+        """
+        Save changed detectors, at most every checkpoint_seconds unless forced.
+        A checkpoint never replaces a newer one from another process.
+
+        Returns:
+            int: Number of detectors saved
+        """
+        with self.lock:
+            now = time.monotonic()
+            if not self.persist or not self.dirty:
+                return 0
+            if not force and now - self.last_checkpoint < self.checkpoint_seconds:
+                return 0
+            updated = datetime.now().strftime(TIME_FORMAT)
+            rows = [(url, self.targets[url].last_id, self.targets[url].dump(), updated)
+                    for url in sorted(self.dirty)]
+            self.dirty.clear()
+            self.last_checkpoint = now
+
+        conn = None
+        try:
+            conn = get_connection()
+            conn.executemany(UPSERT_STATE_SQL, rows)
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"❌ Error saving anomaly detector checkpoint: {e}")
+            return 0
+        finally:
+            close_connection(conn)
+
+    def report(self, url=None):
+        """
+        Get detector states, caught up to the latest saved check.
+
+        Args:
+            url (str): Only this URL (optional)
+
+        Returns:
+            list: TargetDetector.to_dict() per URL, sorted by URL
+        """
+        self.sync()
+        with self.lock:
+            return [self.targets[u].to_dict() for u in sorted(self.targets)
+                    if url is None or u == url]
+
+
+# Shared detector instance
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    """
+    Get the process-wide anomaly detector.
+
+    Returns:
+        AnomalyDetector: Detector
+    """
+    global _detector
+
+    with _detector_lock:
+        if _detector is None:
+            _detector = AnomalyDetector()
+        return _detector
+
+
+def record_result(result):
+    """
+    Pipeline listener: update the detector of one saved check's URL.
+
+    Args:
+        result (dict): Saved check result
+    """
+    get_detector().process(result)
+
+
+def reset_detector():
+    """
+    Checkpoint and drop the process-wide detector (on shutdown, or when
+    the database changes).
+    """
+    global _detector
+
+    with _detector_lock:
+        if _detector is not None:
+            _detector.checkpoint(force=True)
+            _detector = None
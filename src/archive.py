@@ -0,0 +1,468 @@
+"""
+Bulk export / import of the check history.
+
+An archive is a stream of compressed column chunks, written and read one
+chunk at a time, so memory use stays the same however long the history
+is (and no Parquet library is needed). Layout, integers little-endian:
+
+    header   b'CHKA' | u16 version | u16 column count
+             per column: u8 type | u8 name length | ASCII name
+    chunk    u32 row count | u32 payload length | u32 CRC-32 of payload
+             payload = zlib(per column: u32 block length | block)
+    end      u32 0
+
+Column blocks by type:
+
+    INT      int64 per row, NULL stored as -2**63
+    DELTA    int64: first value, then the difference to the previous row
+             (columns without NULLs that mostly grow: id, timestamp)
+    REAL     float64 per row, NULL stored as NaN
+    TEXT     u32 entry count, per entry u32 byte length (0xFFFFFFFF =
+             NULL) and UTF-8 bytes, then one u32 entry index per row
+
+timestamp and scheduled_at are stored as whole seconds since
+1970-01-01 00:00:00 of the stored (local) time, as SQLite's strftime('%s')
+counts them. Chunks hold checks in partition and id order.
+"""
+
+import operator
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+
+from src.database import (
+    get_connection, close_connection, list_partitions, ensure_partitions,
+    partition_name, backfill_check_states, COLUMN_NAMES
+)
+from src.instrumentation import timed
+from src import hotstore
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+MAGIC = b'CHKA'
+VERSION = 1
+
+# Column types
+INT, DELTA, REAL, TEXT = 1, 2, 3, 4
+
+# Type of each exported column, in CHECK_COLUMNS order
+COLUMN_TYPES = {
+    'id': DELTA,
+    'url': TEXT,
+    'timestamp': DELTA,
+    'status_code': INT,
+    'response_time': REAL,
+    'success': INT,
+    'error': TEXT,
+    'retries': INT,
+    'queue_wait': REAL,
+    'scheduled_at': INT,
+    'schedule_lag': REAL,
+    'missed_runs': INT,
+    'prev_gap': INT,
+    'prev_success': INT,
+    'agent': TEXT,
+}
+
+# Stored as epoch seconds instead of '%Y-%m-%d %H:%M:%S' text
+TIME_COLUMNS = ('timestamp', 'scheduled_at')
+
+# An archive without these cannot be imported
+REQUIRED_COLUMNS = ('id', 'url', 'timestamp', 'success')
+
+NULL_INT = -2 ** 63
+NULL_TEXT = 0xFFFFFFFF
+
+# Checks per chunk (about 2-3 MB of Python objects while being converted)
+CHUNK_ROWS = 65536
+
+# zlib level: 1 is fastest, 9 smallest
+COMPRESSION_LEVEL = 6
+
+# array typecode of a 4-byte unsigned integer
+U32 = 'I' if array('I').itemsize == 4 else 'L'
+
+CHUNK_HEADER = struct.Struct('<III')
+
+
+def _to_bytes(values):
+    """
+    Little-endian bytes of an array.
+    """
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode, data):
+    """
+    Array of the given type from little-endian bytes.
+    """
+    values = array(typecode)
+    if len(data) % values.itemsize:
+        raise ValueError('Column block has a partial value')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _encode_column(kind, values):
+    """
+    Encode one column of a chunk.
+
+    Args:
+        kind (int): Column type (INT, DELTA, REAL or TEXT)
+        values (tuple): Column values, NULLs of INT columns already
+            replaced by NULL_INT
+
+    Returns:
+        bytes: Column block
+    """
+    if kind == TEXT:
+        entries = {}
+        codes = array(U32, [entries.setdefault(value, len(entries)) for value in values])
+        parts = [struct.pack('<I', len(entries))]
+        for entry in entries:
+            if entry is None:
+                parts.append(struct.pack('<I', NULL_TEXT))
+            else:
+                data = entry.encode('utf-8')
+                parts.append(struct.pack('<I', len(data)))
+                parts.append(data)
+        parts.append(_to_bytes(codes))
+        return b''.join(parts)
+
+    if kind == REAL:
+        nan = float('nan')
+        return _to_bytes(array('d', [nan if value is None else value for value in values]))
+
+    if kind == DELTA:
+        values = [values[0], *map(operator.sub, values[1:], values[:-1])]
+    return _to_bytes(array('q', values))
+
+
+def _decode_column(kind, block, rows):
+    """
+    Decode one column block of a chunk.
+
+    Args:
+        kind (int): Column type
+        block (bytes): Column block
+        rows (int): Rows in the chunk
+
+    Returns:
+        sequence: Column values (INT columns still hold NULL_INT, REAL
+            columns NaN; SQLite stores NaN as NULL)
+
+    Raises:
+        ValueError: If the block is malformed
+    """
+    if kind == TEXT:
+        count, = struct.unpack_from('<I', block)
+        offset = 4
+        entries = []
+        for _ in range(count):
+            length, = struct.unpack_from('<I', block, offset)
+            offset += 4
+            if length == NULL_TEXT:
+                entries.append(None)
+            else:
+                entries.append(block[offset:offset + length].decode('utf-8'))
+                offset += length
+        values = list(map(entries.__getitem__, _from_bytes(U32, block[offset:])))
+    elif kind == REAL:
+        values = _from_bytes('d', block)
+    elif kind in (INT, DELTA):
+        values = _from_bytes('q', block)
+        if kind == DELTA:
+            values = list(accumulate(values))
+    else:
+        raise ValueError(f'Unknown column type {kind}')
+
+    if len(values) != rows:
+        raise ValueError(f'Column block holds {len(values)} values, expected {rows}')
+    return values
+
+
+def _write_header(f, columns):
+    """
+    Write the archive header for (name, type) columns.
+    """
+    parts = [MAGIC, struct.pack('<HH', VERSION, len(columns))]
+    for name, kind in columns:
+        encoded = name.encode('ascii')
+        parts.append(struct.pack('<BB', kind, len(encoded)) + encoded)
+    f.write(b''.join(parts))
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError('Archive is truncated')
+    return data
+
+
+def _read_header(f):
+    """
+    Read and check the archive header.
+
+    Returns:
+        list: (name, type) of each column
+
+    Raises:
+        ValueError: If this is not an archive this version can import
+    """
+    if _read_exact(f, 4) != MAGIC:
+        raise ValueError('Not a check archive')
+    version, count = struct.unpack('<HH', _read_exact(f, 4))
+    if version != VERSION:
+        raise ValueError(f'Unsupported archive version {version}')
+
+    columns = []
+    for _ in range(count):
+        kind, length = struct.unpack('<BB', _read_exact(f, 2))
+        name = _read_exact(f, length).decode('ascii')
+        if name not in COLUMN_TYPES:
+            raise ValueError(f'Unknown column {name!r}')
+        columns.append((name, kind))
+
+    missing = [name for name in REQUIRED_COLUMNS if name not in dict(columns)]
+    if missing:
+        raise ValueError(f"Archive lacks columns: {', '.join(missing)}")
+    return columns
+
+
+def _write_chunk(f, columns, rows, level):
+    """
+    Write one chunk of row tuples.
+    """
+    blocks = []
+    for (_, kind), values in zip(columns, zip(*rows)):
+        block = _encode_column(kind, values)
+        blocks.append(struct.pack('<I', len(block)))
+        blocks.append(block)
+    payload = zlib.compress(b''.join(blocks), level)
+    f.write(CHUNK_HEADER.pack(len(rows), len(payload), zlib.crc32(payload)))
+    f.write(payload)
+
+
+def _read_chunks(f, columns):
+    """
+    Yield the chunks of an archive as lists of columns, one at a time.
+
+    Raises:
+        ValueError: If a chunk is truncated or corrupt
+    """
+    while True:
+        rows, = struct.unpack('<I', _read_exact(f, 4))
+        if rows == 0:
+            return
+        size, checksum = struct.unpack('<II', _read_exact(f, 8))
+        payload = _read_exact(f, size)
+        if zlib.crc32(payload) != checksum:
+            raise ValueError('Chunk checksum mismatch')
+
+        data = zlib.decompress(payload)
+        offset = 0
+        chunk = []
+        for _, kind in columns:
+            length, = struct.unpack_from('<I', data, offset)
+            offset += 4
+            chunk.append(_decode_column(kind, data[offset:offset + length], rows))
+            offset += length
+        yield chunk
+
+
+def _export_expression(name, kind):
+    """
+    SELECT expression giving a column's archived value.
+    """
+    value = f"CAST(strftime('%s', {name}) AS INTEGER)" if name in TIME_COLUMNS else name
+    if kind == INT:
+        value = f'IFNULL({value}, :null)'
+    return value
+
+
+def _import_expression(name, kind):
+    """
+    SELECT expression turning an archived value back into a stored one.
+    """
+    value = name
+    if kind == INT:
+        value = f'NULLIF({value}, :null)'
+    if name in TIME_COLUMNS:
+        value = f"datetime({value}, 'unixepoch')"
+    return value
+
+
+@timed('archive.export_checks')
+def export_checks(path, since=None, chunk_rows=CHUNK_ROWS, level=COMPRESSION_LEVEL):
+    """
+    Stream the stored checks into an archive file.
+
+    Args:
+        path (str): File to write
+        since (datetime or str): Only export checks from this time on (optional)
+        chunk_rows (int): Checks per chunk
+        level (int): zlib compression level (1-9)
+
+    Returns:
+        int: Number of checks exported, or None on error
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        # One read transaction, so all partitions are read at the same point
+        cursor.execute('BEGIN')
+        partitions = list_partitions(cursor)
+        where = ''
+        params = {'null': NULL_INT}
+        if since is not None:
+            if isinstance(since, datetime):
+                since = since.strftime('%Y-%m-%d %H:%M:%S')
+            first = partition_name(since)
+            partitions = [name for name in partitions if name >= first]
+            where = 'WHERE timestamp >= :since'
+            params['since'] = since
+
+        columns = list(COLUMN_TYPES.items())
+        select = ', '.join(_export_expression(name, kind) for name, kind in columns)
+
+        def rows():
+            for name in partitions:
+                yield from conn.execute(f'SELECT {select} FROM {name} {where} ORDER BY id', params)
+
+        exported = 0
+        stream = rows()
+        with open(path, 'wb') as f:
+            _write_header(f, columns)
+            while True:
+                chunk = list(islice(stream, chunk_rows))
+                if not chunk:
+                    break
+                _write_chunk(f, columns, chunk, level)
+                exported += len(chunk)
+            f.write(struct.pack('<I', 0))
+
+        conn.rollback()
+        close_connection(conn)
+        logger.info(f"📤 Exported {exported} checks to {path}")
+        return exported
+
+    except Exception as e:
+        logger.error(f"❌ Error exporting checks: {e}")
+        if conn:
+            close_connection(conn)
+        return None
+
+
+@timed('archive.import_checks')
+def import_checks(path):
+    """
+    Stream the checks of an archive file into the database, one
+    transaction per chunk.
+
+    Into an empty database the checks keep their ids and stored states.
+    Otherwise they get new ids and every check is relinked to its previous
+    one afterwards. Checks older than the rollups already reach are added
+    to them at the next compaction (see src/rollups.py).
+
+    Args:
+        path (str): Archive file to read
+
+    Returns:
+        int: Number of checks imported, or None on error (chunks imported
+            before the error stay imported)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        with open(path, 'rb') as f:
+            columns = _read_header(f)
+            names = [name for name, _ in columns]
+
+            cursor.execute('DROP TABLE IF EXISTS temp.archive_rows')
+            cursor.execute(f"CREATE TEMP TABLE archive_rows ({', '.join(names)})")
+            stage_sql = f"INSERT INTO temp.archive_rows VALUES ({', '.join('?' * len(names))})"
+
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM checks)')
+            keep_ids = not cursor.fetchone()[0]
+
+            # Target columns in CHECK_COLUMNS order; missing ones get their default
+            kinds = dict(columns)
+            targets = [name for name in COLUMN_NAMES.split(', ') if name in kinds]
+            expressions = [_import_expression(name, kinds[name]) for name in targets]
+            if not keep_ids:
+                expressions[0] = ':offset + rowid'
+            insert_sql = f'''
+                INSERT INTO {{table}} ({', '.join(targets)})
+                SELECT {', '.join(expressions)} FROM temp.archive_rows
+                WHERE timestamp >= :start AND timestamp < :end
+            '''
+
+            imported = 0
+            urls = set()
+            for chunk in _read_chunks(f, columns):
+                rows = len(chunk[0])
+
+                # Takes the write lock before staging, like _insert_check()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('DELETE FROM temp.archive_rows')
+                cursor.executemany(stage_sql, zip(*chunk))
+
+                params = {'null': NULL_INT, 'offset': 0}
+                if keep_ids:
+                    cursor.execute('''
+                        UPDATE check_sequence
+                        SET last_id = MAX(last_id, (SELECT MAX(id) FROM temp.archive_rows))
+                    ''')
+                else:
+                    cursor.execute('UPDATE check_sequence SET last_id = last_id + ?', (rows,))
+                    cursor.execute('SELECT last_id FROM check_sequence')
+                    last_id = cursor.fetchone()[0]
+                    cursor.execute('SELECT MIN(rowid) FROM temp.archive_rows')
+                    params['offset'] = last_id - rows - cursor.fetchone()[0] + 1
+
+                # One INSERT ... SELECT per day of the chunk
+                cursor.execute('SELECT DISTINCT timestamp / 86400 FROM temp.archive_rows')
+                days = sorted(row[0] for row in cursor.fetchall())
+                epoch = datetime(1970, 1, 1)
+                tables = [partition_name(epoch + timedelta(days=day)) for day in days]
+                ensure_partitions(cursor, tables)
+                for day, table in zip(days, tables):
+                    params['start'] = day * 86400
+                    params['end'] = (day + 1) * 86400
+                    cursor.execute(insert_sql.format(table=table), params)
+                    imported += cursor.rowcount
+                cursor.execute('SELECT DISTINCT url FROM temp.archive_rows')
+                urls.update(row[0] for row in cursor.fetchall())
+                conn.commit()
+
+        cursor.execute('DROP TABLE IF EXISTS temp.archive_rows')
+        if not keep_ids:
+            backfill_check_states(conn, relink=True)
+        elif 'prev_gap' not in kinds:
+            backfill_check_states(conn)
+        conn.commit()
+        close_connection(conn)
+
+        # The imported checks never went through the hot-store rings
+        hotstore.rebuild_all(sorted(urls))
+        logger.info(f"📥 Imported {imported} checks from {path}")
+        return imported
+
+    except Exception as e:
+        logger.error(f"❌ Error importing checks: {e}")
+        if conn:
+            conn.rollback()
+            close_connection(conn)
+        return None
@@ -1,53 +1,378 @@
 """
 Database module for storing website check results.
+
+Checks are stored in one table per day (checks_YYYYMMDD, by the local
+timestamp of the check) and read through the `checks` view, which joins
+all of them. Retention drops whole days instead of deleting rows.
 """
 
 import sqlite3
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from src.instrumentation import timed
+from src import hotstore
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+
+# Database file path (DB_PATH environment variable overrides it)
+DB_PATH = os.getenv('DB_PATH', 'data/monitoring.db')
+
+# Days of checks to keep (0 keeps everything). Whole days are dropped,
+# so up to one extra day is kept.
+DATA_RETENTION_DAYS = int(os.getenv('DATA_RETENTION_DAYS', 30))
+
+# Columns of a check (name, definition). Ids are unique across partitions
+# (assigned from check_sequence), so they keep growing with each new check.
+CHECK_COLUMNS = [
+    ('id', 'INTEGER PRIMARY KEY'),
+    ('url', 'TEXT NOT NULL'),
+    ('timestamp', 'TEXT NOT NULL'),
+    ('status_code', 'INTEGER'),
+    ('response_time', 'REAL'),
+    ('success', 'INTEGER NOT NULL'),
+    ('error', 'TEXT'),
+    ('retries', 'INTEGER DEFAULT 0'),
+    ('queue_wait', 'REAL'),
+    ('scheduled_at', 'TEXT'),
+    ('schedule_lag', 'REAL'),
+    ('missed_runs', 'INTEGER DEFAULT 0'),
+    ('prev_gap', 'INTEGER'),
+    ('prev_success', 'INTEGER'),
+    ('agent', 'TEXT'),
+]
+
+COLUMN_NAMES = ', '.join(name for name, _ in CHECK_COLUMNS)
+
+# Columns added after the first release (name, definition).
+# Older databases get them via ALTER TABLE in init_database().
+ADDED_COLUMNS = [
+    ('queue_wait', 'REAL'),
+    ('scheduled_at', 'TEXT'),
+    ('schedule_lag', 'REAL'),
+    ('missed_runs', 'INTEGER DEFAULT 0'),
+    ('prev_gap', 'INTEGER'),
+    ('prev_success', 'INTEGER'),
+    ('agent', 'TEXT'),
+]
+
+# Version of the schema init_database() sets up, stored in PRAGMA
+# user_version. Bump it with every schema change (table, column, view),
+# so databases set up by an older version run the full setup again.
+SCHEMA_VERSION = 3
+
+# Aggregates of older checks (see src/rollups.py): one row per URL and
+# minute / hour / day, keyed by the bucket's start time
+ROLLUP_TABLES = ['rollup_1m', 'rollup_1h', 'rollup_1d']
+
+ROLLUP_COLUMNS = '''
+    bucket TEXT NOT NULL,
+    url TEXT NOT NULL,
+    checks INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    seconds INTEGER NOT NULL,
+    up_seconds INTEGER NOT NULL,
+    rt_count INTEGER NOT NULL,
+    rt_sum REAL,
+    rt_min REAL,
+    rt_max REAL,
+    PRIMARY KEY (bucket, url)
+'''
+
+# Checks saved, or relinked, behind the minute rollup watermark (imports,
+# backfills, delayed agent batches): each partition's triggers log the
+# change here and rollups.compact() adds it to the tiers that already
+# cover its bucket. Relinks log the old state (sign -1) and the new one.
+ROLLUP_PENDING_COLUMNS = '''
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    url TEXT NOT NULL,
+    checks INTEGER NOT NULL,
+    success INTEGER,
+    response_time REAL,
+    prev_gap INTEGER,
+    prev_success INTEGER,
+    sign INTEGER NOT NULL
+'''
+
+ROLLUP_INSERT_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS {table}_rollup_insert AFTER INSERT ON {table}
+    WHEN NEW.timestamp < (SELECT watermark FROM rollup_state WHERE tier = '1m')
+    BEGIN
+        INSERT INTO rollup_pending
+            (timestamp, url, checks, success, response_time, prev_gap, prev_success, sign)
+        VALUES (NEW.timestamp, NEW.url, 1, NEW.success, NEW.response_time,
+                NEW.prev_gap, NEW.prev_success, 1);
+    END
+'''
+
+ROLLUP_RELINK_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS {table}_rollup_relink
+    AFTER UPDATE OF prev_gap, prev_success ON {table}
+    WHEN OLD.timestamp < (SELECT watermark FROM rollup_state WHERE tier = '1m')
+    BEGIN
+        INSERT INTO rollup_pending
+            (timestamp, url, checks, success, response_time, prev_gap, prev_success, sign)
+        VALUES (OLD.timestamp, OLD.url, 0, OLD.success, NULL, OLD.prev_gap, OLD.prev_success, -1),
+               (NEW.timestamp, NEW.url, 0, NEW.success, NULL, NEW.prev_gap, NEW.prev_success, 1);
+    END
+'''
+
+# Partition tables: checks_YYYYMMDD
+PARTITION_PREFIX = 'checks_'
+PARTITION_GLOB = PARTITION_PREFIX + '[0-9]' * 8
+
+# SQLite allows at most 500 terms in one compound SELECT
+MAX_COMPOUND_SELECT = 500
 
 
-# Database file path
-DB_PATH = 'data/monitoring.db'
+def partition_name(timestamp):
+    """
+    Name of the partition table holding checks made at `timestamp`.
+    
+    Args:
+        timestamp: datetime or stored timestamp string ('%Y-%m-%d ...')
+        
+    Returns:
+        str: Table name, e.g. 'checks_20250131'
+        
+    Raises:
+        ValueError: If the timestamp does not start with a date
+    """
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.strptime(timestamp[:10], '%Y-%m-%d')
+    return PARTITION_PREFIX + timestamp.strftime('%Y%m%d')
+
+
+def list_partitions(cursor):
+    """
+    Names of all partition tables, oldest first.
+    
+    Args:
+        cursor: Database cursor
+        
+    Returns:
+        list: Table names
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ? ORDER BY name",
+        (PARTITION_GLOB,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _create_partition(cursor, name):
+    """
+    Create a partition table, its url/timestamp index and rollup triggers.
+    """
+    columns = ', '.join(f'{column} {definition}' for column, definition in CHECK_COLUMNS)
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} ({columns})')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_url_timestamp ON {name}(url, timestamp)')
+    _create_rollup_triggers(cursor, name)
+
+
+def _create_rollup_triggers(cursor, name):
+    """
+    Log changes behind the minute rollup watermark to rollup_pending
+    (dropped together with the partition).
+    """
+    cursor.execute(ROLLUP_INSERT_TRIGGER_SQL.format(table=name))
+    cursor.execute(ROLLUP_RELINK_TRIGGER_SQL.format(table=name))
+
+
+def _rebuild_view(cursor):
+    """
+    Point the `checks` view at the current partitions (creating today's
+    partition if there are none).
+    """
+    names = list_partitions(cursor)
+    if not names:
+        names = [partition_name(datetime.now())]
+        _create_partition(cursor, names[0])
+    
+    selects = [f'SELECT {COLUMN_NAMES} FROM {name}' for name in names]
+    while len(selects) > MAX_COMPOUND_SELECT:
+        selects = [
+            'SELECT * FROM (' + ' UNION ALL '.join(selects[i:i + MAX_COMPOUND_SELECT]) + ')'
+            for i in range(0, len(selects), MAX_COMPOUND_SELECT)
+        ]
+    
+    cursor.execute('DROP VIEW IF EXISTS checks')
+    cursor.execute('CREATE VIEW checks AS ' + ' UNION ALL '.join(selects))
+
+
+def ensure_partitions(cursor, names):
+    """
+    Create the partitions among `names` that do not exist yet and add
+    them to the `checks` view.
+    
+    Args:
+        cursor: Cursor of an open transaction
+        names (iterable): Partition names (see partition_name())
+        
+    Returns:
+        list: Names of all partitions afterwards, oldest first
+    """
+    partitions = list_partitions(cursor)
+    missing = set(names) - set(partitions)
+    if not missing:
+        return partitions
+    for name in missing:
+        _create_partition(cursor, name)
+    _rebuild_view(cursor)
+    return list_partitions(cursor)
+
+
+def _add_missing_columns(cursor, table):
+    """
+    Add ADDED_COLUMNS missing from a table created by an older version.
+    
+    Returns:
+        set: Names of the columns that were added
+    """
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing_columns = {row[1] for row in cursor.fetchall()}
+    added = set()
+    for name, definition in ADDED_COLUMNS:
+        if name not in existing_columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+            added.add(name)
+    return added
+
+
+def _migrate_legacy_table(cursor):
+    """
+    Move the checks of the single `checks` table used by older versions
+    into daily partitions, keeping their ids.
+    
+    Returns:
+        int: Number of checks moved
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_legacy_timestamp ON checks(timestamp)')
+    cursor.execute('SELECT DISTINCT substr(timestamp, 1, 10) FROM checks')
+    days = sorted(row[0] for row in cursor.fetchall())
+    
+    moved = 0
+    for day in days:
+        name = partition_name(day)
+        next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        _create_partition(cursor, name)
+        cursor.execute(f'''
+            INSERT INTO {name} ({COLUMN_NAMES})
+            SELECT {COLUMN_NAMES} FROM checks
+            WHERE timestamp >= ? AND timestamp < ?
+        ''', (day, next_day))
+        moved += cursor.rowcount
+    
+    cursor.execute(
+        'UPDATE check_sequence SET last_id = MAX(last_id, (SELECT IFNULL(MAX(id), 0) FROM checks))'
+    )
+    cursor.execute('DROP TABLE checks')
+    return moved
 
 
+@timed('database.init_database')
 def init_database():
     """
     Initialize database and create tables if they don't exist.
+    Databases of older versions (one `checks` table) are moved into
+    daily partitions. A database already at SCHEMA_VERSION is left
+    as it is (one PRAGMA instead of the DDL and table scans).
     """
     # Ensure data directory exists
-    os.makedirs('data', exist_ok=True)
+    os.makedirs(os.path.dirname(DB_PATH) or '.', exist_ok=True)
     
     # Connect to database (creates file if not exists)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # Create checks table
+    cursor.execute('PRAGMA user_version')
+    if cursor.fetchone()[0] >= SCHEMA_VERSION:
+        conn.close()
+        logger.info(f"✅ Database ready at {DB_PATH}")
+        return
+    
+    # Give the pages of dropped partitions back to the file system
+    # (applies to new databases; migrated ones are vacuumed below)
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
+    # Source of check ids, shared by all partitions
+    cursor.execute('CREATE TABLE IF NOT EXISTS check_sequence (last_id INTEGER NOT NULL)')
+    cursor.execute(
+        'INSERT INTO check_sequence SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM check_sequence)'
+    )
+    
+    # Rollup tiers and how far each has been compacted / pruned
+    for table in ROLLUP_TABLES:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} ({ROLLUP_COLUMNS}) WITHOUT ROWID')
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS checks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            status_code INTEGER,
-            response_time REAL,
-            success INTEGER NOT NULL,
-            error TEXT,
-            retries INTEGER DEFAULT 0
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            tier TEXT PRIMARY KEY,
+            watermark TEXT,
+            kept_from TEXT NOT NULL DEFAULT ''
         )
     ''')
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS rollup_pending ({ROLLUP_PENDING_COLUMNS})')
     
-    # Create index for faster queries
+    # Checkpoints of the online anomaly detector (see src/anomaly.py)
     cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_url_timestamp 
-        ON checks(url, timestamp)
+        CREATE TABLE IF NOT EXISTS detector_state (
+            url TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+    
+    # On-demand check jobs, shared by web worker processes (see src/jobs.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS check_jobs (
+            id TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL
+        )
     ''')
     
+    # Upgrade tables created by older versions
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'checks'")
+    row = cursor.fetchone()
+    legacy = row is not None and row[0] == 'table'
+    added_columns = set()
+    moved = 0
+    if legacy:
+        added_columns |= _add_missing_columns(cursor, 'checks')
+        moved = _migrate_legacy_table(cursor)
+    for name in list_partitions(cursor):
+        added_columns |= _add_missing_columns(cursor, name)
+        _create_rollup_triggers(cursor, name)
+    
+    _rebuild_view(cursor)
     conn.commit()
+    
+    # Checks stored before prev_gap existed
+    if 'prev_gap' in added_columns:
+        backfill_check_states(conn)
+        conn.commit()
+    
+    # Set up: later starts skip all of the above
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.commit()
+    
+    if legacy:
+        logger.info(f"📦 Moved {moved} checks into daily partitions")
+        cursor.execute('VACUUM')
+    
     conn.close()
     
-    print(f"✅ Database initialized at {DB_PATH}")
+    logger.info(f"✅ Database initialized at {DB_PATH}")
 
 
+@timed('database.get_connection')
 def get_connection():
     """
     Get database connection.
@@ -58,6 +383,7 @@ def get_connection():
     return sqlite3.connect(DB_PATH)
 
 
+@timed('database.close_connection')
 def close_connection(conn):
     """
     Close database connection.
@@ -69,6 +395,271 @@ def close_connection(conn):
         conn.close()
 
 
+# Insert statement shared by save_check() and save_checks()
+INSERT_CHECK_SQL = '''
+    INSERT INTO {table} (
+        id, url, timestamp, status_code, response_time,
+        success, error, retries, queue_wait,
+        scheduled_at, schedule_lag, missed_runs, agent,
+        prev_gap, prev_success
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Every check also stores the state it ends: seconds since the previous
+# check of the same URL (prev_gap) and that check's result (prev_success).
+# Time-weighted uptime is then a plain SUM instead of pairing rows at query time.
+PREVIOUS_CHECK_SQL = '''
+    SELECT id, timestamp, success FROM {table}
+    WHERE url = ? AND timestamp <= ?
+    ORDER BY timestamp DESC, id DESC LIMIT 1
+'''
+
+NEXT_CHECK_SQL = '''
+    SELECT id, timestamp, success FROM {table}
+    WHERE url = ? AND timestamp > ?
+    ORDER BY timestamp, id LIMIT 1
+'''
+
+LINK_STATES_SQL = '''
+    CREATE TEMP TABLE linked_states AS
+    SELECT id, gap, previous_success FROM (
+        SELECT
+            id,
+            prev_gap,
+            prev_success,
+            strftime('%s', timestamp) - strftime('%s', LAG(timestamp) OVER byurl) AS gap,
+            LAG(success) OVER byurl AS previous_success
+        FROM checks
+        WINDOW byurl AS (PARTITION BY url ORDER BY timestamp, id)
+    )
+    WHERE {condition}
+'''
+
+# Rows LINK_STATES_SQL picks: only unlinked ones, or every wrongly linked one
+UNLINKED = 'prev_gap IS NULL'
+MISLINKED = 'prev_gap IS NOT COALESCE(gap, 0) OR prev_success IS NOT previous_success'
+
+BACKFILL_STATES_SQL = '''
+    UPDATE {table} SET
+        prev_gap = COALESCE(linked.gap, 0),
+        prev_success = linked.previous_success
+    FROM temp.linked_states AS linked
+    WHERE {table}.id = linked.id
+'''
+
+# Distinct URLs of one partition by hopping through its url/timestamp index
+PARTITION_URLS_SQL = '''
+    WITH RECURSIVE urls(url) AS (
+        SELECT MIN(url) FROM {table}
+        UNION ALL
+        SELECT (SELECT MIN(url) FROM {table} WHERE url > urls.url) FROM urls
+        WHERE urls.url IS NOT NULL
+    )
+    SELECT url FROM urls WHERE url IS NOT NULL
+'''
+
+# Upper bound for timestamps when looking for a URL's latest check
+LATEST = '9999-12-31 23:59:59'
+
+
+def _seconds_between(earlier, later):
+    """
+    Whole seconds between two stored timestamps.
+    """
+    # fromisoformat() parses '%Y-%m-%d %H:%M:%S' many times faster than strptime()
+    start = datetime.fromisoformat(earlier)
+    end = datetime.fromisoformat(later)
+    return int((end - start).total_seconds())
+
+
+def _nearest_check(cursor, partitions, url, timestamp, later=False):
+    """
+    Find the check of `url` closest to `timestamp`: the latest one at or
+    before it, or with later=True the first one after it. Starts in the
+    partition of `timestamp` and moves outwards, one index lookup each
+    (MIN/MAX and ORDER BY ... LIMIT through the view would read every row).
+    
+    Args:
+        cursor: Database cursor
+        partitions (list): Partition names, oldest first
+        url (str): URL of the check
+        timestamp (str): Stored timestamp
+        later (bool): Look for the next check instead of the previous one
+        
+    Returns:
+        tuple: (partition, id, timestamp, success), or None if there is none
+    """
+    home = partition_name(timestamp)
+    if later:
+        candidates = [name for name in partitions if name >= home]
+        sql = NEXT_CHECK_SQL
+    else:
+        candidates = [name for name in reversed(partitions) if name <= home]
+        sql = PREVIOUS_CHECK_SQL
+    
+    for name in candidates:
+        cursor.execute(sql.format(table=name), (url, timestamp))
+        row = cursor.fetchone()
+        if row:
+            return (name,) + row
+    return None
+
+
+def _reserve_ids(cursor, count):
+    """
+    Reserve `count` consecutive check IDs.
+    
+    Also takes the write lock first, so no other writer changes the
+    partitions or the neighbouring checks until we commit.
+    
+    Returns:
+        int: First reserved ID
+    """
+    cursor.execute('UPDATE check_sequence SET last_id = last_id + ?', (count,))
+    cursor.execute('SELECT last_id FROM check_sequence')
+    return cursor.fetchone()[0] - count + 1
+
+
+def _insert_check(cursor, check_result, row_id=None):
+    """
+    Insert one check result into its partition, linking it to the checks
+    before and after it.
+    
+    Args:
+        cursor: Cursor of an open transaction
+        check_result (dict): Check result from check_website()
+        row_id (int): ID reserved by the caller (default: reserve one)
+        
+    Returns:
+        int: ID of inserted row
+    """
+    row = _check_row(check_result)
+    url, timestamp = row[0], row[1]
+    
+    if row_id is None:
+        row_id = _reserve_ids(cursor, 1)
+    
+    table = partition_name(timestamp)
+    partitions = ensure_partitions(cursor, [table])
+    
+    previous = _nearest_check(cursor, partitions, url, timestamp)
+    if previous:
+        state = (_seconds_between(previous[2], timestamp), previous[3])
+    else:
+        state = (0, None)
+    
+    # Checks arriving out of order (batches, imports) split an existing state
+    following = _nearest_check(cursor, partitions, url, timestamp, later=True)
+    
+    cursor.execute(INSERT_CHECK_SQL.format(table=table), (row_id,) + row + state)
+    
+    if following:
+        cursor.execute(
+            f'UPDATE {following[0]} SET prev_gap = ?, prev_success = ? WHERE id = ?',
+            (_seconds_between(timestamp, following[2]), row[4], following[1])
+        )
+    
+    return row_id
+
+
+def _insert_checks(cursor, check_results):
+    """
+    Insert many check results with as few statements as possible.
+    
+    Links the same way as calling _insert_check() for each result in
+    order, but each URL's results are sorted and linked to each other in
+    memory, so only the ends of each URL's run are looked up. A URL with
+    stored checks inside the batch's time range falls back to
+    _insert_check() one by one.
+    
+    Args:
+        cursor: Cursor of an open transaction
+        check_results (list): Check result dictionaries
+        
+    Returns:
+        list: IDs of inserted rows, in the order of `check_results`
+    """
+    if not check_results:
+        return []
+    rows = [_check_row(check_result) for check_result in check_results]
+    first_id = _reserve_ids(cursor, len(rows))
+    row_ids = list(range(first_id, first_id + len(rows)))
+    days = {day: partition_name(day) for day in {row[1][:10] for row in rows}}
+    partitions = ensure_partitions(cursor, days.values())
+    
+    by_url = {}
+    for index, row in enumerate(rows):
+        by_url.setdefault(row[0], []).append(index)
+    
+    inserts = {}  # partition -> parameter tuples
+    links = []    # (partition, prev_gap, prev_success, id) of stored checks
+    for url, indexes in by_url.items():
+        # IDs grow in input order, so this is the (timestamp, id) order
+        indexes.sort(key=lambda i: rows[i][1])
+        first, last = rows[indexes[0]][1], rows[indexes[-1]][1]
+        following = _nearest_check(cursor, partitions, url, first, later=True)
+        if following and following[2] <= last:
+            # Stored checks interleave with the batch
+            for i in indexes:
+                _insert_check(cursor, check_results[i], row_ids[i])
+            continue
+        
+        previous = _nearest_check(cursor, partitions, url, first)
+        before = (previous[2], previous[3]) if previous else None
+        for i in indexes:
+            row = rows[i]
+            state = (_seconds_between(before[0], row[1]), before[1]) if before else (0, None)
+            inserts.setdefault(days[row[1][:10]], []).append((row_ids[i],) + row + state)
+            before = (row[1], row[4])
+        if following:
+            links.append((following[0], _seconds_between(last, following[2]), before[1], following[1]))
+    
+    for table, params in inserts.items():
+        cursor.executemany(INSERT_CHECK_SQL.format(table=table), params)
+    for table, gap, success, row_id in links:
+        cursor.execute(f'UPDATE {table} SET prev_gap = ?, prev_success = ? WHERE id = ?',
+                       (gap, success, row_id))
+    return row_ids
+
+
+def _check_row(check_result):
+    """
+    Convert a check result dictionary to an INSERT parameter tuple.
+    
+    Args:
+        check_result (dict): Check result from check_website()
+        
+    Returns:
+        tuple: Values in INSERT_CHECK_SQL column order
+    """
+    # Convert timestamps to strings if datetime objects
+    timestamp = check_result['timestamp']
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    scheduled_at = check_result.get('scheduled_at')
+    if isinstance(scheduled_at, datetime):
+        scheduled_at = scheduled_at.strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Convert success boolean to integer (SQLite stores as 0/1)
+    success = 1 if check_result['success'] else 0
+    
+    return (
+        check_result['url'],
+        timestamp,
+        check_result.get('status_code'),
+        check_result.get('response_time'),
+        success,
+        check_result.get('error'),
+        check_result.get('retries', 0),
+        check_result.get('queue_wait'),
+        scheduled_at,
+        check_result.get('schedule_lag'),
+        check_result.get('missed_runs', 0),
+        check_result.get('agent')
+    )
+
+
+@timed('database.save_check')
 def save_check(check_result):
     """
     Save a check result to the database.
@@ -76,52 +667,72 @@ def save_check(check_result):
     Args:
         check_result (dict): Check result from check_website()
             Expected keys: url, timestamp, status_code, response_time,
-                          success, error, retries
+                          success, error, retries, queue_wait
+            Optional scheduling keys: scheduled_at, schedule_lag, missed_runs
+            Optional: agent (probe agent that ran the check)
     
     Returns:
         int: ID of inserted row, or None if failed
     """
+    conn = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
         
-        # Convert timestamp to string if datetime object
-        timestamp = check_result['timestamp']
-        if isinstance(timestamp, datetime):
-            timestamp = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Convert success boolean to integer (SQLite stores as 0/1)
-        success = 1 if check_result['success'] else 0
-        
         # Insert check result
-        cursor.execute('''
-            INSERT INTO checks (
-                url, timestamp, status_code, response_time,
-                success, error, retries
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            check_result['url'],
-            timestamp,
-            check_result.get('status_code'),
-            check_result.get('response_time'),
-            success,
-            check_result.get('error'),
-            check_result.get('retries', 0)
-        ))
+        row_id = _insert_check(cursor, check_result)
         
         conn.commit()
-        row_id = cursor.lastrowid
         close_connection(conn)
         
+        # Recent history columns (no-op unless HOTSTORE is enabled)
+        hotstore.append_checks([(row_id, check_result)])
+        
         return row_id
         
     except Exception as e:
-        print(f"❌ Error saving to database: {e}")
+        logger.error(f"❌ Error saving to database: {e}")
         if conn:
             close_connection(conn)
-        return None      
+        return None
+
+
+@timed('database.save_checks')
+def save_checks(check_results):
+    """
+    Save several check results in a single transaction.
+    Much cheaper than calling save_check() per result because
+    the database is only synced once and rows are inserted in bulk.
+    
+    Args:
+        check_results (list): Check result dictionaries
+        
+    Returns:
+        list: IDs of inserted rows (empty list if failed)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        row_ids = _insert_checks(cursor, check_results)
+        
+        conn.commit()
+        close_connection(conn)
+        
+        # Recent history columns (no-op unless HOTSTORE is enabled)
+        hotstore.append_checks(list(zip(row_ids, check_results)))
+        
+        return row_ids
+        
+    except Exception as e:
+        logger.error(f"❌ Error saving batch to database: {e}")
+        if conn:
+            close_connection(conn)
+        return []
       
     
+@timed('database.get_all_checks')
 def get_all_checks():
     """
     Get all check results from database.
@@ -147,18 +758,20 @@ def get_all_checks():
         return checks
         
     except Exception as e:
-        print(f"❌ Error getting checks: {e}")
+        logger.error(f"❌ Error getting checks: {e}")
         if conn:
             close_connection(conn)
         return []
 
 
-def get_recent_checks(limit=10):
+@timed('database.get_recent_checks')
+def get_recent_checks(limit=10, url=None):
     """
     Get most recent check results.
     
     Args:
         limit (int): Number of results to return (default 10)
+        url (str): Only checks of this URL (optional)
         
     Returns:
         list: List of recent check result dictionaries
@@ -168,11 +781,19 @@ def get_recent_checks(limit=10):
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT * FROM checks
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
+        if url:
+            cursor.execute('''
+                SELECT * FROM checks
+                WHERE url = ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            ''', (url, limit))
+        else:
+            cursor.execute('''
+                SELECT * FROM checks
+                ORDER BY timestamp DESC
+                LIMIT ?
+            ''', (limit,))
         
         rows = cursor.fetchall()
         close_connection(conn)
@@ -181,12 +802,13 @@ def get_recent_checks(limit=10):
         return checks
         
     except Exception as e:
-        print(f"❌ Error getting recent checks: {e}")
+        logger.error(f"❌ Error getting recent checks: {e}")
         if conn:
             close_connection(conn)
         return []
 
 
+@timed('database.get_checks_by_url')
 def get_checks_by_url(url):
     """
     Get all checks for a specific URL.
@@ -215,12 +837,13 @@ def get_checks_by_url(url):
         return checks
         
     except Exception as e:
-        print(f"❌ Error getting checks for {url}: {e}")
+        logger.error(f"❌ Error getting checks for {url}: {e}")
         if conn:
             close_connection(conn)
         return []
 
 
+@timed('database.get_check_count')
 def get_check_count():
     """
     Get total number of checks in database.
@@ -239,47 +862,232 @@ def get_check_count():
         return count
         
     except Exception as e:
-        print(f"❌ Error counting checks: {e}")
+        logger.error(f"❌ Error counting checks: {e}")
         if conn:
             close_connection(conn)
         return 0
     
     
-def cleanup_old_checks(days=30):
+@timed('database.get_data_version')
+def get_data_version():
+    """
+    Get a cheap fingerprint of the checks.
+    Only reads the id sequence and the rowid B-tree ends of each
+    partition, so it costs the same for 100 rows as for 10 million.
+    Changes whenever a check is added (max_id) or old checks are
+    cleaned up (min_id). The newest timestamp is looked up through the
+    url/timestamp index of the newest partition with checks, one lookup
+    per URL checked that day.
+    
+    Returns:
+        dict: min_id, max_id and last_timestamp (timestamp of the
+              newest check by time, which late or backfilled checks
+              never move back; None if there are no checks)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        partitions = list_partitions(cursor)
+        min_ids = {}
+        for name in partitions:
+            cursor.execute(f'SELECT MIN(id) FROM {name}')
+            min_ids[name] = cursor.fetchone()[0]
+        filled = [name for name in partitions if min_ids[name] is not None]
+        
+        max_id, last_timestamp = 0, None
+        if filled:
+            cursor.execute('SELECT last_id FROM check_sequence')
+            max_id = cursor.fetchone()[0]
+            newest = filled[-1]
+            for url in get_urls(conn, partition=newest):
+                cursor.execute(PREVIOUS_CHECK_SQL.format(table=newest), (url, LATEST))
+                timestamp = cursor.fetchone()[1]
+                if last_timestamp is None or timestamp > last_timestamp:
+                    last_timestamp = timestamp
+        
+        close_connection(conn)
+        return {
+            'min_id': min(min_ids[name] for name in filled) if filled else 0,
+            'max_id': max_id,
+            'last_timestamp': last_timestamp
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Error getting data version: {e}")
+        if conn:
+            close_connection(conn)
+        return {'min_id': 0, 'max_id': 0, 'last_timestamp': None}
+
+
+@timed('database.get_urls')
+def get_urls(conn=None, partition=None):
+    """
+    Get every URL with stored checks.
+    
+    Args:
+        conn: Open connection to use (optional)
+        partition (str): Only URLs checked in this partition (optional)
+        
+    Returns:
+        list: URLs, sorted
+    """
+    own_connection = conn is None
+    try:
+        if own_connection:
+            conn = get_connection()
+        cursor = conn.cursor()
+        urls = set()
+        for name in [partition] if partition else list_partitions(cursor):
+            cursor.execute(PARTITION_URLS_SQL.format(table=name))
+            urls.update(row[0] for row in cursor.fetchall())
+        if own_connection:
+            close_connection(conn)
+        return sorted(urls)
+        
+    except Exception as e:
+        logger.error(f"❌ Error getting URLs: {e}")
+        if own_connection and conn:
+            close_connection(conn)
+        return []
+
+
+@timed('database.get_latest_checks')
+def get_latest_checks(url=None, conn=None):
+    """
+    Get the latest check of each URL.
+    
+    Args:
+        url (str): Only this URL (optional)
+        conn: Open connection to use (optional)
+        
+    Returns:
+        list: Dictionaries with url, timestamp and success
     """
-    Delete check results older than specified days.
+    own_connection = conn is None
+    try:
+        if own_connection:
+            conn = get_connection()
+        cursor = conn.cursor()
+        partitions = list_partitions(cursor)
+        urls = [url] if url else get_urls(conn)
+        
+        checks = []
+        for check_url in urls:
+            latest = _nearest_check(cursor, partitions, check_url, LATEST)
+            if latest:
+                checks.append({'url': check_url, 'timestamp': latest[2], 'success': latest[3]})
+        
+        if own_connection:
+            close_connection(conn)
+        return checks
+        
+    except Exception as e:
+        logger.error(f"❌ Error getting latest checks: {e}")
+        if own_connection and conn:
+            close_connection(conn)
+        return []
+
+
+@timed('database.backfill_check_states')
+def backfill_check_states(conn=None, relink=False):
+    """
+    Fill prev_gap / prev_success for checks stored without them (databases
+    created by older versions, rows inserted with plain SQL).
     
     Args:
-        days (int): Keep checks from last N days (default 30)
+        conn: Open connection to use (optional, committed by the caller)
+        relink (bool): Also correct checks whose previous check changed
+            (e.g. after bulk-importing older history)
         
     Returns:
-        int: Number of rows deleted
+        int: Number of rows updated
     """
+    own_connection = conn is None
     try:
-        from datetime import timedelta
+        if own_connection:
+            conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('DROP TABLE IF EXISTS temp.linked_states')
+        cursor.execute(LINK_STATES_SQL.format(condition=MISLINKED if relink else UNLINKED))
+        updated = 0
+        for name in list_partitions(cursor):
+            cursor.execute(BACKFILL_STATES_SQL.format(table=name))
+            updated += cursor.rowcount
+        cursor.execute('DROP TABLE temp.linked_states')
+        if own_connection:
+            conn.commit()
+            close_connection(conn)
+        if updated:
+            logger.info(f"🔁 Linked {updated} stored checks to their previous check")
+        return updated
+        
+    except Exception as e:
+        logger.error(f"❌ Error backfilling check states: {e}")
+        if own_connection and conn:
+            close_connection(conn)
+        return 0
+
+
+@timed('database.cleanup_old_checks')
+def cleanup_old_checks(days=None, until=None):
+    """
+    Drop the daily partitions that end before the retention cutoff.
+    Dropping a table costs the same however many checks it holds and
+    does not touch the other partitions or their indexes; the freed pages
+    are then given back to the file system.
+    
+    Args:
+        days (int): Keep checks from last N days (default
+            DATA_RETENTION_DAYS, 0 keeps everything)
+        until (datetime): Never drop checks from this time on, even if
+            expired (e.g. not yet rolled up); optional
         
+    Returns:
+        int: Number of checks removed
+    """
+    if days is None:
+        days = DATA_RETENTION_DAYS
+    if days <= 0:
+        return 0
+    
+    conn = None
+    try:
         conn = get_connection()
         cursor = conn.cursor()
         
-        # Calculate cutoff date
-        cutoff_date = datetime.now() - timedelta(days=days)
-        cutoff_str = cutoff_date.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Delete old checks
-        cursor.execute('''
-            DELETE FROM checks
-            WHERE timestamp < ?
-        ''', (cutoff_str,))
+        # Partitions before the cutoff's day only hold expired checks
+        cutoff = datetime.now() - timedelta(days=days)
+        if until is not None:
+            cutoff = min(cutoff, until)
+        keep_from = partition_name(cutoff)
         
-        deleted_count = cursor.rowcount
+        cursor.execute('BEGIN IMMEDIATE')
+        expired = [name for name in list_partitions(cursor) if name < keep_from]
+        deleted_count = 0
+        for name in expired:
+            cursor.execute(f'SELECT COUNT(*) FROM {name}')
+            deleted_count += cursor.fetchone()[0]
+            cursor.execute(f'DROP TABLE {name}')
+        if expired:
+            _rebuild_view(cursor)
         conn.commit()
-        close_connection(conn)
         
-        print(f"🗑️  Deleted {deleted_count} checks older than {days} days")
+        if expired:
+            # executescript() steps the pragma to completion (one page per step)
+            conn.executescript('PRAGMA incremental_vacuum;')
+            logger.info(f"🗑️  Dropped {len(expired)} partitions ({deleted_count} checks) "
+                  f"older than {days} days")
+            
+            # Recent history columns still holding dropped checks
+            hotstore.expire_before(datetime.strptime(keep_from[len(PARTITION_PREFIX):], '%Y%m%d'))
+        
+        close_connection(conn)
         return deleted_count
         
     except Exception as e:
-        print(f"❌ Error cleaning up old checks: {e}")
+        logger.error(f"❌ Error cleaning up old checks: {e}")
         if conn:
             close_connection(conn)
-        return 0
\ No newline at end of file
+        return 0
@@ -0,0 +1,519 @@
+"""
+Memory-mapped columnar hot-store for recent check history.
+
+One fixed-size ring buffer file per target keeps the latest checks as
+columns (check id, timestamp, response time, success). Every check saved
+to SQLite is appended here as well; the files survive restarts and are
+shared between processes through the page cache, so readers get the
+columns straight from the mapping without decoding SQLite rows.
+
+SQLite stays the durable store: verify() compares a ring with the
+database and rebuild() refills it from there. Writes that bypass
+append_checks() rebuild the rings they touch: retention drops expired
+checks (expire_before()) and archive imports add old ones (rebuild_all()).
+
+File layout (little endian):
+    header (4096 bytes): magic, version, capacity, count, flags, URL
+    ids       int64[capacity]
+    ts        int64[capacity]    seconds, same frame as src.vectorized
+    rt        float32[capacity]  NaN when unknown
+    success   uint8[capacity]
+Slot i holds check number i, i + capacity, ... (count = checks ever
+appended), so the newest check is at (count - 1) % capacity.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+from src.lazy import lazy_import
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Only needed to read rings as arrays (see read_columns())
+np = lazy_import('numpy', optional=True)
+
+# Append checks to the hot-store as they are saved
+HOTSTORE_ENABLED = os.getenv('HOTSTORE', '').lower() in ('1', 'true', 'yes')
+
+# Directory with one ring file per target
+HOTSTORE_DIR = os.getenv('HOTSTORE_DIR', 'data/hotstore')
+
+# Checks kept per target (100000 = about 35 days at one check per 30s)
+HOTSTORE_CAPACITY = int(os.getenv('HOTSTORE_CAPACITY', 100000))
+
+MAGIC = b'HSR1'
+VERSION = 1
+HEADER_SIZE = 4096
+HEADER = struct.Struct('<4sIQQBH')  # magic, version, capacity, count, flags, url length
+COUNT_OFFSET = 16
+FLAGS_OFFSET = 24
+MAX_URL_BYTES = HEADER_SIZE - HEADER.size
+
+# Flags, set when the ring was last verified against or rebuilt from SQLite:
+# no check of the URL newer than the oldest stored one is missing ...
+COMPLETE = 1
+# ... and the ring also holds the URL's oldest check (cleared on wrap)
+FULL_HISTORY = 2
+
+
+def _epoch(timestamp):
+    """
+    Stored check timestamp (string or naive datetime) to seconds, read as
+    UTC like SQLite's strftime('%s').
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+    return int(timestamp.replace(microsecond=0, tzinfo=timezone.utc).timestamp())
+
+
+def ring_path(url):
+    """
+    Returns:
+        str: Ring file of a target
+    """
+    digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+    return os.path.join(HOTSTORE_DIR, f'{digest}.ring')
+
+
+class HotRing:
+    """
+    Ring buffer file of one target, mapped into memory.
+    """
+
+    def __init__(self, path, url, capacity=None):
+        self.path = path
+        self.url = url
+        self.lock = threading.Lock()
+
+        encoded = url.encode()
+        if len(encoded) > MAX_URL_BYTES:
+            raise ValueError('URL too long for the hot-store header')
+
+        if not os.path.exists(path):
+            self._create(path, encoded, capacity or HOTSTORE_CAPACITY)
+
+        self.file = open(path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, version, self.capacity, _, _, url_length = HEADER.unpack_from(self.map, 0)
+        stored_url = bytes(self.map[HEADER.size:HEADER.size + url_length]).decode()
+        if magic != MAGIC or version != VERSION or stored_url != url:
+            self.close()
+            raise ValueError(f'{path} is not a hot-store ring for {url}')
+
+        view = memoryview(self.map)
+        c = self.capacity
+        offset = HEADER_SIZE
+        self.ids = view[offset:offset + 8 * c].cast('q')
+        offset += 8 * c
+        self.ts = view[offset:offset + 8 * c].cast('q')
+        offset += 8 * c
+        self.rt = view[offset:offset + 4 * c].cast('f')
+        offset += 4 * c
+        self.success = view[offset:offset + c].cast('B')
+
+    @staticmethod
+    def _create(path, encoded_url, capacity):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        size = HEADER_SIZE + capacity * (8 + 8 + 4 + 1)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.truncate(size)
+            f.write(HEADER.pack(MAGIC, VERSION, capacity, 0, 0, len(encoded_url)) + encoded_url)
+        os.replace(temp_path, path)
+
+    @property
+    def count(self):
+        """
+        Number of checks ever appended (the ring holds the last `capacity`).
+        """
+        return struct.unpack_from('<Q', self.map, COUNT_OFFSET)[0]
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def flags(self):
+        return self.map[FLAGS_OFFSET]
+
+    def set_flags(self, flags):
+        self.map[FLAGS_OFFSET] = flags
+
+    def append(self, rows):
+        """
+        Append checks.
+
+        Args:
+            rows (list): (check id, epoch seconds, success, response time) tuples
+        """
+        with self.lock:
+            if fcntl:
+                fcntl.flock(self.file, fcntl.LOCK_EX)
+            try:
+                count = self.count
+                for check_id, ts, success, rt in rows:
+                    slot = count % self.capacity
+                    self.ids[slot] = check_id
+                    self.ts[slot] = ts
+                    self.rt[slot] = math.nan if rt is None else rt
+                    self.success[slot] = 1 if success else 0
+                    count += 1
+                # Publish the new rows only after they are written
+                struct.pack_into('<Q', self.map, COUNT_OFFSET, count)
+                if count > self.capacity:
+                    self.set_flags(self.flags & ~FULL_HISTORY)
+            finally:
+                if fcntl:
+                    fcntl.flock(self.file, fcntl.LOCK_UN)
+
+    def reset(self):
+        with self.lock:
+            struct.pack_into('<Q', self.map, COUNT_OFFSET, 0)
+            self.set_flags(0)
+
+    def segments(self):
+        """
+        Stored slots in append order as at most two zero-copy ranges.
+
+        Returns:
+            list: (start, stop) slot ranges, oldest first
+        """
+        count = self.count
+        if count <= self.capacity:
+            return [(0, count)]
+        head = count % self.capacity
+        return [(head, self.capacity), (0, head)] if head else [(0, self.capacity)]
+
+    def columns(self):
+        """
+        Columns in append order as NumPy arrays: zero-copy views of the
+        mapping until the ring wraps, one copy afterwards. Views see later
+        appends, so use them right away rather than keeping them.
+
+        Returns:
+            dict: ids, ts, rt, success arrays
+        """
+        if np is None:
+            raise RuntimeError('NumPy is required to read hot-store columns')
+
+        arrays = {
+            'ids': np.frombuffer(self.ids, dtype=np.int64),
+            'ts': np.frombuffer(self.ts, dtype=np.int64),
+            'rt': np.frombuffer(self.rt, dtype=np.float32),
+            'success': np.frombuffer(self.success, dtype=np.uint8)
+        }
+        ranges = self.segments()
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            return {name: array[start:stop] for name, array in arrays.items()}
+        return {name: np.concatenate([array[start:stop] for start, stop in ranges])
+                for name, array in arrays.items()}
+
+    def oldest_timestamp(self):
+        """
+        Returns:
+            int: Epoch seconds of the oldest stored check, or None if empty
+        """
+        start, stop = self.segments()[0]
+        return self.ts[start] if stop > start else None
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        try:
+            for name in ('ids', 'ts', 'rt', 'success'):
+                view = getattr(self, name, None)
+                if view is not None:
+                    view.release()
+            self.map.close()
+        except BufferError:
+            # Arrays handed out by columns() still use the mapping;
+            # it is unmapped once they are gone
+            pass
+        self.file.close()
+
+
+# Open rings by URL
+_rings = {}
+_rings_lock = threading.Lock()
+
+
+def get_ring(url, create=True):
+    """
+    Get the ring of a target, opening (or creating) its file.
+
+    Returns:
+        HotRing: Ring, or None if it does not exist and create is False
+    """
+    with _rings_lock:
+        ring = _rings.get(url)
+        if ring is None:
+            path = ring_path(url)
+            if not create and not os.path.exists(path):
+                return None
+            ring = HotRing(path, url)
+            _rings[url] = ring
+        return ring
+
+
+def close_all():
+    """
+    Flush and close all open rings.
+    """
+    with _rings_lock:
+        for ring in _rings.values():
+            ring.flush()
+            ring.close()
+        _rings.clear()
+
+
+def append_checks(saved):
+    """
+    Append saved checks to their targets' rings. Called by the database
+    module after each commit; does nothing when the hot-store is off.
+
+    Args:
+        saved (list): (row id, check result dict) pairs
+    """
+    if not HOTSTORE_ENABLED:
+        return
+    try:
+        by_url = {}
+        for row_id, check in saved:
+            by_url.setdefault(check['url'], []).append((
+                row_id,
+                _epoch(check['timestamp']),
+                check['success'],
+                check.get('response_time')
+            ))
+        for url, rows in by_url.items():
+            get_ring(url).append(rows)
+    except Exception as e:
+        logger.error(f"❌ Error writing to hot-store: {e}")
+
+
+def read_columns(url, since=None):
+    """
+    Recent checks of a target from its ring.
+
+    Args:
+        url (str): Target URL
+        since (int): Only checks at or after this epoch second (optional)
+
+    Returns:
+        dict: ids, ts, rt, success NumPy arrays in append order, or None
+            if the ring does not cover `since` (fall back to SQLite)
+    """
+    ring = get_ring(url, create=False)
+    if ring is None or len(ring) == 0 or not ring.flags & COMPLETE:
+        return None
+    if since is None:
+        if not ring.flags & FULL_HISTORY:
+            return None
+    elif ring.oldest_timestamp() > since and not ring.flags & FULL_HISTORY:
+        return None
+
+    columns = ring.columns()
+    if since is not None:
+        ts = columns['ts']
+        if len(ts) < 2 or np.all(ts[1:] >= ts[:-1]):
+            # Time ordered (the usual case): slicing keeps the views
+            start = int(np.searchsorted(ts, since, side='left'))
+            columns = {name: array[start:] for name, array in columns.items()}
+        else:
+            keep = ts >= since
+            columns = {name: array[keep] for name, array in columns.items()}
+    return columns
+
+
+ROWS_BY_ID_SQL = '''
+    SELECT id, timestamp, success, response_time FROM checks
+    WHERE url = ? AND id >= ? ORDER BY id
+'''
+
+
+def verify(url, repair=False):
+    """
+    Compare a target's ring with SQLite: the ring must hold exactly the
+    newest checks of the URL (by id) with the same values.
+
+    Args:
+        url (str): Target URL
+        repair (bool): Rebuild the ring from SQLite if it differs
+
+    Returns:
+        dict: ring/database row counts, missing/extra/mismatched checks, ok
+    """
+    from src.database import get_connection, close_connection
+
+    ring = get_ring(url)
+    ranges = ring.segments()
+    ring_rows = {}
+    for start, stop in ranges:
+        for slot in range(start, stop):
+            ring_rows[ring.ids[slot]] = (ring.ts[slot], ring.success[slot], ring.rt[slot])
+
+    conn = get_connection()
+    try:
+        # Newest `capacity` checks of the URL
+        row = conn.execute(
+            'SELECT id FROM checks WHERE url = ? ORDER BY id DESC LIMIT 1 OFFSET ?',
+            (url, ring.capacity - 1)).fetchone()
+        first_id = row[0] if row else 0
+        rows = conn.execute(ROWS_BY_ID_SQL, (url, first_id)).fetchall()
+    finally:
+        close_connection(conn)
+
+    missing = mismatched = 0
+    for check_id, timestamp, success, rt in rows:
+        stored = ring_rows.pop(check_id, None)
+        if stored is None:
+            missing += 1
+            continue
+        same_rt = (rt is None and math.isnan(stored[2])) or (
+            rt is not None and abs(stored[2] - rt) <= 1e-4 * max(1.0, rt))
+        if stored[0] != _epoch(timestamp) or stored[1] != success or not same_rt:
+            mismatched += 1
+
+    report = {
+        'url': url,
+        'ring_rows': len(ring),
+        'database_rows': len(rows),
+        'missing': missing,
+        'extra': len(ring_rows),
+        'mismatched': mismatched
+    }
+    report['ok'] = missing == 0 and mismatched == 0 and not ring_rows
+
+    if report['ok']:
+        ring.set_flags(COMPLETE | (FULL_HISTORY if len(rows) < ring.capacity else 0))
+    elif repair:
+        report['rebuilt'] = rebuild(url)
+    else:
+        ring.set_flags(0)
+    return report
+
+
+def rebuild(url):
+    """
+    Refill a target's ring with its newest checks from SQLite.
+
+    Returns:
+        int: Checks written
+    """
+    from src.database import get_connection, close_connection
+
+    ring = get_ring(url)
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            'SELECT id, timestamp, success, response_time FROM checks '
+            'WHERE url = ? ORDER BY id DESC LIMIT ?', (url, ring.capacity)).fetchall()
+    finally:
+        close_connection(conn)
+
+    ring.reset()
+    ring.append([(check_id, _epoch(timestamp), success, rt)
+                 for check_id, timestamp, success, rt in reversed(rows)])
+    ring.set_flags(COMPLETE | (FULL_HISTORY if len(rows) < ring.capacity else 0))
+    ring.flush()
+    return len(rows)
+
+
+def stored_urls():
+    """
+    Returns:
+        list: URLs of the ring files in HOTSTORE_DIR
+    """
+    if not os.path.isdir(HOTSTORE_DIR):
+        return []
+    urls = []
+    for name in sorted(os.listdir(HOTSTORE_DIR)):
+        if not name.endswith('.ring'):
+            continue
+        with open(os.path.join(HOTSTORE_DIR, name), 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        magic, version, _, _, _, url_length = HEADER.unpack_from(header, 0)
+        if magic == MAGIC and version == VERSION:
+            urls.append(header[HEADER.size:HEADER.size + url_length].decode())
+    return urls
+
+
+def expire_before(cutoff):
+    """
+    Rebuild the rings still holding checks that retention dropped from
+    SQLite, so readers (full history in particular) never see them.
+    Called by the database module after dropping partitions.
+
+    Args:
+        cutoff (datetime): Start of the oldest kept partition
+
+    Returns:
+        int: Rings rebuilt
+    """
+    if not HOTSTORE_ENABLED:
+        return 0
+    limit = _epoch(cutoff)
+    rebuilt = 0
+    for url in stored_urls():
+        try:
+            ring = get_ring(url)
+            if any(stop > start and min(ring.ts[start:stop]) < limit
+                   for start, stop in ring.segments()):
+                rebuild(url)
+                rebuilt += 1
+        except Exception as e:
+            logger.error(f"❌ Error expiring hot-store for {url}: {e}")
+    return rebuilt
+
+
+def rebuild_all(urls):
+    """
+    Rebuild the rings of targets whose checks were written without the
+    hot-store (e.g. an archive import).
+
+    Returns:
+        int: Rings rebuilt
+    """
+    if not HOTSTORE_ENABLED:
+        return 0
+    rebuilt = 0
+    for url in urls:
+        try:
+            rebuild(url)
+            rebuilt += 1
+        except Exception as e:
+            logger.error(f"❌ Error rebuilding hot-store for {url}: {e}")
+    return rebuilt
+
+
+def verify_all(urls, repair=True):
+    """
+    Verify (and by default repair) the rings of several targets.
+
+    Returns:
+        list: Reports from verify()
+    """
+    reports = []
+    for url in urls:
+        try:
+            report = verify(url, repair=repair)
+            if not report['ok']:
+                logger.warning(f"⚠️  Hot-store for {url} differed from the database "
+                      f"(missing {report['missing']}, extra {report['extra']}, "
+                      f"mismatched {report['mismatched']})")
+            reports.append(report)
+        except Exception as e:
+            logger.error(f"❌ Error verifying hot-store for {url}: {e}")
+    return reports
@@ -0,0 +1,261 @@
+"""
+Self-instrumentation: timing spans and a sampling profiler.
+
+Spans are off by default. While off, a @timed function costs one extra
+call and a flag check. Turn them on with INSTRUMENTATION=true or at
+runtime with enable(); durations go into the
+monitor_span_duration_seconds histogram (see /metrics) and into the
+summary returned by get_span_stats().
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from functools import wraps
+
+from src.metrics import registry, Histogram
+
+# Span duration buckets (seconds): from sub-millisecond DB calls to slow probes
+SPAN_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+span_duration_seconds = registry.register(Histogram(
+    'monitor_span_duration_seconds', 'Duration of instrumented internal operations.',
+    ('span',), buckets=SPAN_BUCKETS))
+
+
+class _State:
+    enabled = os.getenv('INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+
+
+_state = _State()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def enable():
+    """
+    Start recording spans.
+    """
+    _state.enabled = True
+
+
+def disable():
+    """
+    Stop recording spans (recorded data is kept).
+    """
+    _state.enabled = False
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def record(name, duration):
+    """
+    Record one span duration.
+
+    Args:
+        name (str): Span name (e.g. 'database.save_check')
+        duration (float): Seconds
+    """
+    span_duration_seconds.observe(duration, span=name)
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = {'count': 0, 'total': 0.0, 'max': 0.0}
+            _stats[name] = stats
+        stats['count'] += 1
+        stats['total'] += duration
+        if duration > stats['max']:
+            stats['max'] = duration
+
+
+class span:
+    """
+    Context manager timing a block of code:
+
+        with span('analytics.median'):
+            ...
+    """
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if _state.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as span `name`.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def get_span_stats():
+    """
+    Get a summary of recorded spans.
+
+    Returns:
+        dict: Span name -> count, total/avg/max seconds and histogram buckets
+    """
+    with _stats_lock:
+        items = {name: dict(stats) for name, stats in _stats.items()}
+
+    summary = {}
+    for name, stats in sorted(items.items()):
+        histogram = span_duration_seconds.get(span=name)
+        summary[name] = {
+            'count': stats['count'],
+            'total_seconds': round(stats['total'], 6),
+            'avg_seconds': round(stats['total'] / stats['count'], 6),
+            'max_seconds': round(stats['max'], 6),
+            'buckets': dict(zip([str(b) for b in SPAN_BUCKETS], histogram['counts']))
+        }
+    return summary
+
+
+def reset_span_stats():
+    """
+    Forget all recorded spans.
+    """
+    with _stats_lock:
+        _stats.clear()
+    span_duration_seconds.clear()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the stacks of all threads.
+
+    Samples are aggregated as "folded" stacks (one line per stack,
+    frames separated by ';', followed by the sample count), which
+    flame graph tools read directly.
+    """
+
+    def __init__(self, interval=0.01, max_depth=40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = StackCounter()
+        self.samples = 0
+        self.thread = None
+        self.running = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.running.is_set():
+            return
+        self.running.set()
+        self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while self.running.is_set():
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        code = frame.f_code
+                        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                        frame = frame.f_back
+                    self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def folded(self, limit=None):
+        """
+        Get collected stacks in folded format, most frequent first.
+
+        Args:
+            limit (int): Max number of stacks (default all)
+
+        Returns:
+            str: Folded stacks
+        """
+        with self.lock:
+            lines = [f"{stack} {count}" for stack, count in self.stacks.most_common(limit)]
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'running': self.running.is_set(),
+                'interval': self.interval,
+                'samples': self.samples,
+                'stacks': len(self.stacks)
+            }
+
+
+# Process-wide profiler, created when first switched on
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def start_profiler(interval=0.01):
+    """
+    Switch the sampling profiler on (a fresh profile is started).
+
+    Returns:
+        SamplingProfiler: Running profiler
+    """
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None:
+            _profiler.stop()
+        _profiler = SamplingProfiler(interval=interval)
+        _profiler.start()
+        return _profiler
+
+
+def stop_profiler():
+    """
+    Switch the sampling profiler off. The collected profile is kept.
+
+    Returns:
+        SamplingProfiler: Stopped profiler, or None if never started
+    """
+    with _profiler_lock:
+        if _profiler is not None:
+            _profiler.stop()
+        return _profiler
+
+
+def get_profiler():
+    """
+    Returns:
+        SamplingProfiler: Current profiler, or None if never started
+    """
+    return _profiler
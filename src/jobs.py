@@ -0,0 +1,277 @@
+"""
+Registry of on-demand check jobs.
+Lets the web app queue a probe and poll for its result later.
+
+With SQLite storage every state change is also written to the check_jobs
+table. A poll or event stream that reaches another web worker process
+(serve.py --workers N) then finds the job there and follows it by
+re-reading the row. The process that runs the probe wakes its own
+waiters directly.
+"""
+
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from src.database import get_connection, close_connection
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Job states that do not change any more
+FINISHED = ('done', 'failed', 'dropped')
+
+# Seconds between reads of a job run by another process
+POLL_SECONDS = 0.25
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+UPSERT_JOB_SQL = '''
+    INSERT OR REPLACE INTO check_jobs (id, url, status, result, error, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+class CheckJob:
+    """
+    A single queued check and its outcome.
+
+    Status goes queued -> running -> done, or ends as dropped
+    when the probe queue is overloaded.
+    """
+
+    def __init__(self, url, on_change=None):
+        """
+        Args:
+            url (str): URL to check
+            on_change (callable): Called with the job after every state
+                change (the registry's store, optional)
+        """
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.monotonic()
+        self.created_at = datetime.now()
+        self.finished = threading.Event()
+        self.on_change = on_change
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def mark_running(self):
+        self.status = 'running'
+        self._changed()
+
+    def complete(self, result):
+        """
+        Store the probe result and wake up waiters.
+        """
+        self.result = result
+        self.status = 'done'
+        self._changed()
+        self.finished.set()
+
+    def fail(self, error, status='failed'):
+        """
+        Record an error and wake up waiters.
+        """
+        self.error = error
+        self.status = status
+        self._changed()
+        self.finished.set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the job to finish.
+
+        Returns:
+            bool: True if finished
+        """
+        return self.finished.wait(timeout)
+
+    def to_dict(self):
+        """
+        Get a JSON-friendly representation.
+
+        Returns:
+            dict: Job id, url, status, result and error
+        """
+        result = None
+        if self.result is not None:
+            result = dict(self.result)
+            timestamp = result.get('timestamp')
+            if hasattr(timestamp, 'strftime'):
+                result['timestamp'] = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+        return {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'result': result,
+            'error': self.error
+        }
+
+
+class StoredJob:
+    """
+    A job run by another process, as last read from the check_jobs table.
+    Offers the CheckJob methods the web app uses.
+    """
+
+    def __init__(self, registry, job_id, data):
+        self.registry = registry
+        self.id = job_id
+        self.data = data
+
+    @property
+    def status(self):
+        return self.data['status']
+
+    def wait(self, timeout=None):
+        """
+        Re-read the job until it is finished.
+
+        Returns:
+            bool: True if finished
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.status not in FINISHED:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_SECONDS)
+            self.data = self.registry.load(self.id) or self.data
+        return True
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+class JobRegistry:
+    """
+    Keeps recent jobs by id. Jobs expire after `ttl` seconds and the
+    registry never holds more than `max_jobs` jobs.
+    """
+
+    def __init__(self, ttl=600, max_jobs=1000, shared=False):
+        """
+        Args:
+            ttl (int): Seconds a job is kept
+            max_jobs (int): Most jobs kept in this process
+            shared (bool): Also keep jobs in the check_jobs table, for
+                other processes using the same database
+        """
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.shared = shared
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def create(self, url):
+        """
+        Create and register a job.
+
+        Args:
+            url (str): URL to check
+
+        Returns:
+            CheckJob: New job
+        """
+        job = CheckJob(url, on_change=self.store if self.shared else None)
+        with self.lock:
+            self._expire()
+            self.jobs[job.id] = job
+        if self.shared:
+            self.store(job, expire=True)
+        return job
+
+    def get(self, job_id):
+        """
+        Look up a job (with shared=True, also one created by another process).
+
+        Returns:
+            CheckJob: Job (StoredJob if from another process), or None
+                if unknown or expired
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.shared:
+            data = self.load(job_id)
+            if data is not None:
+                job = StoredJob(self, job_id, data)
+        return job
+
+    def store(self, job, expire=False):
+        """
+        Write a job's state to the check_jobs table (errors are logged,
+        the job goes on in this process).
+
+        Args:
+            job (CheckJob): Job to write
+            expire (bool): Also delete jobs older than the ttl
+        """
+        data = job.to_dict()
+        conn = None
+        try:
+            conn = get_connection()
+            conn.execute(UPSERT_JOB_SQL, (
+                job.id, job.url, data['status'],
+                json.dumps(data['result'], default=str) if data['result'] is not None else None,
+                data['error'], job.created_at.strftime(TIME_FORMAT)
+            ))
+            if expire:
+                cutoff = datetime.now() - timedelta(seconds=self.ttl)
+                conn.execute('DELETE FROM check_jobs WHERE created_at < ?', (cutoff.strftime(TIME_FORMAT),))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error saving check job {job.id}: {e}")
+        finally:
+            close_connection(conn)
+
+    def load(self, job_id):
+        """
+        Read a job from the check_jobs table.
+
+        Returns:
+            dict: Job as CheckJob.to_dict() gives it, or None if unknown,
+                expired or on errors
+        """
+        cutoff = datetime.now() - timedelta(seconds=self.ttl)
+        conn = None
+        try:
+            conn = get_connection()
+            row = conn.execute(
+                'SELECT url, status, result, error FROM check_jobs WHERE id = ? AND created_at >= ?',
+                (job_id, cutoff.strftime(TIME_FORMAT))
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"❌ Error reading check job {job_id}: {e}")
+            return None
+        finally:
+            close_connection(conn)
+        if row is None:
+            return None
+        url, status, result, error = row
+        return {
+            'id': job_id,
+            'url': url,
+            'status': status,
+            'result': json.loads(result) if result else None,
+            'error': error
+        }
+
+    def _expire(self):
+        """
+        Drop expired jobs and the oldest ones beyond max_jobs (lock held).
+        """
+        cutoff = time.monotonic() - self.ttl
+        for job_id in [j.id for j in self.jobs.values() if j.created < cutoff]:
+            del self.jobs[job_id]
+
+        # Dictionaries keep insertion order, so the first jobs are the oldest
+        while len(self.jobs) >= self.max_jobs:
+            del self.jobs[next(iter(self.jobs))]
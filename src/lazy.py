@@ -0,0 +1,68 @@
+"""
+Lazy module imports.
+
+Heavy dependencies (requests, NumPy) are only imported the first time an
+attribute is used, so CLI commands, probe agents and workers that never
+touch them start faster. See benchmarks/startup_benchmark.py.
+"""
+
+import importlib
+import importlib.util
+import threading
+
+
+class LazyModule:
+    """
+    Stands in for a module until one of its attributes is used.
+    """
+
+    def __init__(self, name):
+        """
+        Args:
+            name (str): Module name, e.g. 'requests'
+        """
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        # Only called for attributes not set on the proxy itself
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        # Patching the proxy (tests) patches the module it stands for
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name, optional=False):
+    """
+    Get a module that is imported on first use.
+
+    Args:
+        name (str): Module name
+        optional (bool): Return None if the module is not installed
+            (checked without importing it)
+
+    Returns:
+        LazyModule: Proxy for the module, or None (see `optional`)
+    """
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
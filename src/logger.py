@@ -1,31 +1,107 @@
 """
-Logging configuration with colored output.
+Logging configuration: a non-blocking pipeline with colored or JSON output.
+
+Threads that log (probe workers, the pipeline writer, request handlers)
+only put the record on a bounded queue; a listener thread formats and
+writes it. When the queue is full the record is dropped and counted
+instead of making the caller wait for the terminal or a log collector.
+
+    LOG_FORMAT=text|json   colored lines, or one JSON object per line
+    LOG_CHECK_SAMPLE       share of per-check INFO/DEBUG lines kept (the
+                           'monitor.checks' logger, see get_check_logger())
+    LOG_ERROR_BURST        the same warning/error is written at most this
+    LOG_ERROR_WINDOW       many times per window (seconds); the next one
+                           written says how many were suppressed
 """
 
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
 import colorlog
 
+# LOG_* settings are read when logging is set up rather than on import,
+# so entry points that import this module first can still load .env
 
-def setup_logger():
+
+def get_settings():
     """
-    Configure colored logging for the application.
-    
+    Read the logging settings from the environment: LOG_LEVEL (INFO),
+    LOG_FORMAT, LOG_QUEUE_SIZE, LOG_CHECK_SAMPLE and LOG_ERROR_BURST /
+    LOG_ERROR_WINDOW (see the module docstring).
+
     Returns:
-        logger: Configured logger instance
+        dict: level, format, queue_size, check_sample, error_burst, error_window
     """
-    # Create logger
-    logger = logging.getLogger('monitor')
-    logger.setLevel(logging.DEBUG)
-    
-    # Prevent duplicate handlers
-    if logger.handlers:
-        return logger
-    
-    # Create console handler
-    handler = logging.StreamHandler()
-    
-    # Create colored formatter
-    formatter = colorlog.ColoredFormatter(
+    return {
+        'level': os.getenv('LOG_LEVEL', 'INFO').upper(),
+        'format': os.getenv('LOG_FORMAT', 'text').lower(),
+        'queue_size': int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+        'check_sample': float(os.getenv('LOG_CHECK_SAMPLE', 1)),
+        'error_burst': int(os.getenv('LOG_ERROR_BURST', 5)),
+        'error_window': float(os.getenv('LOG_ERROR_WINDOW', 60))
+    }
+
+
+# Logger of per-check chatter
+CHECK_LOGGER = 'monitor.checks'
+
+# Attributes every LogRecord has (anything else came in through extra=)
+STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'suppressed'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: time, level, logger, message, thread, the
+    fields passed with extra={...} and the traceback of exceptions.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ColoredFormatter(colorlog.ColoredFormatter):
+    """
+    Colored text lines; notes how many similar records were suppressed.
+    """
+
+    def format(self, record):
+        line = super().format(record)
+        if getattr(record, 'suppressed', 0):
+            line += f" (+{record.suppressed} similar suppressed)"
+        return line
+
+
+def build_formatter(fmt='text'):
+    """
+    Args:
+        fmt (str): 'text' or 'json'
+
+    Returns:
+        logging.Formatter: Formatter for the output handler
+    """
+    if fmt == 'json':
+        return JsonFormatter()
+    return ColoredFormatter(
         '%(log_color)s[%(levelname)s]%(reset)s %(message)s',
         log_colors={
             'DEBUG': 'cyan',
@@ -35,8 +111,284 @@ def setup_logger():
             'CRITICAL': 'red,bg_white',
         }
     )
-    
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    
-    return logger
\ No newline at end of file
+
+
+class SampleFilter(logging.Filter):
+    """
+    Keeps a share of records below WARNING, evenly spread (every
+    1/rate-th one rather than at random). Warnings and errors always pass.
+    """
+
+    def __init__(self, rate, stats=None):
+        """
+        Args:
+            rate (float): Share kept, 0 to 1
+            stats (dict): Counters to update ('sampled_out')
+        """
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+        self.stats = stats if stats is not None else {'sampled_out': 0}
+        self.seen = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        with self.lock:
+            self.seen += 1
+            keep = int(self.seen * self.rate) != int((self.seen - 1) * self.rate)
+            if not keep:
+                self.stats['sampled_out'] += 1
+        return keep
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Passes the same warning/error (logger, level and message) at most
+    `burst` times per `window` seconds. The first one passed after a
+    suppression carries the count in record.suppressed.
+    """
+
+    # Most distinct messages tracked (the table is cleared when full)
+    MAX_KEYS = 1000
+
+    def __init__(self, burst=5, window=60, stats=None, clock=time.monotonic):
+        """
+        Args:
+            burst (int): Records of one message passed per window (0 = no limit)
+            window (float): Window length in seconds
+            stats (dict): Counters to update ('suppressed')
+            clock (callable): Time source (tests)
+        """
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.stats = stats if stats is not None else {'suppressed': 0}
+        self.clock = clock
+        self.seen = {}  # key -> [window start, passed, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = self.clock()
+        with self.lock:
+            entry = self.seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                if entry is None and len(self.seen) >= self.MAX_KEYS:
+                    self.seen.clear()
+                suppressed = entry[2] if entry else 0
+                self.seen[key] = entry = [now, 0, 0]
+                record.suppressed = suppressed
+            elif entry[1] >= self.burst:
+                entry[2] += 1
+                self.stats['suppressed'] += 1
+                return False
+            else:
+                record.suppressed = entry[2]
+                entry[2] = 0
+            entry[1] += 1
+        return True
+
+
+class QueueingHandler(logging.Handler):
+    """
+    Puts records on a pipeline's bounded queue without waiting. Unlike
+    logging.handlers.QueueHandler it does not format them first, so the
+    message is built on the listener thread too.
+    """
+
+    def __init__(self, pipeline):
+        """
+        Args:
+            pipeline (LogPipeline): Pipeline whose queue records go to
+        """
+        super().__init__()
+        self.pipeline = pipeline
+
+    def handle(self, record):
+        # No handler lock: the queue is thread-safe
+        if not self.filter(record):
+            return False
+        pipeline = self.pipeline
+        if pipeline.stopped:
+            pipeline.output.handle(record)
+            return True
+        if pipeline.thread is None:
+            pipeline.start()
+        try:
+            pipeline.records.put_nowait(record)
+            pipeline.stats['queued'] += 1
+        except queue.Full:
+            pipeline.stats['dropped'] += 1
+        return True
+
+    def emit(self, record):
+        self.handle(record)
+
+
+class LogPipeline:
+    """
+    Bounded queue, rate limiting and a listener thread writing to a
+    stream. The thread starts with the first record.
+    """
+
+    def __init__(self, stream=None, fmt=None, queue_size=None,
+                 error_burst=None, error_window=None, clock=time.monotonic):
+        """
+        Args:
+            stream: File-like object written to (default: sys.stderr)
+            fmt (str): 'text' or 'json'
+            queue_size (int): Records waiting at most
+            error_burst (int): See RateLimitFilter
+            error_window (float): See RateLimitFilter
+            clock (callable): Time source of the rate limit (tests)
+
+        Settings left as None come from the environment (get_settings()).
+        """
+        settings = get_settings()
+        fmt = settings['format'] if fmt is None else fmt
+        queue_size = settings['queue_size'] if queue_size is None else queue_size
+        error_burst = settings['error_burst'] if error_burst is None else error_burst
+        error_window = settings['error_window'] if error_window is None else error_window
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'sampled_out': 0, 'suppressed': 0}
+        self.records = queue.Queue(maxsize=queue_size)
+        self.handler = QueueingHandler(self)
+        self.handler.addFilter(RateLimitFilter(error_burst, error_window, self.stats, clock))
+        self.output = logging.StreamHandler(stream)
+        self.output.setFormatter(build_formatter(fmt))
+        self.thread = None
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the listener thread (if not running yet).
+
+        Returns:
+            LogPipeline: self
+        """
+        with self.lock:
+            if self.thread is None and not self.stopped:
+                self.thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self.thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            record = self.records.get()
+            if record is None:
+                return
+            try:
+                self.output.handle(record)
+            except Exception:
+                self.output.handleError(record)
+            self.stats['written'] += 1
+
+    def flush(self, timeout=5):
+        """
+        Wait until the records queued so far are written.
+        """
+        deadline = time.monotonic() + timeout
+        thread = self.thread
+        while (self.stats['written'] < self.stats['queued'] and time.monotonic() < deadline
+               and thread is not None and thread.is_alive()):
+            time.sleep(0.005)
+        try:
+            self.output.flush()
+        except (OSError, ValueError):
+            # Stream already closed at interpreter exit (as logging.shutdown does)
+            pass
+
+    def stop(self):
+        """
+        Write what is queued and stop the listener thread. Records logged
+        afterwards are written right away.
+        """
+        with self.lock:
+            thread, self.stopped = self.thread, True
+        if thread is None:
+            return
+        self.flush()
+        try:
+            self.records.put(None, timeout=1)
+        except queue.Full:
+            pass
+        thread.join(timeout=1)
+
+
+_pipeline = None
+_setup_lock = threading.Lock()
+
+
+def setup_logger():
+    """
+    Configure logging for the application (once per process), with the
+    LOG_* settings in the environment at that point.
+
+    Returns:
+        logger: Configured logger instance
+    """
+    global _pipeline
+
+    # Create logger
+    logger = logging.getLogger('monitor')
+
+    # Prevent duplicate handlers
+    if logger.handlers:
+        return logger
+
+    with _setup_lock:
+        if logger.handlers:
+            return logger
+        settings = get_settings()
+        logger.setLevel(settings['level'])
+        _pipeline = LogPipeline()
+        logger.addHandler(_pipeline.handler)
+
+        checks = logging.getLogger(CHECK_LOGGER)
+        checks.addFilter(SampleFilter(settings['check_sample'], _pipeline.stats))
+
+        # Write what is still queued when the process exits
+        atexit.register(shutdown_logging)
+
+    return logger
+
+
+def get_check_logger():
+    """
+    Logger for per-check lines (probe results, saved checks). Its INFO
+    and DEBUG records are sampled down to LOG_CHECK_SAMPLE.
+
+    Returns:
+        logger: Child of the 'monitor' logger
+    """
+    setup_logger()
+    return logging.getLogger(CHECK_LOGGER)
+
+
+def get_logging_stats():
+    """
+    Returns:
+        dict: queued, written, dropped, sampled_out and suppressed records
+    """
+    if _pipeline is None:
+        return {}
+    return dict(_pipeline.stats)
+
+
+def flush_logging(timeout=5):
+    """
+    Wait until queued records are written (e.g. before printing directly).
+    """
+    if _pipeline is not None:
+        _pipeline.flush(timeout)
+
+
+def shutdown_logging():
+    """
+    Write queued records and stop the writer thread.
+    """
+    if _pipeline is not None:
+        _pipeline.stop()
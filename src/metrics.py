@@ -0,0 +1,413 @@
+"""
+In-memory metrics with a Prometheus/OpenMetrics text exporter.
+
+Counters and histograms are updated incrementally as check results
+flow through the pipeline, so a scrape only formats numbers that are
+already in memory and never touches the database.
+"""
+
+import threading
+
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Response time histogram buckets (seconds)
+RESPONSE_TIME_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base class: a metric family with optional label names.
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def samples(self, openmetrics=False):
+        """
+        Get exposition lines for this family (without HELP/TYPE).
+        """
+        raise NotImplementedError
+
+    def exposition_name(self, openmetrics=False):
+        return self.name
+
+    def render(self, openmetrics=False):
+        name = self.exposition_name(openmetrics)
+        lines = [
+            f'# HELP {name} {self.documentation}',
+            f'# TYPE {name} {self.type}'
+        ]
+        lines.extend(self.samples(openmetrics))
+        return lines
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing value. The name must end in '_total'.
+    """
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def exposition_name(self, openmetrics=False):
+        # OpenMetrics names the family without the _total suffix
+        if openmetrics and self.name.endswith('_total'):
+            return self.name[:-len('_total')]
+        return self.name
+
+    def samples(self, openmetrics=False):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down.
+    """
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def samples(self, openmetrics=False):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Histogram(Metric):
+    """
+    Cumulative histogram with fixed buckets.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=RESPONSE_TIME_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self.values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def get(self, **labels):
+        """
+        Returns:
+            dict: counts (per bucket, non-cumulative), sum and count
+        """
+        with self.lock:
+            state = self.values.get(self._key(labels))
+            if state is None:
+                return {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            return {'counts': list(state['counts']), 'sum': state['sum'], 'count': state['count']}
+
+    def samples(self, openmetrics=False):
+        with self.lock:
+            items = sorted((key, dict(state, counts=list(state['counts'])))
+                           for key, state in self.values.items())
+
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}')
+            inf = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, inf)} {state["count"]}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state["sum"])}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {state["count"]}')
+        return lines
+
+
+class Registry:
+    """
+    Collection of metric families plus collectors that refresh
+    gauges right before rendering.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Register a callable run before each scrape (e.g. to copy queue depths).
+        """
+        self.collectors.append(collector)
+
+    def render(self, openmetrics=False):
+        """
+        Render all metrics in text exposition format.
+
+        Args:
+            openmetrics (bool): OpenMetrics format instead of Prometheus 0.0.4
+
+        Returns:
+            str: Exposition text
+        """
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"❌ Metrics collector error: {e}")
+
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render(openmetrics))
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+# Default registry and monitor metrics
+registry = Registry()
+
+checks_total = registry.register(Counter(
+    'monitor_checks_total', 'Checks completed, by target and result.', ('url', 'result')))
+retries_total = registry.register(Counter(
+    'monitor_check_retries_total', 'Retry attempts needed by checks.', ('url',)))
+queue_wait_seconds_total = registry.register(Counter(
+    'monitor_queue_wait_seconds_total', 'Time checks spent waiting for the rate limiter.', ('url',)))
+target_up = registry.register(Gauge(
+    'monitor_target_up', 'Whether the last check of the target succeeded (1) or not (0).', ('url',)))
+last_check_timestamp = registry.register(Gauge(
+    'monitor_last_check_timestamp_seconds', 'Unix time of the last check of the target.', ('url',)))
+response_time_seconds = registry.register(Histogram(
+    'monitor_response_time_seconds', 'Response time of successful checks.', ('url',)))
+schedule_lag_seconds = registry.register(Gauge(
+    'monitor_schedule_lag_seconds', 'Delay between planned and actual start of the last scheduled check.', ('url',)))
+missed_runs_total = registry.register(Counter(
+    'monitor_schedule_missed_runs_total', 'Planned checks that never ran (coalesced, skipped or dropped).', ('url',)))
+scheduler_misfires_total = registry.register(Counter(
+    'monitor_scheduler_misfires_total', 'Runs skipped or merged by APScheduler, by reason (misfire, max_instances, coalesced).', ('url', 'reason')))
+stored_checks_total = registry.register(Counter(
+    'monitor_stored_checks_total', 'Checks stored in the database (seeded once at startup).'))
+expired_checks_total = registry.register(Counter(
+    'monitor_expired_checks_total', 'Stored checks dropped by data retention.'))
+pipeline_queue_depth = registry.register(Gauge(
+    'monitor_pipeline_queue_depth', 'Items waiting in the probe pipeline queues.', ('queue',)))
+pipeline_events_total = registry.register(Counter(
+    'monitor_pipeline_events_total', 'Probe pipeline events (dropped, coalesced, ...).', ('event',)))
+
+# Stored check counter is seeded from the database before the first save
+_seed_lock = threading.Lock()
+_seeded = False
+
+
+def seed_stored_checks():
+    """
+    Seed the stored checks counter once with the database row count.
+    Called when the pipeline is created, before its writer saves anything,
+    so results it saves later are counted once (by record_result).
+    """
+    global _seeded
+    from src.storage import get_storage
+
+    with _seed_lock:
+        if not _seeded:
+            stored_checks_total.inc(get_storage().get_check_count())
+            _seeded = True
+
+
+def record_result(result):
+    """
+    Pipeline listener: update metrics for one saved check result.
+
+    Args:
+        result (dict): Check result (as saved by the pipeline writer)
+    """
+    url = result['url']
+    success = bool(result['success'])
+
+    checks_total.inc(url=url, result='up' if success else 'down')
+    target_up.set(1 if success else 0, url=url)
+    stored_checks_total.inc()
+
+    if result.get('retries'):
+        retries_total.inc(result['retries'], url=url)
+    if result.get('queue_wait'):
+        queue_wait_seconds_total.inc(result['queue_wait'], url=url)
+    if success and result.get('response_time') is not None:
+        response_time_seconds.observe(result['response_time'], url=url)
+    if result.get('schedule_lag') is not None:
+        schedule_lag_seconds.set(round(result['schedule_lag'], 3), url=url)
+    if result.get('missed_runs'):
+        missed_runs_total.inc(result['missed_runs'], url=url)
+
+    timestamp = result.get('timestamp')
+    if hasattr(timestamp, 'timestamp'):
+        last_check_timestamp.set(round(timestamp.timestamp(), 3), url=url)
+
+
+def record_expired(count):
+    """
+    Count checks dropped by data retention. The caller seeds the stored
+    checks counter before dropping, so the seed never misses them twice.
+
+    Args:
+        count (int): Checks removed
+    """
+    if count:
+        expired_checks_total.inc(count)
+
+
+def get_total_checks():
+    """
+    Get the number of stored checks from the in-memory counters:
+    seeded once from the database, plus checks saved by this process,
+    minus checks its retention dropped.
+
+    Returns:
+        int: Stored check count
+    """
+    seed_stored_checks()
+    return int(stored_checks_total.get() - expired_checks_total.get())
+
+
+def collect_pipeline_stats():
+    """
+    Collector: copy the probe pipeline statistics into gauges/counters.
+    """
+    from src.pipeline import get_pipeline_stats
+
+    stats = get_pipeline_stats()
+    if not stats.get('running'):
+        return
+
+    pipeline_queue_depth.set(stats['probe_queue_depth'], queue='probe')
+    pipeline_queue_depth.set(stats['result_queue_depth'], queue='result')
+    with pipeline_events_total.lock:
+        for event in ('submitted', 'coalesced', 'skipped_in_flight', 'joined_in_flight',
+                      'dropped', 'probed', 'saved', 'write_errors'):
+            pipeline_events_total.values[(event,)] = stats[event]
+
+
+registry.add_collector(collect_pipeline_stats)
+
+
+def render_metrics(accept_header=''):
+    """
+    Render the default registry in the format the client asked for.
+
+    Args:
+        accept_header (str): HTTP Accept header of the scrape
+
+    Returns:
+        tuple: (body, content_type)
+    """
+    if 'application/openmetrics-text' in (accept_header or ''):
+        return registry.render(openmetrics=True), OPENMETRICS_CONTENT_TYPE
+    return registry.render(), PROMETHEUS_CONTENT_TYPE
+
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """
+    Serve /metrics on a separate port from a background thread.
+    Used by run.py, which has no web server of its own.
+
+    Args:
+        port (int): Port to listen on
+        host (str): Interface to bind
+
+    Returns:
+        ThreadingHTTPServer: Running server (call shutdown() to stop)
+    """
+    # Imported here: only run.py with METRICS_PORT serves metrics this way
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body, content_type = render_metrics(self.headers.get('Accept', ''))
+            data = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
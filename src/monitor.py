@@ -3,15 +3,23 @@ Website availability monitoring module.
 Checks if websites are up or down.
 """
 
-import requests
 from datetime import datetime
 import time
-from src.logger import setup_logger
+from src.lazy import lazy_import
+from src.logger import get_check_logger
+from src.ratelimit import get_rate_limiter
+from src.singleflight import get_probe_flights, normalize_url
+from src.instrumentation import timed
 
-# Initialize logger
-logger = setup_logger()
+# Imported on the first check (agents and CLI commands start faster)
+requests = lazy_import('requests')
 
-def check_website(url, timeout=5, max_retries=3):
+# Per-check lines: %-style arguments, so sampled-out lines are never
+# formatted and kept ones are formatted on the log writer thread
+logger = get_check_logger()
+
+@timed('monitor.check_website')
+def check_website(url, timeout=5, max_retries=3, limiter=None):
     """
     Check if a website is available.
     
@@ -19,6 +27,7 @@ def check_website(url, timeout=5, max_retries=3):
         url (str): Website URL to check
         timeout (int): Max seconds to wait for response
         max_retries (int): Number of retry attempts if failed
+        limiter (RateLimiter): Rate limiter to pass before every attempt (optional)
 
     Returns:
         dict: Check result with keys:
@@ -29,19 +38,29 @@ def check_website(url, timeout=5, max_retries=3):
             - timestamp: When check happened
             - error: Error message or None
             - retries: Number of retries needed
+            - queue_wait: Seconds spent waiting for the rate limiter
     """
     last_error = None
+    queue_wait = 0.0
+
+    logger.info("Checking %s...", url, extra={'url': url})
 
-    logger.info(f"Checking {url}...")
+    # Import requests (on the first check) before taking a rate limiter
+    # token, so the import time does not eat into the spacing of probes
+    http_get = requests.get
 
     # Try multiple times
     for attempt in range(max_retries):
+        # Wait for our turn (not counted in response time)
+        if limiter:
+            queue_wait += limiter.acquire(url)
+
         try:
             # Record start time
             start_time = datetime.now()
             
             # Make HTTP request
-            response = requests.get(url, timeout=timeout)
+            response = http_get(url, timeout=timeout)
             
             # Record end time
             end_time = datetime.now()
@@ -50,7 +69,9 @@ def check_website(url, timeout=5, max_retries=3):
             response_time = (end_time - start_time).total_seconds()
             
             # Log success
-            logger.info(f"✅ {url} is UP - {response.status_code} ({response_time:.3f}s)")
+            logger.info("✅ %s is UP - %s (%.3fs)", url, response.status_code, response_time,
+                        extra={'url': url, 'status_code': response.status_code,
+                               'response_time': response_time})
 
             # Return success result
             return {
@@ -60,23 +81,24 @@ def check_website(url, timeout=5, max_retries=3):
                 'success': response.ok,
                 'timestamp': datetime.now(),
                 'error': None,
-                'retries': attempt
+                'retries': attempt,
+                'queue_wait': queue_wait
             }
         
         except requests.Timeout:
             last_error = f'Timeout - Website took longer than {timeout} seconds'
-            logger.warning(f"⏱️  Attempt {attempt + 1} timed out")
+            logger.warning("⏱️  Attempt %d for %s timed out", attempt + 1, url, extra={'url': url})
         except requests.ConnectionError:
             last_error = 'Connection failed - Cannot reach website'
-            logger.warning(f"🌐 Attempt {attempt + 1} connection failed")
+            logger.warning("🌐 Attempt %d for %s connection failed", attempt + 1, url, extra={'url': url})
         except Exception as e:
             last_error = f'Unexpected error: {str(e)}'
-            logger.warning(f"⚠️  Attempt {attempt + 1} error: {e}")
+            logger.warning("⚠️  Attempt %d for %s error: %s", attempt + 1, url, e, extra={'url': url})
         # If not last attempt, wait before retry
         if attempt < max_retries - 1:
             time.sleep(1)  # Wait 1 second before retry
 
-    logger.error(f"❌ {url} is DOWN - {last_error}")
+    logger.error("❌ %s is DOWN - %s", url, last_error, extra={'url': url, 'error': last_error})
     
     # All retries failed - return failure
     return {
@@ -86,5 +108,39 @@ def check_website(url, timeout=5, max_retries=3):
         'success': False,
         'timestamp': datetime.now(),
         'error': last_error,
-        'retries': max_retries
-    }
\ No newline at end of file
+        'retries': max_retries,
+        'queue_wait': queue_wait
+    }
+
+
+@timed('monitor.dispatch_probe')
+def dispatch_probe(url, timeout=5, max_retries=3):
+    """
+    Probe dispatch path used by the scheduler and the dashboard.
+    Runs check_website() through the shared rate limiter. Concurrent
+    calls for the same (normalized) URL share one in-flight probe.
+    
+    Args:
+        url (str): Website URL to check
+        timeout (int): Max seconds to wait for response
+        max_retries (int): Number of retry attempts if failed
+        
+    Returns:
+        dict: Check result (see check_website). Callers that joined
+              another caller's probe get a copy with 'coalesced': True;
+              the result is saved by the caller that ran the probe.
+    """
+    result, shared = get_probe_flights().do(
+        normalize_url(url),
+        lambda: check_website(
+            url,
+            timeout=timeout,
+            max_retries=max_retries,
+            limiter=get_rate_limiter()
+        )
+    )
+    
+    if shared:
+        logger.info("🔗 Joined in-flight check for %s", url, extra={'url': url})
+        return dict(result, coalesced=True)
+    return result
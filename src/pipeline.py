@@ -0,0 +1,540 @@
+"""
+Probe pipeline with bounded queues and backpressure.
+
+    scheduler -> probe queue -> probe workers -> result queue -> writer
+
+The probe queue is bounded and applies an overflow policy when full.
+The result queue is bounded and blocks probe workers when the writer
+(database) falls behind, which in turn fills the probe queue.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from src.monitor import dispatch_probe
+from src.singleflight import get_probe_flights, normalize_url
+from src.storage import get_storage, uses_sqlite
+from src.jobs import JobRegistry
+from src.metrics import record_result, seed_stored_checks
+from src.logger import setup_logger
+
+# Initialize logger
+logger = setup_logger()
+
+# What to do when the probe queue is full
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+
+class BoundedQueue:
+    """
+    Thread-safe FIFO queue with a fixed capacity and overflow policies.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.closed = False
+        self.peak = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def put(self, item, policy='block', timeout=None):
+        """
+        Add an item to the queue.
+
+        Args:
+            item: Item to add
+            policy (str): 'block', 'drop_oldest' or 'drop_newest'
+            timeout (float): Max seconds to block (policy 'block' only)
+
+        Returns:
+            tuple: (accepted, evicted) - evicted is the item pushed out
+                   by 'drop_oldest', otherwise None
+        """
+        evicted = None
+
+        with self.lock:
+            if self.closed:
+                return False, None
+
+            if len(self.items) >= self.maxsize:
+                if policy == 'drop_newest':
+                    return False, None
+                elif policy == 'drop_oldest':
+                    evicted = self.items.popleft()
+                else:
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    while len(self.items) >= self.maxsize and not self.closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            return False, None
+                        self.not_full.wait(remaining)
+                    if self.closed:
+                        return False, None
+
+            self.items.append(item)
+            self.peak = max(self.peak, len(self.items))
+            self.not_empty.notify()
+
+        return True, evicted
+
+    def get_batch(self, max_items=1, timeout=None):
+        """
+        Remove up to `max_items` items, waiting for at least one.
+
+        Args:
+            max_items (int): Max items to return
+            timeout (float): Max seconds to wait (None = forever)
+
+        Returns:
+            list: Items (empty on timeout or when closed and drained)
+        """
+        with self.lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.items and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self.not_empty.wait(remaining)
+
+            batch = []
+            while self.items and len(batch) < max_items:
+                batch.append(self.items.popleft())
+            if batch:
+                self.not_full.notify_all()
+            return batch
+
+    def get(self, timeout=None):
+        """
+        Remove one item, waiting if needed.
+
+        Returns:
+            Item, or None on timeout or when closed and drained
+        """
+        batch = self.get_batch(1, timeout)
+        return batch[0] if batch else None
+
+    def clear(self):
+        """
+        Remove all queued items.
+
+        Returns:
+            list: Removed items
+        """
+        with self.lock:
+            items = list(self.items)
+            self.items.clear()
+            self.not_full.notify_all()
+            return items
+
+    def close(self):
+        """
+        Stop accepting items and wake up all waiters.
+        Queued items can still be taken.
+        """
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+
+
+class ProbePipeline:
+    """
+    Runs probes on a worker pool and persists results from a single writer.
+    """
+
+    def __init__(self, probe_workers=4, probe_queue_size=100, result_queue_size=1000,
+                 overflow_policy='drop_oldest', batch_size=50,
+                 probe=dispatch_probe, save=None, flights=None, shared_jobs=False):
+        """
+        Args:
+            probe_workers (int): Number of probe threads
+            probe_queue_size (int): Max probes waiting for a worker
+            result_queue_size (int): Max results waiting for the writer
+            overflow_policy (str): Probe queue policy when full (see OVERFLOW_POLICIES)
+            batch_size (int): Max results written per transaction
+            probe (callable): probe(url, timeout=...) -> result dict
+            save (callable): save(results) -> list of row IDs
+                (default: the storage backend's save_checks)
+            flights (SingleFlight): Registry of in-flight probes
+                (default: the shared probe registry)
+            shared_jobs (bool): Keep on-demand jobs in the database too, so
+                other web worker processes can answer polls for them
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.probe_workers = probe_workers
+        self.overflow_policy = overflow_policy
+        self.batch_size = batch_size
+        self.probe = probe
+        self.save = save or (lambda results: get_storage().save_checks(results))
+        self.flights = flights or get_probe_flights()
+
+        self.probe_queue = BoundedQueue(probe_queue_size)
+        self.result_queue = BoundedQueue(result_queue_size)
+        self.threads = []
+        self.writer = None
+        self.running = False
+        self.listeners = []
+        self.jobs = JobRegistry(shared=shared_jobs)
+
+        # Queued probes by normalized URL (for coalescing duplicates)
+        self.pending = {}
+
+        # Planned time of the last executed scheduled run per URL
+        self.last_scheduled = {}
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.stats = {
+            'submitted': 0,
+            'coalesced': 0,
+            'skipped_in_flight': 0,
+            'joined_in_flight': 0,
+            'dropped': 0,
+            'probed': 0,
+            'saved': 0,
+            'write_errors': 0,
+            'busy_workers': 0
+        }
+
+    def start(self):
+        """
+        Start probe workers and the writer thread.
+        """
+        if self.running:
+            return
+
+        self.running = True
+        for i in range(self.probe_workers):
+            thread = threading.Thread(target=self._probe_loop, name=f'probe-worker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        self.writer = threading.Thread(target=self._write_loop, name='result-writer', daemon=True)
+        self.writer.start()
+
+    def stop(self, timeout=10):
+        """
+        Stop the pipeline.
+        Queued probes are discarded, in-flight probes finish and
+        all collected results are written before returning.
+
+        Args:
+            timeout (float): Max seconds to wait per thread
+        """
+        if not self.running:
+            return
+
+        self.running = False
+        self.probe_queue.close()
+        dropped = self.probe_queue.clear()
+        with self.lock:
+            self.pending.clear()
+            self.stats['dropped'] += len(dropped)
+        for item in dropped:
+            for job in item['jobs']:
+                job.fail('Monitoring stopped', status='dropped')
+
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+        self.result_queue.close()
+        self.writer.join(timeout)
+        self.writer = None
+
+    def add_result_listener(self, listener):
+        """
+        Register a callable invoked as listener(result) after each result is saved.
+        The result dictionary gets an 'id' key with the database row ID.
+        """
+        self.listeners.append(listener)
+
+    def submit(self, url, timeout=5, job=None, schedule=None):
+        """
+        Queue a probe for a URL.
+        A URL that is already waiting in the queue is not queued twice,
+        and a URL whose previous probe is still running is skipped
+        (like APScheduler's max_instances=1).
+
+        Args:
+            url (str): URL to check
+            timeout (int): Request timeout in seconds
+            job (CheckJob): Job to complete with the result (optional).
+                Jobs are never skipped: while a probe for the URL is
+                running, the job joins that probe instead.
+            schedule (dict): For scheduled runs: 'scheduled_at' (planned
+                fire time) and 'interval' (seconds). Used to record the
+                start lag and the planned runs that never ran.
+
+        Returns:
+            bool: True if the probe is queued (or coalesced with a queued
+                  or running one)
+        """
+        key = normalize_url(url)
+
+        with self.lock:
+            self.stats['submitted'] += 1
+            queued = self.pending.get(key)
+            if queued is not None:
+                self.stats['coalesced'] += 1
+                if job is not None:
+                    queued['jobs'].append(job)
+                return True
+            if job is None and self.flights.in_flight(key):
+                self.stats['skipped_in_flight'] += 1
+                return True
+
+            item = {
+                'url': url,
+                'key': key,
+                'timeout': timeout,
+                'submitted_at': datetime.now(),
+                'schedule': schedule,
+                'jobs': [job] if job is not None else []
+            }
+            self.pending[key] = item
+
+        accepted, evicted = self.probe_queue.put(item, policy=self.overflow_policy)
+
+        with self.lock:
+            if evicted is not None:
+                self.pending.pop(evicted['key'], None)
+                self.stats['dropped'] += 1
+            if not accepted:
+                self.pending.pop(key, None)
+                self.stats['dropped'] += 1
+
+        if evicted is not None:
+            self._drop(evicted)
+        if not accepted:
+            self._drop(item)
+
+        return accepted
+
+    def submit_job(self, url, timeout=5):
+        """
+        Queue an on-demand check and return a job to poll.
+
+        Args:
+            url (str): URL to check
+            timeout (int): Request timeout in seconds
+
+        Returns:
+            CheckJob: Job that completes with the check result
+        """
+        job = self.jobs.create(url)
+        self.submit(url, timeout=timeout, job=job)
+        return job
+
+    def get_job(self, job_id):
+        """
+        Look up an on-demand check job.
+
+        Returns:
+            CheckJob: Job, or None if unknown or expired
+        """
+        return self.jobs.get(job_id)
+
+    def _drop(self, item):
+        """
+        Report a probe that was dropped from the queue.
+        """
+        logger.warning(f"⚠️  Probe queue full - dropped check for {item['url']}")
+        for job in item['jobs']:
+            job.fail('Probe queue full - try again later', status='dropped')
+
+    def _probe_loop(self):
+        """
+        Probe worker: take probes from the queue and pass results on.
+        """
+        while True:
+            item = self.probe_queue.get()
+            if item is None:
+                return
+
+            with self.lock:
+                self.pending.pop(item['key'], None)
+                self.stats['busy_workers'] += 1
+
+            for job in item['jobs']:
+                job.mark_running()
+
+            started = datetime.now()
+            try:
+                result = self.probe(item['url'], timeout=item['timeout'])
+            except Exception as e:
+                logger.error(f"❌ Probe for {item['url']} failed: {e}")
+                for job in item['jobs']:
+                    job.fail(str(e))
+                result = None
+
+            with self.lock:
+                self.stats['busy_workers'] -= 1
+                if result is not None:
+                    self.stats['probed'] += 1
+
+            if result is None:
+                continue
+
+            if item['schedule']:
+                self._record_schedule(item['key'], item['schedule'], started, result)
+
+            for job in item['jobs']:
+                job.complete(result)
+
+            # Joined another caller's probe - that caller saves the result
+            if result.get('coalesced'):
+                with self.lock:
+                    self.stats['joined_in_flight'] += 1
+                continue
+
+            # Blocks while the writer is behind (backpressure)
+            self.result_queue.put(result, policy='block')
+
+    def _record_schedule(self, key, schedule, started, result):
+        """
+        Add scheduling details to a result: planned start, lag of the
+        actual start, and planned runs since the previous executed run
+        that never ran (coalesced, skipped while in flight, dropped or
+        missed by the scheduler).
+        """
+        scheduled_at = schedule['scheduled_at']
+        interval = schedule.get('interval')
+
+        with self.lock:
+            previous = self.last_scheduled.get(key)
+            self.last_scheduled[key] = scheduled_at
+
+        missed_runs = 0
+        if previous is not None and interval:
+            elapsed = (scheduled_at - previous).total_seconds()
+            missed_runs = max(0, round(elapsed / interval) - 1)
+
+        result['scheduled_at'] = scheduled_at
+        result['schedule_lag'] = max(0.0, (started - scheduled_at).total_seconds())
+        result['missed_runs'] = missed_runs
+
+    def _write_loop(self):
+        """
+        Writer: persist results in batches and notify listeners.
+        """
+        while True:
+            batch = self.result_queue.get_batch(self.batch_size, timeout=1.0)
+            if not batch:
+                if self.result_queue.closed:
+                    return
+                continue
+
+            row_ids = self.save(batch)
+
+            with self.lock:
+                if row_ids:
+                    self.stats['saved'] += len(batch)
+                else:
+                    self.stats['write_errors'] += len(batch)
+
+            if not row_ids:
+                continue
+
+            for result, row_id in zip(batch, row_ids):
+                result['id'] = row_id
+                for listener in self.listeners:
+                    try:
+                        listener(result)
+                    except Exception as e:
+                        logger.error(f"❌ Result listener error: {e}")
+
+    def get_stats(self):
+        """
+        Get queue depths and counters.
+
+        Returns:
+            dict: Pipeline statistics
+        """
+        with self.lock:
+            stats = dict(self.stats)
+
+        stats.update({
+            'probes_executed': self.flights.get_stats()['executed'],
+            'probes_coalesced': self.flights.get_stats()['coalesced'],
+            'running': self.running,
+            'overflow_policy': self.overflow_policy,
+            'probe_queue_depth': len(self.probe_queue),
+            'probe_queue_peak': self.probe_queue.peak,
+            'probe_queue_size': self.probe_queue.maxsize,
+            'result_queue_depth': len(self.result_queue),
+            'result_queue_peak': self.result_queue.peak,
+            'result_queue_size': self.result_queue.maxsize
+        })
+        return stats
+
+
+# Shared pipeline instance
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """
+    Get the process-wide probe pipeline, starting it on first use.
+
+    Environment:
+        PROBE_WORKERS: Number of probe threads
+        PROBE_QUEUE_SIZE: Max probes waiting for a worker
+        RESULT_QUEUE_SIZE: Max results waiting to be written
+        QUEUE_OVERFLOW_POLICY: block, drop_oldest or drop_newest
+
+    Returns:
+        ProbePipeline: Running pipeline
+    """
+    global _pipeline
+
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = ProbePipeline(
+                probe_workers=int(os.getenv('PROBE_WORKERS', 4)),
+                probe_queue_size=int(os.getenv('PROBE_QUEUE_SIZE', 100)),
+                result_queue_size=int(os.getenv('RESULT_QUEUE_SIZE', 1000)),
+                overflow_policy=os.getenv('QUEUE_OVERFLOW_POLICY', 'drop_oldest'),
+                shared_jobs=uses_sqlite()
+            )
+            # Count what is stored before the writer adds to it
+            seed_stored_checks()
+            _pipeline.add_result_listener(record_result)
+        _pipeline.start()
+        return _pipeline
+
+
+def get_pipeline_stats():
+    """
+    Get statistics of the process-wide pipeline without starting it.
+
+    Returns:
+        dict: Pipeline statistics, or {'running': False} if never started
+    """
+    if _pipeline is None:
+        return {'running': False}
+    return _pipeline.get_stats()
+
+
+def stop_pipeline():
+    """
+    Stop the process-wide pipeline, flushing pending results.
+    """
+    global _pipeline
+
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+            _pipeline = None
@@ -0,0 +1,180 @@
+"""
+Rate limiting for outgoing probes.
+Token buckets keep the monitor from flooding a single host (or the network).
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Callers never get rejected: they reserve a token and are told how
+    long to wait for it, so probes queue up instead of being dropped.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum burst size (default max(1, rate))
+            clock (callable): Time source (tests)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take one token, borrowing from the future if the bucket is empty.
+
+        Returns:
+            float: Seconds the caller has to wait before using the token
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+def get_host_key(url):
+    """
+    Get the rate limiting key for a URL (host and port).
+
+    Args:
+        url (str): URL to probe
+
+    Returns:
+        str: Lowercase host, with port if one is given
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    return host
+
+
+class RateLimiter:
+    """
+    Global and per-host rate limiter for probes.
+
+    A rate of 0 or None disables that limit.
+    """
+
+    def __init__(self, global_rate=None, global_burst=None,
+                 per_host_rate=None, per_host_burst=None, clock=time.monotonic):
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock) if global_rate else None
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self.host_buckets = {}
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.acquired = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+
+    def _get_host_bucket(self, host):
+        """
+        Get (or create) the bucket for a host.
+        """
+        with self.lock:
+            bucket = self.host_buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.per_host_rate, self.per_host_burst, self.clock)
+                self.host_buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """
+        Block until a request to `url` is allowed.
+        The host limit is waited on first so a slow host does not hold
+        global tokens that other hosts could use.
+
+        Args:
+            url (str): URL about to be requested
+
+        Returns:
+            float: Seconds spent waiting in the queue
+        """
+        waited = 0.0
+
+        if self.per_host_rate:
+            delay = self._get_host_bucket(get_host_key(url)).reserve()
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+
+        if self.global_bucket:
+            delay = self.global_bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+
+        with self.lock:
+            self.acquired += 1
+            if waited > 0:
+                self.delayed += 1
+            self.total_wait += waited
+
+        return waited
+
+    def get_stats(self):
+        """
+        Get limiter statistics.
+
+        Returns:
+            dict: Acquired/delayed counts and total queue wait
+        """
+        with self.lock:
+            return {
+                'acquired': self.acquired,
+                'delayed': self.delayed,
+                'total_wait': round(self.total_wait, 3),
+                'hosts': len(self.host_buckets)
+            }
+
+
+# Shared limiter instance
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Get the process-wide rate limiter, configured from environment.
+
+    Environment:
+        RATE_LIMIT_GLOBAL: Max probe requests per second overall (0 = off)
+        RATE_LIMIT_GLOBAL_BURST: Global burst size
+        RATE_LIMIT_PER_HOST: Max probe requests per second per host (0 = off)
+        RATE_LIMIT_PER_HOST_BURST: Per-host burst size
+
+    Returns:
+        RateLimiter: Shared limiter
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                global_rate=float(os.getenv('RATE_LIMIT_GLOBAL', 10)),
+                global_burst=float(os.getenv('RATE_LIMIT_GLOBAL_BURST', 10)),
+                per_host_rate=float(os.getenv('RATE_LIMIT_PER_HOST', 1)),
+                per_host_burst=float(os.getenv('RATE_LIMIT_PER_HOST_BURST', 2))
+            )
+        return _rate_limiter
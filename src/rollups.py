@@ -0,0 +1,518 @@
+"""
+Rollups: downsampled check history for periods whose raw checks are gone.
+
+Tiers, each summing the tier below it:
+    raw checks   DATA_RETENTION_DAYS (daily partitions, see database.py)
+    rollup_1m    per URL and minute, ROLLUP_MINUTE_DAYS
+    rollup_1h    per URL and hour, ROLLUP_HOUR_DAYS (0 = forever)
+    rollup_1d    per URL and day, forever
+
+A rollup row holds counts, time-weighted seconds (each check's previous
+state, at most UPTIME_MAX_GAP seconds, in the bucket where it ended) and
+response time sums, so uptime and averages combine exactly across buckets.
+
+compact() moves each tier's watermark forward in small batches, one short
+transaction each, and prunes expired rows a day at a time. Raw partitions
+are only dropped once rolled up (see compacted_until()). Checks saved or
+relinked behind the minute watermark later (imports, backfills, delayed
+agent batches) are logged to rollup_pending by partition triggers and
+added to the tiers that already cover them, so dropping their partition
+loses nothing. rollup_totals() gives analytics the part of a period older
+than the oldest raw check.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from src.database import (
+    get_connection, close_connection, get_urls, list_partitions,
+    partition_name, PARTITION_PREFIX
+)
+from src.instrumentation import timed
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Keep downsampled history (otherwise retention just drops old checks)
+ROLLUPS_ENABLED = os.getenv('ROLLUPS', 'true').lower() in ('1', 'true', 'yes')
+
+# Days of 1-minute rollups to keep
+ROLLUP_MINUTE_DAYS = int(os.getenv('ROLLUP_MINUTE_DAYS', 90))
+
+# Days of hourly rollups to keep (0 = forever); daily rollups are never pruned
+ROLLUP_HOUR_DAYS = int(os.getenv('ROLLUP_HOUR_DAYS', 0))
+
+# Minutes of raw checks rolled up per transaction
+ROLLUP_BATCH_MINUTES = int(os.getenv('ROLLUP_BATCH_MINUTES', 60))
+
+# Longest time (seconds) one check's state counts for; the same setting as
+# the time-weighted uptime, fixed into the rollups when they are built
+ROLLUP_MAX_GAP = int(os.getenv('UPTIME_MAX_GAP', 300))
+
+# Checks may be saved a little after they ran; recent minutes wait this long
+COMPACTION_DELAY = timedelta(minutes=5)
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Bucket format of the minute tier
+MINUTE_FORMAT = '%Y-%m-%d %H:%M:00'
+
+# Tiers built from the tier before them: (tier, table, bucket format, batch)
+COARSER_TIERS = [
+    ('1h', 'rollup_1h', '%Y-%m-%d %H:00:00', timedelta(days=1)),
+    ('1d', 'rollup_1d', '%Y-%m-%d 00:00:00', timedelta(days=31)),
+]
+
+MINUTE_ROLLUP_SQL = '''
+    INSERT INTO rollup_1m
+    SELECT
+        strftime('%Y-%m-%d %H:%M:00', timestamp),
+        url,
+        COUNT(*),
+        SUM(success = 1),
+        SUM(MIN(IFNULL(prev_gap, 0), :max_gap)),
+        SUM(CASE WHEN prev_success = 1 THEN MIN(IFNULL(prev_gap, 0), :max_gap) ELSE 0 END),
+        COUNT(CASE WHEN success = 1 THEN response_time END),
+        SUM(CASE WHEN success = 1 THEN response_time END),
+        MIN(CASE WHEN success = 1 THEN response_time END),
+        MAX(CASE WHEN success = 1 THEN response_time END)
+    FROM {table}
+    WHERE url = :url AND timestamp >= :start AND timestamp < :end
+    GROUP BY 1
+'''
+
+COARSER_ROLLUP_SQL = '''
+    INSERT INTO {table}
+    SELECT
+        strftime(:format, bucket),
+        url,
+        SUM(checks),
+        SUM(successes),
+        SUM(seconds),
+        SUM(up_seconds),
+        SUM(rt_count),
+        SUM(rt_sum),
+        MIN(rt_min),
+        MAX(rt_max)
+    FROM {source}
+    WHERE bucket >= :start AND bucket < :end
+    GROUP BY 1, 2
+'''
+
+# Adds logged late changes (see database.ROLLUP_PENDING_COLUMNS) to the
+# buckets of one tier that it has already rolled up and still keeps
+FOLD_PENDING_SQL = '''
+    INSERT INTO {table}
+    SELECT
+        strftime(:format, timestamp),
+        url,
+        SUM(checks),
+        SUM(checks * (success = 1)),
+        SUM(sign * MIN(IFNULL(prev_gap, 0), :max_gap)),
+        SUM(CASE WHEN prev_success = 1 THEN sign * MIN(IFNULL(prev_gap, 0), :max_gap) ELSE 0 END),
+        COUNT(CASE WHEN checks = 1 AND success = 1 THEN response_time END),
+        SUM(CASE WHEN checks = 1 AND success = 1 THEN response_time END),
+        MIN(CASE WHEN checks = 1 AND success = 1 THEN response_time END),
+        MAX(CASE WHEN checks = 1 AND success = 1 THEN response_time END)
+    FROM rollup_pending
+    WHERE id <= :last
+        AND strftime(:format, timestamp) >= :kept_from
+        AND strftime(:format, timestamp) < :watermark
+    GROUP BY 1, 2
+    ON CONFLICT (bucket, url) DO UPDATE SET
+        checks = checks + excluded.checks,
+        successes = successes + excluded.successes,
+        seconds = seconds + excluded.seconds,
+        up_seconds = up_seconds + excluded.up_seconds,
+        rt_count = rt_count + excluded.rt_count,
+        rt_sum = CASE WHEN excluded.rt_sum IS NULL THEN rt_sum
+                      ELSE IFNULL(rt_sum, 0) + excluded.rt_sum END,
+        rt_min = MIN(IFNULL(rt_min, excluded.rt_min), IFNULL(excluded.rt_min, rt_min)),
+        rt_max = MAX(IFNULL(rt_max, excluded.rt_max), IFNULL(excluded.rt_max, rt_max))
+'''
+
+TOTALS_SQL = '''
+    SELECT
+        SUM(checks), SUM(successes), SUM(seconds), SUM(up_seconds),
+        SUM(rt_count), SUM(rt_sum), MIN(rt_min), MAX(rt_max)
+    FROM {table}
+    WHERE bucket >= ? AND bucket < ?{url_filter}
+'''
+
+
+def _parse(timestamp):
+    return datetime.strptime(timestamp, TIME_FORMAT)
+
+
+def _format(moment):
+    return moment.strftime(TIME_FORMAT)
+
+
+def _day_start(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _partition_start(name):
+    return datetime.strptime(name[len(PARTITION_PREFIX):], '%Y%m%d')
+
+
+def _get_state(cursor, tier):
+    """
+    Returns:
+        tuple: (watermark, kept_from) of a tier; watermark is None before
+            its first compaction, kept_from '' while nothing was pruned
+    """
+    cursor.execute('SELECT watermark, kept_from FROM rollup_state WHERE tier = ?', (tier,))
+    row = cursor.fetchone()
+    return row if row else (None, '')
+
+
+def _set_state(cursor, tier, watermark=None, kept_from=None):
+    watermark_now, kept_now = _get_state(cursor, tier)
+    cursor.execute(
+        'INSERT OR REPLACE INTO rollup_state (tier, watermark, kept_from) VALUES (?, ?, ?)',
+        (tier,
+         watermark if watermark is not None else watermark_now,
+         kept_from if kept_from is not None else kept_now)
+    )
+
+
+def raw_from(cursor):
+    """
+    Start of the oldest raw partition: checks before it only exist as rollups.
+
+    Returns:
+        str: Timestamp, or None if there are no partitions
+    """
+    partitions = list_partitions(cursor)
+    if not partitions:
+        return None
+    return _format(_partition_start(partitions[0]))
+
+
+def _compact_minutes(conn, now):
+    """
+    Roll up the next batch of raw checks into minutes.
+
+    Returns:
+        bool: True if the watermark moved (more work may be left)
+    """
+    cursor = conn.cursor()
+    watermark, _ = _get_state(cursor, '1m')
+    partitions = list_partitions(cursor)
+    if watermark is None:
+        if not partitions:
+            return False
+        watermark = _format(_partition_start(partitions[0]))
+
+    limit = (now - COMPACTION_DELAY).replace(second=0, microsecond=0)
+    start = _parse(watermark)
+    if start >= limit:
+        return False
+
+    # Batches never cross midnight, so each reads a single partition
+    end = min(start + timedelta(minutes=ROLLUP_BATCH_MINUTES),
+              _day_start(start) + timedelta(days=1), limit)
+    table = partition_name(start)
+
+    if table in partitions:
+        for url in get_urls(conn, partition=table):
+            cursor.execute(MINUTE_ROLLUP_SQL.format(table=table), {
+                'url': url,
+                'start': _format(start),
+                'end': _format(end),
+                'max_gap': ROLLUP_MAX_GAP
+            })
+    else:
+        # Nothing stored on that day: skip to the next partition
+        later = [name for name in partitions if name > table]
+        end = min(_partition_start(later[0]), limit) if later else limit
+
+    _set_state(cursor, '1m', watermark=_format(end))
+    conn.commit()
+    return True
+
+
+def _fold_pending(conn):
+    """
+    Add the checks logged behind the minute watermark to every tier that
+    has already rolled up (and still keeps) their bucket. Tiers that have
+    not reached the bucket yet pick them up from the tier below.
+
+    Returns:
+        int: Logged changes folded in
+    """
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('SELECT MAX(id), COUNT(*) FROM rollup_pending')
+    last, count = cursor.fetchone()
+    if not count:
+        conn.commit()
+        return 0
+
+    tiers = [('1m', 'rollup_1m', MINUTE_FORMAT)] + [
+        (tier, table, bucket_format) for tier, table, bucket_format, _ in COARSER_TIERS]
+    for tier, table, bucket_format in tiers:
+        watermark, kept_from = _get_state(cursor, tier)
+        if watermark is None:
+            continue
+        cursor.execute(FOLD_PENDING_SQL.format(table=table), {
+            'format': bucket_format,
+            'max_gap': ROLLUP_MAX_GAP,
+            'last': last,
+            'kept_from': kept_from,
+            'watermark': watermark
+        })
+    cursor.execute('DELETE FROM rollup_pending WHERE id <= ?', (last,))
+    conn.commit()
+    return count
+
+
+def _compact_coarser(conn, tier, table, bucket_format, source, source_tier, batch):
+    """
+    Roll up the next batch of a finer tier (up to its watermark) into
+    hours or days.
+
+    Returns:
+        bool: True if the watermark moved
+    """
+    cursor = conn.cursor()
+    source_watermark, _ = _get_state(cursor, source_tier)
+    if source_watermark is None:
+        return False
+    watermark, _ = _get_state(cursor, tier)
+    if watermark is None:
+        cursor.execute(f'SELECT MIN(bucket) FROM {source}')
+        first = cursor.fetchone()[0] or source_watermark
+        watermark = _format(_day_start(_parse(first)))
+
+    # Only whole buckets the finer tier has completely covered
+    limit = _parse(_parse(source_watermark).strftime(bucket_format))
+    start = _parse(watermark)
+    if start >= limit:
+        return False
+    end = min(start + batch, limit)
+
+    cursor.execute(COARSER_ROLLUP_SQL.format(table=table, source=source), {
+        'format': bucket_format,
+        'start': _format(start),
+        'end': _format(end)
+    })
+    _set_state(cursor, tier, watermark=_format(end))
+    conn.commit()
+    return True
+
+
+def _prune(conn, tier, table, keep_days, limit):
+    """
+    Delete the oldest day of a tier once it is older than keep_days and
+    rolled up into the next tier (before `limit`).
+
+    Returns:
+        int: Rows deleted
+    """
+    if keep_days <= 0 or limit is None:
+        return 0
+    cursor = conn.cursor()
+    _, kept_from = _get_state(cursor, tier)
+    cutoff = min(_day_start(datetime.now() - timedelta(days=keep_days)),
+                 _day_start(_parse(limit)))
+
+    cursor.execute(f'SELECT MIN(bucket) FROM {table}')
+    oldest = cursor.fetchone()[0]
+    if oldest is None or _parse(oldest) >= cutoff:
+        return 0
+
+    day_end = _day_start(_parse(oldest)) + timedelta(days=1)
+    cursor.execute(f'DELETE FROM {table} WHERE bucket < ?', (_format(day_end),))
+    deleted = cursor.rowcount
+    _set_state(cursor, tier, kept_from=max(kept_from, _format(day_end)))
+    conn.commit()
+    return deleted
+
+
+@timed('rollups.compact')
+def compact(max_batches=100):
+    """
+    Advance every rollup tier by at most max_batches batches and prune
+    one expired day per tier. Each batch is its own transaction, so
+    writers are never held up for long; call it again to continue.
+
+    Args:
+        max_batches (int): Batch limit per tier
+
+    Returns:
+        int: Batches done, pruned days included (0 when up to date or disabled)
+    """
+    if not ROLLUPS_ENABLED:
+        return 0
+
+    conn = None
+    try:
+        conn = get_connection()
+        now = datetime.now()
+        done = 0
+
+        # Checks saved behind the watermarks since the last run
+        if _fold_pending(conn):
+            done += 1
+        for _ in range(max_batches):
+            if not _compact_minutes(conn, now):
+                break
+            done += 1
+        source_tier, source = '1m', 'rollup_1m'
+        for tier, table, bucket_format, batch in COARSER_TIERS:
+            for _ in range(max_batches):
+                if not _compact_coarser(conn, tier, table, bucket_format, source,
+                                        source_tier, batch):
+                    break
+                done += 1
+            source_tier, source = tier, table
+
+        # Finer tiers expire once the next tier holds their data
+        cursor = conn.cursor()
+        if _prune(conn, '1m', 'rollup_1m', ROLLUP_MINUTE_DAYS, _get_state(cursor, '1h')[0]):
+            done += 1
+        if _prune(conn, '1h', 'rollup_1h', ROLLUP_HOUR_DAYS, _get_state(cursor, '1d')[0]):
+            done += 1
+
+        close_connection(conn)
+        return done
+
+    except Exception as e:
+        logger.error(f"❌ Error compacting rollups: {e}")
+        if conn:
+            conn.rollback()
+            close_connection(conn)
+        return 0
+
+
+def compacted_until():
+    """
+    Time up to which raw checks are rolled up (retention must not drop
+    anything newer).
+
+    Returns:
+        datetime: Minute watermark (datetime.min before the first
+            compaction), or None if rollups are disabled
+    """
+    if not ROLLUPS_ENABLED:
+        return None
+    conn = get_connection()
+    try:
+        watermark, _ = _get_state(conn.cursor(), '1m')
+    finally:
+        close_connection(conn)
+    return _parse(watermark) if watermark else datetime.min
+
+
+@timed('rollups.rollup_totals')
+def rollup_totals(cutoff=None, url=None, conn=None):
+    """
+    Sum the rollups for the part of a period older than the oldest raw
+    check, using the finest tier kept for each stretch.
+
+    Args:
+        cutoff (datetime): Period start (None = since monitoring started)
+        url (str): Filter by URL (optional)
+        conn: Open connection to use (optional)
+
+    Returns:
+        dict: checks, successes, seconds, up_seconds, rt_count, rt_sum,
+            rt_min, rt_max; None if no rollup covers the period
+    """
+    if not ROLLUPS_ENABLED:
+        return None
+
+    own_connection = conn is None
+    if own_connection:
+        conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        first_raw = raw_from(cursor)
+        if first_raw is None:
+            return None
+        start = cutoff.strftime(TIME_FORMAT) if cutoff else ''
+        if start >= first_raw:
+            return None
+
+        minute_from = _get_state(cursor, '1m')[1]
+        hour_from = _get_state(cursor, '1h')[1]
+        stretches = [
+            ('rollup_1m', max(start, minute_from), first_raw),
+            ('rollup_1h', max(start, hour_from), min(minute_from, first_raw)),
+            ('rollup_1d', start, min(hour_from, first_raw)),
+        ]
+
+        url_filter = " AND url = ?" if url else ""
+        totals = None
+        for table, lower, upper in stretches:
+            if lower >= upper:
+                continue
+            params = [lower, upper] + ([url] if url else [])
+            cursor.execute(TOTALS_SQL.format(table=table, url_filter=url_filter), params)
+            row = cursor.fetchone()
+            if not row[0]:
+                continue
+            row = dict(zip(
+                ('checks', 'successes', 'seconds', 'up_seconds', 'rt_count', 'rt_sum',
+                 'rt_min', 'rt_max'), row))
+            if totals is None:
+                totals = row
+                continue
+            for key in ('checks', 'successes', 'seconds', 'up_seconds', 'rt_count'):
+                totals[key] += row[key]
+            totals['rt_sum'] = (totals['rt_sum'] or 0) + (row['rt_sum'] or 0)
+            for key, pick in (('rt_min', min), ('rt_max', max)):
+                values = [value for value in (totals[key], row[key]) if value is not None]
+                totals[key] = pick(values) if values else None
+        return totals
+    finally:
+        if own_connection:
+            close_connection(conn)
+
+
+def tier_segments(cursor, tier, start, end):
+    """
+    Split a period into the stretches read from rollups (of `tier`, or a
+    coarser tier where `tier` was pruned) and the recent rest that is only
+    stored raw.
+
+    Args:
+        cursor: Database cursor
+        tier (str): '1m', '1h' or '1d'
+        start (str): Period start timestamp
+        end (str): Period end timestamp (exclusive)
+
+    Returns:
+        tuple: ([(table, lower, upper), ...], raw_start): rollup stretches
+            and the start of the raw stretch [raw_start, end)
+    """
+    tiers = ['1m', '1h', '1d']
+    watermark = _get_state(cursor, tier)[0] if ROLLUPS_ENABLED else None
+    if not watermark:
+        return [], start
+
+    segments = []
+    upper = min(end, watermark)
+    for name in tiers[tiers.index(tier):]:
+        kept_from = _get_state(cursor, name)[1]
+        lower = max(start, kept_from)
+        if lower < upper:
+            segments.append((f'rollup_{name}', lower, upper))
+        # Coarser tiers only for what this one no longer keeps
+        upper = min(upper, kept_from)
+    return segments, max(start, watermark)
+
+
+def reaches_rollups(cutoff=None):
+    """
+    Returns:
+        bool: True if a period starting at cutoff needs rollups (some of
+            its checks are no longer stored raw)
+    """
+    try:
+        return rollup_totals(cutoff) is not None
+    except Exception as e:
+        logger.error(f"❌ Error reading rollups: {e}")
+        return False
@@ -1,84 +1,276 @@
 """
 Scheduler module for automated website monitoring.
 Runs checks at regular intervals.
+
+APScheduler is only imported by start_monitoring(), so importing this
+module (e.g. for get_monitor_urls()) stays cheap. Environment variables
+are loaded by the entry points (run.py, serve.py).
 """
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 import os
-from dotenv import load_dotenv
-
-from src.monitor import check_website
-from src.database import init_database, save_check
-from src.logger import setup_logger
+import threading
+from datetime import datetime
 
-# Load environment variables
-load_dotenv()
+from src.database import DATA_RETENTION_DAYS
+from src.storage import get_storage, uses_sqlite
+from src import alerts, anomaly, hotstore, rollups, slo
+from src.pipeline import get_pipeline, stop_pipeline
+from src.logger import setup_logger, get_check_logger
+from src.instrumentation import timed
+from src.metrics import scheduler_misfires_total, seed_stored_checks, record_expired
 
 # Initialize logger
 logger = setup_logger()
+check_logger = get_check_logger()
 
 # Global scheduler instance
 scheduler = None
 
-def check_and_save():
+# Planned fire time of the run each job is about to execute (job id -> datetime)
+_planned_runs = {}
+_planned_runs_lock = threading.Lock()
+
+# Prefix of per-target job ids
+JOB_ID_PREFIX = 'website_check:'
+
+# Id of the job dropping expired partitions
+RETENTION_JOB_ID = 'retention'
+
+# How often expired partitions are dropped
+RETENTION_INTERVAL_HOURS = 1
+
+# Id of the job rolling up older checks, and how often it runs
+ROLLUP_JOB_ID = 'rollups'
+ROLLUP_INTERVAL_SECONDS = 60
+
+
+def planned_time_executor():
+    """
+    Create a thread pool executor that remembers the planned fire time of
+    each submitted run, so check_and_save() can compare it to the actual
+    start. Recorded before the run is handed to the pool, so the job
+    always sees it. Runs merged by coalesce=True are counted as well.
+    
+    Returns:
+        ThreadPoolExecutor: APScheduler executor
+    """
+    from apscheduler.executors.pool import ThreadPoolExecutor
+    
+    class PlannedTimeExecutor(ThreadPoolExecutor):
+        
+        def _do_submit_job(self, job, run_times):
+            planned = run_times[-1].astimezone().replace(tzinfo=None)
+            with _planned_runs_lock:
+                _planned_runs[job.id] = planned
+            if len(run_times) > 1 and job.id.startswith(JOB_ID_PREFIX):
+                url = job.id[len(JOB_ID_PREFIX):]
+                scheduler_misfires_total.inc(len(run_times) - 1, url=url, reason='coalesced')
+            super()._do_submit_job(job, run_times)
+    
+    return PlannedTimeExecutor()
+
+
+def on_job_misfire(event):
+    """
+    Scheduler listener: count runs that APScheduler skipped, either because
+    they were too late (misfire) or the previous run was still going.
+    
+    Args:
+        event: APScheduler JobExecutionEvent / JobSubmissionEvent
+    """
+    from apscheduler.events import EVENT_JOB_MISSED
+    
+    if not event.job_id.startswith(JOB_ID_PREFIX):
+        return
+    
+    url = event.job_id[len(JOB_ID_PREFIX):]
+    reason = 'misfire' if event.code == EVENT_JOB_MISSED else 'max_instances'
+    scheduler_misfires_total.inc(url=url, reason=reason)
+    logger.warning(f"⚠️  Skipped scheduled check for {url} ({reason})")
+
+def get_monitor_urls():
+    """
+    Get the list of URLs to monitor.
+    MONITOR_URL may hold several comma-separated URLs.
+    
+    Returns:
+        list: URLs to monitor
+    """
+    urls = os.getenv('MONITOR_URL', 'https://example.com')
+    return [url.strip() for url in urls.split(',') if url.strip()]
+
+
+@timed('scheduler.check_and_save')
+def check_and_save(url=None):
     """
-    Check website and save result to database.
-    This function is called by the scheduler.
+    Queue a website check; the probe pipeline checks it and saves the result.
+    This function is called by the scheduler and returns immediately,
+    so a slow probe or a slow disk never stalls the scheduler thread.
+    
+    Args:
+        url (str): URL to check (default: first configured URL)
     """
     try:
         # Get URL from environment
-        url = os.getenv('MONITOR_URL', 'https://example.com')
+        if url is None:
+            url = get_monitor_urls()[0]
         timeout = int(os.getenv('TIMEOUT', 5))
+        interval = int(os.getenv('CHECK_INTERVAL', 30))
         
-        # Check website
-        result = check_website(url, timeout=timeout)
+        # When was this run supposed to start? (now for unscheduled runs)
+        with _planned_runs_lock:
+            planned = _planned_runs.pop(JOB_ID_PREFIX + url, None)
+        schedule = {
+            'scheduled_at': planned or datetime.now(),
+            'interval': interval
+        }
         
-        # Save to database
-        row_id = save_check(result)
-        
-        if row_id:
-            logger.info(f"💾 Saved check result to database (ID: {row_id})")
+        # Hand over to the probe workers (rate limited per host and globally)
+        get_pipeline().submit(url, timeout=timeout, schedule=schedule)
         
     except Exception as e:
         logger.error(f"❌ Error in scheduled check: {e}")
 
 
+@timed('scheduler.apply_retention')
+def apply_retention():
+    """
+    Drop checks older than DATA_RETENTION_DAYS (whole daily partitions),
+    but only once they are rolled up when rollups are enabled.
+    Called by the scheduler every RETENTION_INTERVAL_HOURS.
+    """
+    try:
+        until = rollups.compacted_until() if uses_sqlite() else None
+        # Seed first, so the dropped checks are subtracted exactly once
+        seed_stored_checks()
+        removed = get_storage().cleanup_old_checks(DATA_RETENTION_DAYS, until=until)
+        record_expired(removed)
+    except Exception as e:
+        logger.error(f"❌ Error applying data retention: {e}")
+
+
+@timed('scheduler.compact_rollups')
+def compact_rollups():
+    """
+    Roll up older checks into minute/hour/day tiers, a few short batches
+    at a time. Called by the scheduler every ROLLUP_INTERVAL_SECONDS.
+    """
+    try:
+        batches = rollups.compact()
+        if batches:
+            logger.info(f"📉 Compacted {batches} rollup batches")
+    except Exception as e:
+        logger.error(f"❌ Error compacting rollups: {e}")
+
+
+def log_saved_check(result):
+    """
+    Pipeline listener: log each persisted check.
+    
+    Args:
+        result (dict): Saved check result (with 'id')
+    """
+    check_logger.info("💾 Saved check result to database (ID: %s)", result['id'],
+                      extra={'url': result['url'], 'check_id': result['id']})
+
+
 def start_monitoring():
     """
     Start the monitoring scheduler.
     Checks website at regular intervals.
     """
     global scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+    from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
     
     # Initialize database
-    init_database()
+    get_storage().init()
+    
+    # Start probe workers and result writer
+    pipeline = get_pipeline()
+    if log_saved_check not in pipeline.listeners:
+        pipeline.add_result_listener(log_saved_check)
+    
+    # Latency baselines and flap rates, updated as checks are saved
+    if anomaly.ANOMALY_DETECTION and anomaly.record_result not in pipeline.listeners:
+        pipeline.add_result_listener(anomaly.record_result)
+    
+    # Error budgets and burn rates, counted as checks are saved
+    if slo.SLO_ENABLED and slo.record_result not in pipeline.listeners:
+        pipeline.add_result_listener(slo.record_result)
+    
+    # Evaluate alert rules on each saved check (in memory, no queries)
+    if alerts.ALERTS_ENABLED and alerts.evaluate_result not in pipeline.listeners:
+        alerts.get_alert_engine()
+        pipeline.add_result_listener(alerts.evaluate_result)
     
     # Get configuration
-    url = os.getenv('MONITOR_URL', 'https://example.com')
+    urls = get_monitor_urls()
     interval = int(os.getenv('CHECK_INTERVAL', 30))
     
-    logger.info(f"🏁 Starting monitoring for {url}")
+    # Hot-store rings must match the database (another process or a crash
+    # may have written checks the rings never saw)
+    if hotstore.HOTSTORE_ENABLED and uses_sqlite():
+        hotstore.verify_all(urls, repair=True)
+    
+    logger.info(f"🏁 Starting monitoring for {', '.join(urls)}")
     logger.info(f"⏳ Checking every {interval} seconds")
     
     # Create scheduler
-    scheduler = BackgroundScheduler()
+    scheduler = BackgroundScheduler(executors={'default': planned_time_executor()})
+    scheduler.add_listener(on_job_misfire, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
     
-    # Add job
-    scheduler.add_job(
-        check_and_save,
-        trigger=IntervalTrigger(seconds=interval),
-        id='website_check',
-        name='Website availability check',
-        replace_existing=True
-    )
+    # Add one job per target. A late run still executes (and records its lag)
+    # unless it is more than a whole interval late.
+    for url in urls:
+        scheduler.add_job(
+            check_and_save,
+            trigger=IntervalTrigger(seconds=interval),
+            args=[url],
+            id=JOB_ID_PREFIX + url,
+            name=f'Website availability check ({url})',
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=interval,
+            replace_existing=True
+        )
+    
+    # Drop expired days regularly (dropping a partition is cheap, so
+    # retention runs hourly and never needs a maintenance window)
+    if DATA_RETENTION_DAYS > 0:
+        scheduler.add_job(
+            apply_retention,
+            trigger=IntervalTrigger(hours=RETENTION_INTERVAL_HOURS),
+            id=RETENTION_JOB_ID,
+            name=f'Data retention ({DATA_RETENTION_DAYS} days)',
+            coalesce=True,
+            max_instances=1,
+            replace_existing=True
+        )
+        logger.info(f"🗑️  Keeping {DATA_RETENTION_DAYS} days of checks")
+    
+    # Downsample history as it ages (small batches, so writers never wait long)
+    if rollups.ROLLUPS_ENABLED and uses_sqlite():
+        scheduler.add_job(
+            compact_rollups,
+            trigger=IntervalTrigger(seconds=ROLLUP_INTERVAL_SECONDS),
+            id=ROLLUP_JOB_ID,
+            name='Rollup compaction',
+            coalesce=True,
+            max_instances=1,
+            replace_existing=True
+        )
     
     # Start scheduler
     scheduler.start()
     logger.info("✅ Scheduler started")
     
-    # Run first check immediately
-    check_and_save()
+    # Run first checks (and retention) immediately
+    for url in urls:
+        check_and_save(url)
+    if DATA_RETENTION_DAYS > 0:
+        apply_retention()
 
 
 def stop_monitoring():
@@ -92,6 +284,13 @@ def stop_monitoring():
         logger.info("🛑 Scheduler stopped")
     else:
         logger.info("⚠️  Scheduler is not running")
+    
+    # Flush results that are still queued for the database
+    stop_pipeline()
+    alerts.stop_alerts()
+    anomaly.reset_detector()
+    slo.reset_tracker()
+    hotstore.close_all()
 
 
 def is_running():
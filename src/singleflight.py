@@ -0,0 +1,140 @@
+"""
+Single-flight registry for probes.
+Concurrent requests for the same URL share one in-flight probe and its result.
+"""
+
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+
+# Ports that are implied by the scheme
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """
+    Normalize a URL so equivalent spellings map to the same key.
+    Lowercases scheme and host, drops default ports and fragments,
+    and uses '/' for an empty path.
+
+    Args:
+        url (str): URL to normalize
+
+    Returns:
+        str: Normalized URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and DEFAULT_PORTS.get(scheme) != parts.port:
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+class _Call:
+    """
+    One in-flight call and its outcome.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key.
+    The first caller (leader) runs the function; callers arriving while
+    it runs wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+        # Statistics
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call with the same key is already running.
+
+        Args:
+            key (str): Deduplication key
+            fn (callable): Function to run
+
+        Returns:
+            tuple: (result, shared) - shared is True if the result came
+                   from another caller's in-flight call
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self.calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self, key):
+        """
+        Check whether a call with this key is running.
+
+        Args:
+            key (str): Deduplication key
+
+        Returns:
+            bool: True if running
+        """
+        with self.lock:
+            return key in self.calls
+
+    def get_stats(self):
+        """
+        Get registry statistics.
+
+        Returns:
+            dict: Executed and coalesced call counts, calls in flight
+        """
+        with self.lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self.calls)
+            }
+
+
+# Shared registry for all probes in this process
+_probe_flights = SingleFlight()
+
+
+def get_probe_flights():
+    """
+    Get the process-wide probe registry.
+
+    Returns:
+        SingleFlight: Shared registry
+    """
+    return _probe_flights
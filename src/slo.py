@@ -0,0 +1,491 @@
+"""
+Service level objectives: error budgets and burn rates per target.
+
+Each URL has an objective (SLO_OBJECTIVE percent of checks good over the
+last SLO_WINDOW_DAYS days, overridable per URL with SLO_TARGETS). A check
+is good if it succeeded and, with a latency threshold, answered within it.
+
+Good and total checks are kept in rolling-window counters: a ring of time
+buckets per window with running sums, so adding a check and reading a
+window are both O(1) (amortized over expired buckets), however many checks
+the window holds:
+
+    window     SLO_WINDOW_DAYS in hourly buckets: SLI and error budget
+    5m ... 3d  burn-rate windows in 60 buckets each
+
+The burn rate of a window is its error rate over the error rate the
+objective allows (1 = the budget lasts exactly the SLO window). Alerts
+follow the multi-window scheme of the Google SRE workbook: a long window
+shows the budget is burning fast enough to spend BURN_ALERTS' share of it,
+and a short one that it still is.
+
+The scheduler feeds the tracker from the pipeline's result listener. A
+process without it (the dashboard) seeds the counters once from stored
+checks (with the minute rollups for anything older than the raw checks)
+and then catches up on newer checks by id.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from src.database import get_connection, close_connection, get_urls
+from src.storage import uses_sqlite
+from src import rollups
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Track SLOs of saved checks
+SLO_ENABLED = os.getenv('SLO', 'true').lower() in ('1', 'true', 'yes')
+
+# Percent of checks that must be good over the SLO window
+SLO_OBJECTIVE = float(os.getenv('SLO_OBJECTIVE', 99.9))
+
+# Days the objective and its error budget cover
+SLO_WINDOW_DAYS = int(os.getenv('SLO_WINDOW_DAYS', 30))
+
+# Successful checks slower than this many seconds are bad too (0 = availability only)
+SLO_LATENCY = float(os.getenv('SLO_LATENCY', 0))
+
+# Per-URL overrides: url=objective[:latency], comma-separated
+SLO_TARGETS = os.getenv('SLO_TARGETS', '')
+
+# Burn-rate windows: (name, seconds)
+BURN_WINDOWS = [
+    ('5m', 300),
+    ('30m', 1800),
+    ('1h', 3600),
+    ('6h', 6 * 3600),
+    ('1d', 86400),
+    ('3d', 3 * 86400),
+]
+
+# (severity, long window, short window, share of the budget the long
+# window would spend): 2% in 1h and 5% in 6h page, 10% in 3d is a ticket.
+# With a 30-day window these are burn rates of 14.4, 6 and 1.
+BURN_ALERTS = [
+    ('page', '1h', '5m', 0.02),
+    ('page', '6h', '30m', 0.05),
+    ('ticket', '3d', '6h', 0.10),
+]
+
+# Buckets per burn-rate window (a window's edge is this precise)
+WINDOW_BUCKETS = 60
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SEED_SQL = '''
+    SELECT strftime('%Y-%m-%d %H:%M:00', timestamp), COUNT(*),
+           COUNT(CASE WHEN success = 1 AND (:latency <= 0 OR response_time <= :latency) THEN 1 END),
+           MAX(timestamp)
+    FROM checks
+    WHERE url = :url AND timestamp >= :start AND id <= :last_id
+    GROUP BY 1
+'''
+
+SEED_ROLLUPS_SQL = '''
+    SELECT bucket, url, checks, successes
+    FROM rollup_1m
+    WHERE bucket >= ? AND bucket < ?
+'''
+
+
+def _epoch(timestamp):
+    if hasattr(timestamp, 'timestamp'):
+        return timestamp.timestamp()
+    return datetime.fromisoformat(str(timestamp)[:19]).timestamp()
+
+
+def _format_timestamp(timestamp):
+    if hasattr(timestamp, 'strftime'):
+        return timestamp.strftime(TIME_FORMAT)
+    return str(timestamp)[:19] if timestamp else None
+
+
+def parse_slo_targets(value):
+    """
+    Parse SLO_TARGETS.
+
+    Args:
+        value (str): Comma-separated url=objective[:latency] entries
+
+    Returns:
+        dict: url -> (objective percent, latency seconds or None for the default)
+    """
+    targets = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            url, definition = entry.rsplit('=', 1)
+            objective, _, latency = definition.partition(':')
+            objective = float(objective)
+            if not 0 < objective < 100:
+                raise ValueError('objective must be between 0 and 100')
+            targets[url.strip()] = (objective, float(latency) if latency else None)
+        except ValueError as e:
+            logger.warning(f"⚠️  Ignoring SLO target '{entry}': {e}")
+    return targets
+
+
+class RollingCounter:
+    """
+    Good and total checks over the last `seconds`, in `buckets` time
+    buckets with running sums. Buckets older than the window are dropped
+    as time moves on, so a window ends up to one bucket wider than
+    `seconds` just before one expires.
+    """
+
+    def __init__(self, seconds, buckets=WINDOW_BUCKETS):
+        """
+        Args:
+            seconds (float): Window length
+            buckets (int): Time buckets the window is split into
+        """
+        self.seconds = seconds
+        self.buckets = buckets
+        self.width = seconds / buckets
+        self.slots = deque()  # [bucket index, good, total], oldest first
+        self.newest = None
+        self.good = 0
+        self.total = 0
+
+    def _expire(self, index):
+        if self.newest is None or index > self.newest:
+            self.newest = index
+        oldest = self.newest - self.buckets + 1
+        slots = self.slots
+        while slots and slots[0][0] < oldest:
+            _, good, total = slots.popleft()
+            self.good -= good
+            self.total -= total
+
+    def add(self, moment, good, total=1):
+        """
+        Count checks at `moment` (epoch seconds). Checks may come a little
+        out of order; ones already outside the window are ignored.
+        """
+        index = int(moment // self.width)
+        self._expire(index)
+        if index <= self.newest - self.buckets:
+            return
+        slots = self.slots
+        if slots and slots[-1][0] == index:
+            slot = slots[-1]
+        elif not slots or slots[-1][0] < index:
+            slot = [index, 0, 0]
+            slots.append(slot)
+        else:
+            # Late check: find or insert its bucket (at most `buckets` steps)
+            position = len(slots)
+            while position and slots[position - 1][0] > index:
+                position -= 1
+            if position and slots[position - 1][0] == index:
+                slot = slots[position - 1]
+            else:
+                slot = [index, 0, 0]
+                slots.insert(position, slot)
+        slot[1] += good
+        slot[2] += total
+        self.good += good
+        self.total += total
+
+    def totals(self, now):
+        """
+        Args:
+            now (float): Current time, epoch seconds
+
+        Returns:
+            tuple: (good, total) over the window ending at `now`
+        """
+        self._expire(int(now // self.width))
+        return self.good, self.total
+
+
+class TargetSLO:
+    """
+    Objective, error budget and burn-rate windows of one URL.
+    """
+
+    def __init__(self, url, objective=SLO_OBJECTIVE, latency=SLO_LATENCY, window_days=SLO_WINDOW_DAYS):
+        """
+        Args:
+            url (str): Target URL
+            objective (float): Percent of checks that must be good
+            latency (float): Slowest good response in seconds (0 = any)
+            window_days (int): Days the objective covers
+        """
+        self.url = url
+        self.objective = objective
+        self.latency = latency
+        self.window_days = window_days
+        self.window = RollingCounter(window_days * 86400, window_days * 24)
+        self.burn_windows = {name: RollingCounter(seconds) for name, seconds in BURN_WINDOWS}
+        self.last_check = None
+
+    def is_good(self, success, response_time):
+        if not success:
+            return False
+        return self.latency <= 0 or (response_time is not None and response_time <= self.latency)
+
+    def add(self, moment, good, total=1):
+        """
+        Count checks at `moment` (epoch seconds) in every window.
+        """
+        self.window.add(moment, good, total)
+        for counter in self.burn_windows.values():
+            counter.add(moment, good, total)
+
+    def update(self, check):
+        """
+        Add one check.
+
+        Args:
+            check (dict): Check with timestamp, success and response_time
+        """
+        self.add(_epoch(check['timestamp']),
+                 int(self.is_good(check['success'], check.get('response_time'))))
+        self.last_check = max(self.last_check or '', _format_timestamp(check['timestamp']))
+
+    def burn_rate(self, name, now):
+        """
+        Returns:
+            float: Error rate of window `name` over the allowed error rate,
+                or None without checks in the window
+        """
+        good, total = self.burn_windows[name].totals(now)
+        if not total:
+            return None
+        return (1 - good / total) / (1 - self.objective / 100)
+
+    def to_dict(self, now):
+        """
+        Get the SLO as reported by the API.
+
+        Args:
+            now (float): Current time, epoch seconds
+
+        Returns:
+            dict: Objective, SLI, error budget, burn rates and firing alerts
+        """
+        good, total = self.window.totals(now)
+        allowed = total * (1 - self.objective / 100)
+        bad = total - good
+        burn_rates = {name: self.burn_rate(name, now) for name, _ in BURN_WINDOWS}
+
+        alerts = []
+        for severity, long_window, short_window, budget_share in BURN_ALERTS:
+            threshold = budget_share * self.window_days * 86400 / dict(BURN_WINDOWS)[long_window]
+            rates = (burn_rates[long_window], burn_rates[short_window])
+            if all(rate is not None and rate >= threshold for rate in rates):
+                alerts.append({
+                    'severity': severity,
+                    'long_window': long_window,
+                    'short_window': short_window,
+                    'threshold': round(threshold, 2),
+                    'burn_rate': round(rates[0], 2)
+                })
+
+        remaining = None
+        if total:
+            remaining = 100 * (1 - bad / allowed)
+        status = 'ok'
+        if alerts:
+            status = 'page' if any(a['severity'] == 'page' for a in alerts) else 'ticket'
+        elif remaining is not None and remaining <= 0:
+            status = 'exhausted'
+
+        return {
+            'url': self.url,
+            'objective': self.objective,
+            'latency_threshold': self.latency or None,
+            'window_days': self.window_days,
+            'checks': total,
+            'bad_checks': bad,
+            'sli': round(100 * good / total, 4) if total else None,
+            'error_budget': {
+                'allowed_bad_checks': round(allowed, 2),
+                'consumed_bad_checks': bad,
+                'remaining_percent': round(remaining, 2) if remaining is not None else None
+            },
+            'burn_rates': {name: round(rate, 3) if rate is not None else None
+                           for name, rate in burn_rates.items()},
+            'alerts': alerts,
+            'status': status,
+            'last_check': self.last_check
+        }
+
+
+class SLOTracker:
+    """
+    SLOs of all URLs.
+
+    Fed either live by the pipeline listener (process) or, in a process
+    without the scheduler, by catching up on saved checks (sync).
+    """
+
+    def __init__(self, targets=None, persist=None, clock=time.time):
+        """
+        Args:
+            targets (dict): url -> (objective, latency) overrides (default: SLO_TARGETS)
+            persist (bool): Seed from and catch up on the database (default:
+                with SQLite storage)
+            clock (callable): Current time in epoch seconds (tests)
+        """
+        self.overrides = parse_slo_targets(SLO_TARGETS) if targets is None else targets
+        self.objective = SLO_OBJECTIVE
+        if not 0 < self.objective < 100:
+            logger.warning("⚠️  SLO_OBJECTIVE must be between 0 and 100, using 99.9")
+            self.objective = 99.9
+        self.persist = uses_sqlite() if persist is None else persist
+        self.clock = clock
+        self.targets = {}
+        self.lock = threading.Lock()
+        self.live = False
+        self.loaded = False
+        self.synced_id = 0
+
+    def _target(self, url):
+        target = self.targets.get(url)
+        if target is None:
+            objective, latency = self.overrides.get(url, (self.objective, None))
+            target = self.targets[url] = TargetSLO(
+                url, objective, SLO_LATENCY if latency is None else latency)
+        return target
+
+    def _load(self):
+        """
+        Seed the counters once from the checks of the SLO window, grouped
+        by minute (and from minute rollups where raw checks are gone).
+        """
+        self.loaded = True
+        if not self.persist:
+            return
+        start = datetime.fromtimestamp(self.clock()) - timedelta(days=SLO_WINDOW_DAYS)
+        start = start.strftime(TIME_FORMAT)
+
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            self.synced_id = cursor.execute('SELECT MAX(id) FROM checks').fetchone()[0] or 0
+            for url in get_urls(conn):
+                target = self._target(url)
+                cursor.execute(SEED_SQL, {'url': url, 'start': start, 'last_id': self.synced_id,
+                                          'latency': target.latency})
+                for minute, total, good, last in cursor.fetchall():
+                    target.add(_epoch(minute), good, total)
+                    target.last_check = max(target.last_check or '', last[:19])
+
+            first_raw = rollups.raw_from(cursor) if rollups.ROLLUPS_ENABLED else None
+            if first_raw and start < first_raw:
+                # Rollups only count successes: the latency threshold does not apply
+                for minute, url, total, good in cursor.execute(SEED_ROLLUPS_SQL, (start, first_raw)):
+                    self._target(url).add(_epoch(minute), good, total)
+        finally:
+            close_connection(conn)
+
+    def process(self, check):
+        """
+        Add one saved check (pipeline listener).
+
+        Args:
+            check (dict): Saved check result
+        """
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            self.live = True
+            # Already counted by the seed
+            if check.get('id') and check['id'] <= self.synced_id:
+                return
+            self._target(check['url']).update(check)
+
+    def sync(self):
+        """
+        Catch up on checks saved since the last sync (only needed where no
+        listener feeds the tracker).
+
+        Returns:
+            int: Number of checks added
+        """
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            if self.live or not self.persist:
+                return 0
+
+            conn = get_connection()
+            try:
+                rows = conn.execute(
+                    'SELECT id, url, timestamp, success, response_time FROM checks '
+                    'WHERE id > ? ORDER BY id', (self.synced_id,)
+                ).fetchall()
+            finally:
+                close_connection(conn)
+
+            for _, url, timestamp, success, response_time in rows:
+                self._target(url).update({'timestamp': timestamp, 'success': success,
+                                          'response_time': response_time})
+            if rows:
+                self.synced_id = rows[-1][0]
+            return len(rows)
+
+    def report(self, url=None):
+        """
+        Get SLO states, caught up to the latest saved check.
+
+        Args:
+            url (str): Only this URL (optional)
+
+        Returns:
+            list: TargetSLO.to_dict() per URL, sorted by URL
+        """
+        self.sync()
+        now = self.clock()
+        with self.lock:
+            return [self.targets[u].to_dict(now) for u in sorted(self.targets)
+                    if url is None or u == url]
+
+
+# Shared tracker instance
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker():
+    """
+    Get the process-wide SLO tracker.
+
+    Returns:
+        SLOTracker: Tracker
+    """
+    global _tracker
+
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = SLOTracker()
+        return _tracker
+
+
+def record_result(result):
+    """
+    Pipeline listener: count one saved check against its URL's SLO.
+
+    Args:
+        result (dict): Saved check result
+    """
+    get_tracker().process(result)
+
+
+def reset_tracker():
+    """
+    Drop the process-wide tracker (on shutdown, or when the database changes).
+    """
+    global _tracker
+
+    with _tracker_lock:
+        _tracker = None
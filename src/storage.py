@@ -0,0 +1,796 @@
+"""
+Storage backends: where checks are saved and what analytics reads.
+
+analytics.py, the API and the probe pipeline go through get_storage()
+instead of opening SQLite connections themselves:
+
+    sqlite   database.py: daily partitions in DB_PATH, rollups of older
+             checks (the default)
+    memory   MemoryStorage: per-URL arrays in this process, nothing on
+             disk. For tests and benchmarks (parallel runs do not share a
+             file, and analytics can be timed without disk I/O). History is
+             lost when the process exits.
+
+Select one with STORAGE_BACKEND, or set_storage() in tests. Both engines
+pass the same conformance tests (tests/test_storage.py).
+
+Aggregate methods raise on errors; analytics reports them. Methods that
+mirror database.py functions keep their safe defaults.
+"""
+
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from heapq import merge
+
+import src.database as database
+from src import rollups
+
+# Storage engine: 'sqlite' or 'memory'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Time-weighted uptime in one pass over the period: every check stores how
+# long the previous state of its URL lasted (prev_gap) and what it was
+# (prev_success); the state covers [previous, previous + min(prev_gap, max_gap)].
+# Only states that may begin before the period start need the timestamp
+# converted, to clip that part.
+TIME_WEIGHTED_UPTIME_SQL = """
+    SELECT
+        COUNT(*),
+        SUM(success = 1),
+        SUM(seconds),
+        SUM(CASE WHEN prev_success = 1 THEN seconds ELSE 0 END)
+    FROM (
+        SELECT
+            success,
+            prev_success,
+            CASE WHEN timestamp < :edge OR prev_gap > :max_gap
+                THEN MAX(0, MIN(COALESCE(prev_gap, 0), :max_gap) - MAX(0, :start
+                    - (CAST(strftime('%s', timestamp) AS INTEGER) - COALESCE(prev_gap, 0))))
+                ELSE MIN(COALESCE(prev_gap, 0), :max_gap)
+            END AS seconds
+        FROM checks
+        WHERE 1=1{filters}
+    )
+"""
+
+
+# Chart series: aggregates per URL and time bucket. Buckets are seconds
+# since 1970 of the same (local) wall clock (see _epoch), so they line up
+# with the rollups' whole minutes, hours and days
+BUCKET_SQL = "CAST(strftime('%s', {column}) AS INTEGER) / :step * :step"
+
+ROLLUP_SERIES_SQL = """
+    SELECT url, {bucket}, SUM(checks), SUM(successes), SUM(seconds), SUM(up_seconds),
+           SUM(rt_count), SUM(rt_sum), MIN(rt_min), MAX(rt_max)
+    FROM {table}
+    WHERE bucket >= :start AND bucket < :end{url_filter}
+    GROUP BY 1, 2
+"""
+
+RAW_SERIES_SQL = """
+    SELECT url, {bucket}, COUNT(*), SUM(success = 1),
+           SUM(MIN(IFNULL(prev_gap, 0), :max_gap)),
+           SUM(CASE WHEN prev_success = 1 THEN MIN(IFNULL(prev_gap, 0), :max_gap) ELSE 0 END),
+           COUNT(CASE WHEN success = 1 THEN response_time END),
+           SUM(CASE WHEN success = 1 THEN response_time END),
+           MIN(CASE WHEN success = 1 THEN response_time END),
+           MAX(CASE WHEN success = 1 THEN response_time END)
+    FROM checks
+    WHERE url = :url AND timestamp >= :start AND timestamp < :end
+    GROUP BY 1, 2
+"""
+
+def _epoch(moment):
+    # Stored timestamps are naive local times and strftime('%s') reads
+    # them as UTC, so all epoch values are computed in that same frame
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _median(values):
+    """
+    Median of sorted values (0.0 if there are none).
+    """
+    n = len(values)
+    if not n:
+        return 0.0
+    if n % 2 == 0:
+        return (values[n//2 - 1] + values[n//2]) / 2
+    return values[n//2]
+
+
+def _add_bucket(buckets, url, row):
+    """
+    Merge one aggregated row (bucket, checks, successes, seconds,
+    up_seconds, rt_count, rt_sum, rt_min, rt_max) into buckets[url][bucket].
+    """
+    bucket, checks, successes, seconds, up_seconds, rt_count, rt_sum, rt_min, rt_max = row
+    current = buckets.setdefault(url, {}).get(bucket)
+    if current is None:
+        buckets[url][bucket] = [checks, successes or 0, seconds or 0, up_seconds or 0,
+                                rt_count or 0, rt_sum or 0.0, rt_min, rt_max]
+        return
+    current[0] += checks
+    current[1] += successes or 0
+    current[2] += seconds or 0
+    current[3] += up_seconds or 0
+    current[4] += rt_count or 0
+    current[5] += rt_sum or 0.0
+    for index, value, pick in ((6, rt_min, min), (7, rt_max, max)):
+        values = [v for v in (current[index], value) if v is not None]
+        current[index] = pick(values) if values else None
+
+class StorageBackend:
+    """
+    Operations the monitor, the API and analytics need from check storage.
+
+    `since` arguments are naive local datetimes (None = all history).
+    """
+
+    name = None
+
+    def init(self):
+        """
+        Prepare the storage (create tables, run migrations).
+        """
+
+    def save_checks(self, check_results):
+        """
+        Save check results, linking each to the previous check of its URL.
+
+        Returns:
+            list: New check ids, in input order
+        """
+        raise NotImplementedError
+
+    def get_recent_checks(self, limit=10, url=None):
+        """
+        Returns:
+            list: Check dictionaries (all columns), newest first
+        """
+        raise NotImplementedError
+
+    def get_check_count(self):
+        raise NotImplementedError
+
+    def get_data_version(self):
+        """
+        Returns:
+            dict: min_id, max_id and last_timestamp (see database.get_data_version)
+        """
+        raise NotImplementedError
+
+    def get_urls(self):
+        """
+        Returns:
+            list: URLs with stored checks, sorted
+        """
+        raise NotImplementedError
+
+    def get_latest_checks(self, url=None):
+        """
+        Returns:
+            list: Dictionaries with url, timestamp and success of each URL's latest check
+        """
+        raise NotImplementedError
+
+    def cleanup_old_checks(self, days=None, until=None):
+        """
+        Drop checks older than `days` (whole days), never from `until` on.
+
+        Returns:
+            int: Number of checks removed
+        """
+        raise NotImplementedError
+
+    def check_states(self, since=None, url=None):
+        """
+        Returns:
+            list: Dictionaries with id, timestamp and success, oldest first
+        """
+        raise NotImplementedError
+
+    def count_totals(self, since=None, url=None):
+        """
+        Returns:
+            dict: checks and successes from `since` on
+        """
+        raise NotImplementedError
+
+    def state_totals(self, since=None, url=None, max_gap=300):
+        """
+        Time-weighted state totals: each check's state lasts until the next
+        check of its URL, at most max_gap seconds. Covers the states ended
+        by checks after `since` (clipped to it), not the current states.
+
+        Returns:
+            dict: checks, successes (checks after `since`), seconds and
+                up_seconds (time in known / up states)
+        """
+        raise NotImplementedError
+
+    def response_stats(self, since=None, url=None):
+        """
+        Returns:
+            dict: total_checks, successful_checks, failed_checks, and
+                avg/min/max/median_response_time of successful checks
+                (unrounded, 0.0 without any)
+        """
+        raise NotImplementedError
+
+    def schedule_totals(self, since=None, url=None):
+        """
+        Returns:
+            dict: scheduled_checks, avg_lag_seconds, max_lag_seconds and
+                missed_runs of checks started by the scheduler
+        """
+        raise NotImplementedError
+
+    def series_buckets(self, start, end, step, url=None, tier=None, max_gap=300):
+        """
+        Aggregates per URL and time bucket, for chart series. States are
+        time-weighted as in state_totals() (each check covers the state
+        before it, at most max_gap seconds).
+
+        Args:
+            start (datetime): First bucket start (aligned to step)
+            end (datetime): Period end (exclusive)
+            step (int): Seconds per bucket
+            url (str): Only this URL (default: all)
+            tier (str): Rollup tier for the compacted part of the period
+                (SQLite only; None = raw checks only)
+            max_gap (int): Longest state a check accounts for (seconds)
+
+        Returns:
+            tuple: ({url: {bucket: [checks, successes, seconds, up_seconds,
+                rt_count, rt_sum, rt_min, rt_max]}}, names of the sources read),
+                buckets being seconds since 1970 of the local wall clock
+        """
+        raise NotImplementedError
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    database.py storage, with rollups for periods older than the raw checks.
+    """
+
+    name = 'sqlite'
+
+    def init(self):
+        database.init_database()
+
+    def save_checks(self, check_results):
+        return database.save_checks(check_results)
+
+    def get_recent_checks(self, limit=10, url=None):
+        return database.get_recent_checks(limit=limit, url=url)
+
+    def get_check_count(self):
+        return database.get_check_count()
+
+    def get_data_version(self):
+        return database.get_data_version()
+
+    def get_urls(self):
+        return database.get_urls()
+
+    def get_latest_checks(self, url=None):
+        return database.get_latest_checks(url=url)
+
+    def cleanup_old_checks(self, days=None, until=None):
+        return database.cleanup_old_checks(days=days, until=until)
+
+    @staticmethod
+    def _filters(since, url):
+        """
+        WHERE clause additions and parameters for a period and URL.
+        """
+        filters, params = '', []
+        if since:
+            filters += ' AND timestamp >= ?'
+            params.append(since.strftime(TIME_FORMAT))
+        if url:
+            filters += ' AND url = ?'
+            params.append(url)
+        return filters, params
+
+    def check_states(self, since=None, url=None):
+        filters, params = self._filters(since, url)
+        conn = database.get_connection()
+        try:
+            rows = conn.execute(
+                f'SELECT id, timestamp, success FROM checks WHERE 1=1{filters} ORDER BY timestamp ASC',
+                params
+            ).fetchall()
+        finally:
+            database.close_connection(conn)
+        return [{'id': row[0], 'timestamp': row[1], 'success': row[2]} for row in rows]
+
+    def count_totals(self, since=None, url=None):
+        filters, params = self._filters(since, url)
+        conn = database.get_connection()
+        try:
+            checks, successes = conn.execute(
+                f'SELECT COUNT(*), SUM(success = 1) FROM checks WHERE 1=1{filters}', params
+            ).fetchone()
+            totals = {'checks': checks or 0, 'successes': successes or 0}
+
+            # Checks older than the raw ones, from rollups
+            older = rollups.rollup_totals(since, url, conn)
+            if older:
+                totals['checks'] += older['checks']
+                totals['successes'] += older['successes']
+        finally:
+            database.close_connection(conn)
+        return totals
+
+    def state_totals(self, since=None, url=None, max_gap=300):
+        params = {'max_gap': max_gap, 'start': 0, 'edge': ''}
+        filters = ''
+        if since:
+            filters += ' AND timestamp > :start_str'
+            params['start'] = _epoch(since)
+            params['start_str'] = since.strftime(TIME_FORMAT)
+            params['edge'] = (since + timedelta(seconds=max_gap)).strftime(TIME_FORMAT)
+        if url:
+            filters += ' AND url = :url'
+            params['url'] = url
+
+        conn = database.get_connection()
+        try:
+            checks, successes, seconds, up_seconds = conn.execute(
+                TIME_WEIGHTED_UPTIME_SQL.format(filters=filters), params).fetchone()
+            totals = {
+                'checks': checks or 0,
+                'successes': successes or 0,
+                'seconds': seconds or 0,
+                'up_seconds': up_seconds or 0
+            }
+
+            # States that ended before the raw checks, from rollups
+            older = rollups.rollup_totals(since, url, conn)
+            if older:
+                for key in totals:
+                    totals[key] += older[key]
+        finally:
+            database.close_connection(conn)
+        return totals
+
+    def response_stats(self, since=None, url=None):
+        filters, params = self._filters(since, url)
+        conn = database.get_connection()
+        try:
+            cursor = conn.cursor()
+
+            # All checks
+            cursor.execute(f'''
+                SELECT COUNT(*), SUM(success = 1), SUM(success = 0)
+                FROM checks WHERE 1=1{filters}
+            ''', params)
+            total, successful, failed = (value or 0 for value in cursor.fetchone())
+
+            # Response times of successful checks only
+            cursor.execute(f'''
+                SELECT AVG(response_time), MIN(response_time), MAX(response_time), COUNT(response_time)
+                FROM checks
+                WHERE success = 1 AND response_time IS NOT NULL{filters}
+            ''', params)
+            avg, min_time, max_time, timed_checks = cursor.fetchone()
+            avg, min_time, max_time = avg or 0.0, min_time or 0.0, max_time or 0.0
+
+            # Checks older than the raw ones, from rollups (not in the median)
+            older = rollups.rollup_totals(since, url, conn)
+            if older:
+                total += older['checks']
+                successful += older['successes']
+                failed += older['checks'] - older['successes']
+                if older['rt_count']:
+                    avg = (avg * timed_checks + older['rt_sum']) / (timed_checks + older['rt_count'])
+                    min_time = min(min_time, older['rt_min']) if timed_checks else older['rt_min']
+                    max_time = max(max_time, older['rt_max'])
+
+            cursor.execute(f'''
+                SELECT response_time FROM checks
+                WHERE success = 1 AND response_time IS NOT NULL{filters}
+                ORDER BY response_time
+            ''', params)
+            median = _median([row[0] for row in cursor.fetchall()])
+        finally:
+            database.close_connection(conn)
+
+        return {
+            'total_checks': total,
+            'successful_checks': successful,
+            'failed_checks': failed,
+            'avg_response_time': avg,
+            'min_response_time': min_time,
+            'max_response_time': max_time,
+            'median_response_time': median
+        }
+
+    def schedule_totals(self, since=None, url=None):
+        filters, params = self._filters(since, url)
+        conn = database.get_connection()
+        try:
+            scheduled, avg_lag, max_lag, missed = conn.execute(f'''
+                SELECT COUNT(*), AVG(schedule_lag), MAX(schedule_lag), SUM(missed_runs)
+                FROM checks
+                WHERE scheduled_at IS NOT NULL{filters}
+            ''', params).fetchone()
+        finally:
+            database.close_connection(conn)
+        return {
+            'scheduled_checks': scheduled or 0,
+            'avg_lag_seconds': avg_lag or 0.0,
+            'max_lag_seconds': max_lag or 0.0,
+            'missed_runs': missed or 0
+        }
+
+    def series_buckets(self, start, end, step, url=None, tier=None, max_gap=300):
+        lower, upper = start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)
+        buckets, sources = {}, []
+        conn = database.get_connection()
+        try:
+            cursor = conn.cursor()
+            raw_start = lower
+            if tier is not None:
+                segments, raw_start = rollups.tier_segments(cursor, tier, lower, upper)
+                for table, segment_start, segment_end in segments:
+                    sql = ROLLUP_SERIES_SQL.format(bucket=BUCKET_SQL.format(column='bucket'), table=table,
+                                                   url_filter=' AND url = :url' if url else '')
+                    cursor.execute(sql, {'step': step, 'start': segment_start, 'end': segment_end, 'url': url})
+                    for row in cursor.fetchall():
+                        _add_bucket(buckets, row[0], row[1:])
+                    sources.append(table)
+
+            if raw_start < upper:
+                # One query per URL: each reads only its url/timestamp index range
+                sql = RAW_SERIES_SQL.format(bucket=BUCKET_SQL.format(column='timestamp'))
+                for target in [url] if url else database.get_urls(conn):
+                    cursor.execute(sql, {'step': step, 'max_gap': max_gap, 'url': target,
+                                         'start': raw_start, 'end': upper})
+                    for row in cursor.fetchall():
+                        _add_bucket(buckets, row[0], row[1:])
+                sources.append('checks')
+        finally:
+            database.close_connection(conn)
+        return buckets, sources
+
+
+class _Series:
+    """
+    Checks of one URL as parallel arrays, ordered by (timestamp, id).
+    Aggregated columns are typed arrays (NULL: NaN / -1); the rest are lists.
+    """
+
+    NUMERIC = (('ids', 'q'), ('ts', 'q'), ('success', 'b'), ('rt', 'd'),
+               ('lag', 'd'), ('missed', 'q'))
+
+    def __init__(self):
+        for name, typecode in self.NUMERIC:
+            setattr(self, name, array(typecode))
+        # Remaining columns: (timestamp, status_code, error, retries,
+        # queue_wait, scheduled_at, agent) per check
+        self.rows = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def insert(self, check_id, ts, row):
+        """
+        Insert a check in timestamp order (after checks with the same timestamp).
+
+        Returns:
+            int: Its position
+        """
+        position = bisect_right(self.ts, ts)
+        timestamp, status_code, response_time, success, error, retries, \
+            queue_wait, scheduled_at, schedule_lag, missed_runs, agent = row
+        nan = float('nan')
+        values = (
+            check_id, ts, success,
+            nan if response_time is None else response_time,
+            nan if schedule_lag is None else schedule_lag,
+            -1 if missed_runs is None else missed_runs
+        )
+        for (name, _), value in zip(self.NUMERIC, values):
+            getattr(self, name).insert(position, value)
+        self.rows.insert(position, (timestamp, status_code, error, retries, queue_wait,
+                                    scheduled_at, agent))
+        return position
+
+    def check(self, url, i):
+        """
+        Check dictionary at position i, with all stored columns.
+        """
+        timestamp, status_code, error, retries, queue_wait, scheduled_at, agent = self.rows[i]
+        rt, lag, missed = self.rt[i], self.lag[i], self.missed[i]
+        return {
+            'id': self.ids[i],
+            'url': url,
+            'timestamp': timestamp,
+            'status_code': status_code,
+            'response_time': None if rt != rt else rt,
+            'success': self.success[i],
+            'error': error,
+            'retries': retries,
+            'queue_wait': queue_wait,
+            'scheduled_at': scheduled_at,
+            'schedule_lag': None if lag != lag else lag,
+            'missed_runs': None if missed < 0 else missed,
+            'agent': agent,
+            'prev_gap': self.ts[i] - self.ts[i - 1] if i else 0,
+            'prev_success': self.success[i - 1] if i else None
+        }
+
+    def drop_before(self, ts):
+        """
+        Remove checks older than ts.
+
+        Returns:
+            int: Number of checks removed
+        """
+        count = bisect_left(self.ts, ts)
+        if count:
+            for name, _ in self.NUMERIC:
+                del getattr(self, name)[:count]
+            del self.rows[:count]
+        return count
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Checks kept in per-URL arrays of this process (see _Series). Previous
+    state links are derived from neighbouring entries, so checks arriving
+    out of order need no updates.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self.series = {}
+        self.min_id = 0
+        self.last_id = 0
+        self.last_timestamp = None
+        self.lock = threading.Lock()
+
+    def save_checks(self, check_results):
+        if not check_results:
+            return []
+        ids = []
+        with self.lock:
+            for check_result in check_results:
+                row = database._check_row(check_result)
+                url, timestamp = row[0], row[1]
+                self.last_id += 1
+                moment = datetime.strptime(timestamp, TIME_FORMAT)
+                self.series.setdefault(url, _Series()).insert(self.last_id, _epoch(moment), row[1:])
+                # Newest by time: late arrivals never move it back
+                if self.last_timestamp is None or timestamp > self.last_timestamp:
+                    self.last_timestamp = timestamp
+                ids.append(self.last_id)
+            # New ids only grow; the oldest changes when checks are dropped
+            self.min_id = self.min_id or ids[0]
+        return ids
+
+    def _selected(self, url=None):
+        """
+        (url, series) pairs for one URL or all of them.
+        """
+        if url:
+            return [(url, self.series[url])] if url in self.series else []
+        return sorted(self.series.items())
+
+    def get_recent_checks(self, limit=10, url=None):
+        def newest_first(check_url, series):
+            for i in range(len(series) - 1, -1, -1):
+                yield series.ts[i], series.ids[i], check_url, series, i
+
+        with self.lock:
+            newest = merge(
+                *[newest_first(check_url, series) for check_url, series in self._selected(url)],
+                reverse=True
+            )
+            checks = []
+            for _, _, check_url, series, i in newest:
+                if len(checks) >= limit:
+                    break
+                checks.append(series.check(check_url, i))
+        return checks
+
+    def get_check_count(self):
+        with self.lock:
+            return sum(len(series) for series in self.series.values())
+
+    def get_data_version(self):
+        with self.lock:
+            if not self.min_id:
+                return {'min_id': 0, 'max_id': 0, 'last_timestamp': None}
+            return {'min_id': self.min_id, 'max_id': self.last_id, 'last_timestamp': self.last_timestamp}
+
+    def get_urls(self):
+        with self.lock:
+            return sorted(url for url, series in self.series.items() if len(series))
+
+    def get_latest_checks(self, url=None):
+        with self.lock:
+            return [
+                {'url': check_url, 'timestamp': series.rows[-1][0], 'success': series.success[-1]}
+                for check_url, series in self._selected(url) if len(series)
+            ]
+
+    def cleanup_old_checks(self, days=None, until=None):
+        if days is None:
+            days = database.DATA_RETENTION_DAYS
+        if days <= 0:
+            return 0
+        # Whole days, like dropping partitions
+        cutoff = datetime.now() - timedelta(days=days)
+        if until is not None:
+            cutoff = min(cutoff, until)
+        keep_from = _epoch(cutoff.replace(hour=0, minute=0, second=0, microsecond=0))
+        with self.lock:
+            removed = sum(series.drop_before(keep_from) for series in self.series.values())
+            if removed:
+                ids = [min(series.ids) for series in self.series.values() if len(series)]
+                self.min_id = min(ids) if ids else 0
+            return removed
+
+    def _start(self, series, since, after=False):
+        """
+        Position of the first check at (or with after=True, after) `since`.
+        """
+        if since is None:
+            return 0
+        find = bisect_right if after else bisect_left
+        return find(series.ts, _epoch(since))
+
+    def check_states(self, since=None, url=None):
+        with self.lock:
+            states = merge(*[
+                [(series.ts[i], series.ids[i], series.rows[i][0], series.success[i])
+                 for i in range(self._start(series, since), len(series))]
+                for _, series in self._selected(url)
+            ])
+            return [{'id': row[1], 'timestamp': row[2], 'success': row[3]} for row in states]
+
+    def count_totals(self, since=None, url=None):
+        checks = successes = 0
+        with self.lock:
+            for _, series in self._selected(url):
+                start = self._start(series, since)
+                checks += len(series) - start
+                successes += sum(series.success[start:])
+        return {'checks': checks, 'successes': successes}
+
+    def state_totals(self, since=None, url=None, max_gap=300):
+        totals = {'checks': 0, 'successes': 0, 'seconds': 0, 'up_seconds': 0}
+        period_start = _epoch(since) if since else 0
+        with self.lock:
+            for _, series in self._selected(url):
+                ts, success = series.ts, series.success
+                start = self._start(series, since, after=True)
+                totals['checks'] += len(series) - start
+                totals['successes'] += sum(success[start:])
+                for i in range(max(start, 1), len(series)):
+                    state_start = ts[i - 1]
+                    seconds = max(0, min(ts[i] - state_start, max_gap)
+                                  - max(0, period_start - state_start))
+                    totals['seconds'] += seconds
+                    if success[i - 1] == 1:
+                        totals['up_seconds'] += seconds
+        return totals
+
+    def response_stats(self, since=None, url=None):
+        total = successful = 0
+        times = []
+        with self.lock:
+            for _, series in self._selected(url):
+                start = self._start(series, since)
+                total += len(series) - start
+                flags = series.success[start:]
+                successful += sum(flags)
+                times.extend(rt for flag, rt in zip(flags, series.rt[start:]) if flag == 1 and rt == rt)
+        times.sort()
+        return {
+            'total_checks': total,
+            'successful_checks': successful,
+            'failed_checks': total - successful,
+            'avg_response_time': sum(times) / len(times) if times else 0.0,
+            'min_response_time': times[0] if times else 0.0,
+            'max_response_time': times[-1] if times else 0.0,
+            'median_response_time': _median(times)
+        }
+
+    def schedule_totals(self, since=None, url=None):
+        scheduled = missed = 0
+        lags = []
+        with self.lock:
+            for _, series in self._selected(url):
+                for i in range(self._start(series, since), len(series)):
+                    if series.rows[i][5] is None:
+                        continue
+                    scheduled += 1
+                    missed += max(series.missed[i], 0)
+                    if series.lag[i] == series.lag[i]:
+                        lags.append(series.lag[i])
+        return {
+            'scheduled_checks': scheduled,
+            'avg_lag_seconds': sum(lags) / len(lags) if lags else 0.0,
+            'max_lag_seconds': max(lags) if lags else 0.0,
+            'missed_runs': missed
+        }
+
+    def series_buckets(self, start, end, step, url=None, tier=None, max_gap=300):
+        first, last = _epoch(start), _epoch(end)
+        buckets = {}
+        with self.lock:
+            for check_url, series in self._selected(url):
+                ts, success, rt = series.ts, series.success, series.rt
+                for i in range(bisect_left(ts, first), bisect_left(ts, last)):
+                    seconds = min(ts[i] - ts[i - 1], max_gap) if i else 0
+                    up = success[i - 1] == 1 if i else False
+                    timed = success[i] == 1 and rt[i] == rt[i]
+                    _add_bucket(buckets, check_url, (
+                        ts[i] // step * step, 1, success[i], seconds, seconds if up else 0,
+                        1 if timed else 0, rt[i] if timed else None,
+                        rt[i] if timed else None, rt[i] if timed else None
+                    ))
+        return buckets, ['memory']
+
+
+BACKENDS = {
+    'sqlite': SQLiteStorage,
+    'memory': MemoryStorage,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Get the storage backend selected by STORAGE_BACKEND.
+
+    Returns:
+        StorageBackend: Shared instance
+
+    Raises:
+        ValueError: If STORAGE_BACKEND names no backend
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+            _storage = BACKENDS[STORAGE_BACKEND]()
+        return _storage
+
+
+def set_storage(backend):
+    """
+    Replace the shared storage backend (tests, benchmarks).
+
+    Args:
+        backend (StorageBackend): Backend to use, or None to go back to STORAGE_BACKEND
+
+    Returns:
+        StorageBackend: The previous backend (None if none was created yet)
+    """
+    global _storage
+    with _storage_lock:
+        previous, _storage = _storage, backend
+        return previous
+
+
+def uses_sqlite():
+    """
+    Returns:
+        bool: True if checks are stored in SQLite (rollups, hot-store and
+            the NumPy backend only work on it)
+    """
+    return get_storage().name == 'sqlite'
@@ -0,0 +1,259 @@
+"""
+Response time and uptime series for charts, downsampled on the server.
+
+A series is read from the coarsest source with at least one bucket for
+every other requested point (up to OVERSAMPLE per point, if the source is
+fine enough):
+
+    rollup_1d / rollup_1h / rollup_1m   for the compacted part of the
+                                        period (see src/rollups.py)
+    raw checks                          for the rest, grouped in SQL by
+                                        the same bucket size (url/timestamp
+                                        index of each daily partition)
+
+(StorageBackend.series_buckets(); the memory backend has no rollups and
+groups its checks in place). So a 30-day chart reads about 720 hourly
+rows per target, however many checks were made. The buckets are then
+reduced to the requested number of points with one of:
+
+    lttb     Largest-Triangle-Three-Buckets on the bucket averages: keeps
+             the visual shape (peaks, steps) of the series
+    minmax   per group of buckets, the lowest and the highest value in
+             time order: never hides a spike or a dip
+"""
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from src.analytics import UPTIME_METHOD
+from src import rollups
+from src.storage import get_storage
+from src.instrumentation import timed
+from src.logger import setup_logger
+
+logger = setup_logger()
+
+# Series that can be requested
+METRICS = ('response_time', 'uptime')
+
+# Downsampling methods
+METHODS = ('lttb', 'minmax')
+
+# Points per series by default, and at most
+DEFAULT_POINTS = 300
+MAX_POINTS = 2000
+
+# Source buckets read per point returned (downsampling needs some to choose from)
+OVERSAMPLE = 4
+
+# Rollup tiers, coarsest first: (tier, seconds per bucket)
+TIERS = [('1d', 86400), ('1h', 3600), ('1m', 60)]
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Buckets are seconds since 1970 of the local wall clock (see storage._epoch)
+EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=4096)
+def _format_bucket(seconds):
+    return (EPOCH + timedelta(seconds=seconds)).strftime(TIME_FORMAT)
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling (Steinarsson 2013).
+
+    Args:
+        points (list): (x, y) pairs sorted by x
+        threshold (int): Points to keep (at least 3)
+
+    Returns:
+        list: `threshold` of the points, first and last included
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    previous = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # Average of the next bucket is the third corner of the triangle
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        avg_x = sum(xs[end:next_end]) / (next_end - end)
+        avg_y = sum(ys[end:next_end]) / (next_end - end)
+
+        # Twice the triangle's area is |dx * (y - ay) - (x - ax) * dy|
+        ax, ay = xs[previous], ys[previous]
+        dx, dy = ax - avg_x, avg_y - ay
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        previous = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def minmax(buckets, threshold):
+    """
+    Min/max downsampling: split the buckets into threshold / 2 groups and
+    keep each group's lowest and highest value.
+
+    Args:
+        buckets (list): (x, value, low, high) tuples sorted by x
+        threshold (int): Points to keep at most
+
+    Returns:
+        list: (x, y) pairs in x order
+    """
+    if len(buckets) <= threshold:
+        return [(x, value) for x, value, _, _ in buckets]
+
+    groups = max(1, threshold // 2)
+    size = len(buckets) / groups
+    sampled = []
+    for g in range(groups):
+        group = buckets[int(g * size):int((g + 1) * size)]
+        low = min(group, key=lambda b: b[2])
+        high = max(group, key=lambda b: b[3])
+        sampled.extend(sorted({(low[0], low[2]), (high[0], high[3])}))
+    return sampled
+
+
+def _resolution(span, points, tiers=True):
+    """
+    Pick the source and bucket size for `points` points over `span` seconds.
+
+    Args:
+        tiers (bool): Whether rollup tiers can be read (SQLite storage)
+
+    Returns:
+        tuple: (tier or None for raw checks only, bucket seconds)
+    """
+    per_point = span / points
+    wanted = per_point / OVERSAMPLE
+    if tiers and rollups.ROLLUPS_ENABLED:
+        # The coarsest tier with a bucket for at least every other point
+        # (the next finer one has 24-60 times as many rows), read up to
+        # OVERSAMPLE times finer if it has the buckets for that
+        for tier, seconds in TIERS:
+            if seconds <= 2 * per_point:
+                return tier, seconds * max(1, int(wanted // seconds))
+    return None, max(1, int(wanted))
+
+
+def _values(metric, buckets):
+    """
+    Turn aggregated buckets into (x, value, low, high) tuples, skipping
+    buckets without a value (no successful check for response times).
+    """
+    values = []
+    for bucket in sorted(buckets):
+        checks, successes, seconds, up_seconds, rt_count, rt_sum, rt_min, rt_max = buckets[bucket]
+        if metric == 'response_time':
+            if not rt_count:
+                continue
+            values.append((bucket, rt_sum / rt_count, rt_min, rt_max))
+        else:
+            if UPTIME_METHOD != 'count' and seconds:
+                uptime = 100.0 * up_seconds / seconds
+            elif checks:
+                uptime = 100.0 * successes / checks
+            else:
+                continue
+            values.append((bucket, uptime, uptime, uptime))
+    return values
+
+
+@timed('timeseries.get_timeseries')
+def get_timeseries(metric, start, end, points=DEFAULT_POINTS, url=None, method='lttb'):
+    """
+    Get a downsampled series per URL.
+
+    Args:
+        metric (str): 'response_time' (average of successful checks, seconds)
+            or 'uptime' (percent, as UPTIME_METHOD)
+        start (datetime): Period start
+        end (datetime): Period end
+        points (int): Points per series at most
+        url (str): Only this URL (default: every URL with checks)
+        method (str): 'lttb' or 'minmax'
+
+    Returns:
+        dict: metric, start, end, resolution (seconds per source bucket),
+            sources (tables read, or 'memory'), method and series ([{url, points}],
+            points being [timestamp, value] pairs); None on errors
+    """
+    points = max(3, min(int(points), MAX_POINTS))
+    span = max(1.0, (end - start).total_seconds())
+
+    try:
+        storage = get_storage()
+        tier, step = _resolution(span, points, tiers=storage.name == 'sqlite')
+        # Whole buckets only: the first one starts before `start` if need be
+        first = EPOCH + timedelta(seconds=int((start - EPOCH).total_seconds()) // step * step)
+        series, sources = storage.series_buckets(first, end, step, url=url, tier=tier,
+                                                 max_gap=rollups.ROLLUP_MAX_GAP)
+
+        result = []
+        for target in sorted(series):
+            values = _values(metric, series[target])
+            if method == 'minmax':
+                sampled = minmax(values, points)
+            else:
+                sampled = lttb([(x, value) for x, value, _, _ in values], points)
+            digits = 4 if metric == 'response_time' else 3
+            result.append({
+                'url': target,
+                'points': [[_format_bucket(x), round(y, digits)] for x, y in sampled]
+            })
+
+        return {
+            'metric': metric,
+            'start': first.strftime(TIME_FORMAT),
+            'end': end.strftime(TIME_FORMAT),
+            'resolution': step,
+            'sources': sources,
+            'method': method,
+            'series': result
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Error getting {metric} series: {e}")
+        return None
+
+
+def period_bounds(hours=None, days=None, start=None, end=None, now=None):
+    """
+    Resolve the period of a series request.
+
+    Args:
+        hours (float): Last N hours
+        days (float): Last N days
+        start (str): Period start timestamp (instead of hours/days)
+        end (str): Period end timestamp (default: now)
+        now (datetime): Current time (tests)
+
+    Returns:
+        tuple: (start, end) datetimes
+
+    Raises:
+        ValueError: For unparseable timestamps or an empty period
+    """
+    end = datetime.fromisoformat(end) if end else (now or datetime.now())
+    if start:
+        start = datetime.fromisoformat(start)
+    elif days:
+        start = end - timedelta(days=float(days))
+    else:
+        start = end - timedelta(hours=float(hours or 24))
+    if not start < end:
+        raise ValueError('start must be before end')
+    return start, end
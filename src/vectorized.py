@@ -0,0 +1,443 @@
+"""
+Vectorized analytics backend (optional, needs NumPy).
+
+Checks are loaded per URL into columns - timestamp (int64 seconds),
+success (uint8) and response time (float32, NaN for failed checks) -
+and uptime, outages, percentiles, moving averages and histograms are
+computed with array operations instead of Python loops over rows.
+
+Enable it for the dashboard and API with ANALYTICS_BACKEND=numpy.
+Without NumPy installed the SQL backend is used.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import src.database as database
+from src import hotstore
+from src.database import (
+    get_connection, close_connection, get_data_version, get_urls, list_partitions
+)
+from src.instrumentation import timed
+from src.lazy import lazy_import
+
+# Imported on first use: the SQL backend never needs it
+np = lazy_import('numpy', optional=True)
+HAS_NUMPY = np is not None
+
+# Row layout read straight from the cursor into a structured array
+ROW_DTYPE = [('ts', 'i8'), ('success', 'u1'), ('rt', 'f4')]
+
+COLUMNS_SQL = """
+    SELECT
+        CAST(strftime('%s', timestamp) AS INTEGER),
+        success,
+        IFNULL(response_time, -1.0)
+    FROM checks
+    WHERE url = ? AND id <= ?
+    ORDER BY timestamp, id
+"""
+
+NEW_ROWS_SQL = """
+    SELECT
+        url,
+        CAST(strftime('%s', timestamp) AS INTEGER),
+        success,
+        IFNULL(response_time, -1.0)
+    FROM checks
+    WHERE id > ? AND id <= ?
+    ORDER BY id
+"""
+
+def _epoch(moment):
+    # Stored timestamps are naive local times; strftime('%s') reads them as
+    # UTC, so epoch values live in that frame throughout this module
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _format_epoch(seconds):
+    return (datetime(1970, 1, 1) + timedelta(seconds=int(seconds))).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class CheckColumns:
+    """
+    Columnar extract of checks, ordered by time.
+
+    Attributes:
+        ts (ndarray[int64]): Check time, seconds
+        success (ndarray[uint8]): 1 = up, 0 = down
+        rt (ndarray[float32]): Response time in seconds, NaN when unknown
+        url_id (ndarray[int32]): Index into `urls`
+        urls (list): URLs of the extract
+    """
+
+    def __init__(self, ts, success, rt, url_id, urls):
+        self.ts = ts
+        self.success = success
+        self.rt = rt
+        self.url_id = url_id
+        self.urls = urls
+
+    def __len__(self):
+        return len(self.ts)
+
+    def for_url(self, url):
+        """
+        Columns of a single URL (views, no copy when only one URL is loaded).
+        """
+        if len(self.urls) == 1 and self.urls[0] == url:
+            return self
+        if url not in self.urls:
+            return CheckColumns(self.ts[:0], self.success[:0], self.rt[:0], self.url_id[:0], [])
+        mask = self.url_id == self.urls.index(url)
+        return CheckColumns(self.ts[mask], self.success[mask], self.rt[mask],
+                            np.zeros(int(mask.sum()), dtype=np.int32), [url])
+
+
+class _UrlColumns:
+    """
+    Growable, time-ordered columns of one URL. Appends write past the
+    current size, so views handed out earlier stay valid.
+    """
+
+    def __init__(self, rows):
+        self.size = len(rows)
+        self.ts = rows['ts'].copy()
+        self.success = rows['success'].copy()
+        self.rt = rows['rt'].copy()
+        self.rt[self.rt < 0] = np.nan
+
+    def append(self, rows):
+        needed = self.size + len(rows)
+        if needed > len(self.ts):
+            capacity = max(needed, 2 * len(self.ts), 1024)
+            for name in ('ts', 'success', 'rt'):
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+
+        in_order = self.size == 0 or rows['ts'][0] >= self.ts[self.size - 1]
+        self.ts[self.size:needed] = rows['ts']
+        self.success[self.size:needed] = rows['success']
+        rt = rows['rt'].astype(np.float32)
+        rt[rt < 0] = np.nan
+        self.rt[self.size:needed] = rt
+        self.size = needed
+
+        # Late arrivals (batches, imports): restore time order in new arrays
+        if not in_order or np.any(np.diff(rows['ts']) < 0):
+            order = np.argsort(self.ts[:needed], kind='stable')
+            self.ts = self.ts[:needed][order]
+            self.success = self.success[:needed][order]
+            self.rt = self.rt[:needed][order]
+
+    def view(self, since=None):
+        start = 0
+        if since is not None:
+            start = int(np.searchsorted(self.ts[:self.size], since, side='left'))
+        return self.ts[start:self.size], self.success[start:self.size], self.rt[start:self.size]
+
+
+def _partition_marks():
+    """
+    Lowest check id of each partition: a partition that is gone, or was
+    dropped and created again, no longer has the same mark.
+
+    Returns:
+        dict: Partition name -> lowest id (None while empty)
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        marks = {}
+        for name in list_partitions(cursor):
+            cursor.execute(f'SELECT MIN(id) FROM {name}')
+            marks[name] = cursor.fetchone()[0]
+        return marks
+    finally:
+        close_connection(conn)
+
+
+class ColumnStore:
+    """
+    In-memory columns of all checks, per URL, kept in sync with the
+    database incrementally: each refresh only reads rows added since the
+    last one (by id). Dropped partitions (retention, even when their ids
+    interleave with kept ones) or a different database trigger a full
+    reload; new partitions do not.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.marks = {}
+        self.max_id = 0
+        self.columns = {}
+
+    def refresh(self):
+        marks = _partition_marks()
+        version = get_data_version()
+        with self.lock:
+            dropped = any(marks.get(name, -1) != mark
+                          for name, mark in self.marks.items() if mark is not None)
+            if (self.path != database.DB_PATH or dropped
+                    or version['max_id'] < self.max_id):
+                self._reload(version)
+            elif version['max_id'] > self.max_id:
+                self._append(version)
+            self.marks = marks
+
+    def _reload(self, version):
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            urls = get_urls(conn)
+            columns = {}
+            for url in urls:
+                cursor.execute(COLUMNS_SQL, (url, version['max_id']))
+                columns[url] = _UrlColumns(np.fromiter(cursor, dtype=ROW_DTYPE))
+        finally:
+            close_connection(conn)
+
+        self.columns = columns
+        self.path = database.DB_PATH
+        self.max_id = version['max_id']
+
+    def _append(self, version):
+        conn = get_connection()
+        try:
+            rows = conn.execute(NEW_ROWS_SQL, (self.max_id, version['max_id'])).fetchall()
+        finally:
+            close_connection(conn)
+
+        by_url = {}
+        for url, ts, success, rt in rows:
+            by_url.setdefault(url, []).append((ts, success, rt))
+        for url, url_rows in by_url.items():
+            new = np.array(url_rows, dtype=ROW_DTYPE)
+            if url in self.columns:
+                self.columns[url].append(new)
+            else:
+                self.columns[url] = _UrlColumns(new)
+
+        self.max_id = version['max_id']
+
+    def get(self, url=None, since=None):
+        """
+        Returns:
+            list: (url, ts, success, rt) views per URL
+        """
+        with self.lock:
+            urls = [url] if url else sorted(self.columns)
+            return [(u,) + self.columns[u].view(since) for u in urls if u in self.columns]
+
+
+# Process-wide column store
+_store = ColumnStore()
+
+
+@timed('vectorized.load_columns')
+def load_columns(url=None, since=None):
+    """
+    Get checks as NumPy columns. Served from the hot-store when it covers
+    the window of a single target, otherwise from the in-memory column
+    store, which only reads checks added since the previous call.
+
+    Args:
+        url (str): Only this URL (default all URLs)
+        since (datetime): Only checks at or after this time (optional)
+
+    Returns:
+        CheckColumns: Columns ordered by timestamp (views when one URL is
+            selected, so do not modify them)
+    """
+    since_epoch = _epoch(since) if since is not None else None
+
+    # Recent window of one target: read the memory-mapped hot-store
+    if url and hotstore.HOTSTORE_ENABLED:
+        columns = hotstore.read_columns(url, since_epoch)
+        if columns is not None:
+            ts, success, rt = columns['ts'], columns['success'], columns['rt']
+            if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+                order = np.argsort(ts, kind='stable')
+                ts, success, rt = ts[order], success[order], rt[order]
+            return CheckColumns(ts, success, rt, np.zeros(len(ts), dtype=np.int32), [url])
+
+    _store.refresh()
+    parts = _store.get(url, since_epoch)
+
+    if len(parts) == 1:
+        target, ts, success, rt = parts[0]
+        return CheckColumns(ts, success, rt, np.zeros(len(ts), dtype=np.int32), [target])
+    if not parts:
+        empty = np.empty(0, dtype=np.int64)
+        return CheckColumns(empty, empty.astype(np.uint8), empty.astype(np.float32),
+                            empty.astype(np.int32), [])
+
+    # Several URLs: merge into one time-ordered sequence
+    ts = np.concatenate([p[1] for p in parts])
+    order = np.argsort(ts, kind='stable')
+    url_id = np.concatenate([np.full(len(p[1]), i, dtype=np.int32) for i, p in enumerate(parts)])
+    return CheckColumns(
+        ts[order],
+        np.concatenate([p[2] for p in parts])[order],
+        np.concatenate([p[3] for p in parts])[order],
+        url_id[order],
+        [p[0] for p in parts]
+    )
+
+
+def uptime(columns, start=None, now=None, method='time', max_gap=300):
+    """
+    Uptime percentage of the columns.
+
+    Args:
+        columns (CheckColumns): Checks (may start before `start` so the
+            state at the period start is known)
+        start (int): Period start, epoch seconds (None = from the first check)
+        now (int): Period end, epoch seconds (default current time)
+        method (str): 'time' (time-weighted) or 'count'
+        max_gap (int): Seconds a check's state may last at most
+
+    Returns:
+        float: Uptime percentage (0-100), or None without checks
+    """
+    in_period = columns.ts >= start if start is not None else slice(None)
+    success = columns.success[in_period]
+
+    if method == 'count':
+        if len(success) == 0:
+            return None
+        return round(float(success.mean()) * 100, 2)
+
+    if now is None:
+        now = _epoch(datetime.now())
+
+    # Each check's state lasts until the next check of its URL (or now)
+    seconds = np.zeros(len(columns), dtype=np.int64)
+    for url_id in range(len(columns.urls)):
+        positions = np.flatnonzero(columns.url_id == url_id) if len(columns.urls) > 1 \
+            else np.arange(len(columns))
+        if len(positions) == 0:
+            continue
+        ts = columns.ts[positions]
+        ends = np.append(ts[1:], max(now, int(ts[-1])))
+        ends = np.minimum(ends, ts + max_gap)
+        begins = np.maximum(ts, start) if start is not None else ts
+        seconds[positions] = np.maximum(0, ends - begins)
+
+    total = int(seconds.sum())
+    if total:
+        return round(float(seconds[columns.success == 1].sum()) / total * 100, 2)
+    if len(success):
+        return round(float(success.mean()) * 100, 2)
+    return None
+
+
+def outages(columns):
+    """
+    Runs of consecutive failed checks (same shape as analytics.detect_outages).
+
+    Returns:
+        list: Outage dictionaries with start, end, checks_failed,
+            duration_minutes and, for a run reaching the last check, ongoing
+    """
+    down = (columns.success == 0).astype(np.int8)
+    if not down.any():
+        return []
+
+    edges = np.diff(np.concatenate(([0], down, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    minutes = ((columns.ts[ends] - columns.ts[starts]) / 60).astype(np.int64)
+
+    result = []
+    for first, last, duration in zip(starts.tolist(), ends.tolist(), minutes.tolist()):
+        outage = {
+            'start': _format_epoch(columns.ts[first]),
+            'end': _format_epoch(columns.ts[last]),
+            'checks_failed': last - first + 1,
+            'duration_minutes': duration
+        }
+        if last == len(columns) - 1:
+            outage['ongoing'] = True
+        result.append(outage)
+    return result
+
+
+def response_times(columns):
+    """
+    Response times of successful checks (NaN dropped).
+    """
+    rt = columns.rt[columns.success == 1]
+    return rt[~np.isnan(rt)]
+
+
+def percentiles(columns, quantiles=(50, 90, 95, 99)):
+    """
+    Response time percentiles of successful checks.
+
+    Returns:
+        dict: 'p50' etc. -> seconds (0.0 without data)
+    """
+    rt = response_times(columns)
+    if len(rt) == 0:
+        return {f'p{q}': 0.0 for q in quantiles}
+    values = np.percentile(rt.astype(np.float64), quantiles)
+    return {f'p{q}': round(float(v), 3) for q, v in zip(quantiles, values)}
+
+
+def moving_average(columns, window=10):
+    """
+    Moving average of successful response times over `window` checks.
+
+    Returns:
+        tuple: (timestamps, averages) arrays, one point per full window
+    """
+    mask = columns.success == 1
+    mask &= ~np.isnan(columns.rt)
+    rt = columns.rt[mask].astype(np.float64)
+    ts = columns.ts[mask]
+    if len(rt) < window:
+        return ts[:0], rt[:0]
+    sums = np.cumsum(np.concatenate(([0.0], rt)))
+    averages = (sums[window:] - sums[:-window]) / window
+    return ts[window - 1:], averages
+
+
+def histogram(columns, bins=20, value_range=None):
+    """
+    Histogram of successful response times.
+
+    Args:
+        bins (int): Number of bins
+        value_range (tuple): (low, high) seconds (default data min/max)
+
+    Returns:
+        tuple: (counts, bin_edges)
+    """
+    return np.histogram(response_times(columns), bins=bins, range=value_range)
+
+
+def performance_stats(columns):
+    """
+    Same result as analytics.get_performance_stats for the columns.
+    """
+    total = len(columns)
+    successful = int(columns.success.sum())
+    rt = response_times(columns).astype(np.float64)
+
+    if len(rt):
+        avg, low, high, median = rt.mean(), rt.min(), rt.max(), np.median(rt)
+    else:
+        avg = low = high = median = 0.0
+
+    return {
+        'total_checks': total,
+        'successful_checks': successful,
+        'failed_checks': total - successful,
+        'avg_response_time': round(float(avg), 3),
+        'min_response_time': round(float(low), 3),
+        'max_response_time': round(float(high), 3),
+        'median_response_time': round(float(median), 3)
+    }
@@ -0,0 +1,152 @@
+"""
+HTTP conditional responses for the JSON API.
+
+ETags are derived from the data version (lowest and highest check id)
+and the request, so they can be computed - and 304s answered - without
+running any analytics. Serialized payloads are cached by ETag so
+unchanged data is not rebuilt or re-serialized.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from src.storage import get_storage
+
+
+class PayloadCache:
+    """
+    Small thread-safe LRU cache of serialized response bodies by ETag.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag):
+        with self.lock:
+            body = self.entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag, body):
+        with self.lock:
+            self.entries[etag] = body
+            self.entries.move_to_end(etag)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Shared cache for all conditional endpoints
+payload_cache = PayloadCache(int(os.getenv('API_CACHE_ENTRIES', 128)))
+
+# How long rolling-window responses may be reused without new checks
+API_CACHE_SECONDS = int(os.getenv('API_CACHE_SECONDS', 60))
+
+
+def compute_etag(version, time_bucket=None):
+    """
+    Build an ETag for the current request.
+
+    Args:
+        version (dict): Data version from get_data_version()
+        time_bucket (int): Seconds per time bucket for endpoints whose
+            result depends on "now" (rolling windows), or None
+
+    Returns:
+        str: ETag value (without quotes)
+    """
+    from flask import request
+
+    parts = [
+        request.path,
+        sorted(request.args.items(multi=True)),
+        version['min_id'],
+        version['max_id']
+    ]
+    if time_bucket:
+        parts.append(int(time.time() // time_bucket))
+
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def parse_check_timestamp(timestamp):
+    """
+    Convert a stored check timestamp (local time) to an aware UTC datetime.
+
+    Returns:
+        datetime: UTC datetime, or None if unparseable
+    """
+    try:
+        local = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+        return local.astimezone(timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def conditional_json(time_bucket=None):
+    """
+    Decorator for JSON views that should answer conditional requests.
+
+    The view only runs when the client's copy is stale and the
+    payload cache has no body for the current ETag.
+
+    Args:
+        time_bucket (int): For rolling-window endpoints, how many seconds
+            a response may be reused when no new check has landed
+            (usually API_CACHE_SECONDS). None for endpoints that only
+            depend on stored data.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import request, make_response
+
+            version = get_storage().get_data_version()
+            etag = compute_etag(version, time_bucket)
+            last_modified = parse_check_timestamp(version['last_timestamp'])
+
+            def finish(response):
+                response.set_etag(etag)
+                response.cache_control.no_cache = True
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                return response
+
+            # Client copy is still current: no report work at all.
+            # Weak comparison, gzipped bodies carry W/"<etag>". If-Modified-Since
+            # is not enough: a late or backfilled check changes the data without
+            # moving Last-Modified (the newest check's time)
+            if request.if_none_match.contains_weak(etag):
+                return finish(make_response('', 304))
+
+            body = payload_cache.get(etag)
+            if body is not None:
+                response = make_response(body)
+                response.mimetype = 'application/json'
+                return finish(response)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            payload_cache.put(etag, response.get_data())
+            return finish(response)
+
+        return wrapper
+    return decorator
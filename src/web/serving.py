@@ -0,0 +1,90 @@
+"""
+Production serving helpers for the Flask dashboard.
+Adds gzip compression and cache headers for static assets.
+"""
+
+import gzip
+import os
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = (
+    'text/html',
+    'text/css',
+    'text/plain',
+    'application/json',
+    'application/javascript',
+    'image/svg+xml'
+)
+
+
+def compress_response(response, min_size=500, level=6):
+    """
+    Gzip a response body if the client accepts it and it is worth it.
+
+    Args:
+        response: Flask response
+        min_size (int): Don't compress bodies smaller than this (bytes)
+        level (int): gzip compression level (1-9)
+
+    Returns:
+        Response: The same response, possibly compressed
+    """
+    from flask import request
+
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+
+    # Other clients may get this URL gzipped, so caches must key on the
+    # header even when this response (or a 304 for it) stays identity
+    if response.mimetype in COMPRESSIBLE_TYPES or response.status_code == 304:
+        response.vary.add('Accept-Encoding')
+
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=level))
+    response.headers['Content-Encoding'] = 'gzip'
+
+    # Same content, different bytes: a strong validator no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def configure_production(app):
+    """
+    Configure a Flask app for production serving.
+
+    Environment:
+        WEB_GZIP_MIN_SIZE: Smallest body to compress in bytes (default 500)
+        WEB_GZIP_LEVEL: gzip level (default 6)
+        STATIC_MAX_AGE: Cache lifetime for static assets in seconds (default 1 day)
+
+    Args:
+        app: Flask app
+    """
+    from flask import request
+
+    min_size = int(os.getenv('WEB_GZIP_MIN_SIZE', 500))
+    level = int(os.getenv('WEB_GZIP_LEVEL', 6))
+    static_max_age = int(os.getenv('STATIC_MAX_AGE', 86400))
+
+    app.debug = False
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = static_max_age
+
+    @app.after_request
+    def add_production_headers(response):
+        # Static assets are versioned by deploy, let browsers keep them
+        if app.static_url_path and request.path.startswith(app.static_url_path + '/'):
+            response.cache_control.public = True
+            response.cache_control.max_age = static_max_age
+        return compress_response(response, min_size=min_size, level=level)
+
+    return app
@@ -0,0 +1,243 @@
+"""
+Compact binary encoding of check result batches.
+
+Probe agents and other writer processes send results to /api/ingest in
+this format instead of JSON: every result is one fixed-width record, and
+URLs and error messages are sent once per batch and referred to by
+number. Layout, integers little-endian:
+
+    header   b'CHKW' | u8 version | u8 flags (0) | u32 result count
+             | i64 base time | u8 agent length | UTF-8 agent name
+    urls     u16 count, per URL u16 byte length | UTF-8 bytes
+    errors   u16 count, per error u16 byte length | UTF-8 bytes
+    records  RECORD per result (30 bytes)
+    end      u32 CRC-32 of everything before it
+
+Record fields:
+
+    url        u16 index into the URL table
+    timestamp  u32 seconds after the base time
+    status     u16 HTTP status code (0 = none)
+    response   u32 response time in microseconds
+    flags      u8  bit 0 success, bit 1 scheduled_at present
+    retries    u8  (saturates at 255)
+    error      u16 index into the error table (0xFFFF = none)
+    queue      u32 queue wait in microseconds
+    lag        u32 schedule lag in milliseconds
+    scheduled  i32 scheduled_at in seconds after the base time
+    missed     u16 missed runs (saturates at 65535)
+
+Times are whole seconds since 1970-01-01 00:00:00 of the stored (local)
+time, as in archives (see src/archive.py); the base time is the earliest
+timestamp of the batch. Durations of 0xFFFFFFFF are none, longer ones
+saturate just below it.
+"""
+
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+MAGIC = b'CHKW'
+VERSION = 1
+
+CONTENT_TYPE = 'application/x-check-batch'
+
+HEADER = struct.Struct('<4sBBIqB')
+RECORD = struct.Struct('<HIHIBBHIIiH')
+LENGTH = struct.Struct('<H')
+CRC = struct.Struct('<I')
+
+NONE16 = 0xFFFF
+NONE32 = 0xFFFFFFFF
+
+SUCCESS = 1
+SCHEDULED = 2
+
+# Most results in one batch
+MAX_RESULTS = 1000000
+
+EPOCH = datetime(1970, 1, 1)
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _seconds(moment):
+    """
+    Whole seconds since EPOCH of a datetime or stored timestamp string.
+    """
+    if isinstance(moment, str):
+        moment = datetime.strptime(moment[:19], TIME_FORMAT)
+    return (moment.replace(microsecond=0) - EPOCH) // timedelta(seconds=1)
+
+
+def _duration(seconds, unit):
+    """
+    Duration in `unit`s of a second for a u32 field (NONE32 for none).
+    """
+    if seconds is None:
+        return NONE32
+    return min(max(0, round(seconds * unit)), NONE32 - 1)
+
+
+def _table(data, offset):
+    """
+    Read a u16-counted table of u16-length UTF-8 strings.
+
+    Returns:
+        tuple: (list of strings, offset after the table)
+    """
+    (count,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    entries = []
+    for _ in range(count):
+        (length,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        entries.append(bytes(data[offset:offset + length]).decode('utf-8'))
+        offset += length
+    return entries, offset
+
+
+def _text(value, limit):
+    """
+    UTF-8 bytes of `value`, cut to at most `limit` bytes on a character boundary.
+    """
+    return value.encode('utf-8')[:limit].decode('utf-8', 'ignore').encode('utf-8')
+
+
+def _pack_table(entries):
+    """
+    Write a u16-counted table of u16-length UTF-8 strings.
+    """
+    parts = [LENGTH.pack(len(entries))]
+    for entry in entries:
+        encoded = _text(entry, NONE16)
+        parts.append(LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b''.join(parts)
+
+
+def encode_results(results, agent=None):
+    """
+    Encode check results as one binary batch.
+
+    Args:
+        results (list): Check results (timestamps as datetime or stored text)
+        agent (str): Name of the agent that made the checks, if any
+
+    Returns:
+        bytes: Encoded batch
+
+    Raises:
+        ValueError: If the batch has too many results, URLs or errors
+    """
+    if len(results) > MAX_RESULTS:
+        raise ValueError(f'At most {MAX_RESULTS} results per batch')
+    times = [_seconds(result['timestamp']) for result in results]
+    base = min(times) if times else 0
+
+    urls, errors = {}, {}
+    records = bytearray(RECORD.size * len(results))
+    try:
+        _pack_records(records, results, times, base, urls, errors)
+    except struct.error as e:
+        raise ValueError(f'Result does not fit the format: {e}')
+    if len(urls) >= NONE16 or len(errors) >= NONE16:
+        raise ValueError('Too many distinct URLs or errors in one batch')
+
+    name = _text(agent or '', 255)
+    body = b''.join((
+        HEADER.pack(MAGIC, VERSION, 0, len(results), base, len(name)), name,
+        _pack_table(list(urls)), _pack_table(list(errors)), records
+    ))
+    return body + CRC.pack(zlib.crc32(body))
+
+
+def _pack_records(records, results, times, base, urls, errors):
+    """
+    Pack each result into `records`, numbering URLs and errors as they appear.
+    """
+    for index, (result, moment) in enumerate(zip(results, times)):
+        url_id = urls.setdefault(result['url'], len(urls))
+        error = result.get('error')
+        error_id = errors.setdefault(error, len(errors)) if error else NONE16
+        scheduled_at = result.get('scheduled_at')
+        flags = (SUCCESS if result['success'] else 0) | (SCHEDULED if scheduled_at else 0)
+        RECORD.pack_into(
+            records, index * RECORD.size,
+            url_id,
+            moment - base,
+            result.get('status_code') or 0,
+            _duration(result.get('response_time'), 1000000),
+            flags,
+            min(result.get('retries') or 0, 255),
+            error_id,
+            _duration(result.get('queue_wait'), 1000000),
+            _duration(result.get('schedule_lag'), 1000),
+            _seconds(scheduled_at) - base if scheduled_at else 0,
+            min(result.get('missed_runs') or 0, NONE16)
+        )
+
+
+def decode_results(data, max_results=MAX_RESULTS):
+    """
+    Decode a binary batch back into check result dictionaries.
+
+    Args:
+        data (bytes): Encoded batch (see encode_results())
+        max_results (int): Most results accepted (checked before decoding any)
+
+    Returns:
+        tuple: (agent name or None, list of check results). Results
+            carry 'agent' when the batch names one.
+
+    Raises:
+        ValueError: If the batch is truncated, corrupted, of an unknown
+            version or has too many results
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size + CRC.size:
+        raise ValueError('Batch is truncated')
+    (crc,) = CRC.unpack_from(data, len(data) - CRC.size)
+    if zlib.crc32(data[:-CRC.size]) != crc:
+        raise ValueError('Batch checksum mismatch')
+
+    try:
+        magic, version, _, count, base, name_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a check batch')
+        if version != VERSION:
+            raise ValueError(f'Unsupported batch version {version}')
+        offset = HEADER.size
+        agent = bytes(data[offset:offset + name_length]).decode('utf-8') or None
+        urls, offset = _table(data, offset + name_length)
+        errors, offset = _table(data, offset)
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f'Batch is truncated: {e}')
+    if count > max_results:
+        raise ValueError(f'At most {max_results} results per batch')
+    if len(data) - CRC.size - offset != count * RECORD.size:
+        raise ValueError('Batch length does not match its result count')
+
+    start = EPOCH + timedelta(seconds=base)
+    results = []
+    try:
+        for (url_id, moment, status, response, flags, retries, error_id,
+             queue, lag, scheduled, missed) in RECORD.iter_unpack(data[offset:len(data) - CRC.size]):
+            result = {
+                'url': urls[url_id],
+                'timestamp': start + timedelta(seconds=moment),
+                'status_code': status or None,
+                'response_time': response / 1000000 if response != NONE32 else None,
+                'success': bool(flags & SUCCESS),
+                'error': errors[error_id] if error_id != NONE16 else None,
+                'retries': retries,
+                'queue_wait': queue / 1000000 if queue != NONE32 else None,
+                'scheduled_at': start + timedelta(seconds=scheduled) if flags & SCHEDULED else None,
+                'schedule_lag': lag / 1000 if lag != NONE32 else None,
+                'missed_runs': missed
+            }
+            if agent:
+                result['agent'] = agent
+            results.append(result)
+    except IndexError:
+        raise ValueError('Record refers to a missing URL or error')
+    return agent, results
@@ -0,0 +1,23 @@
+"""
+Shared pytest fixtures.
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """
+    Point the database module at a fresh database file.
+    """
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'monitoring.db'))
+    database.init_database()
+    return database.DB_PATH
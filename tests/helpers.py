@@ -0,0 +1,176 @@
+"""
+Shared helpers for the test suite: local HTTP/SMTP servers and fakes.
+"""
+
+import json
+import socketserver
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CountingServer(ThreadingHTTPServer):
+    """
+    Local HTTP server that records request times and peak concurrency.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.02):
+        super().__init__(('127.0.0.1', 0), CountingHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.request_times = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            server.request_times.append(time.monotonic())
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(delay=0.02):
+    server = CountingServer(delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def fake_probe(url, timeout=5):
+    return {
+        'url': url,
+        'status_code': 200,
+        'response_time': 0.01,
+        'success': True,
+        'timestamp': datetime.now(),
+        'error': None,
+        'retries': 0
+    }
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class WebhookReceiver(ThreadingHTTPServer):
+    """
+    Local stand-in for a webhook: records JSON bodies POSTed to it.
+    The first `fail_first` requests get a 500.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fail_first=0):
+        super().__init__(('127.0.0.1', 0), WebhookHandler)
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.attempts = 0
+        self.bodies = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/hook"
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.attempts += 1
+            failed = server.attempts <= server.fail_first
+            if not failed:
+                server.bodies.append(json.loads(body))
+        self.send_response(500 if failed else 204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SmtpReceiver(socketserver.ThreadingTCPServer):
+    """
+    Local stand-in for a mail server: speaks just enough SMTP to accept
+    messages and records (sender, recipients, data) for each.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SmtpHandler)
+        self.messages = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        sender, recipients = None, []
+        self.reply('220 localhost stand-in')
+        for raw in self.rfile:
+            command = raw.decode().rstrip('\r\n')
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                sender = command.split(':', 1)[1].strip(' <>')
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip(' <>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data in self.rfile:
+                    if data.rstrip(b'\r\n') == b'.':
+                        break
+                    lines.append(data.decode())
+                self.server.messages.append((sender, recipients, ''.join(lines)))
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+def start_receiver(receiver):
+    thread = threading.Thread(target=receiver.serve_forever, daemon=True)
+    thread.start()
+    return receiver
@@ -0,0 +1,211 @@
+"""
+Tests for probe agents and the aggregator's quorum decisions.
+The end-to-end test runs agents as separate local processes.
+"""
+
+import sys
+import os
+import gzip
+import json
+import socket
+import subprocess
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.serving import make_server
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.aggregator as aggregator
+import src.database as database
+from src.aggregator import Aggregator, decode_results, encode_result
+from tests.helpers import start_server
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+URL = 'https://a.test/'
+
+
+def result(success, moment, url=URL):
+    return {'url': url, 'timestamp': moment, 'status_code': 200 if success else None,
+            'response_time': 0.1 if success else None, 'success': success,
+            'error': None if success else 'Timeout', 'retries': 0, 'missed_runs': 0}
+
+
+def counting_save():
+    counter = iter(range(1, 10 ** 6))
+    return lambda results: [next(counter) for _ in results]
+
+
+def test_quorum_separates_site_down_from_agent_trouble():
+    now = datetime.now()
+    hub = Aggregator(stale_seconds=60, save=counting_save())
+
+    hub.ingest('a', [result(True, now)])
+    assert hub.decide(URL)['state'] == 'up'
+    hub.ingest('b', [result(False, now)])
+    # One of two agents is not a majority
+    assert hub.decide(URL)['state'] == 'partial'
+    hub.ingest('c', [result(True, now)])
+    decision = hub.decide(URL)
+    assert (decision['state'], decision['quorum'], decision['agents_down']) == ('partial', 2, ['b'])
+
+    hub.ingest('c', [result(False, now + timedelta(seconds=1))])
+    assert hub.decide(URL)['state'] == 'down'
+    # An older result from an agent never replaces its newer one
+    hub.ingest('c', [result(True, now - timedelta(seconds=30))])
+    assert hub.decide(URL)['state'] == 'down'
+
+    # Agents that stopped reporting no longer count
+    later = now + timedelta(seconds=120)
+    assert hub.decide(URL, now=later)['state'] == 'unknown'
+    assert hub.decide(URL, now=later)['stale_agents'] == ['a', 'b', 'c']
+
+    fixed = Aggregator(quorum=3, stale_seconds=60, save=counting_save())
+    for agent in 'ab':
+        fixed.ingest(agent, [result(False, now)])
+    assert fixed.decide(URL)['state'] == 'unknown'
+    fixed.ingest('c', [result(True, now)])
+    assert fixed.decide(URL)['state'] == 'partial'
+
+
+def test_batches_are_validated():
+    moment = datetime(2024, 5, 1, 12, 0, 0)
+    agent, results = decode_results({'agent': 'eu-1', 'results': [encode_result(result(True, moment))]})
+    assert agent == 'eu-1'
+    assert results[0]['timestamp'] == moment and results[0]['agent'] == 'eu-1'
+
+    for payload in ([], {'results': []}, {'agent': 'x'}, {'agent': 'x', 'results': [{'url': URL}]},
+                    {'agent': 'x', 'results': [{'url': URL, 'success': 1, 'timestamp': 'yesterday'}]}):
+        with pytest.raises(ValueError):
+            decode_results(payload)
+
+
+def test_ingest_endpoint_saves_tagged_results(temp_db, monkeypatch):
+    from app import app
+    monkeypatch.setattr(aggregator, '_aggregator', None)
+    monkeypatch.setattr(aggregator, 'AGENT_TOKEN', 'secret')
+    client = app.test_client()
+
+    moment = datetime.now().replace(microsecond=0)
+    batch = {'agent': 'eu-1', 'results': [encode_result(result(True, moment)),
+                                          encode_result(result(False, moment, url='https://b.test/'))]}
+    body = gzip.compress(json.dumps(batch).encode())
+    headers = {'Content-Encoding': 'gzip', 'Content-Type': 'application/json'}
+
+    assert client.post('/api/agents/results', data=body, headers=headers).status_code == 401
+    headers['X-Agent-Token'] = 'secret'
+    response = client.post('/api/agents/results', data=body, headers=headers)
+    assert response.status_code == 200 and response.json['saved'] == 2
+    assert client.post('/api/agents/results', data=b'{"agent": 1}', headers={'X-Agent-Token': 'secret'}).status_code == 400
+
+    rows = database.get_recent_checks(limit=5)
+    assert {(r['url'], r['agent'], r['success']) for r in rows} == {
+        (URL, 'eu-1', 1), ('https://b.test/', 'eu-1', 0)
+    }
+    status = client.get('/api/agents').json
+    assert status['agents']['eu-1']['results'] == 2
+    assert [t['state'] for t in status['targets']] == ['up', 'down']
+
+
+def test_ingest_refuses_remote_agents_without_token_and_gzip_bombs(temp_db, monkeypatch):
+    from app import app
+    monkeypatch.setattr(aggregator, '_aggregator', None)
+    monkeypatch.setattr(aggregator, 'AGENT_TOKEN', '')
+    monkeypatch.setattr(aggregator, 'MAX_BATCH_BYTES', 65536)
+    client = app.test_client()
+    batch = {'agent': 'eu-1', 'results': [encode_result(result(True, datetime.now().replace(microsecond=0)))]}
+    body = json.dumps(batch).encode()
+    remote = {'REMOTE_ADDR': '10.0.0.7'}
+
+    # No token configured: only local clients, unless explicitly allowed
+    assert client.post('/api/agents/results', data=body, environ_base=remote).status_code == 401
+    assert client.post('/api/agents/results', data=body).status_code == 200
+    monkeypatch.setattr(aggregator, 'AGENT_ALLOW_UNAUTHENTICATED', True)
+    assert client.post('/api/agents/results', data=body, environ_base=remote).status_code == 200
+
+    # Inflates past MAX_BATCH_BYTES: refused without decompressing it all
+    bomb = gzip.compress(b' ' * 10 ** 7)
+    response = client.post('/api/agents/results', data=bomb, headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 400 and 'larger than' in response.json['error']
+    assert client.post('/api/agents/results', data=gzip.compress(body)[:-8],
+                       headers={'Content-Encoding': 'gzip'}).status_code == 400
+
+
+def test_agent_splits_outbox_into_allowed_batches(monkeypatch):
+    from src import agent
+
+    class Session:
+        def __init__(self):
+            self.headers, self.batches = {}, []
+
+        def post(self, url, data, timeout):
+            _, results = json.loads(gzip.decompress(data)).values()
+            self.batches.append(len(results))
+            first = sum(self.batches) - len(results)
+            response = type('Response', (), {})()
+            response.raise_for_status = lambda: None
+            response.json = lambda: {'ids': list(range(first + 1, first + len(results) + 1))}
+            return response
+
+    monkeypatch.setattr(agent, 'MAX_BATCH_RESULTS', 2)
+    session = Session()
+    client = agent.AgentClient('http://hub.test', 'eu-1', session=session, wire_format='json')
+    moment = datetime.now().replace(microsecond=0)
+    assert client.send([result(True, moment) for _ in range(5)]) == [1, 2, 3, 4, 5]
+    assert session.batches == [2, 2, 1]
+    assert client.stats['batches_sent'] == 3 and not client.outbox
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_agent_processes_report_to_local_aggregator(temp_db, monkeypatch):
+    from app import app
+    monkeypatch.setattr(aggregator, '_aggregator', None)
+    monkeypatch.setattr(aggregator, 'AGENT_TOKEN', '')
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    target = start_server(delay=0.01)
+    dead = f'http://127.0.0.1:{free_port()}/'
+    try:
+        agents = []
+        for name in ('a', 'b', 'c'):
+            env = dict(os.environ, DB_PATH=os.devnull, RATE_LIMIT_PER_HOST='0', RATE_LIMIT_GLOBAL='0',
+                       TIMEOUT='2')
+            hub = f'http://127.0.0.1:{server.server_port}'
+            if name == 'c':
+                # This agent's own network is broken (but it still reaches the aggregator)
+                env['HTTP_PROXY'] = env['http_proxy'] = dead
+                env['NO_PROXY'] = env['no_proxy'] = 'localhost'
+                hub = f'http://localhost:{server.server_port}'
+            agents.append(subprocess.Popen(
+                [sys.executable, 'run.py', 'agent', hub,
+                 '--name', name, '--urls', f'{target.url},{dead}', '--interval', '1', '--rounds', '2'],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            ))
+        for process in agents:
+            _, stderr = process.communicate(timeout=60)
+            assert process.returncode == 0, stderr.decode()[-2000:]
+
+        # A round skips a URL whose previous probe is still retrying
+        rows = database.get_all_checks()
+        assert 6 <= len(rows) <= 12
+        assert {(r['agent'], r['url']) for r in rows} == {
+            (agent, url) for agent in 'abc' for url in (target.url, dead)
+        }
+
+        decisions = {t['url']: t for t in aggregator.get_aggregator().get_status()['targets']}
+        assert decisions[target.url]['state'] == 'partial'
+        assert decisions[target.url]['agents_down'] == ['c']
+        assert decisions[dead]['state'] == 'down'
+    finally:
+        server.shutdown()
+        target.shutdown()
+        target.server_close()
@@ -0,0 +1,157 @@
+"""
+Tests for alert rules, debouncing, flap suppression and batched delivery.
+Notifications go to local stand-in receivers (no network).
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.alerts import (
+    AlertEngine, ConsecutiveFailuresRule, LatencyP95Rule, UptimeRule,
+    NotificationDispatcher, WebhookChannel, SmtpChannel
+)
+from src.pipeline import ProbePipeline
+from tests.helpers import WebhookReceiver, SmtpReceiver, start_receiver, fake_probe, wait_for
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def results(pattern, url='https://a.test/', response_time=0.1, step=30):
+    """
+    Check results from a pattern string: '+' success, '-' failure.
+    """
+    return [
+        {'url': url, 'timestamp': START + timedelta(seconds=step * i),
+         'success': mark == '+', 'response_time': response_time if mark == '+' else None}
+        for i, mark in enumerate(pattern)
+    ]
+
+
+def states(engine, checks):
+    return [n['state'] for check in checks for n in engine.process(check)]
+
+
+def test_consecutive_failures_fire_once_and_resolve_debounced():
+    engine = AlertEngine([ConsecutiveFailuresRule(3)], debounce=2)
+    checks = results('++-------' + '+--')
+
+    fired = [engine.process(check) for check in checks]
+    assert [i for i, n in enumerate(fired) if n] == [4, 10]
+    assert fired[4][0]['state'] == 'firing' and fired[4][0]['value'] == 3
+    assert fired[4][0]['message'] == 'https://a.test/: 3 consecutive failed checks'
+    # The streak debounces firing; resolving needs two evaluations below it
+    assert fired[10][0]['state'] == 'resolved'
+    assert engine.get_active() == []
+
+
+def test_latency_and_uptime_rules_use_windows():
+    engine = AlertEngine([LatencyP95Rule(1.0, window=300, min_samples=5)], debounce=2)
+    fast = results('+' * 10, response_time=0.2)
+    slow = results('+' * 4, response_time=3.0)
+    for i, check in enumerate(slow):
+        check['timestamp'] = fast[-1]['timestamp'] + timedelta(seconds=30 * (i + 1))
+
+    assert states(engine, fast) == []
+    # One slow check in ten is not p95; the second and third push it over
+    assert states(engine, slow) == ['firing']
+    assert engine.get_active()[0]['rule'] == 'latency_p95'
+
+    engine = AlertEngine([UptimeRule(90.0, window=300, min_samples=10)], debounce=1)
+    # 10 checks per window: one failure is 90%, two are 80%
+    assert states(engine, results('+++++-++++' + '+-+++++++' + '+' * 10)) == ['firing', 'resolved']
+
+
+def test_flapping_is_reported_once_and_suppressed():
+    engine = AlertEngine([ConsecutiveFailuresRule(1)], debounce=1, flap_window=600, flap_threshold=4)
+    checks = results('+-+-+-+-+-' + '+' * 20)
+
+    notified = states(engine, checks)
+    # Fires and resolves twice before flapping is detected, then stays quiet
+    # until the changes leave the window and it settles as resolved
+    assert notified == ['firing', 'resolved', 'firing', 'flapping', 'resolved']
+
+
+def test_dispatcher_batches_and_retries_webhook():
+    receiver = start_receiver(WebhookReceiver(fail_first=1))
+    dispatcher = NotificationDispatcher([WebhookChannel(receiver.url)], batch_seconds=0.2,
+                                        retry_backoff=0.05).start()
+    engine = AlertEngine([ConsecutiveFailuresRule(2)], dispatcher=dispatcher)
+    try:
+        for url in ('https://a.test/', 'https://b.test/', 'https://c.test/'):
+            for check in results('--', url=url):
+                engine.process(check)
+
+        assert wait_for(lambda: receiver.bodies, timeout=5)
+        # The receiver answers before the dispatcher counts the batch
+        assert wait_for(lambda: dispatcher.get_stats()['batches_sent'], timeout=5)
+        assert receiver.attempts == 2
+        assert [n['url'] for n in receiver.bodies[0]['alerts']] == [
+            'https://a.test/', 'https://b.test/', 'https://c.test/'
+        ]
+        stats = dispatcher.get_stats()
+        assert (stats['queued'], stats['batches_sent'], stats['retries'], stats['failed']) == (3, 1, 1, 0)
+    finally:
+        dispatcher.stop()
+        receiver.shutdown()
+        receiver.server_close()
+
+
+def test_dispatcher_gives_up_after_max_retries():
+    receiver = start_receiver(WebhookReceiver(fail_first=100))
+    dispatcher = NotificationDispatcher([WebhookChannel(receiver.url)], batch_seconds=0,
+                                        max_retries=2, retry_backoff=0.01).start()
+    try:
+        dispatcher.notify({'url': 'https://a.test/', 'state': 'firing'})
+        assert wait_for(lambda: dispatcher.get_stats()['failed'] == 1)
+        assert receiver.attempts == 3
+    finally:
+        dispatcher.stop()
+        receiver.shutdown()
+        receiver.server_close()
+
+
+def test_smtp_channel_sends_one_email_per_batch():
+    receiver = start_receiver(SmtpReceiver())
+    channel = SmtpChannel('127.0.0.1', receiver.port, sender='monitor@example.com',
+                          recipients=['ops@example.com', 'oncall@example.com'])
+    dispatcher = NotificationDispatcher([channel], batch_seconds=0.2).start()
+    engine = AlertEngine([ConsecutiveFailuresRule(1)], dispatcher=dispatcher)
+    try:
+        for check in results('-') + results('-', url='https://b.test/'):
+            engine.process(check)
+        assert wait_for(lambda: receiver.messages, timeout=5)
+
+        sender, recipients, data = receiver.messages[0]
+        assert sender == 'monitor@example.com'
+        assert recipients == ['ops@example.com', 'oncall@example.com']
+        assert 'Subject: [monitor] 2 firing' in data
+        assert 'https://b.test/: 1 consecutive failed checks' in data
+        assert len(receiver.messages) == 1
+    finally:
+        dispatcher.stop()
+        receiver.shutdown()
+        receiver.server_close()
+
+
+def test_pipeline_listener_evaluates_saved_results():
+    engine = AlertEngine([ConsecutiveFailuresRule(2)])
+
+    def failing_probe(url, timeout=5):
+        return dict(fake_probe(url, timeout), success=False, status_code=None)
+
+    pipeline = ProbePipeline(probe_workers=1, probe=failing_probe,
+                             save=lambda batch: list(range(1, len(batch) + 1)))
+    pipeline.add_result_listener(engine.process)
+    pipeline.start()
+    try:
+        for saved in (1, 2):
+            pipeline.submit('https://a.test/')
+            assert wait_for(lambda: pipeline.stats['saved'] >= saved)
+        assert wait_for(lambda: engine.get_active())
+        assert engine.get_active()[0]['state'] == 'firing'
+    finally:
+        pipeline.stop()
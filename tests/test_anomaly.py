@@ -0,0 +1,126 @@
+"""
+Tests for online flap detection and anomaly scoring, their checkpoints,
+and outage reporting of flaky targets.
+"""
+
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+from src.analytics import detect_outages, get_outage_summary
+from src.anomaly import AnomalyDetector, TargetDetector
+
+URL = 'https://a.test/'
+
+
+def checks(count, start=None, success=lambda i: True, latency=lambda i: 0.2, step=30, url=URL):
+    start = start or datetime.now().replace(microsecond=0) - timedelta(seconds=step * count)
+    return [
+        {'url': url, 'timestamp': start + timedelta(seconds=step * i),
+         'status_code': 200 if success(i) else None,
+         'response_time': latency(i) if success(i) else None,
+         'success': success(i), 'error': None if success(i) else 'Timeout', 'retries': 0}
+        for i in range(count)
+    ]
+
+
+def test_latency_spike_is_flagged_against_the_baseline():
+    rng = random.Random(3)
+    detector = TargetDetector(URL)
+    for check in checks(60, latency=lambda i: rng.gauss(0.2, 0.01)):
+        detector.update(check)
+    assert not detector.spike and detector.spikes == 0
+    assert abs(detector.mean - 0.2) < 0.02
+
+    detector.update(checks(1, latency=lambda i: 1.5)[0])
+    report = detector.to_dict()
+    assert report['spike'] and report['anomalous'] and report['zscore'] > 3
+    assert report['anomaly_score'] > 1
+    assert report['recent_anomalies'][-1]['type'] == 'spike'
+
+    # A few milliseconds over a very steady baseline is not a spike
+    detector = TargetDetector(URL)
+    for check in checks(60, latency=lambda i: 0.2 + (i % 2) * 0.001):
+        detector.update(check)
+    detector.update(checks(1, latency=lambda i: 0.21)[0])
+    assert detector.zscore > 3 and not detector.spike
+
+
+def test_flapping_starts_and_settles_with_hysteresis():
+    detector = TargetDetector(URL)
+    for check in checks(20, success=lambda i: i % 2 == 0):
+        detector.update(check)
+    assert detector.flapping and detector.flap_episodes == 1
+    assert detector.state_changes == 19
+
+    # Still flapping below the start threshold, until under the settle one
+    for check in checks(40):
+        detector.update(check)
+        assert detector.flapping == (detector.flap_rate >= 0.15)
+    assert not detector.flapping and detector.flap_episodes == 1
+
+
+def test_checkpoint_and_catch_up_match_live_detection(temp_db):
+    rng = random.Random(7)
+    history = checks(400, success=lambda i: rng.random() > 0.2, latency=lambda i: rng.uniform(0.1, 0.4))
+    history += checks(100, url='https://b.test/', step=120)
+    history.sort(key=lambda c: c['timestamp'])
+    ids = database.save_checks(history)
+    for check, row_id in zip(history, ids):
+        check['id'] = row_id
+
+    live = AnomalyDetector(persist=False)
+    monitor = AnomalyDetector(persist=True)
+    for check in history[:300]:
+        live.process(check)
+        monitor.process(check)
+    assert monitor.checkpoint(force=True) == 2
+
+    # Another process: loads the checkpoint, replays only the newer checks
+    for check in history[300:]:
+        live.process(check)
+    dashboard = AnomalyDetector(persist=True)
+    assert dashboard.report() == live.report()
+    assert dashboard.sync() == 0
+
+    # An older checkpoint never replaces a newer one
+    assert dashboard.checkpoint(force=True) == 2
+    monitor.dirty.add(URL)
+    assert monitor.checkpoint(force=True) == 1
+    conn = database.get_connection()
+    last_ids = dict(conn.execute('SELECT url, last_id FROM detector_state').fetchall())
+    conn.close()
+    assert last_ids[URL] == max(c['id'] for c in history if c['url'] == URL)
+
+
+def test_flaky_target_reports_blips_not_outages(temp_db):
+    pattern = '+-+-++-+' + '----' + '+-++' + '-'
+    database.save_checks(checks(len(pattern), success=lambda i: pattern[i] == '+'))
+
+    runs = detect_outages(hours=24, min_checks=1)
+    assert len(runs) == 6
+    outages = detect_outages(hours=24)
+    assert [o['checks_failed'] for o in outages] == [4, 1]
+    assert outages[-1]['ongoing']
+
+    summary = get_outage_summary(hours=24)
+    assert (summary['total_outages'], summary['blips']) == (2, 4)
+
+
+def test_updates_are_constant_time():
+    detector = TargetDetector(URL)
+    history = checks(50000, success=lambda i: i % 17 != 0, latency=lambda i: 0.1 + (i % 7) / 100)
+
+    began = time.perf_counter()
+    for check in history:
+        detector.update(check)
+    elapsed = time.perf_counter() - began
+
+    assert detector.checks == 50000
+    assert elapsed < 1.0, f"50k updates took {elapsed:.2f}s"
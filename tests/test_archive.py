@@ -0,0 +1,112 @@
+"""
+Tests for archive export / import of the check history.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+from src import archive
+
+URL = 'https://example.test/'
+
+
+def make_checks(count, start, url=URL):
+    return [{
+        'url': url,
+        'timestamp': start + timedelta(minutes=7 * i),
+        'status_code': 200 if i % 4 else None,
+        'response_time': 0.125 * i if i % 4 else None,
+        'success': bool(i % 4),
+        'error': None if i % 4 else 'Zeitüberschreitung ⏱️',
+        'retries': i % 3,
+        'scheduled_at': start + timedelta(minutes=7 * i) if i % 2 else None,
+        'schedule_lag': 0.5 if i % 2 else None,
+        'missed_runs': 0
+    } for i in range(count)]
+
+
+def stored_checks():
+    conn = database.get_connection()
+    rows = conn.execute(f'SELECT {database.COLUMN_NAMES} FROM checks ORDER BY id').fetchall()
+    database.close_connection(conn)
+    return rows
+
+
+def use_new_database(monkeypatch, tmp_path, name):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / name))
+    database.init_database()
+
+
+def test_round_trip_keeps_every_column(temp_db, tmp_path, monkeypatch):
+    start = datetime(2024, 3, 1, 22, 0, 0)
+    database.save_checks(make_checks(300, start) + make_checks(50, start, url='https://b.test/'))
+    original = stored_checks()
+    path = str(tmp_path / 'history.chka')
+
+    # Small chunks, so chunks span partitions and URLs
+    assert archive.export_checks(path, chunk_rows=64) == len(original)
+
+    use_new_database(monkeypatch, tmp_path, 'restored.db')
+    assert archive.import_checks(path) == len(original)
+    assert stored_checks() == original
+    assert database.get_data_version()['max_id'] == original[-1][0]
+
+    # New checks continue after the imported ids
+    assert database.save_check(make_checks(1, datetime.now())[0]) == original[-1][0] + 1
+
+
+def test_export_since_skips_older_checks(temp_db, tmp_path):
+    start = datetime(2024, 3, 1, 12, 0, 0)
+    database.save_checks(make_checks(500, start))
+    path = str(tmp_path / 'recent.chka')
+
+    since = start + timedelta(days=1)
+    expected = sum(1 for row in stored_checks() if row[2] >= since.strftime('%Y-%m-%d %H:%M:%S'))
+    assert archive.export_checks(path, since=since) == expected
+
+
+def test_import_into_existing_history_relinks_states(temp_db, tmp_path, monkeypatch):
+    start = datetime(2024, 3, 1, 0, 0, 0)
+    checks = make_checks(40, start)
+    path = str(tmp_path / 'odd.chka')
+
+    # Every other check exported from one database, the rest saved in another
+    database.save_checks(checks[1::2])
+    assert archive.export_checks(path) == 20
+
+    use_new_database(monkeypatch, tmp_path, 'merged.db')
+    database.save_checks(checks[::2])
+    assert archive.import_checks(path) == 20
+
+    # Same states as if all checks had been saved one by one
+    merged = [row[1:] for row in sorted(stored_checks(), key=lambda row: row[2])]
+    use_new_database(monkeypatch, tmp_path, 'direct.db')
+    database.save_checks(checks)
+    direct = [row[1:] for row in stored_checks()]
+    assert merged == direct
+
+    ids = [row[0] for row in stored_checks()]
+    assert len(set(ids)) == 40
+
+
+def test_corrupt_archive_is_rejected(temp_db, tmp_path):
+    database.save_checks(make_checks(100, datetime(2024, 3, 1)))
+    path = tmp_path / 'history.chka'
+    archive.export_checks(str(path))
+
+    data = bytearray(path.read_bytes())
+    data[-10] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert archive.import_checks(str(path)) is None
+
+    path.write_bytes(b'not an archive')
+    assert archive.import_checks(str(path)) is None
+    with pytest.raises(ValueError), open(path, 'rb') as f:
+        archive._read_header(f)
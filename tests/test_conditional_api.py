@@ -0,0 +1,97 @@
+"""
+Tests for ETag / Last-Modified handling of the JSON API.
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import app as app_module
+from src.database import save_check
+from src.web.caching import payload_cache
+from tests.helpers import fake_probe
+
+
+@pytest.fixture
+def client(temp_db):
+    payload_cache.clear()
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
+
+
+def count_report_calls(monkeypatch):
+    calls = []
+    original = app_module.get_complete_report
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'get_complete_report', counting)
+    return calls
+
+
+def test_if_none_match_skips_report(client, monkeypatch):
+    save_check(fake_probe('https://example.com/'))
+    calls = count_report_calls(monkeypatch)
+
+    first = client.get('/api/status')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+    assert len(calls) == 1
+
+    second = client.get('/api/status', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert len(calls) == 1
+
+    # Without a validator the cached payload is served, still no report work
+    third = client.get('/api/status')
+    assert third.status_code == 200
+    assert third.get_json() == first.get_json()
+    assert len(calls) == 1
+
+
+def test_new_check_changes_etag(client):
+    save_check(fake_probe('https://example.com/'))
+    etag = client.get('/api/recent').headers['ETag']
+
+    save_check(fake_probe('https://example.com/'))
+    response = client.get('/api/recent', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 2
+
+
+def test_query_parameters_are_part_of_etag(client):
+    save_check(fake_probe('https://example.com/'))
+    a = client.get('/api/uptime').headers['ETag']
+    b = client.get('/api/uptime?url=https://example.com/').headers['ETag']
+    assert a != b
+
+
+def test_last_modified_ignores_late_checks(client):
+    """
+    Last-Modified is the newest check's time: a backfilled check neither
+    moves it back nor gets hidden behind a 304 for If-Modified-Since.
+    """
+    result = fake_probe('https://example.com/')
+    result['timestamp'] = datetime(2025, 1, 1, 12, 0, 0)
+    save_check(result)
+    first = client.get('/api/recent')
+
+    late = fake_probe('https://example.com/')
+    late['timestamp'] = datetime(2024, 12, 31, 12, 0, 0)
+    save_check(late)
+
+    response = client.get('/api/recent', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert response.status_code == 200
+    assert len(response.get_json()) == 2
+    assert response.headers['Last-Modified'] == first.headers['Last-Modified']
@@ -0,0 +1,135 @@
+"""
+Tests for the memory-mapped hot-store.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+np = pytest.importorskip('numpy')
+
+import src.database as database
+from src import hotstore, vectorized
+
+URL = 'https://example.test/'
+
+
+@pytest.fixture
+def hot(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(hotstore, 'HOTSTORE_ENABLED', True)
+    monkeypatch.setattr(hotstore, 'HOTSTORE_DIR', str(tmp_path / 'hot'))
+    monkeypatch.setattr(hotstore, 'HOTSTORE_CAPACITY', 5)
+    yield
+    hotstore.close_all()
+
+
+def make_checks(count, start=None):
+    start = start or datetime.now() - timedelta(minutes=count)
+    return [{
+        'url': URL,
+        'timestamp': start + timedelta(minutes=i),
+        'status_code': 200 if i % 3 else None,
+        'response_time': 0.1 * (i + 1) if i % 3 else None,
+        'success': bool(i % 3),
+        'error': None,
+        'retries': 0
+    } for i in range(count)]
+
+
+def test_saved_checks_are_appended_and_survive_reopen(hot):
+    ids = database.save_checks(make_checks(3))
+    database.save_check(make_checks(1)[0])
+
+    ring = hotstore.get_ring(URL)
+    assert len(ring) == 4
+    assert list(ring.ids[:4]) == ids + [ids[-1] + 1]
+
+    # Reopen the file as a restarted process would
+    hotstore.close_all()
+    assert len(hotstore.get_ring(URL)) == 4
+
+
+def test_ring_keeps_newest_checks_and_reads_zero_copy(hot):
+    ids = database.save_checks(make_checks(3))
+
+    assert hotstore.read_columns(URL) is None  # not verified yet
+    assert hotstore.verify(URL)['ok']
+
+    columns = hotstore.read_columns(URL)
+    assert list(columns['ids']) == ids
+    assert not columns['ts'].flags.owndata  # view of the mapping
+    assert np.isnan(columns['rt'][0]) and columns['success'][0] == 0
+
+    # Wrap around: only the newest 5 are kept, in order
+    ids += database.save_checks(make_checks(4, start=datetime.now()))
+    assert hotstore.read_columns(URL, since=0) is None  # older than the ring
+    columns = hotstore.read_columns(URL, since=hotstore.get_ring(URL).oldest_timestamp())
+    assert list(columns['ids']) == ids[-5:]
+    assert np.all(np.diff(columns['ts']) > 0)
+    assert hotstore.read_columns(URL) is None  # whole history no longer held
+    assert hotstore.verify(URL)['ok']
+
+
+def test_verify_detects_and_repairs_drift(hot, monkeypatch):
+    database.save_checks(make_checks(2))
+    assert hotstore.verify(URL)['ok']
+
+    # Written by a process without the hot-store
+    monkeypatch.setattr(hotstore, 'HOTSTORE_ENABLED', False)
+    database.save_check(make_checks(1)[0])
+    monkeypatch.setattr(hotstore, 'HOTSTORE_ENABLED', True)
+
+    report = hotstore.verify(URL)
+    assert not report['ok'] and report['missing'] == 1
+    assert hotstore.read_columns(URL) is None
+
+    report = hotstore.verify(URL, repair=True)
+    assert report['rebuilt'] == 3
+    assert hotstore.verify(URL)['ok']
+
+
+def test_vectorized_backend_reads_hot_store(hot):
+    database.save_checks(make_checks(4))
+    hotstore.verify(URL)
+
+    since = datetime.now() - timedelta(minutes=3)
+    from_ring = vectorized.load_columns(url=URL, since=since)
+    assert not from_ring.ts.flags.owndata
+
+    store = vectorized.ColumnStore()
+    store.refresh()
+    _, ts, success, rt = store.get(URL, vectorized._epoch(since))[0]
+    assert np.array_equal(from_ring.ts, ts)
+    assert np.array_equal(from_ring.success, success)
+
+
+def test_retention_rebuilds_rings_holding_dropped_checks(hot):
+    database.save_checks(make_checks(2, start=datetime.now() - timedelta(days=40)))
+    kept = database.save_checks(make_checks(2))
+    assert hotstore.verify(URL)['ok']
+    assert len(hotstore.read_columns(URL)['ids']) == 4  # whole history
+
+    assert database.cleanup_old_checks(days=30) == 2
+
+    columns = hotstore.read_columns(URL)
+    assert list(columns['ids']) == kept
+    assert hotstore.verify(URL)['ok']
+
+
+def test_import_rebuilds_rings(hot, tmp_path):
+    from src import archive
+
+    database.save_checks(make_checks(2))
+    assert hotstore.verify(URL)['ok']
+    path = str(tmp_path / 'checks.chka')
+    assert archive.export_checks(path) == 2
+
+    # Imported next to the stored checks (new ids), not through the rings
+    assert archive.import_checks(path) == 2
+    assert len(hotstore.read_columns(URL)['ids']) == 4
+    assert hotstore.verify(URL)['ok']
@@ -0,0 +1,97 @@
+"""
+Tests for the non-blocking /check endpoint and job polling.
+"""
+
+import sys
+import os
+import json
+import threading
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app import app
+from src.database import get_recent_checks
+from src.jobs import JobRegistry
+from src.pipeline import stop_pipeline
+from tests.helpers import start_server, wait_for
+
+
+@pytest.fixture
+def client(temp_db):
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    stop_pipeline()
+
+
+@pytest.fixture
+def slow_server():
+    server = start_server(delay=0.5)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_check_returns_job_without_waiting(client, slow_server):
+    response = client.post('/check', json={'url': slow_server.url},
+                           headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] in ('queued', 'running')
+
+    # The probe takes 0.5 s, the request did not wait for it
+    status = client.get(job['status_url']).get_json()
+    assert status['status'] in ('queued', 'running')
+
+    assert wait_for(lambda: client.get(job['status_url']).get_json()['status'] == 'done')
+    status = client.get(job['status_url']).get_json()
+    assert status['result']['success'] is True
+    assert status['result']['status_code'] == 200
+
+    # Saved by the pipeline writer
+    assert wait_for(lambda: len(get_recent_checks()) == 1)
+
+
+def test_check_events_stream(client, slow_server):
+    job = client.post('/check', json={'url': slow_server.url},
+                      headers={'Accept': 'application/json'}).get_json()
+
+    response = client.get(job['events_url'])
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    event = body.split('event: result\ndata: ')[1].strip()
+    assert json.loads(event)['status'] == 'done'
+
+
+def test_form_post_redirects_and_polls(client, slow_server):
+    response = client.post('/check', data={'url': slow_server.url})
+    assert response.status_code == 302
+
+    page = client.get('/').get_data(as_text=True)
+    assert 'id="check-job"' in page
+
+
+def test_unknown_job(client):
+    assert client.get('/api/check/nope').status_code == 404
+
+
+def test_job_created_by_another_worker(client):
+    """
+    Polls and event streams that reach another web worker process find
+    the job through the database.
+    """
+    other = JobRegistry(shared=True)
+    job = other.create('https://elsewhere.test/')
+    assert client.get(f'/api/check/{job.id}').get_json()['status'] == 'queued'
+
+    job.mark_running()
+    result = {'url': job.url, 'status_code': 200, 'success': True, 'timestamp': datetime.now()}
+    threading.Timer(0.3, job.complete, [result]).start()
+    body = client.get(f'/api/check/{job.id}/events').get_data(as_text=True)
+    event = json.loads(body.split('event: result\ndata: ')[1].strip())
+    assert event['status'] == 'done' and event['result']['status_code'] == 200
+    assert client.get(f'/api/check/{job.id}').get_json()['result']['success'] is True
@@ -0,0 +1,105 @@
+"""
+Tests for timing spans and the sampling profiler.
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from src import instrumentation
+from src.analytics import get_complete_report
+from src.database import save_check
+from tests.helpers import fake_probe
+
+
+@pytest.fixture
+def spans():
+    instrumentation.reset_span_stats()
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset_span_stats()
+
+
+def test_disabled_spans_record_nothing():
+    instrumentation.reset_span_stats()
+    assert not instrumentation.is_enabled()
+
+    @instrumentation.timed('test.disabled')
+    def work():
+        return 42
+
+    assert work() == 42
+    with instrumentation.span('test.block'):
+        pass
+    assert instrumentation.get_span_stats() == {}
+
+
+def test_hot_paths_are_timed(temp_db, spans):
+    save_check(fake_probe('https://example.com/'))
+    get_complete_report(hours=24)
+
+    stats = spans.get_span_stats()
+    assert stats['database.save_check']['count'] == 1
+    assert stats['analytics.get_complete_report']['count'] == 1
+    assert stats['analytics.get_performance_stats']['count'] == 1
+    assert stats['analytics.calculate_uptime_percentage']['count'] == 4
+    report = stats['analytics.get_complete_report']
+    assert report['max_seconds'] >= report['avg_seconds'] > 0
+
+
+def test_spans_are_exported_as_histogram(spans):
+    from src.metrics import registry
+
+    with spans.span('test.exported'):
+        time.sleep(0.002)
+
+    text = registry.render()
+    assert 'monitor_span_duration_seconds_count{span="test.exported"} 1' in text
+
+
+def test_runtime_toggles_and_profile(temp_db):
+    from app import app
+    from src.web.caching import payload_cache
+    payload_cache.clear()
+    app.config['TESTING'] = True
+    client = app.test_client()
+    try:
+        state = client.post('/debug/instrumentation', json={'spans': True, 'profiler': True, 'interval': 0.001}).get_json()
+        assert state['enabled'] is True
+        assert state['profiler']['running'] is True
+
+        client.get('/api/status')
+        time.sleep(0.05)
+
+        state = client.post('/debug/instrumentation', json={'spans': False, 'profiler': False}).get_json()
+        assert state['enabled'] is False
+        assert state['profiler']['samples'] > 0
+        assert 'analytics.get_complete_report' in state['spans']
+
+        profile = client.get('/debug/profile').get_data(as_text=True)
+        assert profile.strip()
+    finally:
+        instrumentation.disable()
+        instrumentation.stop_profiler()
+        instrumentation.reset_span_stats()
+
+
+@pytest.mark.parametrize('method, path', [
+    ('get', '/debug/spans'),
+    ('get', '/debug/profile'),
+    ('post', '/debug/instrumentation')
+])
+def test_debug_endpoints_refuse_remote_clients(temp_db, method, path):
+    from app import app
+    app.config['TESTING'] = True
+    client = app.test_client()
+
+    request = getattr(client, method)
+    assert request(path, environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code == 403
+    assert request(path, environ_base={'REMOTE_ADDR': '::1'}).status_code != 403
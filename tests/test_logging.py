@@ -0,0 +1,143 @@
+"""
+Tests for the logging pipeline: JSON output, sampling of per-check lines,
+rate limiting of repeated errors and never blocking the caller.
+"""
+
+import sys
+import os
+import io
+import json
+import logging
+import subprocess
+import threading
+import time
+
+# Add parent directory to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.logger import LogPipeline, SampleFilter, RateLimitFilter
+
+
+def make_logger(pipeline, name):
+    logger = logging.getLogger(name)
+    logger.handlers = [pipeline.handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_json_lines_carry_extra_fields():
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream, fmt='json')
+    logger = make_logger(pipeline, 'test.logging.json')
+
+    logger.info("✅ %s is UP", 'https://a.test/', extra={'url': 'https://a.test/', 'status_code': 200})
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        logger.exception("❌ failed")
+    pipeline.stop()
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first['message'] == '✅ https://a.test/ is UP'
+    assert first['level'] == 'INFO'
+    assert first['logger'] == 'test.logging.json'
+    assert first['url'] == 'https://a.test/'
+    assert first['status_code'] == 200
+    assert second['level'] == 'ERROR'
+    assert 'RuntimeError: boom' in second['exception']
+    assert pipeline.stats['written'] == 2
+
+
+def test_sampling_keeps_a_share_of_info_and_all_warnings():
+    stats = {'sampled_out': 0}
+    sampler = SampleFilter(0.1, stats)
+    info = [logging.makeLogRecord({'levelno': logging.INFO}) for _ in range(1000)]
+    warnings = [logging.makeLogRecord({'levelno': logging.WARNING}) for _ in range(10)]
+
+    assert sum(sampler.filter(record) for record in info) == 100
+    assert stats['sampled_out'] == 900
+    assert all(sampler.filter(record) for record in warnings)
+
+
+def test_repeated_errors_are_rate_limited():
+    now = [0.0]
+    stats = {'suppressed': 0}
+    limiter = RateLimitFilter(burst=5, window=60, stats=stats, clock=lambda: now[0])
+
+    def error(message='❌ Error saving to database: locked'):
+        return logging.makeLogRecord({'name': 'monitor', 'levelno': logging.ERROR, 'msg': message})
+
+    passed = [limiter.filter(error()) for _ in range(20)]
+    assert passed == [True] * 5 + [False] * 15
+    assert stats['suppressed'] == 15
+
+    # Another message has its own budget
+    assert limiter.filter(error('❌ Error getting URLs: locked'))
+
+    # Next window: passes again and reports what was suppressed
+    now[0] = 61
+    record = error()
+    assert limiter.filter(record)
+    assert record.suppressed == 15
+
+    # Info lines are never limited
+    assert all(limiter.filter(logging.makeLogRecord({'levelno': logging.INFO})) for _ in range(20))
+
+
+class SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait(5)
+        return super().write(text)
+
+
+def test_slow_output_never_blocks_the_caller():
+    stream = SlowStream()
+    pipeline = LogPipeline(stream, fmt='text', queue_size=10)
+    logger = make_logger(pipeline, 'test.logging.slow')
+
+    start = time.perf_counter()
+    for i in range(100):
+        logger.info("check %d", i)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert pipeline.stats['dropped'] > 0
+    assert pipeline.stats['queued'] + pipeline.stats['dropped'] == 100
+
+    stream.release.set()
+    pipeline.stop()
+    assert pipeline.stats['written'] == pipeline.stats['queued']
+
+    # After stop() records are written directly
+    logger.warning("⚠️  late")
+    assert 'late' in stream.getvalue().splitlines()[-1]
+
+
+def test_settings_come_from_dotenv_loaded_after_import(tmp_path):
+    """
+    Like serve.py: src.logger is imported before .env is loaded, and the
+    LOG_* settings in .env still apply.
+    """
+    (tmp_path / '.env').write_text('LOG_FORMAT=json\nLOG_LEVEL=WARNING\nLOG_ERROR_BURST=1\n')
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from src.logger import setup_logger\n"
+        "from dotenv import load_dotenv\n"
+        "load_dotenv()\n"
+        "logger = setup_logger()\n"
+        "logger.info('hidden')\n"
+        "for _ in range(3):\n"
+        "    logger.error('boom')\n"
+    )
+    env = {key: value for key, value in os.environ.items() if not key.startswith('LOG_')}
+    output = subprocess.run([sys.executable, '-c', script, ROOT], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=30)
+
+    lines = [json.loads(line) for line in output.stderr.splitlines()]
+    assert [(line['level'], line['message']) for line in lines] == [('ERROR', 'boom')]
@@ -0,0 +1,132 @@
+"""
+Tests for the in-memory metrics and the /metrics endpoint.
+"""
+
+import sys
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import src.metrics as metrics
+from src.metrics import Counter, Histogram, Registry, record_result
+from src.pipeline import ProbePipeline
+from tests.helpers import fake_probe, wait_for
+
+
+@pytest.fixture
+def client(temp_db, monkeypatch):
+    from app import app
+    app.config['TESTING'] = True
+    # Seed from the (empty) test database, not from an earlier test
+    monkeypatch.setattr(metrics, '_seeded', False)
+    metrics.stored_checks_total.clear()
+    metrics.expired_checks_total.clear()
+    with app.test_client() as client:
+        yield client
+
+
+def test_histogram_and_counter_exposition():
+    registry = Registry()
+    counter = registry.register(Counter('demo_total', 'Demo counter.', ('url',)))
+    histogram = registry.register(Histogram('demo_seconds', 'Demo histogram.', ('url',), buckets=(0.1, 1.0)))
+
+    counter.inc(url='a')
+    counter.inc(2, url='a')
+    histogram.observe(0.05, url='a')
+    histogram.observe(0.5, url='a')
+    histogram.observe(5, url='a')
+
+    text = registry.render()
+    assert '# TYPE demo_total counter' in text
+    assert 'demo_total{url="a"} 3' in text
+    assert 'demo_seconds_bucket{url="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{url="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{url="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{url="a"} 3' in text
+
+    openmetrics = registry.render(openmetrics=True)
+    assert '# TYPE demo counter' in openmetrics
+    assert openmetrics.endswith('# EOF\n')
+
+
+def test_scrape_never_touches_database(client, monkeypatch):
+    url = 'https://metrics-scrape.test/'
+    result = fake_probe(url)
+    result['retries'] = 2
+    record_result(result)
+    down = fake_probe(url)
+    down.update(success=False, response_time=None)
+    record_result(down)
+
+    def no_database(*args, **kwargs):
+        raise AssertionError('scrape touched the database')
+
+    monkeypatch.setattr(sqlite3, 'connect', no_database)
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert f'monitor_checks_total{{url="{url}",result="up"}} 1' in text
+    assert f'monitor_checks_total{{url="{url}",result="down"}} 1' in text
+    assert f'monitor_target_up{{url="{url}"}} 0' in text
+    assert f'monitor_check_retries_total{{url="{url}"}} 2' in text
+    assert f'monitor_response_time_seconds_count{{url="{url}"}} 1' in text
+
+
+
+def test_openmetrics_negotiation(client):
+    response = client.get('/metrics', headers={'Accept': 'application/openmetrics-text'})
+    assert response.content_type.startswith('application/openmetrics-text')
+    assert response.get_data(as_text=True).endswith('# EOF\n')
+
+
+def test_stored_checks_counted_once(client):
+    """
+    The counter is seeded before the writer's first batch, so that batch
+    is not counted twice, and /health reads the same counter.
+    """
+    from src.database import save_checks
+    save_checks([fake_probe('https://stored-before.test/')] * 2)
+
+    pipeline = ProbePipeline(probe_workers=1, probe=fake_probe)
+    metrics.seed_stored_checks()
+    pipeline.add_result_listener(record_result)
+    pipeline.start()
+    try:
+        for i in range(3):
+            assert pipeline.submit(f'https://stored-{i}.test/')
+        assert wait_for(lambda: pipeline.get_stats()['saved'] == 3)
+    finally:
+        pipeline.stop()
+    assert metrics.stored_checks_total.get() == 5
+    assert client.get('/health').get_json()['total_checks'] == 5
+
+
+def test_health_subtracts_expired_checks(client, monkeypatch):
+    """
+    Retention subtracts exactly the checks it dropped, even when a
+    backfill gave old checks newer ids than the ones that are kept.
+    """
+    from src import scheduler
+    from src.database import save_checks
+
+    save_checks([fake_probe('https://kept.test/') for _ in range(3)])
+    backfill = []
+    for i in range(4):
+        result = fake_probe('https://backfilled.test/')
+        result['timestamp'] = datetime.now() - timedelta(days=60, minutes=i)
+        backfill.append(result)
+    save_checks(backfill)
+    assert client.get('/health').get_json()['total_checks'] == 7
+
+    monkeypatch.setattr(scheduler, 'DATA_RETENTION_DAYS', 30)
+    monkeypatch.setattr(scheduler.rollups, 'compacted_until', lambda: None)
+    scheduler.apply_retention()
+
+    assert metrics.expired_checks_total.get() == 4
+    assert client.get('/health').get_json()['total_checks'] == 3
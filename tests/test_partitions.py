@@ -0,0 +1,136 @@
+"""
+Tests for daily partitions, the legacy table migration and retention.
+"""
+
+import sys
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+
+URL = 'https://example.test/'
+
+
+def check(timestamp, success=True, url=URL):
+    return {
+        'url': url,
+        'timestamp': timestamp,
+        'status_code': 200 if success else None,
+        'response_time': 0.2 if success else None,
+        'success': success,
+        'error': None if success else 'Timeout',
+        'retries': 0
+    }
+
+
+def partitions():
+    conn = database.get_connection()
+    names = database.list_partitions(conn.cursor())
+    database.close_connection(conn)
+    return names
+
+
+def test_checks_are_stored_per_day_behind_the_view(temp_db):
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    ids = database.save_checks([
+        check(midnight - timedelta(days=1, minutes=1)),
+        check(midnight - timedelta(minutes=1), success=False)
+    ])
+    # Late arrival into yesterday's partition still gets a newer id
+    ids.append(database.save_check(check(midnight - timedelta(minutes=2))))
+    ids.append(database.save_check(check(midnight + timedelta(minutes=1))))
+
+    assert ids == [1, 2, 3, 4]
+    assert partitions() == [
+        database.partition_name(midnight - timedelta(days=2)),
+        database.partition_name(midnight - timedelta(days=1)),
+        database.partition_name(midnight)
+    ]
+    assert database.get_check_count() == 4
+
+    # States are linked across partition boundaries
+    conn = database.get_connection()
+    states = conn.execute(
+        'SELECT id, prev_gap, prev_success FROM checks ORDER BY timestamp').fetchall()
+    database.close_connection(conn)
+    assert states == [(1, 0, None), (3, 86340, 1), (2, 60, 1), (4, 120, 0)]
+
+    version = database.get_data_version()
+    assert (version['min_id'], version['max_id']) == (1, 4)
+    assert database.get_urls() == [URL]
+    assert database.get_latest_checks()[0]['success'] == 1
+
+
+def test_legacy_table_is_moved_into_partitions(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+
+    # Layout of the first release: one table, no queue/schedule/state columns
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE checks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            status_code INTEGER,
+            response_time REAL,
+            success INTEGER NOT NULL,
+            error TEXT,
+            retries INTEGER DEFAULT 0
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO checks (id, url, timestamp, success) VALUES (?, ?, ?, ?)',
+        [(5, URL, '2024-03-01 23:59:00', 1), (9, URL, '2024-03-02 00:01:00', 0)]
+    )
+    conn.commit()
+    conn.close()
+
+    database.init_database()
+
+    assert partitions() == ['checks_20240301', 'checks_20240302']
+    conn = database.get_connection()
+    rows = conn.execute(
+        'SELECT id, prev_gap, prev_success FROM checks ORDER BY id').fetchall()
+    kind = conn.execute("SELECT type FROM sqlite_master WHERE name = 'checks'").fetchone()[0]
+    database.close_connection(conn)
+    assert rows == [(5, 0, None), (9, 120, 1)]
+    assert kind == 'view'
+
+    # New checks continue after the migrated ids
+    assert database.save_check(check('2024-03-02 00:02:00')) == 10
+
+
+def test_retention_drops_whole_expired_days(temp_db):
+    now = datetime.now()
+    database.save_checks(
+        [check(now - timedelta(days=40, seconds=i)) for i in range(500)]
+        + [check(now - timedelta(days=2)), check(now)]
+    )
+    size = os.path.getsize(temp_db)
+
+    assert database.cleanup_old_checks(days=0) == 0
+    assert database.cleanup_old_checks(days=30) == 500
+    assert database.cleanup_old_checks(days=30) == 0
+
+    assert database.get_check_count() == 2
+    assert database.partition_name(now - timedelta(days=40)) not in partitions()
+    assert os.path.getsize(temp_db) < size  # pages given back
+
+    version = database.get_data_version()
+    assert (version['min_id'], version['max_id']) == (501, 502)
+
+
+def test_data_version_timestamp_is_the_newest_check(temp_db):
+    now = datetime.now().replace(microsecond=0)
+    database.save_check(check(now))
+
+    # A backfill gets the newest id for the oldest check, then expires
+    database.save_check(check(now - timedelta(days=40)))
+    assert database.get_data_version()['last_timestamp'] == now.strftime('%Y-%m-%d %H:%M:%S')
+    assert database.cleanup_old_checks(days=30) == 1
+    assert database.get_data_version()['last_timestamp'] == now.strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,118 @@
+"""
+Tests for the bounded probe pipeline.
+Probes and the writer are replaced by local fakes (no network, no disk).
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline import BoundedQueue, ProbePipeline
+from tests.helpers import fake_probe, wait_for
+
+
+def test_bounded_queue_policies():
+    queue = BoundedQueue(2)
+    assert queue.put('a') == (True, None)
+    assert queue.put('b') == (True, None)
+
+    # Full: drop_newest rejects, drop_oldest evicts the head
+    assert queue.put('c', policy='drop_newest') == (False, None)
+    assert queue.put('d', policy='drop_oldest') == (True, 'a')
+    assert queue.put('e', policy='block', timeout=0.05) == (False, None)
+    assert queue.get_batch(10) == ['b', 'd']
+    assert queue.peak == 2
+
+
+def test_results_are_written_in_batches():
+    saved = []
+
+    def save(results):
+        saved.append(list(results))
+        return list(range(len(results)))
+
+    pipeline = ProbePipeline(probe_workers=2, probe=fake_probe, save=save)
+    seen = []
+    pipeline.add_result_listener(seen.append)
+    pipeline.start()
+    try:
+        for i in range(20):
+            assert pipeline.submit(f'http://target-{i}.test/')
+        assert wait_for(lambda: pipeline.get_stats()['saved'] == 20)
+    finally:
+        pipeline.stop()
+
+    assert sum(len(batch) for batch in saved) == 20
+    assert len(seen) == 20
+    assert all('id' in result for result in seen)
+
+
+def test_slow_writer_applies_backpressure():
+    """
+    A stalled writer fills the result queue, then the probe queue,
+    and the overflow policy drops the oldest queued probes.
+    """
+    release = threading.Event()
+
+    def slow_save(results):
+        release.wait()
+        return list(range(len(results)))
+
+    pipeline = ProbePipeline(
+        probe_workers=1,
+        probe_queue_size=3,
+        result_queue_size=2,
+        overflow_policy='drop_oldest',
+        batch_size=1,
+        probe=fake_probe,
+        save=slow_save
+    )
+    pipeline.start()
+    try:
+        for i in range(20):
+            pipeline.submit(f'http://target-{i}.test/')
+            time.sleep(0.01)
+
+        stats = pipeline.get_stats()
+        assert stats['probe_queue_depth'] <= 3
+        assert stats['result_queue_depth'] <= 2
+        assert stats['dropped'] > 0
+
+        release.set()
+        assert wait_for(lambda: pipeline.get_stats()['probe_queue_depth'] == 0)
+    finally:
+        release.set()
+        pipeline.stop()
+
+    stats = pipeline.get_stats()
+    assert stats['saved'] + stats['dropped'] == 20
+
+
+def test_duplicate_queued_url_is_coalesced():
+    blocker = threading.Event()
+
+    def blocking_probe(url, timeout=5):
+        blocker.wait()
+        return fake_probe(url)
+
+    pipeline = ProbePipeline(probe_workers=1, probe=blocking_probe, save=lambda r: [1] * len(r))
+    pipeline.start()
+    try:
+        pipeline.submit('http://busy.test/')
+        assert wait_for(lambda: pipeline.get_stats()['busy_workers'] == 1)
+
+        # Worker is busy, so these wait in the queue and collapse into one
+        pipeline.submit('http://example.test/')
+        pipeline.submit('http://example.test/')
+        pipeline.submit('http://example.test/')
+
+        stats = pipeline.get_stats()
+        assert stats['probe_queue_depth'] == 1
+        assert stats['coalesced'] == 2
+    finally:
+        blocker.set()
+        pipeline.stop()
@@ -0,0 +1,102 @@
+"""
+Tests for probe rate limiting.
+Uses a local HTTP server that counts concurrent connections.
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.monitor import check_website
+from src.ratelimit import TokenBucket, RateLimiter, get_host_key
+from tests.helpers import start_server
+
+
+def run_concurrent_probes(url, limiter, count):
+    results = []
+    lock = threading.Lock()
+
+    def probe():
+        result = check_website(url, timeout=5, max_retries=1, limiter=limiter)
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=probe) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_token_bucket_burst_then_waits():
+    """
+    A full bucket serves its burst immediately, then hands out delays.
+    """
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    delay = bucket.reserve()
+    assert 0.05 < delay <= 0.1
+    # Queued callers line up behind each other
+    assert bucket.reserve() > delay
+
+
+def test_host_key_includes_port():
+    assert get_host_key('https://Example.com/path') == 'example.com'
+    assert get_host_key('http://127.0.0.1:8080/') == '127.0.0.1:8080'
+
+
+def test_per_host_limit_serializes_probes():
+    """
+    Concurrent probes to one host are spaced out and none are dropped.
+    The limiter's clock is frozen, so every probe reserves its token at
+    the same instant and the grant delays are exact, however the threads
+    get scheduled.
+    """
+    server = start_server(delay=0.01)
+    try:
+        limiter = RateLimiter(per_host_rate=20, per_host_burst=1, clock=lambda: 0.0)
+        results = run_concurrent_probes(server.url, limiter, count=6)
+
+        assert len(results) == 6
+        assert all(r['success'] for r in results)
+        assert server.peak == 1
+
+        # One token per 1/20 s: each probe is granted 50 ms after the previous one
+        waits = sorted(r['queue_wait'] for r in results)
+        assert waits == pytest.approx([i / 20 for i in range(6)])
+
+        # Queue wait is recorded separately from response time
+        assert all(r['response_time'] < 1 for r in results)
+        assert limiter.get_stats()['delayed'] == 5
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_global_limit_applies_across_hosts():
+    """
+    The global bucket throttles probes even when hosts differ.
+    """
+    server_a = start_server(delay=0)
+    server_b = start_server(delay=0)
+    try:
+        limiter = RateLimiter(global_rate=20, global_burst=1)
+        start = time.monotonic()
+        results = run_concurrent_probes(server_a.url, limiter, count=2)
+        results += run_concurrent_probes(server_b.url, limiter, count=2)
+        elapsed = time.monotonic() - start
+
+        assert all(r['success'] for r in results)
+        assert elapsed >= 3 / 20
+    finally:
+        for server in (server_a, server_b):
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,147 @@
+"""
+Tests for rollup compaction and analytics across raw and rolled-up history.
+"""
+
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.analytics as analytics
+import src.database as database
+from src import rollups
+
+URLS = ['https://a.test/', 'https://b.test/']
+
+
+@pytest.fixture
+def history(temp_db):
+    """
+    Two URLs checked every 2-4 minutes for the last 5 days, with outages.
+    """
+    rng = random.Random(3)
+    end = datetime.now() - timedelta(minutes=10)
+    checks = []
+    for url in URLS:
+        moment = end - timedelta(days=5)
+        while moment < end:
+            success = rng.random() > 0.1
+            checks.append({
+                'url': url,
+                'timestamp': moment,
+                'status_code': 200 if success else None,
+                'response_time': round(rng.uniform(0.1, 1.5), 3) if success else None,
+                'success': success,
+                'error': None if success else 'Timeout',
+                'retries': 0
+            })
+            moment += timedelta(seconds=rng.choice([120, 180, 240]))
+    database.save_checks(checks)
+    return checks
+
+
+def compact_all():
+    while rollups.compact(max_batches=1000):
+        pass
+
+
+def report():
+    return (
+        analytics.calculate_uptime_percentage(method='count'),
+        analytics.calculate_uptime_percentage(method='time'),
+        analytics.calculate_uptime_percentage(days=7, url=URLS[1], method='time'),
+        analytics.get_performance_stats(days=7)
+    )
+
+
+def test_compaction_sums_every_check(history):
+    compact_all()
+    assert rollups.compact() == 0  # up to date
+
+    conn = database.get_connection()
+    minutes = conn.execute('SELECT SUM(checks), SUM(successes) FROM rollup_1m').fetchone()
+    hours = conn.execute('SELECT SUM(checks), SUM(successes) FROM rollup_1h').fetchone()
+    days = conn.execute('SELECT COUNT(*) FROM rollup_1d').fetchone()[0]
+    database.close_connection(conn)
+
+    # Everything up to the last whole hour / day reached the coarser tiers
+    assert minutes == (len(history), sum(c['success'] for c in history))
+    assert 0 < hours[0] <= minutes[0]
+    assert days >= len(URLS) * 4
+
+
+def test_analytics_span_raw_and_rolled_up_history(history):
+    before = report()
+
+    # Expired, but not rolled up yet: nothing may be dropped
+    assert database.cleanup_old_checks(days=2, until=rollups.compacted_until()) == 0
+
+    compact_all()
+    assert database.cleanup_old_checks(days=2, until=rollups.compacted_until()) > 0
+    assert database.get_check_count() < len(history)
+
+    after = report()
+    assert after[:3] == before[:3]
+    for key in ('total_checks', 'successful_checks', 'failed_checks',
+                'avg_response_time', 'min_response_time', 'max_response_time'):
+        assert after[3][key] == pytest.approx(before[3][key], abs=0.001)
+
+
+def test_finer_tiers_are_pruned_once_rolled_up(history, monkeypatch):
+    compact_all()
+    database.cleanup_old_checks(days=1, until=rollups.compacted_until())
+    before = report()
+
+    monkeypatch.setattr(rollups, 'ROLLUP_MINUTE_DAYS', 2)
+    compact_all()
+
+    conn = database.get_connection()
+    oldest = conn.execute('SELECT MIN(bucket) FROM rollup_1m').fetchone()[0]
+    database.close_connection(conn)
+    assert oldest >= (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
+
+    # Hourly rollups now cover the pruned minutes
+    assert report()[:3] == before[:3]
+
+
+def test_late_checks_behind_the_watermark_survive_retention(history):
+    """
+    Checks saved after the minute watermark passed their time (imports,
+    delayed agent batches) still reach the rollups, also when retention
+    drops their partition before the next compaction.
+    """
+    compact_all()
+    late = []
+    for url in URLS:
+        moment = datetime.now() - timedelta(days=4, seconds=30)
+        for i in range(5):
+            late.append({
+                'url': url,
+                'timestamp': moment + timedelta(minutes=37 * i),
+                'status_code': None,
+                'response_time': None,
+                'success': False,
+                'error': 'Timeout',
+                'retries': 0
+            })
+    late[0].update(success=True, status_code=200, response_time=9.5, error=None)
+    database.save_checks(late)
+    expected = report()
+
+    # Their partitions are dropped before the next compaction runs
+    assert database.cleanup_old_checks(days=2, until=rollups.compacted_until()) > 0
+    compact_all()
+
+    conn = database.get_connection()
+    assert conn.execute('SELECT COUNT(*) FROM rollup_pending').fetchone()[0] == 0
+    database.close_connection(conn)
+    after = report()
+    assert after[:3] == expected[:3]
+    for key in ('total_checks', 'successful_checks', 'failed_checks',
+                'avg_response_time', 'min_response_time', 'max_response_time'):
+        assert after[3][key] == pytest.approx(expected[3][key], abs=0.001)
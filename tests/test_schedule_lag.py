@@ -0,0 +1,70 @@
+"""
+Tests for scheduler lag and missed-run accounting.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+from src.analytics import calculate_uptime_percentage, get_schedule_stats, get_uptime_summary
+from src.pipeline import ProbePipeline
+from tests.helpers import fake_probe, wait_for
+
+
+def test_pipeline_records_lag_and_missed_runs(temp_db):
+    pipeline = ProbePipeline(probe_workers=1, probe=fake_probe)
+    seen = []
+    pipeline.add_result_listener(seen.append)
+    pipeline.start()
+    try:
+        url = 'https://example.test/'
+        base = datetime.now() - timedelta(seconds=120)
+
+        # Runs planned at 0s and 30s, then 90s (the 60s run never happened)
+        for offset in (0, 30, 90):
+            schedule = {'scheduled_at': base + timedelta(seconds=offset), 'interval': 30}
+            pipeline.submit(url, schedule=schedule)
+            count = len(seen) + 1
+            assert wait_for(lambda: len(seen) >= count)
+    finally:
+        pipeline.stop()
+
+    assert [r['missed_runs'] for r in seen] == [0, 0, 1]
+    assert seen[0]['schedule_lag'] >= 120 - 1
+    assert seen[2]['schedule_lag'] < seen[0]['schedule_lag']
+
+    stats = get_schedule_stats(hours=1)
+    assert stats['scheduled_checks'] == 3
+    assert stats['missed_runs'] == 1
+    assert stats['coverage_percent'] == 75.0
+    assert stats['max_lag_seconds'] >= 119
+
+
+def test_unscheduled_checks_have_no_schedule_data(temp_db):
+    database.save_check(fake_probe('https://example.test/'))
+
+    assert get_schedule_stats(hours=1)['scheduled_checks'] == 0
+    assert get_schedule_stats(hours=1)['coverage_percent'] is None
+
+
+def test_uptime_without_data_is_not_downtime(temp_db):
+    # No checks at all: unknown, not 0%
+    assert calculate_uptime_percentage(hours=24) is None
+    assert get_uptime_summary()['last_7d'] is None
+
+    failed = dict(fake_probe('https://example.test/'), success=False, status_code=None)
+    database.save_check(failed)
+    assert calculate_uptime_percentage(hours=24) == 0.0
+    assert calculate_uptime_percentage(hours=24, url='https://other.test/') is None
+
+
+def test_dashboard_shows_no_data(temp_db):
+    from app import app
+
+    response = app.test_client().get('/')
+    assert response.status_code == 200
+    assert b'No data' in response.data
@@ -0,0 +1,96 @@
+"""
+Tests for production serving helpers (compression and cache headers).
+"""
+
+import sys
+import os
+import gzip
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify, request, make_response
+
+from serve import parse_args
+from src.web.serving import configure_production
+
+
+def make_app(tmp_path):
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'app.css').write_text('body { color: red; }')
+
+    app = Flask(__name__, static_folder=str(static))
+
+    @app.route('/big')
+    def big():
+        return jsonify({'values': list(range(1000))})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/tagged')
+    def tagged():
+        if request.if_none_match.contains_weak('v1'):
+            response = make_response('', 304)
+        else:
+            response = jsonify({'values': list(range(1000))})
+        response.set_etag('v1')
+        return response
+
+    return configure_production(app)
+
+
+def test_large_json_is_gzipped(tmp_path):
+    client = make_app(tmp_path).test_client()
+
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'"values"' in gzip.decompress(response.data)
+
+    plain = client.get('/big')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+
+def test_small_responses_are_not_compressed(tmp_path):
+    client = make_app(tmp_path).test_client()
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_gzipped_response_gets_weak_etag(tmp_path):
+    client = make_app(tmp_path).test_client()
+
+    plain = client.get('/tagged')
+    assert plain.headers['ETag'] == '"v1"'
+
+    zipped = client.get('/tagged', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['ETag'] == 'W/"v1"'
+
+    revalidated = client.get('/tagged', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert 'Accept-Encoding' in revalidated.headers['Vary']
+
+
+def test_static_assets_are_cacheable(tmp_path):
+    client = make_app(tmp_path).test_client()
+    response = client.get('/static/app.css')
+    assert response.status_code == 200
+    assert response.cache_control.public
+    assert response.cache_control.max_age == 86400
+
+
+def test_serve_options_from_environment(monkeypatch):
+    monkeypatch.setenv('WEB_THREADS', '16')
+    monkeypatch.setenv('WEB_KEEPALIVE', '10')
+    options = parse_args([])
+    assert options.threads == 16
+    assert options.keep_alive == 10
+    assert options.workers == 1
+    assert not options.with_monitor
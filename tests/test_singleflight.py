@@ -0,0 +1,110 @@
+"""
+Tests for coalescing of duplicate in-flight probes.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.monitor import check_website
+from src.pipeline import ProbePipeline
+from src.singleflight import SingleFlight, normalize_url
+from tests.helpers import start_server, fake_probe, wait_for
+
+
+def test_normalize_url():
+    assert normalize_url('HTTPS://Example.COM') == 'https://example.com/'
+    assert normalize_url('https://example.com:443/a#top') == 'https://example.com/a'
+    assert normalize_url('http://example.com:8080/a?b=1') == 'http://example.com:8080/a?b=1'
+
+
+def test_concurrent_checks_share_one_probe():
+    """
+    Five callers checking the same URL at once cause one HTTP request.
+    """
+    server = start_server(delay=0.2)
+    flights = SingleFlight()
+    results = []
+    lock = threading.Lock()
+
+    def probe(url):
+        result = flights.do(normalize_url(url), lambda: check_website(url, max_retries=1))
+        with lock:
+            results.append(result)
+
+    try:
+        urls = [server.url, server.url.upper().replace('HTTP://', 'http://')] + [server.url] * 3
+        threads = [threading.Thread(target=probe, args=(url,)) for url in urls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(server.request_times) == 1
+    assert len(results) == 5
+    assert sum(1 for _, shared in results if shared) == 4
+    assert len({id(result) for result, _ in results}) == 1
+    assert flights.get_stats() == {'executed': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_exception_is_shared_with_waiters():
+    flights = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('boom')
+
+    def call():
+        try:
+            flights.do('key', failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+    assert not flights.in_flight('key')
+
+
+def test_pipeline_skips_tick_while_probe_in_flight():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def slow_probe(url, timeout=5):
+        result, _ = flights.do(normalize_url(url), lambda: (release.wait(), fake_probe(url))[1])
+        return result
+
+    pipeline = ProbePipeline(probe_workers=2, probe=slow_probe,
+                             save=lambda r: [1] * len(r), flights=flights)
+    pipeline.start()
+    try:
+        pipeline.submit('http://slow.test/')
+        assert wait_for(lambda: flights.in_flight('http://slow.test/'))
+
+        # Scheduler ticks while the previous probe is still running
+        pipeline.submit('http://slow.test/')
+        pipeline.submit('HTTP://SLOW.test')
+        stats = pipeline.get_stats()
+        assert stats['skipped_in_flight'] == 2
+        assert stats['probe_queue_depth'] == 0
+    finally:
+        release.set()
+        pipeline.stop()
+
+    assert pipeline.get_stats()['saved'] == 1
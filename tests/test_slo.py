@@ -0,0 +1,155 @@
+"""
+Tests for SLO tracking: rolling-window counters, error budgets, burn-rate
+alerts, and seeding/catching up from stored checks.
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+from src import slo
+from src.slo import RollingCounter, TargetSLO, SLOTracker, parse_slo_targets
+
+URL = 'https://a.test/'
+
+
+def checks(count, end, success=lambda i: True, latency=lambda i: 0.2, step=60, url=URL):
+    """
+    `count` checks every `step` seconds, the last one at `end`.
+    """
+    start = end - timedelta(seconds=step * (count - 1))
+    return [
+        {'url': url, 'timestamp': start + timedelta(seconds=step * i),
+         'status_code': 200 if success(i) else None,
+         'response_time': latency(i) if success(i) else None,
+         'success': success(i), 'error': None if success(i) else 'Timeout', 'retries': 0}
+        for i in range(count)
+    ]
+
+
+def test_rolling_counter_expires_old_buckets():
+    counter = RollingCounter(600, buckets=10)
+    for second in range(0, 600, 10):
+        counter.add(second, good=second % 20 == 0)
+    assert counter.totals(599) == (30, 60)
+
+    # Five minutes later half the window has expired
+    assert counter.totals(899) == (15, 30)
+
+    # Late checks land in their bucket; ones outside the window are ignored
+    counter.add(450, good=1)
+    counter.add(100, good=1)
+    assert counter.totals(899) == (16, 31)
+    assert counter.totals(2000) == (0, 0)
+
+
+def test_error_budget_and_burn_rates():
+    now = datetime.now().replace(microsecond=0)
+    target = TargetSLO(URL, objective=99.0, window_days=30)
+
+    # A day of good checks, then 10% failing over the last hour
+    for check in checks(23 * 60, now - timedelta(hours=1)):
+        target.update(check)
+    for check in checks(60, now, success=lambda i: i % 10 != 0):
+        target.update(check)
+
+    report = target.to_dict(now.timestamp())
+    assert report['checks'] == 24 * 60
+    assert report['bad_checks'] == 6
+    assert report['sli'] == round(100 * (1 - 6 / 1440), 4)
+    assert report['error_budget']['allowed_bad_checks'] == 14.4
+    assert report['error_budget']['remaining_percent'] == round(100 * (1 - 6 / 14.4), 2)
+    assert report['burn_rates']['1h'] == 10.0
+    # Windows are as precise as their buckets (24 minutes for a day)
+    assert abs(report['burn_rates']['1d'] - 6 / 1440 / 0.01) < 0.01
+    assert report['status'] == 'ok'
+
+    # Failing for the next ten minutes as well: 2% of the budget spent in an hour
+    for check in checks(10, now + timedelta(minutes=10), success=lambda i: False):
+        target.update(check)
+    report = target.to_dict((now + timedelta(minutes=10)).timestamp())
+    assert report['burn_rates']['1h'] >= 14.4 and report['burn_rates']['5m'] == 100.0
+    assert report['alerts'][0]['severity'] == 'page'
+    assert report['alerts'][0]['threshold'] == 14.4
+    assert report['status'] == 'page'
+
+
+def test_slow_responses_spend_the_budget_with_a_latency_threshold():
+    now = datetime.now().replace(microsecond=0)
+    target = TargetSLO(URL, objective=99.0, latency=1.0)
+    for check in checks(100, now, latency=lambda i: 2.0 if i < 5 else 0.3):
+        target.update(check)
+    assert target.to_dict(now.timestamp())['bad_checks'] == 5
+
+
+def test_parse_slo_targets():
+    targets = parse_slo_targets('https://a.test/=99.95, https://b.test/?q=1=99:1.5,bad,https://c.test/=100')
+    assert targets == {'https://a.test/': (99.95, None), 'https://b.test/?q=1': (99.0, 1.5)}
+
+
+def test_seed_and_catch_up_match_live_counting(temp_db):
+    # Whole minutes: the seed counts checks per minute
+    now = datetime.now().replace(second=0, microsecond=0)
+    history = (checks(300, now - timedelta(minutes=30), success=lambda i: i % 7 != 0)
+               + checks(30, now, success=lambda i: i % 3 != 0, url='https://b.test/'))
+    database.save_checks(history)
+
+    live = SLOTracker(targets={}, persist=False)
+    for check in history:
+        live.process(check)
+
+    # Another process seeds from the database...
+    tracker = SLOTracker(targets={}, persist=True)
+    assert tracker.report() == live.report()
+
+    # ...and then only reads the checks saved since
+    newer = checks(30, now + timedelta(minutes=30), success=lambda i: i % 2 == 0)
+    database.save_checks(newer)
+    for check in newer:
+        live.process(check)
+    assert tracker.sync() == 30
+    assert tracker.sync() == 0
+    assert tracker.report(URL) == live.report(URL)
+
+    # A listener ignores checks the seed already counted
+    listener = SLOTracker(targets={}, persist=True)
+    for check in database.get_checks_by_url(URL):
+        listener.process(check)
+    assert listener.report(URL) == live.report(URL)
+
+
+def test_api_reports_slos(temp_db, monkeypatch):
+    monkeypatch.setattr(slo, '_tracker', None)
+    database.save_checks(checks(10, datetime.now().replace(microsecond=0)))
+
+    from app import app
+    response = app.test_client().get('/api/slo?url=' + URL)
+    assert response.status_code == 200
+    [report] = response.get_json()
+    assert report['url'] == URL and report['checks'] == 10 and report['status'] == 'ok'
+    assert set(report['burn_rates']) == {name for name, _ in slo.BURN_WINDOWS}
+
+
+def test_updates_and_reports_do_not_grow_with_history():
+    now = datetime.now().replace(microsecond=0)
+    target = TargetSLO(URL)
+    history = checks(50000, now, success=lambda i: i % 17 != 0, step=30)
+
+    began = time.perf_counter()
+    for check in history:
+        target.update(check)
+    elapsed = time.perf_counter() - began
+    assert elapsed < 2.0, f"50k updates took {elapsed:.2f}s"
+
+    # Bounded by buckets, not checks
+    assert len(target.window.slots) <= 30 * 24
+    assert all(len(counter.slots) <= slo.WINDOW_BUCKETS for counter in target.burn_windows.values())
+    began = time.perf_counter()
+    for _ in range(1000):
+        target.to_dict(now.timestamp())
+    assert time.perf_counter() - began < 1.0
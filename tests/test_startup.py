@@ -0,0 +1,54 @@
+"""
+Tests for startup cost: entry points import no heavy dependency they do
+not use, stay within their import time budget, and skip the schema setup
+of an up-to-date database.
+"""
+
+import sys
+import os
+import sqlite3
+import subprocess
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+from benchmarks.startup_benchmark import import_times, IMPORT_BUDGETS_MS, HEAVY_MODULES, ROOT
+
+
+def test_entry_points_import_fast_without_heavy_dependencies():
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        # Best of three: the budget is about this code, not a busy machine
+        runs = [import_times(module) for _ in range(3)]
+        loaded = set(runs[0])
+        assert module in loaded
+        assert not loaded & set(HEAVY_MODULES), f"{module} imports {sorted(loaded & set(HEAVY_MODULES))}"
+        fastest = min(times[module][1] for times in runs) / 1000
+        assert fastest <= budget, f"importing {module} took {fastest:.0f} ms (budget {budget} ms)"
+
+
+def test_lazy_dependencies_load_on_first_use():
+    code = ('import sys, src.monitor; assert "requests" not in sys.modules; '
+            'src.monitor.requests.Session; assert "requests" in sys.modules')
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+
+def test_schema_setup_runs_once_per_version(temp_db):
+    conn = sqlite3.connect(temp_db)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == database.SCHEMA_VERSION
+    conn.execute('DROP TABLE detector_state')
+    conn.commit()
+
+    # Up to date: not even checked
+    database.init_database()
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'detector_state' not in tables
+
+    # Set up by an older version: the full setup runs again
+    conn.execute('PRAGMA user_version = 0')
+    conn.commit()
+    database.init_database()
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'detector_state' in tables
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == database.SCHEMA_VERSION
+    conn.close()
@@ -0,0 +1,195 @@
+"""
+Conformance and performance tests shared by all storage backends.
+"""
+
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.analytics as analytics
+import src.database as database
+from src import storage
+
+URLS = ['https://a.test/', 'https://b.test/']
+
+
+def make_backend(name, path):
+    if name == 'sqlite':
+        database.DB_PATH = path
+        backend = storage.SQLiteStorage()
+    else:
+        backend = storage.MemoryStorage()
+    backend.init()
+    return backend
+
+
+@pytest.fixture(params=sorted(storage.BACKENDS))
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', database.DB_PATH)
+    backend = make_backend(request.param, str(tmp_path / 'monitoring.db'))
+    previous = storage.set_storage(backend)
+    yield backend
+    storage.set_storage(previous)
+
+
+def check(timestamp, success=True, url=URLS[0], response_time=0.2, **extra):
+    result = {
+        'url': url,
+        'timestamp': timestamp,
+        'status_code': 200 if success else None,
+        'response_time': response_time if success else None,
+        'success': success,
+        'error': None if success else 'Timeout',
+        'retries': 0
+    }
+    result.update(extra)
+    return result
+
+
+def history(count=600, seed=5):
+    """
+    Irregular checks of two URLs over the last two days, out of order in places.
+    """
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    checks = []
+    for i in range(count):
+        moment = now - timedelta(seconds=rng.randint(60, 2 * 86400))
+        scheduled = rng.random() < 0.5
+        checks.append(check(
+            moment, success=rng.random() > 0.15, url=rng.choice(URLS),
+            response_time=round(rng.uniform(0.05, 2.0), 3),
+            scheduled_at=moment - timedelta(seconds=1) if scheduled else None,
+            schedule_lag=rng.choice([None, 0.5, 1.25]) if scheduled else None,
+            missed_runs=rng.choice([0, 0, 1]) if scheduled else 0
+        ))
+    return checks
+
+
+def test_saved_checks_read_back_in_time_order(backend):
+    now = datetime.now().replace(microsecond=0)
+    ids = backend.save_checks([
+        check(now - timedelta(minutes=5)),
+        check(now - timedelta(minutes=1), success=False),
+        check(now - timedelta(minutes=3), url=URLS[1])
+    ])
+    ids.append(backend.save_checks([check(now - timedelta(minutes=4))])[0])  # late arrival
+
+    assert ids == sorted(ids) and len(set(ids)) == 4
+    assert backend.get_check_count() == 4
+    assert backend.get_urls() == URLS
+
+    recent = backend.get_recent_checks(limit=3)
+    assert [c['id'] for c in recent] == [ids[1], ids[2], ids[3]]
+    assert recent[0]['error'] == 'Timeout' and recent[0]['response_time'] is None
+    assert recent[2]['prev_gap'] == 60 and recent[2]['prev_success'] == 1
+    assert [c['id'] for c in backend.get_recent_checks(limit=5, url=URLS[1])] == [ids[2]]
+
+    latest = {c['url']: c['success'] for c in backend.get_latest_checks()}
+    assert latest == {URLS[0]: 0, URLS[1]: 1}
+
+    version = backend.get_data_version()
+    assert (version['min_id'], version['max_id']) == (ids[0], ids[3])
+    # The newest check, not the late arrival saved last
+    assert version['last_timestamp'] == (now - timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def test_aggregates(backend):
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(minutes=30)
+    backend.save_checks([
+        check(start, response_time=0.5),
+        check(start + timedelta(minutes=1), success=False),
+        check(start + timedelta(minutes=3), response_time=0.1),
+        check(start + timedelta(minutes=20), response_time=0.3,
+              scheduled_at=start, schedule_lag=2.0, missed_runs=1),
+    ])
+
+    assert backend.count_totals() == {'checks': 4, 'successes': 3}
+    assert backend.count_totals(since=start + timedelta(minutes=1)) == {'checks': 3, 'successes': 2}
+
+    # States: up 60s, down 120s, up 1020s capped at 300s
+    totals = backend.state_totals(max_gap=300)
+    assert (totals['seconds'], totals['up_seconds']) == (480, 360)
+    totals = backend.state_totals(since=start + timedelta(seconds=30), max_gap=300)
+    assert (totals['checks'], totals['seconds'], totals['up_seconds']) == (3, 450, 330)
+
+    stats = backend.response_stats()
+    assert (stats['total_checks'], stats['failed_checks']) == (4, 1)
+    assert stats['avg_response_time'] == pytest.approx(0.3)
+    assert (stats['min_response_time'], stats['max_response_time'],
+            stats['median_response_time']) == (0.1, 0.5, 0.3)
+
+    assert backend.schedule_totals() == {
+        'scheduled_checks': 1, 'avg_lag_seconds': 2.0, 'max_lag_seconds': 2.0, 'missed_runs': 1
+    }
+    states = backend.check_states(since=start + timedelta(seconds=1))
+    assert [s['success'] for s in states] == [0, 1, 1]
+
+
+def test_retention_drops_whole_days(backend):
+    now = datetime.now()
+    backend.save_checks([check(now - timedelta(days=40)), check(now - timedelta(days=39)), check(now)])
+
+    assert backend.cleanup_old_checks(days=0) == 0
+    assert backend.cleanup_old_checks(days=30) == 2
+    assert backend.get_check_count() == 1
+    assert backend.get_data_version()['min_id'] == backend.get_data_version()['max_id']
+
+
+def test_backends_give_the_same_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', database.DB_PATH)
+    checks = history()
+
+    # Both reports at the same moment (current states count up to now)
+    frozen = datetime.now()
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return frozen
+
+    monkeypatch.setattr(analytics, 'datetime', FrozenDatetime)
+    reports = {}
+    for name in sorted(storage.BACKENDS):
+        backend = make_backend(name, str(tmp_path / f'{name}.db'))
+        backend.save_checks(checks[:300])
+        for c in checks[300:]:
+            backend.save_checks([c])
+        previous = storage.set_storage(backend)
+        try:
+            reports[name] = [
+                analytics.get_complete_report(hours=24, url=url) for url in [None] + URLS
+            ] + [
+                analytics.calculate_uptime_percentage(hours=h, method=m)
+                for h in (None, 1, 36) for m in ('time', 'count')
+            ]
+        finally:
+            storage.set_storage(previous)
+
+    assert reports['memory'] == reports['sqlite']
+
+
+def test_report_over_many_checks_stays_fast(backend):
+    rng = random.Random(1)
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=2)
+    backend.save_checks([
+        check(start + timedelta(seconds=10 * i), success=rng.random() > 0.05,
+              url=URLS[i % 2], response_time=rng.uniform(0.1, 1.0))
+        for i in range(17000)
+    ])
+
+    began = time.perf_counter()
+    report = analytics.get_complete_report(hours=24)
+    elapsed = time.perf_counter() - began
+
+    assert report['performance']['total_checks'] > 8000
+    assert elapsed < 2.0, f"{backend.name}: report took {elapsed:.2f}s"
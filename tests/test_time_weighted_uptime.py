@@ -0,0 +1,104 @@
+"""
+Tests for time-weighted uptime.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+from src.analytics import calculate_uptime_percentage, calculate_time_weighted_uptime
+
+URL = 'https://example.test/'
+
+
+@pytest.fixture
+def now():
+    """
+    One reference time per test, so the gaps between saved checks are exact
+    even when a second boundary passes between two saves.
+    """
+    return datetime.now().replace(microsecond=0)
+
+
+def save(now, minutes_ago, success, url=URL):
+    database.save_check({
+        'url': url,
+        'timestamp': now - timedelta(minutes=minutes_ago),
+        'status_code': 200 if success else None,
+        'response_time': 0.1 if success else None,
+        'success': success,
+        'error': None if success else 'Connection failed',
+        'retries': 0
+    })
+
+
+def test_states_are_weighted_by_duration(temp_db, now):
+    save(now, 60, True)    # up for 30 minutes
+    save(now, 30, False)   # down for 10 minutes
+    save(now, 20, True)    # up until now
+
+    # 50 of 60 minutes up, although only 2 of 3 checks succeeded
+    assert calculate_time_weighted_uptime(hours=1, max_gap=3600) == pytest.approx(83.33, abs=0.1)
+    assert calculate_uptime_percentage(hours=1, method='count') == pytest.approx(66.67)
+
+
+def test_gaps_longer_than_max_gap_are_unknown(temp_db, now):
+    save(now, 60, True)
+    save(now, 30, False)
+    save(now, 20, True)
+
+    # Each state lasts at most 10 minutes: 10 up, 10 down, 10 up
+    assert calculate_time_weighted_uptime(hours=1, max_gap=600) == pytest.approx(66.67, abs=0.1)
+
+
+def test_state_before_the_period_covers_its_start(temp_db, now):
+    save(now, 90, False)   # still down when the 1 hour window starts
+    save(now, 30, True)
+
+    assert calculate_time_weighted_uptime(hours=1, max_gap=7200) == pytest.approx(50.0, abs=0.1)
+
+
+def test_urls_are_integrated_separately(temp_db, now):
+    save(now, 60, True)
+    save(now, 60, False, url='https://other.test/')
+    save(now, 30, True, url='https://other.test/')
+
+    assert calculate_time_weighted_uptime(hours=1, max_gap=3600, url=URL) == pytest.approx(100.0)
+    assert calculate_time_weighted_uptime(hours=1, max_gap=3600) == pytest.approx(75.0, abs=0.1)
+
+
+def test_no_data_and_fresh_checks(temp_db, now):
+    assert calculate_time_weighted_uptime(hours=24) is None
+
+    # Only a check stored this very second: fall back to the check ratio
+    save(now, 0, False)
+    assert calculate_time_weighted_uptime(hours=24) == 0.0
+
+
+def test_out_of_order_checks_and_backfill(temp_db, now):
+    # The check at -30 arrives last and splits the state started at -60
+    save(now, 60, True)
+    save(now, 20, True)
+    save(now, 30, False)
+
+    assert calculate_time_weighted_uptime(hours=1, max_gap=3600) == pytest.approx(83.33, abs=0.1)
+
+    # Rows without links (older databases, plain SQL inserts) get them back
+    conn = database.get_connection()
+    states = conn.execute('SELECT prev_gap, prev_success FROM checks ORDER BY timestamp').fetchall()
+    for name in database.list_partitions(conn.cursor()):
+        conn.execute(f'UPDATE {name} SET prev_gap = NULL, prev_success = NULL')
+    conn.commit()
+    database.close_connection(conn)
+
+    assert database.backfill_check_states() == 3
+    conn = database.get_connection()
+    assert conn.execute('SELECT prev_gap, prev_success FROM checks ORDER BY timestamp').fetchall() == states
+    database.close_connection(conn)
+    assert states == [(0, None), (1800, 1), (600, 0)]
@@ -0,0 +1,131 @@
+"""
+Tests for chart series: downsampling, reading rollups and raw checks
+interchangeably, and the /api/timeseries endpoints.
+"""
+
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database as database
+from src import rollups, storage
+from src.timeseries import lttb, minmax, get_timeseries
+
+URLS = ['https://a.test/', 'https://b.test/']
+
+
+@pytest.fixture
+def history(temp_db):
+    """
+    Two URLs checked every 2-4 minutes for the last 5 days.
+    """
+    rng = random.Random(5)
+    end = datetime.now() - timedelta(minutes=10)
+    checks = []
+    for url in URLS:
+        moment = end - timedelta(days=5)
+        while moment < end:
+            success = rng.random() > 0.05
+            checks.append({
+                'url': url, 'timestamp': moment,
+                'status_code': 200 if success else None,
+                'response_time': round(rng.uniform(0.1, 0.5), 3) if success else None,
+                'success': success, 'error': None if success else 'Timeout', 'retries': 0
+            })
+            moment += timedelta(seconds=rng.choice([120, 180, 240]))
+    database.save_checks(checks)
+    return checks
+
+
+def test_lttb_keeps_shape_and_ends():
+    points = [(x, 1.0) for x in range(1000)]
+    points[500] = (500, 9.0)
+    sampled = lttb(points, 50)
+    assert len(sampled) == 50
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (500, 9.0) in sampled
+    assert lttb(points[:10], 50) == points[:10]
+
+
+def test_minmax_keeps_spikes_and_dips():
+    buckets = [(x, 1.0, 0.5, 1.5) for x in range(1000)]
+    buckets[100] = (100, 1.0, 0.01, 1.5)
+    buckets[700] = (700, 1.0, 0.5, 30.0)
+    sampled = minmax(buckets, 100)
+    assert len(sampled) <= 100
+    assert (100, 0.01) in sampled and (700, 30.0) in sampled
+    assert [x for x, _ in sampled] == sorted(x for x, _ in sampled)
+
+
+def test_rollups_give_the_same_series_as_raw_checks(history, monkeypatch):
+    end = datetime.now()
+    start = end - timedelta(days=5)
+
+    # 30 points over 5 days: hourly buckets
+    monkeypatch.setattr(rollups, 'ROLLUPS_ENABLED', False)
+    raw = {metric: get_timeseries(metric, start, end, points=30, method='minmax')
+           for metric in ('response_time', 'uptime')}
+    assert raw['uptime']['sources'] == ['checks'] and raw['uptime']['resolution'] == 3600
+
+    monkeypatch.setattr(rollups, 'ROLLUPS_ENABLED', True)
+    while rollups.compact(max_batches=1000):
+        pass
+    for metric in ('response_time', 'uptime'):
+        series = get_timeseries(metric, start, end, points=30, method='minmax')
+        assert series['sources'][0] == 'rollup_1h'
+        assert series['series'] == raw[metric]['series']
+        for target in series['series']:
+            assert 10 < len(target['points']) <= 30
+
+
+def test_memory_backend_gives_the_same_series(history, monkeypatch):
+    """
+    With STORAGE_BACKEND=memory the series come from the checks in memory
+    (not from whatever is in the SQLite file), bucketed the same way.
+    """
+    end = datetime.now()
+    start = end - timedelta(days=2)
+    monkeypatch.setattr(rollups, 'ROLLUPS_ENABLED', False)
+    expected = {metric: get_timeseries(metric, start, end, points=100, method='minmax')
+                for metric in ('response_time', 'uptime')}
+
+    memory = storage.MemoryStorage()
+    memory.save_checks(history)
+    previous = storage.set_storage(memory)
+    try:
+        for metric in ('response_time', 'uptime'):
+            series = get_timeseries(metric, start, end, points=100, method='minmax')
+            assert series['sources'] == ['memory']
+            assert series['series'] == expected[metric]['series']
+
+        # Nothing saved in memory: empty, even though the file has checks
+        storage.set_storage(storage.MemoryStorage())
+        assert get_timeseries('uptime', start, end)['series'] == []
+    finally:
+        storage.set_storage(previous)
+
+
+def test_api_timeseries(history):
+    from app import app
+    client = app.test_client()
+
+    response = client.get('/api/timeseries/response_time?hours=24&points=50&url=' + URLS[0])
+    assert response.status_code == 200
+    data = response.get_json()
+    [series] = data['series']
+    assert series['url'] == URLS[0] and len(series['points']) == 50
+    assert all(0.1 <= value <= 0.5 for _, value in series['points'])
+
+    data = client.get('/api/timeseries/uptime?days=5&method=minmax').get_json()
+    assert [s['url'] for s in data['series']] == URLS
+    assert all(0 <= value <= 100 for s in data['series'] for _, value in s['points'])
+
+    assert client.get('/api/timeseries/status_codes').status_code == 404
+    assert client.get('/api/timeseries/uptime?method=average').status_code == 400
+    assert client.get('/api/timeseries/uptime?start=yesterday').status_code == 400
@@ -0,0 +1,139 @@
+"""
+Tests for the NumPy analytics backend: results must match the SQL backend.
+"""
+
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+np = pytest.importorskip('numpy')
+
+import src.analytics as analytics
+import src.database as database
+from src import vectorized
+
+URLS = ['https://a.test/', 'https://b.test/']
+
+
+@pytest.fixture
+def history(temp_db):
+    """
+    Two URLs, irregular intervals, failures in runs, over the last 3 days.
+    """
+    rng = random.Random(7)
+    now = datetime.now()
+    checks = []
+    for url in URLS:
+        moment = now - timedelta(days=3)
+        down = False
+        while moment < now:
+            if rng.random() < 0.05:
+                down = not down
+            checks.append({
+                'url': url,
+                'timestamp': moment,
+                'status_code': None if down else 200,
+                'response_time': None if down else rng.uniform(0.05, 2.0),
+                'success': not down,
+                'error': 'Timeout' if down else None,
+                'retries': 0
+            })
+            moment += timedelta(seconds=rng.choice([30, 30, 60, 400, 900]))
+    database.save_checks(checks)
+    return checks
+
+
+def both_backends(monkeypatch, fn):
+    monkeypatch.setattr(analytics, 'ANALYTICS_BACKEND', 'sql')
+    expected = fn()
+    monkeypatch.setattr(analytics, 'ANALYTICS_BACKEND', 'numpy')
+    assert analytics.use_vectorized_backend()
+    return expected, fn()
+
+
+@pytest.mark.parametrize('method', ['time', 'count'])
+@pytest.mark.parametrize('hours', [None, 24])
+@pytest.mark.parametrize('url', [None, URLS[1]])
+def test_uptime_matches_sql(history, monkeypatch, method, hours, url):
+    expected, actual = both_backends(monkeypatch, lambda: analytics.calculate_uptime_percentage(
+        hours=hours, url=url, method=method))
+    assert expected is not None
+    assert actual == pytest.approx(expected, abs=0.01)
+
+
+@pytest.mark.parametrize('url', [None, URLS[0]])
+def test_outages_and_performance_match_sql(history, monkeypatch, url):
+    expected, actual = both_backends(monkeypatch, lambda: analytics.detect_outages(hours=48, url=url))
+    assert len(expected) > 0
+    assert actual == expected
+
+    expected, actual = both_backends(monkeypatch, lambda: analytics.get_performance_stats(hours=48, url=url))
+    assert actual == expected
+
+
+def test_no_data(temp_db, monkeypatch):
+    monkeypatch.setattr(analytics, 'ANALYTICS_BACKEND', 'numpy')
+    assert analytics.calculate_uptime_percentage(hours=24) is None
+    assert analytics.detect_outages(hours=24) == []
+    assert analytics.get_performance_stats(hours=24)['total_checks'] == 0
+
+
+def test_percentiles_moving_average_histogram(history):
+    columns = vectorized.load_columns(url=URLS[0])
+    times = sorted(c['response_time'] for c in history
+                   if c['url'] == URLS[0] and c['success'])
+
+    p = vectorized.percentiles(columns, quantiles=(50, 99))
+    assert p['p50'] == pytest.approx(np.percentile(times, 50), abs=0.001)
+    assert p['p99'] == pytest.approx(np.percentile(times, 99), abs=0.001)
+
+    ts, averages = vectorized.moving_average(columns, window=5)
+    assert len(averages) == len(times) - 4
+    assert len(ts) == len(averages)
+
+    counts, edges = vectorized.histogram(columns, bins=10, value_range=(0, 2))
+    assert counts.sum() == len(times)
+    assert len(edges) == 11
+
+
+def test_column_store_follows_new_and_late_checks(history):
+    before = vectorized.load_columns(url=URLS[0])
+
+    # One new check and one that arrives late (older than the newest)
+    newest = max(c['timestamp'] for c in history if c['url'] == URLS[0])
+    database.save_checks([
+        dict(history[0], timestamp=newest + timedelta(seconds=30)),
+        dict(history[0], timestamp=newest - timedelta(seconds=5), success=False,
+             response_time=None)
+    ])
+
+    after = vectorized.load_columns(url=URLS[0])
+    assert len(after) == len(before) + 2
+    assert np.all(np.diff(after.ts) >= 0)
+
+    fresh = vectorized.ColumnStore()
+    fresh.refresh()
+    _, ts, success, rt = fresh.get(URLS[0])[0]
+    assert np.array_equal(ts, after.ts)
+    assert np.array_equal(success, after.success)
+
+
+def test_column_store_drops_expired_partitions(history):
+    # A backfill whose ids interleave with kept checks, then retention
+    old = datetime.now() - timedelta(days=40)
+    database.save_checks([dict(history[0], timestamp=old + timedelta(minutes=i)) for i in range(3)])
+    database.save_checks([dict(history[0], timestamp=datetime.now())])
+    before = vectorized.load_columns(url=URLS[0])
+    assert database.get_data_version()['min_id'] == 1
+
+    assert database.cleanup_old_checks(days=30) == 3
+    assert database.get_data_version()['min_id'] == 1  # unchanged
+    after = vectorized.load_columns(url=URLS[0])
+    assert len(after) == len(before) - 3
+    assert after.ts[0] > vectorized._epoch(old + timedelta(days=1))
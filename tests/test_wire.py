@@ -0,0 +1,157 @@
+"""
+Tests for the binary result wire format, bulk inserts and /api/ingest.
+"""
+
+import sys
+import os
+import gzip
+import random
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.aggregator as aggregator
+import src.database as database
+from src import wire
+
+URL = 'https://a.test/'
+
+
+def result(moment, success=True, url=URL, **extra):
+    check = {'url': url, 'timestamp': moment, 'status_code': 200 if success else None,
+             'response_time': 0.123 if success else None, 'success': success,
+             'error': None if success else 'Timeout', 'retries': 0 if success else 2}
+    check.update(extra)
+    return check
+
+
+def test_results_survive_a_round_trip():
+    moment = datetime(2024, 5, 1, 12, 0, 0)
+    results = [
+        result(moment, queue_wait=0.0005, scheduled_at=moment - timedelta(seconds=2),
+               schedule_lag=2.25, missed_runs=1),
+        result(moment + timedelta(seconds=30, microseconds=900), success=False),
+        result(moment - timedelta(days=3), url='https://ü.test/päth', error='Connection refused: ✗'),
+        result(moment, status_code=503, success=False, url='https://ü.test/päth'),
+    ]
+    data = wire.encode_results(results, agent='eu-1')
+    agent, decoded = wire.decode_results(data)
+
+    assert agent == 'eu-1'
+    assert len(decoded) == 4
+    assert decoded[0] == {**results[0], 'queue_wait': 0.0005, 'schedule_lag': 2.25, 'agent': 'eu-1'}
+    assert decoded[1]['timestamp'] == moment + timedelta(seconds=30)
+    assert (decoded[1]['status_code'], decoded[1]['response_time'], decoded[1]['queue_wait'],
+            decoded[1]['scheduled_at'], decoded[1]['retries']) == (None, None, None, None, 2)
+    assert decoded[2]['url'] == 'https://ü.test/päth' and decoded[2]['error'] == 'Connection refused: ✗'
+    assert decoded[3]['status_code'] == 503 and not decoded[3]['success']
+
+    # Stored timestamps work as input too, and an empty batch is valid
+    assert wire.decode_results(wire.encode_results(
+        [result('2024-05-01 12:00:00')]))[1][0]['timestamp'] == moment
+    assert wire.decode_results(wire.encode_results([])) == (None, [])
+
+    # URLs and errors are sent once: well under the JSON size
+    many = [result(moment + timedelta(seconds=i), success=i % 5 > 0, url=f'https://t{i % 20}.test/')
+            for i in range(1000)]
+    assert len(wire.encode_results(many)) < 1000 * wire.RECORD.size + 1000
+
+
+def test_damaged_batches_are_rejected():
+    data = wire.encode_results([result(datetime(2024, 5, 1, 12)) for _ in range(3)], agent='x')
+
+    flipped = bytearray(data)
+    flipped[40] ^= 0xFF
+    body = data[:-4]
+    newer = bytearray(body)
+    newer[4] = wire.VERSION + 1
+    short = body[:-wire.RECORD.size]
+    for bad in (b'', data[:10], data[:-1], bytes(flipped), b'JUNK' + data[4:],
+                bytes(newer) + struct.pack('<I', zlib.crc32(bytes(newer))),
+                short + struct.pack('<I', zlib.crc32(short))):
+        with pytest.raises(ValueError):
+            wire.decode_results(bad)
+
+
+def links():
+    conn = database.get_connection()
+    rows = conn.execute('SELECT id, url, timestamp, prev_gap, prev_success FROM checks ORDER BY id').fetchall()
+    database.close_connection(conn)
+    return [tuple(row) for row in rows]
+
+
+def test_bulk_insert_links_like_one_by_one(tmp_path, monkeypatch):
+    rng = random.Random(5)
+    start = datetime.now().replace(microsecond=0) - timedelta(days=2)
+
+    def batch(count, urls):
+        return [result(start + timedelta(seconds=rng.randrange(0, 2 * 86400, 20)),
+                       success=rng.random() > 0.3, url=rng.choice(urls)) for _ in range(count)]
+
+    stored = sorted(batch(200, ['https://a.test/', 'https://b.test/']), key=lambda r: r['timestamp'])
+    batches = [
+        batch(300, ['https://a.test/']),                      # interleaves the stored checks
+        [result(start + timedelta(days=3, seconds=i * 10), url='https://b.test/') for i in range(50)],
+        [result(start - timedelta(seconds=i * 10), url='https://c.test/') for i in range(50)],
+        [result(start + timedelta(days=3), url='https://b.test/', success=False)] * 3,  # ties
+    ]
+
+    tables = []
+    for bulk in (False, True):
+        monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / f'bulk-{bulk}.db'))
+        database.init_database()
+        database.save_checks(stored)
+        for checks in batches:
+            if bulk:
+                database.save_checks(checks)
+            else:
+                for check in checks:
+                    database.save_check(check)
+        tables.append(links())
+    assert tables[0] == tables[1]
+    assert len(tables[0]) == 603
+
+
+def test_ingest_endpoint_bulk_inserts_binary_batches(temp_db, monkeypatch):
+    from app import app
+    monkeypatch.setattr(aggregator, '_aggregator', None)
+    monkeypatch.setattr(aggregator, 'AGENT_TOKEN', 'secret')
+    client = app.test_client()
+    headers = {'Content-Type': wire.CONTENT_TYPE, 'X-Agent-Token': 'secret'}
+
+    moment = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+    results = [result(moment + timedelta(seconds=i), success=i % 10 > 0, url=f'https://t{i % 4}.test/')
+               for i in range(2000)]
+    body = wire.encode_results(results)
+
+    assert client.post('/api/ingest', data=body, headers={'Content-Type': wire.CONTENT_TYPE}).status_code == 401
+    response = client.post('/api/ingest', data=body, headers=headers)
+    assert response.status_code == 200 and response.json['saved'] == 2000
+    assert client.post('/api/ingest', data=body[:-1], headers=headers).status_code == 400
+
+    # Same batch limit as the JSON endpoint, and the same gzip size cap
+    monkeypatch.setattr(aggregator, 'MAX_BATCH_RESULTS', 1000)
+    response = client.post('/api/ingest', data=body, headers=headers)
+    assert response.status_code == 400 and 'At most 1000' in response.json['error']
+    monkeypatch.setattr(aggregator, 'MAX_BATCH_BYTES', 65536)
+    bomb = gzip.compress(b'\0' * 10 ** 7)
+    assert client.post('/api/ingest', data=bomb, headers=dict(headers, **{'Content-Encoding': 'gzip'})).status_code == 400
+
+    conn = database.get_connection()
+    count, failed, linked = conn.execute(
+        'SELECT COUNT(*), SUM(success = 0), SUM(prev_gap = 4) FROM checks'
+    ).fetchone()
+    database.close_connection(conn)
+    assert (count, failed, linked) == (2000, 200, 1996)
+
+    # A batch from an agent updates the quorum decisions
+    tagged = wire.encode_results([result(datetime.now().replace(microsecond=0), success=False)], agent='eu-1')
+    assert client.post('/api/ingest', data=tagged, headers=headers).json['saved'] == 1
+    status = client.get('/api/agents').json
+    assert status['agents']['eu-1']['results'] == 1
+    assert status['targets'][0]['state'] == 'down'